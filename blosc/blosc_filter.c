@@ -19,6 +19,12 @@
 #include "../blosc/blosc.h"
 #include "blosc_filter.h"
 
+#if defined(_WIN32)
+  #include "win32/pthread.h"
+#else
+  #include <pthread.h>
+#endif
+
 
 /* The conditional below is necessary because the THG team has decided
   to fix an API inconsistency in the definition of the H5Z_class_t
@@ -43,6 +49,10 @@ size_t blosc_filter(unsigned flags, size_t cd_nelmts,
 
 herr_t blosc_set_local(hid_t dcpl, hid_t type, hid_t space);
 
+/* Blosc keeps its state in global variables, so calls to it from the
+   threads filtering chunks outside of HDF5 must be serialized */
+static pthread_mutex_t blosc_mutex;
+
 
 /* Register the filter, passing on the HDF5 return value */
 int register_blosc(char **version, char **date){
@@ -69,6 +79,8 @@ int register_blosc(char **version, char **date){
     };
 #endif
 
+    pthread_mutex_init(&blosc_mutex, NULL);
+
     retval = H5Zregister(&filter_class);
     if(retval<0){
         PUSH_ERR("register_blosc", H5E_CANTREGISTER, "Can't register Blosc filter");
@@ -203,8 +215,10 @@ size_t blosc_filter(unsigned flags, size_t cd_nelmts,
             goto failed;
         }
 
+        pthread_mutex_lock(&blosc_mutex);
         status = blosc_compress(clevel, doshuffle, typesize, nbytes,
                                 *buf, outbuf, nbytes);
+        pthread_mutex_unlock(&blosc_mutex);
         if (status < 0) {
           PUSH_ERR("blosc_filter", H5E_CALLBACK, "Blosc compression error");
           goto failed;
@@ -226,7 +240,9 @@ size_t blosc_filter(unsigned flags, size_t cd_nelmts,
           goto failed;
         }
 
+        pthread_mutex_lock(&blosc_mutex);
         status = blosc_decompress(*buf, outbuf, outbuf_size);
+        pthread_mutex_unlock(&blosc_mutex);
 
         if(status <= 0){    /* decompression failed */
           PUSH_ERR("blosc_filter", H5E_CALLBACK, "Blosc decompression error");
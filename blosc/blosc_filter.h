@@ -14,6 +14,12 @@ extern "C" {
 /* Register the filter with the library */
 int register_blosc(char **version, char **date);
 
+/* The filter function, also used to filter chunks outside of HDF5
+   (from any thread, as calls to Blosc are serialized) */
+size_t blosc_filter(unsigned flags, size_t cd_nelmts,
+                    const unsigned cd_values[], size_t nbytes,
+                    size_t *buf_size, void **buf);
+
 #ifdef __cplusplus
 }
 #endif
@@ -258,6 +258,7 @@ if os.name == 'posix':
     _Package = PosixPackage
     _platdep = {  # package tag -> platform-dependent components
         'HDF5': ['hdf5'],
+        'HDF5_HL': ['hdf5_hl'],
         'LZO2': ['lzo2'],
         'LZO': ['lzo'],
         'BZ2': ['bz2'],
@@ -266,6 +267,7 @@ elif os.name == 'nt':
     _Package = WindowsPackage
     _platdep = {  # package tag -> platform-dependent components
         'HDF5': ['hdf5dll', 'hdf5dll'],
+        'HDF5_HL': ['hdf5_hldll', 'hdf5_hldll'],
         'LZO2': ['lzo2', 'lzo2'],
         'LZO': ['liblzo', 'lzo1'],
         'BZ2': ['bzip2', 'bzip2'],
@@ -277,8 +279,11 @@ elif os.name == 'nt':
                  ]
     if '--debug' in sys.argv:
         _platdep['HDF5'] = ['hdf5ddll', 'hdf5ddll']
+        _platdep['HDF5_HL'] = ['hdf5_hlddll', 'hdf5_hlddll']
 
 hdf5_package = _Package("HDF5", 'HDF5', 'H5public', *_platdep['HDF5'])
+hdf5_hl_package = _Package("HDF5 high-level", 'HDF5_HL', 'H5DOpublic',
+                           *_platdep['HDF5_HL'])
 lzo2_package = _Package("LZO 2", 'LZO2', _cp('lzo/lzo1x'), *_platdep['LZO2'])
 lzo1_package = _Package("LZO 1", 'LZO', 'lzo1x', *_platdep['LZO'])
 bzip2_package = _Package("bzip2", 'BZ2', 'bzlib', *_platdep['BZ2'])
@@ -344,6 +349,7 @@ CFLAGS.append("-DH5_USE_16_API")
 lzo2_enabled = False
 for (package, location) in [
     (hdf5_package, HDF5_DIR),
+    (hdf5_hl_package, HDF5_DIR),
     (lzo2_package, LZO_DIR),
     (lzo1_package, LZO_DIR),
     (bzip2_package, BZIP2_DIR),
@@ -444,8 +450,11 @@ def get_cython_extfiles(extnames):
             # Copy extensions that depends on the HDF5 version
             hdf5_maj_version, hdf5_min_version = hdf5_version[:2]
             hdf5_majmin = "%d%d" % (hdf5_maj_version, hdf5_min_version)
-            if not hdf5_majmin in ("16", "18"):
+            if not hdf5_majmin in ("16", "18", "110"):
                 exit_with_error("Unsupported HDF5 version!")
+            if hdf5_majmin == "110":
+                # HDF5 1.10 keeps the 1.8 API for links
+                hdf5_majmin = "18"
             specific_ext = os.path.join(extdir, extname + hdf5_majmin + ".pyx")
             if exists(specific_ext):
                 shutil.copy(specific_ext, extpfile)
@@ -547,7 +556,10 @@ if os.name == "nt":
     data_files.extend([('Lib/site-packages/%s'%name, dll_files),
                        ])
 
-ADDLIBS = [hdf5_package.library_name, ]
+ADDLIBS = [hdf5_package.library_name]
+# Chunks are written directly with the HDF5 high-level library, if found.
+if hdf5_hl_package.tag in optional_libs:
+    ADDLIBS.append(hdf5_hl_package.library_name)
 utilsExtension_libs = LIBS + ADDLIBS
 hdf5Extension_libs = LIBS + ADDLIBS
 tableExtension_libs = LIBS + ADDLIBS
@@ -31,7 +31,7 @@
  *-------------------------------------------------------------------------
  */
 
-herr_t H5ARRAYmake( hid_t loc_id,
+hid_t H5ARRAYmake( hid_t loc_id,
 		    const char *dset_name,
 		    const char *obversion,
 		    const int rank,
@@ -12,10 +12,6 @@
 #include "bzlib.h"
 #endif  /* defined HAVE_BZ2_LIB */
 
-size_t bzip2_deflate(unsigned int flags, size_t cd_nelmts,
-		     const unsigned int cd_values[], size_t nbytes,
-		     size_t *buf_size, void **buf);
-
 
 int register_bzip2(char **version, char **date)
 {
@@ -1,7 +1,14 @@
 #ifndef __H5ZBZIP2_H__
 #define __H5ZBZIP2_H__ 1
 
+#include <stddef.h>
+
 #define FILTER_BZIP2 307
 int register_bzip2(char **version, char **date);
 
+/* The filter function, also used to filter chunks outside of HDF5 */
+size_t bzip2_deflate(unsigned int flags, size_t cd_nelmts,
+		     const unsigned int cd_values[], size_t nbytes,
+		     size_t *buf_size, void **buf);
+
 #endif /* ! defined __H5ZBZIP2_H__ */
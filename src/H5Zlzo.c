@@ -33,10 +33,6 @@
    F. Alted 2004/01/02 */
 #undef CHECKSUM
 
-size_t lzo_deflate (unsigned flags, size_t cd_nelmts,
-		    const unsigned cd_values[], size_t nbytes,
-		    size_t *buf_size, void **buf);
-
 
 int register_lzo(char **version, char **date) {
 
@@ -107,6 +103,7 @@ size_t lzo_deflate (unsigned flags, size_t cd_nelmts,
   /* max_len_buffer will keep the likely output buffer size
      after processing the first chunk */
   static unsigned int max_len_buffer = 0;
+  unsigned int len_buffer;
   int complevel = 1;
   int object_version = 10;    	/* Default version 1.0 */
   int object_type = Table;      /* Default object type */
@@ -152,16 +149,19 @@ size_t lzo_deflate (unsigned flags, size_t cd_nelmts,
     }
 #endif
 
-    /* Only allocate the bytes for the outbuf */
-    if (max_len_buffer == 0) {
+    /* Only allocate the bytes for the outbuf.  The likely size is read
+       just once, since chunks may be decompressed by several threads
+       at the same time (see tables/_comp_lzo.pyx). */
+    len_buffer = max_len_buffer;
+    if (len_buffer == 0) {
       if (NULL==(outbuf = (void *)malloc(nalloc)))
 	fprintf(stderr, "Memory allocation failed for lzo uncompression.\n");
     }
     else {
-      if (NULL==(outbuf = (void *)malloc(max_len_buffer)))
+      if (NULL==(outbuf = (void *)malloc(len_buffer)))
 	fprintf(stderr, "Memory allocation failed for lzo uncompression.\n");
-      out_len = max_len_buffer;
-      nalloc =  max_len_buffer;
+      out_len = len_buffer;
+      nalloc =  len_buffer;
     }
 
     while(1) {
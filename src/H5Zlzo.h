@@ -1,7 +1,14 @@
 #ifndef __H5ZLZO_H__
 #define __H5ZLZO_H__ 1
 
+#include <stddef.h>
+
 #define FILTER_LZO 305
 int register_lzo(char **version, char **date);
 
+/* The filter function, also used to filter chunks outside of HDF5 */
+size_t lzo_deflate (unsigned flags, size_t cd_nelmts,
+		    const unsigned cd_values[], size_t nbytes,
+		    size_t *buf_size, void **buf);
+
 #endif /* ! defined __H5ZLZO_H__ */
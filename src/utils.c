@@ -4,6 +4,9 @@
 #include "version.h"
 #include "H5Zlzo.h"  		       /* Import FILTER_LZO */
 #include "H5Zbzip2.h"  		       /* Import FILTER_BZIP2 */
+#if defined(PT_DIRECT_CHUNK_WRITE) && !PT_HDF5_VERSION_GE(1, 10, 3)
+#include "H5DOpublic.h"       /* Import H5DOwrite_chunk(), H5DOread_chunk() */
+#endif
 
 
 /* ---------------------------------------------------------------- */
@@ -182,7 +185,7 @@ PyObject *get_filter_names( hid_t loc_id,
  unsigned filt_flags;     /* filter flags */
  H5Z_filter_t filt_id;       /* filter identification number */
  size_t   cd_nelmts;      /* filter client number of values */
- unsigned cd_values[20];  /* filter client data values */
+ unsigned cd_values[PT_MAX_CD_VALUES];  /* filter client data values */
  char     f_name[256];    /* filter name */
  PyObject *filters;
  PyObject *filter_values;
@@ -200,7 +203,7 @@ PyObject *get_filter_names( hid_t loc_id,
     nf = H5Pget_nfilters(dcpl);
    if ((nf = H5Pget_nfilters(dcpl))>0) {
      for (i=0; i<nf; i++) {
-       cd_nelmts = 20;
+       cd_nelmts = PT_MAX_CD_VALUES;
 #if H5_USE_16_API || (H5_VERS_MAJOR == 1 && H5_VERS_MINOR < 7)
        /* 1.6.x */
        filt_id = H5Pget_filter(dcpl, i, &filt_flags, &cd_nelmts,
@@ -210,6 +213,9 @@ PyObject *get_filter_names( hid_t loc_id,
        filt_id = H5Pget_filter(dcpl, i, &filt_flags, &cd_nelmts,
 			       cd_values, sizeof(f_name), f_name, NULL);
 #endif /* if H5_VERSION < "1.7" */
+       /* The number of values reported may not fit in the buffer */
+       if (cd_nelmts > PT_MAX_CD_VALUES)
+	 cd_nelmts = PT_MAX_CD_VALUES;
 
        filter_values = PyTuple_New(cd_nelmts);
        for (j=0;j<(long)cd_nelmts;j++) {
@@ -237,6 +243,212 @@ out:
 
 }
 
+/*-------------------------------------------------------------------------
+ * Function: get_filter_pipeline
+ *
+ * Purpose: Get the identifiers and client data values of the filters
+ *          of a chunked dataset, in the order they are applied
+ *
+ * Return: Success: a list of (id, cd_values) tuples,
+ *         Failure: None (dataset not chunked or error), or NULL if a
+ *                  Python exception has been raised
+ *
+ *-------------------------------------------------------------------------
+ */
+
+PyObject *get_filter_pipeline(hid_t dataset_id)
+{
+ hid_t    dcpl;           /* dataset creation property list */
+ int      i, j;
+ int      nf;             /* number of filters */
+ unsigned filt_flags;     /* filter flags */
+ H5Z_filter_t filt_id;    /* filter identification number */
+ size_t   cd_nelmts;      /* filter client number of values */
+ unsigned cd_values[PT_MAX_CD_VALUES];  /* filter client data values */
+ char     f_name[256];    /* filter name */
+ PyObject *pipeline;
+ PyObject *filter;
+ PyObject *filter_values;
+
+ if ( (dcpl = H5Dget_create_plist(dataset_id)) < 0 )
+   goto out;
+ if ( H5D_CHUNKED != H5Pget_layout(dcpl) ) {
+   H5Pclose(dcpl);
+   goto out;
+ }
+
+ pipeline = PyList_New(0);
+ nf = H5Pget_nfilters(dcpl);
+ for (i=0; i<nf; i++) {
+   cd_nelmts = PT_MAX_CD_VALUES;
+#if H5_USE_16_API || (H5_VERS_MAJOR == 1 && H5_VERS_MINOR < 7)
+   /* 1.6.x */
+   filt_id = H5Pget_filter(dcpl, i, &filt_flags, &cd_nelmts,
+			   cd_values, sizeof(f_name), f_name);
+#else
+   /* 1.7.x */
+   filt_id = H5Pget_filter(dcpl, i, &filt_flags, &cd_nelmts,
+			   cd_values, sizeof(f_name), f_name, NULL);
+#endif /* if H5_VERSION < "1.7" */
+   /* The number of values reported may not fit in the buffer */
+   if (cd_nelmts > PT_MAX_CD_VALUES)
+     cd_nelmts = PT_MAX_CD_VALUES;
+
+   filter_values = PyTuple_New(cd_nelmts);
+   if (filter_values == NULL)
+     goto error;
+   for (j=0;j<(long)cd_nelmts;j++) {
+     PyTuple_SetItem(filter_values, j, PyInt_FromLong(cd_values[j]));
+   }
+   /* The reference to filter_values is stolen by the tuple */
+   filter = Py_BuildValue("(iN)", (int)filt_id, filter_values);
+   if (filter == NULL)
+     goto error;
+   j = PyList_Append(pipeline, filter);
+   Py_DECREF(filter);
+   if (j < 0)
+     goto error;
+ }
+
+ H5Pclose(dcpl);
+ return pipeline;
+
+error:
+ /* A Python exception is set */
+ Py_DECREF(pipeline);
+ H5Pclose(dcpl);
+ return NULL;
+
+out:
+ Py_INCREF(Py_None);
+ return Py_None;
+
+}
+
+/*-------------------------------------------------------------------------
+ * Function: has_direct_chunk_write
+ *
+ * Purpose: Tell whether chunks can be written bypassing the filter
+ *          pipeline (only possible with HDF5 1.8.11 or higher)
+ *
+ *-------------------------------------------------------------------------
+ */
+
+int has_direct_chunk_write(void)
+{
+#ifdef PT_DIRECT_CHUNK_WRITE
+  return 1;
+#else
+  return 0;
+#endif
+}
+
+/*-------------------------------------------------------------------------
+ * Function: has_direct_chunk_read
+ *
+ * Purpose: Tell whether chunks can be read bypassing the filter
+ *          pipeline (only possible with HDF5 1.10.2 or higher)
+ *
+ *-------------------------------------------------------------------------
+ */
+
+int has_direct_chunk_read(void)
+{
+#ifdef PT_DIRECT_CHUNK_READ
+  return 1;
+#else
+  return 0;
+#endif
+}
+
+/*-------------------------------------------------------------------------
+ * Function: write_chunk
+ *
+ * Purpose: Write the already filtered data of the chunk at offset,
+ *          along with the mask of the filters which were skipped
+ *
+ * Return: Success: 0, Failure: -1
+ *
+ *-------------------------------------------------------------------------
+ */
+
+herr_t write_chunk(hid_t dataset_id,
+		   hsize_t *offset,
+		   unsigned int filter_mask,
+		   size_t nbytes,
+		   const void *data)
+{
+#if PT_HDF5_VERSION_GE(1, 10, 3)
+  return H5Dwrite_chunk(dataset_id, H5P_DEFAULT, filter_mask, offset,
+			nbytes, data);
+#elif defined(PT_DIRECT_CHUNK_WRITE)
+  return H5DOwrite_chunk(dataset_id, H5P_DEFAULT, filter_mask, offset,
+			 nbytes, data);
+#else
+  return -1;
+#endif
+}
+
+/*-------------------------------------------------------------------------
+ * Function: get_chunk_size
+ *
+ * Purpose: Get the size of the filtered data of the chunk at offset
+ *
+ * Return: Success: the size in bytes, or 0 if the chunk has not been
+ *         written yet (or chunks can not be read bypassing filters)
+ *
+ *-------------------------------------------------------------------------
+ */
+
+hsize_t get_chunk_size(hid_t dataset_id,
+		       hsize_t *offset)
+{
+  hsize_t nbytes = 0;
+#ifdef PT_DIRECT_CHUNK_READ
+  herr_t  ret;
+
+  H5E_BEGIN_TRY {
+    ret = H5Dget_chunk_storage_size(dataset_id, offset, &nbytes);
+  } H5E_END_TRY;
+  if (ret < 0)
+    return 0;
+#endif
+  return nbytes;
+}
+
+/*-------------------------------------------------------------------------
+ * Function: read_chunk
+ *
+ * Purpose: Read the filtered data of the chunk at offset, along with
+ *          the mask of the filters which were skipped when writing it
+ *
+ * Return: Success: 0, Failure: -1
+ *
+ *-------------------------------------------------------------------------
+ */
+
+herr_t read_chunk(hid_t dataset_id,
+		  hsize_t *offset,
+		  unsigned int *filter_mask,
+		  void *data)
+{
+#ifdef PT_DIRECT_CHUNK_READ
+  uint32_t mask;
+
+#if PT_HDF5_VERSION_GE(1, 10, 3)
+  if ( H5Dread_chunk(dataset_id, H5P_DEFAULT, offset, &mask, data) < 0 )
+    return -1;
+#else
+  if ( H5DOread_chunk(dataset_id, H5P_DEFAULT, offset, &mask, data) < 0 )
+    return -1;
+#endif
+  *filter_mask = mask;
+  return 0;
+#else
+  return -1;
+#endif
+}
+
 /****************************************************************
 **
 **  get_objinfo(): Get information about the type of a child.
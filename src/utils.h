@@ -56,8 +56,47 @@ PyObject *getHDF5VersionInfo(void);
 
 PyObject *createNamesTuple(char *buffer[], int nelements);
 
+/* The maximum number of client data values retrieved for a filter */
+#define PT_MAX_CD_VALUES 20
+
 PyObject *get_filter_names( hid_t loc_id, const char *dset_name);
 
+PyObject *get_filter_pipeline(hid_t dataset_id);
+
+/* Is the HDF5 library at least version maj.min.rel? */
+#define PT_HDF5_VERSION_GE(maj, min, rel) \
+  (H5_VERS_MAJOR > (maj) || (H5_VERS_MAJOR == (maj) && \
+   (H5_VERS_MINOR > (min) || (H5_VERS_MINOR == (min) && \
+    H5_VERS_RELEASE >= (rel)))))
+
+/* Chunks can be written bypassing filters with H5DOwrite_chunk() from
+   the high-level library (if available) since HDF5 1.8.11, and with
+   H5Dwrite_chunk() in the main library since 1.10.3 */
+#if PT_HDF5_VERSION_GE(1, 10, 3) || \
+    (defined(HAVE_HDF5_HL_LIB) && PT_HDF5_VERSION_GE(1, 8, 11))
+#define PT_DIRECT_CHUNK_WRITE 1
+#endif
+
+/* Chunks can be read bypassing filters with H5DOread_chunk() from the
+   high-level library (if available) since HDF5 1.10.2, and with
+   H5Dread_chunk() in the main library since 1.10.3 */
+#if PT_HDF5_VERSION_GE(1, 10, 3) || \
+    (defined(HAVE_HDF5_HL_LIB) && PT_HDF5_VERSION_GE(1, 10, 2))
+#define PT_DIRECT_CHUNK_READ 1
+#endif
+
+int has_direct_chunk_write(void);
+
+int has_direct_chunk_read(void);
+
+herr_t write_chunk(hid_t dataset_id, hsize_t *offset,
+		   unsigned int filter_mask, size_t nbytes, const void *data);
+
+hsize_t get_chunk_size(hid_t dataset_id, hsize_t *offset);
+
+herr_t read_chunk(hid_t dataset_id, hsize_t *offset,
+		  unsigned int *filter_mask, void *data);
+
 int get_objinfo(hid_t loc_id, const char *name);
 
 PyObject *Giterate(hid_t parent_id, hid_t loc_id, const char *name);
@@ -39,7 +39,7 @@ First Level Functions
 =====================
 
 openFile, copyFile, test,  print_versions, whichLibVersion,
-isPyTablesFile, isHDF5File
+isPyTablesFile, isHDF5File, join
 
 Misc variables
 ==============
@@ -95,12 +95,14 @@ from tables.node import Node
 from tables.group import Group
 from tables.leaf import Leaf
 from tables.table import Table, Cols, Column
+from tables.ctable import CTable
 from tables.array import Array
 from tables.carray import CArray
 from tables.earray import EArray
 from tables.vlarray import VLArray
 from tables.unimplemented import UnImplemented, Unknown
 from tables.expression import Expr
+from tables.join import join
 from tables.tests import print_versions, test
 
 
@@ -116,7 +118,7 @@ __all__ = [
     'FiltersWarning', 'DataTypeWarning',
     # Functions:
     'isHDF5File', 'isPyTablesFile', 'whichLibVersion',
-    'copyFile', 'openFile', 'print_versions', 'test',
+    'copyFile', 'openFile', 'print_versions', 'test', 'join',
     'split_type', 'restrict_flavors', 'lrange',
     # Helper classes:
     'IsDescription', 'Description', 'Filters', 'Cols', 'Column',
@@ -141,6 +143,7 @@ __all__ = [
     'EnumCol',
     # Node classes:
     'Node', 'Group', 'Leaf', 'Table', 'Array', 'CArray', 'EArray', 'VLArray',
+    'CTable',
     'UnImplemented',
     # The File class:
     'File',
@@ -1,8 +1,23 @@
 cdef extern from "stdlib.h":
+  void *malloc(size_t size)
   void free(void *)
 
+cdef extern from "string.h":
+  void *memcpy(void *dest, void *src, size_t n)
+
+cdef extern from "Python.h":
+  object PyString_FromStringAndSize(char *s, Py_ssize_t len)
+  int PyObject_AsReadBuffer(object obj, void **buffer,
+                            Py_ssize_t *buffer_len) except -1
+
+cdef extern from "hdf5.h":
+  int H5Z_FLAG_REVERSE
+
 cdef extern from "H5Zbzip2.h":
   int register_bzip2(char **, char **)
+  size_t bzip2_deflate(unsigned int flags, size_t cd_nelmts,
+                       unsigned int *cd_values, size_t nbytes,
+                       size_t *buf_size, void **buf) nogil
 
 def register_():
   cdef char *version, *date
@@ -14,3 +29,43 @@ def register_():
   free(version)
   free(date)
   return compinfo
+
+def filterChunk(object data, object cd_values, int reverse):
+  """Compress the `data` of a chunk with bzip2, or decompress it if `reverse`.
+
+  `cd_values` are the parameters of the filter in the pipeline of the
+  chunk.  None is returned if the filter fails.  The GIL is released
+  while filtering, so chunks can be filtered by several threads at the
+  same time.
+  """
+  cdef void *inbuf, *buf
+  cdef Py_ssize_t nbytes
+  cdef size_t buf_size, outbytes, cd_nelmts, i
+  cdef unsigned int flags, *cd_values_
+
+  flags = 0
+  if reverse:
+    flags = H5Z_FLAG_REVERSE
+  PyObject_AsReadBuffer(data, &inbuf, &nbytes)
+  cd_nelmts = len(cd_values)
+  cd_values_ = <unsigned int *>malloc((cd_nelmts+1) * sizeof(unsigned int))
+  buf = malloc(nbytes+1)
+  if cd_values_ == NULL or buf == NULL:
+    free(cd_values_)
+    free(buf)
+    raise MemoryError("unable to allocate the buffers for the chunk")
+  for i from 0 <= i < cd_nelmts:
+    cd_values_[i] = cd_values[i]
+  # The filter frees the buffer when replacing it with its output.
+  memcpy(buf, inbuf, nbytes)
+  buf_size = nbytes
+  with nogil:
+    outbytes = bzip2_deflate(flags, cd_nelmts, cd_values_, buf_size,
+                             &buf_size, &buf)
+  free(cd_values_)
+  if outbytes == 0:
+    data = None
+  else:
+    data = PyString_FromStringAndSize(<char *>buf, outbytes)
+  free(buf)
+  return data
@@ -15,21 +15,40 @@ Classes:
 
 `CompileCondition`
     Container for a compiled condition.
+`CompiledConditionCache`
+    LRU cache of compiled conditions.
 
 Functions:
 
+`required_expr_vars`
+    Get the variables required by a condition.
 `compile_condition`
     Compile a condition and extract usable index conditions.
 `call_on_recarr`
     Evaluate a function over a record array.
+`combine_index_results`
+    Combine the results of the index expressions of a condition.
+
+Misc variables:
+
+`compiled_condition_cache`
+    The cache of compiled conditions shared by the whole process.
 """
 
+import operator
 import re
+import sys
+import threading
+
+import numpy
+
 from numexpr.necompiler import typecode_to_kind
 from numexpr.necompiler import expressionToAST, typeCompileAst
 from numexpr.necompiler import stringToExpression, NumExpr
+from numexpr.expressions import functions as numexpr_functions
 from tables.utilsExtension import getNestedField
 from tables.utils import lazyattr
+from tables.parameters import SHARED_COND_CACHE_SLOTS
 
 _no_matching_opcode = re.compile(r"[^a-z]([a-z]+)_([a-z]+)[^a-z]")
 # E.g. "gt" and "bfc" from "couldn't find matching opcode for 'gt_bfc'".
@@ -269,6 +288,116 @@ def _get_idx_expr(expr, indexedcols):
     return _get_idx_expr_recurse(expr, indexedcols, [], [''])
 
 
+def _get_conjuncts(exprnode):
+    """Get the list of terms in the top-level conjunction `exprnode`."""
+    terms, stack = [], [exprnode]
+    while stack:
+        node = stack.pop()
+        if node.astType == 'op' and node.value == 'and':
+            stack.extend(node.children[::-1])
+        else:
+            terms.append(node)
+    return terms
+
+
+def _count_terms(exprnode):
+    """Count the terms in the conjunctions and disjunctions of `exprnode`."""
+    nterms, stack = 0, [exprnode]
+    while stack:
+        node = stack.pop()
+        if node.astType == 'op' and node.value in ['and', 'or']:
+            stack.extend(node.children)
+        else:
+            nterms += 1
+    return nterms
+
+
+def _get_composite_idx_expr(expr, indexedcols, compositecols):
+    """
+    Extract an indexable expression using composite indexes.
+
+    `compositecols` is a sequence of tuples with the variable names of
+    the columns in composite indexes, in index order.  The top-level
+    conjunction in `expr` is searched for equality comparisons on the
+    leading columns of a composite index, optionally followed by a
+    range comparison on the next column.  The composite index which
+    restricts more columns is chosen, and it yields an expression in
+    the form ``((var0, var1...), (ops), (limits))``.  The rest of terms
+    are handled by `_get_idx_expr()` using `indexedcols`.
+
+    If no composite index is usable, None is returned.  Otherwise, the
+    same kind of tuple as `_get_idx_expr()` is returned.
+    """
+    terms = _get_conjuncts(expr)
+    compvars = set()
+    for cols in compositecols:
+        compvars.update(cols)
+    # Get the comparisons on columns in composite indexes.
+    cmps = []
+    for term in terms:
+        var, op, value = _get_indexable_cmp(term, compvars)
+        if var is None or op not in ('eq', 'lt', 'le', 'gt', 'ge'):
+            var = None
+        cmps.append((var, op, value))
+
+    best, bestexpr, bestused = 0, None, None
+    for cols in compositecols:
+        used, vars, ops, lims = [], [], [], []
+        for col in cols:
+            eqterms = [ i for i, (var, op, value) in enumerate(cmps)
+                        if var == col and op == 'eq' ]
+            if eqterms:
+                used.append(eqterms[0])
+                vars.append(col)
+                ops.append('eq')
+                lims.append(cmps[eqterms[0]][2])
+                continue
+            # A range may follow the equality comparisons.
+            lower = upper = None
+            for i, (var, op, value) in enumerate(cmps):
+                if var != col:
+                    continue
+                if op in ('gt', 'ge') and lower is None:
+                    lower = i
+                elif op in ('lt', 'le') and upper is None:
+                    upper = i
+            for i in (lower, upper):
+                if i is not None:
+                    used.append(i)
+                    ops.append(cmps[i][1])
+                    lims.append(cmps[i][2])
+            if lower is not None or upper is not None:
+                vars.append(col)
+            break
+        # A single column is better served by its own index, if any.
+        if len(vars) > best and (len(vars) > 1 or vars[0] not in indexedcols):
+            best = len(vars)
+            bestexpr = (tuple(vars), tuple(ops), tuple(lims))
+            bestused = used
+    if bestexpr is None:
+        return None
+
+    # Extract index conditions from the rest of terms.
+    idxexprs, strexpr = [bestexpr], "e0"
+    for i, term in enumerate(terms):
+        if i in bestused:
+            continue
+        texprs = _get_idx_expr(term, indexedcols)
+        if type(texprs) == list:
+            texprs, tstrexpr = texprs, 'e0'
+        else:
+            texprs, tstrexpr = texprs[0], texprs[1][0]
+        if not texprs:
+            continue
+        offset = len(idxexprs)
+        tstrexpr = re.sub( r"e(\d+)",
+                           lambda m: "e%d" % (int(m.group(1)) + offset),
+                           tstrexpr )
+        idxexprs.extend(texprs)
+        strexpr = "(%s & %s)" % (strexpr, tstrexpr)
+    return (idxexprs, [strexpr])
+
+
 
 class CompiledCondition(object):
     """Container for a compiled condition."""
@@ -282,20 +411,33 @@ class CompiledCondition(object):
         idxvars = []
         for expr in idxexprs:
             idxvar = expr[0]
-            if idxvar not in idxvars:
+            if type(idxvar) is tuple:  # a composite index
+                idxvars.extend(idxvar)
+            elif idxvar not in idxvars:
                 idxvars.append(idxvar)
         return frozenset(idxvars)
 
 
-    def __init__(self, func, params, idxexprs, strexpr):
+    def __init__(self, func, params, idxexprs, strexpr, covered=False):
         self.function = func
         """The compiled function object corresponding to this condition."""
         self.parameters = params
         """A list of parameter names for this condition."""
         self.index_expressions = idxexprs
-        """A list of expressions in the form ``(var, (ops), (limits))``."""
+        """
+        A list of expressions in the form ``(var, (ops), (limits))``.
+
+        For composite indexes, ``var`` is a tuple of variable names.
+        """
         self.string_expression = strexpr
         """The indexable expression in string format."""
+        self.index_covered = covered
+        """
+        Whether the index expressions are equivalent to the condition.
+
+        This is only true if every term in the condition is in the
+        index expressions and no composite index is used.
+        """
 
     def __repr__(self):
         return ( "idxexprs: %s\nstrexpr: %s\nidxvars: %s"
@@ -325,7 +467,8 @@ class CompiledCondition(object):
             exprs2.append((var, ops, tuple(limit_values)))
         # Create a new container for the converted values
         newcc = CompiledCondition(
-            self.function, self.parameters, exprs2, self.string_expression )
+            self.function, self.parameters, exprs2, self.string_expression,
+            self.index_covered )
         return newcc
 
 
@@ -342,7 +485,196 @@ def _get_variable_names(expression):
     return list(set(names))  # remove repeated names
 
 
-def compile_condition(condition, typemap, indexedcols, copycols):
+class CompiledConditionCache(object):
+    """
+    Least-Recently-Used (LRU) cache of compiled conditions.
+
+    Keys are built by `compile_condition()` from all of its arguments,
+    so the cached conditions do not depend on any particular table and
+    they can be shared among all the tables in the process.  The number
+    of lookups that found (`hits`) and did not find (`misses`) a
+    condition in the cache are kept for informational purposes.
+    """
+
+    def __init__(self, maxentries):
+        self.maxentries = maxentries
+        """The maximum number of conditions in the cache."""
+        self.hits = 0
+        """The number of lookups that found a condition."""
+        self.misses = 0
+        """The number of lookups that did not find a condition."""
+        self._cache = {}  # key -> [prev link, next link, key, compiled]
+        # The entries are linked in a circular list, from the least to
+        # the most recently used one, so that the least recently used
+        # condition is found and moved in constant time.
+        self._root = root = [None, None, None, None]
+        root[0] = root[1] = root
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def _unlink(self, link):
+        """Remove `link` from the list of entries."""
+        prev, next = link[0], link[1]
+        prev[1] = next
+        next[0] = prev
+
+    def _linkLast(self, link):
+        """Put `link` as the most recently used entry."""
+        root = self._root
+        last = root[0]
+        link[0], link[1] = last, root
+        last[1] = root[0] = link
+
+    def get(self, key, default=None):
+        """Get the condition for `key`, or `default` if not found."""
+        self._lock.acquire()
+        try:
+            link = self._cache.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._unlink(link)
+            self._linkLast(link)
+            return link[3]
+        finally:
+            self._lock.release()
+
+    def __setitem__(self, key, compiled):
+        self._lock.acquire()
+        try:
+            cache = self._cache
+            link = cache.get(key)
+            if link is not None:
+                self._unlink(link)
+            elif len(cache) >= self.maxentries:
+                if self.maxentries <= 0:
+                    return
+                # Evict the least recently used condition.
+                lrulink = self._root[1]
+                self._unlink(lrulink)
+                del cache[lrulink[2]]
+            link = cache[key] = [None, None, key, compiled]
+            self._linkLast(link)
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """Remove all the conditions and reset the counters."""
+        self._lock.acquire()
+        try:
+            self._cache.clear()
+            root = self._root
+            root[0] = root[1] = root
+            self.hits = self.misses = 0
+        finally:
+            self._lock.release()
+
+    def __repr__(self):
+        return ( "<%s (%d/%d entries, %d hits, %d misses)>"
+                 % (self.__class__.__name__, len(self._cache),
+                    self.maxentries, self.hits, self.misses) )
+
+
+compiled_condition_cache = CompiledConditionCache(SHARED_COND_CACHE_SLOTS)
+"""The cache of compiled conditions shared by the whole process."""
+
+
+def required_expr_vars(expression, uservars, getcolumn, iscolumn,
+                       depth=1, exprvarscache=None):
+    """
+    Get the variables required by the `expression`.
+
+    A new dictionary defining the variables used in the `expression`
+    is returned.  Required variables are first looked up in the
+    `uservars` mapping, then among the default columns of the queried
+    table, which the `getcolumn` function returns given their names
+    (or None for other names).  Unknown variables cause a `NameError`
+    to be raised.
+
+    When `uservars` is `None`, the local and global namespace of the
+    frame `depth` levels above this function is sought instead.
+
+    The `iscolumn` function is called with the name and the value of
+    every variable, and it tells whether the value is a column of the
+    queried table.  It raises a `TypeError` for nested columns and a
+    `ValueError` for columns of other tables.  Multidimensional and
+    64-bit unsigned integer columns are not supported, and non-column
+    values are converted to NumPy arrays.
+
+    The variable names of expressions are kept in the `exprvarscache`
+    dictionary, if given.
+    """
+    # Get the names of variables used in the expression.
+    if exprvarscache is None:
+        exprvarscache = {}
+    if not expression in exprvarscache:
+        # Protection against growing the cache too much
+        if len(exprvarscache) > 256:
+            # Remove 10 (arbitrary) elements from the cache
+            for k in exprvarscache.keys()[:10]:
+                del exprvarscache[k]
+        cexpr = compile(expression, '<string>', 'eval')
+        exprvars = [ var for var in cexpr.co_names
+                     if var not in ['None', 'False', 'True']
+                     and var not in numexpr_functions ]
+        exprvarscache[expression] = exprvars
+    else:
+        exprvars = exprvarscache[expression]
+
+    # Get the local and global variable mappings of the user frame
+    # if no mapping has been explicitly given for user variables.
+    user_locals, user_globals = {}, {}
+    if uservars is None:
+        user_frame = sys._getframe(depth)
+        user_locals = user_frame.f_locals
+        user_globals = user_frame.f_globals
+
+    # Look for the required variables first among the ones
+    # explicitly provided by the user, then among implicit columns,
+    # then among external variables (only if no explicit variables).
+    reqvars = {}
+    for var in exprvars:
+        # Get the value.
+        if uservars is not None and var in uservars:
+            val = uservars[var]
+        else:
+            val = getcolumn(var)
+            if val is not None:
+                pass
+            elif uservars is None and var in user_locals:
+                val = user_locals[var]
+            elif uservars is None and var in user_globals:
+                val = user_globals[var]
+            else:
+                raise NameError("name ``%s`` is not defined" % var)
+
+        # Check the value.
+        if iscolumn(var, val):
+            if val.shape[1:] != ():
+                raise NotImplementedError(
+                    "variable ``%s`` refers to "
+                    "a multidimensional column, "
+                    "not yet supported in conditions, sorry" % var )
+            if val.dtype.str[1:] == 'u8':
+                raise NotImplementedError(
+                    "variable ``%s`` refers to "
+                    "a 64-bit unsigned integer column, "
+                    "not yet supported in conditions, sorry; "
+                    "please use regular Python selections" % var )
+        else:  # only non-column values are converted to arrays
+            val = numpy.asarray(val)
+        reqvars[var] = val
+    return reqvars
+
+
+def compile_condition(condition, typemap, indexedcols, copycols,
+                      compositecols=()):
     """
     Compile a condition and extract usable index conditions.
 
@@ -362,14 +694,35 @@ def compile_condition(condition, typemap, indexedcols, copycols):
     referenced.  This seems to accelerate access to unaligned,
     *unidimensional* arrays up to 2x (multidimensional arrays still
     need to be copied by `call_on_recarr()`.).
+
+    The `compositecols` sequence contains tuples with the variable
+    names of the columns in usable composite indexes (in index order).
+    When a composite index is usable for the top-level conjunction of
+    `condition`, the variable of its index expression is the tuple of
+    the columns it restricts.
+
+    Compiled conditions are kept in `compiled_condition_cache`, so
+    compiling the same condition again is very cheap.
     """
 
+    # Look up the condition in the shared cache.
+    condkey = ( condition, tuple(sorted(typemap.items())),
+                frozenset(indexedcols), tuple(copycols),
+                tuple(compositecols) )
+    compiled = compiled_condition_cache.get(condkey)
+    if compiled is not None:
+        return compiled
+
     # Get the expression tree and extract index conditions.
     expr = stringToExpression(condition, typemap, {})
     if expr.astKind != 'bool':
         raise TypeError( "condition ``%s`` does not have a boolean type"
                          % condition )
-    idxexprs = _get_idx_expr(expr, indexedcols)
+    idxexprs = None
+    if compositecols:
+        idxexprs = _get_composite_idx_expr(expr, indexedcols, compositecols)
+    if idxexprs is None:
+        idxexprs = _get_idx_expr(expr, indexedcols)
     # Post-process the answer
     if type(idxexprs) == list:
         # Simple expression
@@ -379,6 +732,17 @@ def compile_condition(condition, typemap, indexedcols, copycols):
         idxexprs, strexpr = idxexprs
     # Get rid of the unneccessary list wrapper for strexpr
     strexpr = strexpr[0]
+    # Every term in the condition must appear in the index expressions
+    # (ranges stand for two of them) for indexes to cover it.
+    covered = False
+    if idxexprs:
+        nops = 0
+        for var, ops, lims in idxexprs:
+            if type(var) is tuple:
+                nops = -1
+                break
+            nops += len(ops)
+        covered = (nops == _count_terms(expr))
 
     # Get the variable names used in the condition.
     # At the same time, build its signature.
@@ -395,7 +759,9 @@ def compile_condition(condition, typemap, indexedcols, copycols):
     params = varnames
 
     # This is more comfortable to handle about than a tuple.
-    return CompiledCondition(func, params, idxexprs, strexpr)
+    compiled = CompiledCondition(func, params, idxexprs, strexpr, covered)
+    compiled_condition_cache[condkey] = compiled
+    return compiled
 
 
 def call_on_recarr(func, params, recarr, param2arg=None):
@@ -417,3 +783,40 @@ def call_on_recarr(func, params, recarr, param2arg=None):
             arg = getNestedField(recarr, arg.pathname)
         args.append(arg)
     return func(*args)
+
+
+def combine_index_results(strexpr, operands, and_=None, or_=None):
+    """
+    Combine the `operands` of the indexable string expression `strexpr`.
+
+    `strexpr` is the ``string_expression`` of a compiled condition,
+    which is made of ``eN`` variables joined by ``&`` and ``|``
+    operators.  The `operands` mapping gives the value of every
+    variable, which must support these operators (like boolean arrays
+    or packed bitsets), unless the `and_` and `or_` functions are given
+    to combine two operands instead (like ``numpy.intersect1d()`` and
+    ``numpy.union1d()`` for sorted sets of coordinates).  The
+    expression is parsed and its operand tree walked, so it is never
+    evaluated as Python code.
+    """
+    if and_ is None:
+        and_ = operator.and_
+    if or_ is None:
+        or_ = operator.or_
+    typemap = dict((name, bool) for name in operands)
+    expr = stringToExpression(strexpr, typemap, {})
+    return _combine_recurse(expr, operands, and_, or_)
+
+
+def _combine_recurse(exprnode, operands, and_, or_):
+    """Combine the `operands` of the expression node `exprnode`."""
+    if exprnode.astType == 'variable':
+        return operands[exprnode.value]
+    if exprnode.astType == 'op' and exprnode.value in ['and', 'or']:
+        left, right = [ _combine_recurse(child, operands, and_, or_)
+                        for child in exprnode.children ]
+        if exprnode.value == 'and':
+            return and_(left, right)
+        return or_(left, right)
+    raise ValueError( "unsupported node in index expression: %s %r"
+                      % (exprnode.astType, exprnode.value) )
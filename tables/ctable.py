@@ -0,0 +1,1165 @@
+########################################################################
+#
+#       License: BSD
+#       Created: October 18, 2026
+#
+#       $Id$
+#
+########################################################################
+
+"""Here is defined the CTable class.
+
+See CTable class docstring for more info.
+
+Classes:
+
+    CTable
+    CIndexesG
+    CCols
+    CRow
+
+Functions:
+
+
+Misc variables:
+
+    __version__
+
+
+"""
+
+import inspect
+
+import numpy
+
+from tables import atom
+from tables.conditions import compile_condition, required_expr_vars, \
+     combine_index_results
+from numexpr.necompiler import getType as numexpr_getType
+from tables.description import IsDescription, Description, Col, \
+     descr_from_dtype
+from tables.node import NotLoggedMixin
+from tables.group import Group
+from tables.leaf import Leaf
+from tables.filters import Filters
+from tables.path import joinPath
+from tables.utils import is_idx, SizeType, NailedDict as CacheDict
+from tables.utilsExtension import getNestedField, lrange
+from tables.index import CompositeIndex, defaultIndexFilters
+from tables.table import _nxTypeFromNPType
+
+__version__ = "$Revision$"
+
+
+# default version for CTABLE objects
+obversion = "1.0"    # initial version
+
+# The name of the group keeping the indexes of a CTable.
+_indexesName = '_i_indexes'
+
+
+
+def _atomFromCol(col):
+    """Get the atom of the arrays that keep the data of `col`."""
+    atomclass = getattr(atom, '%sAtom' % col.prefix())
+    if isinstance(col, atom.EnumAtom):
+        return atomclass(**col._get_init_args())
+    # Column constructors do not tell about their arguments.
+    kwargs = dict( (arg, getattr(col, arg))
+                   for arg in inspect.getargspec(atomclass.__init__)[0]
+                   if arg != 'self' )
+    return atomclass(**kwargs)
+
+
+def _colFromArray(array, pos):
+    """Get the column description of the data kept in `array`."""
+    return Col.from_atom(array.atom, pos=pos)
+
+
+def _indexNameOfColumn(colpathname):
+    return '_cidx_%s' % colpathname.replace('/', '.')
+
+
+def _walkCols(description):
+    """Iterate over the bottom-level columns of `description` in order."""
+    for name in description._v_names:
+        colobj = description._v_colObjects[name]
+        if isinstance(colobj, Description):
+            for col in _walkCols(colobj):
+                yield col
+        else:
+            yield colobj
+
+
+
+class CTable(Group):
+    """
+    This class represents column-oriented tables in an HDF5 file.
+
+    A `CTable` is a group which keeps the data of each column in a
+    separate, one-dimensional `EArray` (nested columns are kept in
+    subgroups), so that reading or querying a few columns does not need
+    to read, nor decompress, the other ones.  Every column can have its
+    own filters.  The structure of the table is described with the same
+    objects used for `Table` (see `IsDescription` and `Description`), and
+    most of the reading and querying methods of `Table` are supported.
+    Bottom-level columns can be indexed with `CTable.createIndex()`.
+
+    Instance variables
+    ------------------
+
+    coldtypes
+        Maps the name of a column to its NumPy data type.
+    colnames
+        A list containing the names of *top-level* columns in the table.
+    colpathnames
+        A list containing the pathnames of *bottom-level* columns in the
+        table.
+    cols
+        A `CCols` instance that provides natural naming access to the
+        arrays of the columns.
+    coltypes
+        Maps the name of a column to its PyTables data type.
+    description
+        A `Description` instance reflecting the structure of the table.
+    dtype
+        The NumPy ``dtype`` that most closely matches this table.
+    indexedcolpathnames
+        A list containing the pathnames of the indexed columns.
+    nrows
+        The current number of rows in the table.
+    nrowsinbuf
+        The number of rows that are read at a time during queries.
+
+    Public methods
+    --------------
+
+    append(rows)
+    createIndex(colname[, filters])
+    flush()
+    getWhereList(condition[, condvars][, sort][, start][, stop][, step])
+    iterrows([start][, stop][, step])
+    read([start][, stop][, step][, field][, fields])
+    readCoordinates(coords[, field])
+    readWhere(condition[, condvars][, field][, start][, stop][, step])
+    reIndex()
+    removeIndex(colname)
+    where(condition[, condvars][, start][, stop][, step])
+    willQueryUseIndexing(condition[, condvars])
+
+    Special methods
+    ---------------
+
+    __getitem__(key)
+    __iter__()
+    __len__()
+    """
+
+    # Class identifier.
+    _c_classId = 'CTABLE'
+
+    # The arrays of the columns are copied along with the table.
+    _c_copiesChildren = True
+
+
+    # <properties>
+
+    def _g_getnrows(self):
+        if not self.colpathnames:
+            return SizeType(0)
+        return self._g_getColumn(self.colpathnames[0]).nrows
+
+    nrows = property(_g_getnrows, None, None,
+                     "The current number of rows in the table.")
+
+    description = property(lambda self: self._v_description, None, None,
+                           "A `Description` instance for the table.")
+
+    dtype = property(lambda self: self._v_description._v_dtype, None, None,
+                     "The NumPy ``dtype`` that most closely matches "
+                     "this table.")
+
+    colnames = property(lambda self: self._v_description._v_names, None,
+                        None, "The names of top-level columns.")
+
+    colpathnames = property(lambda self: self._v_colpathnames, None, None,
+                            "The pathnames of bottom-level columns.")
+
+    coldtypes = property(lambda self: self._v_coldtypes, None, None,
+                         "Maps column names to NumPy data types.")
+
+    coltypes = property(lambda self: self._v_coltypes, None, None,
+                        "Maps column names to PyTables data types.")
+
+    cols = property(lambda self: CCols(self), None, None,
+                    "Natural naming access to the arrays of the columns.")
+
+    nrowsinbuf = property(lambda self: self._v_nrowsinbuf, None, None,
+                          "The number of rows read at a time in queries.")
+
+    indexedcolpathnames = property(
+        lambda self: sorted(self._getColumnIndexes().keys()), None, None,
+        "The pathnames of the indexed columns.")
+
+    # </properties>
+
+
+    # The range of rows is processed as in leaves.
+    _processRange = Leaf._processRange.im_func
+    _processRangeRead = Leaf._processRangeRead.im_func
+
+
+    def __init__(self, parentNode, name,
+                 description=None, title="", filters=None,
+                 expectedrows=None, colfilters=None,
+                 new=False, _log=True):
+        """Create an instance of CTable.
+
+        Keyword arguments:
+
+        description -- A IsDescription subclass, a Description instance,
+            a dictionary or a NumPy (nested) dtype describing the
+            structure of a new table.
+
+        title -- Sets a TITLE attribute on the table entity.
+
+        filters -- An instance of the Filters class that provides
+            the default filter properties for the columns.
+
+        expectedrows -- An user estimate about the number of rows
+            that will be on the table, used to compute the chunkshape of
+            the columns.
+
+        colfilters -- A dictionary mapping column pathnames to the
+            Filters instances to be used for these columns.
+
+        new -- Whether the table is to be created (with the given
+            `description`) or read from disk.
+        """
+
+        if new and description is None:
+            raise ValueError("invalid table description: None")
+        self._v_description = None
+        """The `Description` of the table."""
+
+        if new and isinstance(description, dict):
+            # Dictionary case
+            self._v_description = Description(description)
+        elif new and ( type(description) == type(IsDescription)
+                       and issubclass(description, IsDescription) ):
+            # IsDescription subclass case
+            descr = description()
+            self._v_description = Description(descr.columns)
+        elif new and isinstance(description, Description):
+            # It is a Description instance already
+            self._v_description = description
+        elif new and type(description) is numpy.dtype:
+            self._v_description = descr_from_dtype(description)[0]
+        elif new:
+            raise TypeError(
+                "the ``description`` argument is not of a supported type: "
+                "``IsDescription`` subclass, ``Description`` instance, "
+                "dictionary, or NumPy dtype" )
+
+        if colfilters is None:
+            colfilters = {}
+        if new:
+            for colpathname, colfilter in colfilters.items():
+                if colpathname not in self._v_description._v_pathnames:
+                    raise KeyError( "no such column: ``%s``"
+                                    % (colpathname,) )
+                if not isinstance(colfilter, Filters):
+                    raise TypeError( "filters for column ``%s`` are not "
+                                     "an instance of `Filters`: %r"
+                                     % (colpathname, colfilter) )
+        self._v_new_colfilters = colfilters
+        """The filters for the columns of a new table."""
+        if expectedrows is None:
+            expectedrows = parentNode._v_file.params['EXPECTED_ROWS_TABLE']
+        self._v_expectedrows = expectedrows
+        """The expected number of rows of a new table."""
+        self._v_nrowsinbuf = None
+        self._v_colpathnames = []
+        self._v_coldtypes = {}
+        self._v_coltypes = {}
+        max_slots = parentNode._v_file.params['COND_CACHE_SLOTS']
+        self._conditionCache = CacheDict(max_slots)
+        """Cache of already compiled conditions."""
+        self._exprvarsCache = {}
+        """Cache of variables participating in numexpr expressions."""
+
+        super(CTable, self).__init__(parentNode, name, title, new,
+                                     filters, _log)
+
+
+    def _g_postInitHook(self):
+        if self._v_new:
+            self._v_version = obversion
+        super(CTable, self)._g_postInitHook()
+        if self._v_new:
+            self._g_createColumns(self, self._v_description)
+        else:
+            self._v_description = self._g_readDescription()
+        self._v_new_colfilters = None
+
+        # Get info about columns
+        for colobj in _walkCols(self._v_description):
+            colname = colobj._v_pathname
+            self._v_colpathnames.append(colname)
+            self._v_coltypes[colname] = colobj.type
+            self._v_coldtypes[colname] = colobj.dtype
+        if self._v_new:
+            self._v_attrs._g__setattr('COLPATHNAMES', self._v_colpathnames)
+
+        # Read about one I/O buffer of data at a time in queries.
+        rowsize = max(self.dtype.itemsize, 1)
+        self._v_nrowsinbuf = max(
+            self._v_file.params['IO_BUFFER_SIZE'] // rowsize, 1 )
+
+
+    def _g_createColumns(self, group, description):
+        """Create the arrays for the columns in `description`."""
+        colfilters = self._v_new_colfilters
+        for name in description._v_names:
+            colobj = description._v_colObjects[name]
+            if isinstance(colobj, Description):
+                subgroup = self._v_file.createGroup(group, name)
+                self._g_createColumns(subgroup, colobj)
+            else:
+                self._v_file.createEArray(
+                    group, name, _atomFromCol(colobj), shape=(0,),
+                    filters=colfilters.get(colobj._v_pathname),
+                    expectedrows=self._v_expectedrows )
+
+
+    def _g_readDescription(self):
+        """Build the `Description` of the table from its arrays."""
+        columns = {}
+        for pos, colpathname in enumerate(self._v_attrs.COLPATHNAMES):
+            array = self._g_getColumn(colpathname)
+            # Nested columns are placed before their first child.
+            names = colpathname.split('/')
+            descr = columns
+            for name in names[:-1]:
+                if name not in descr:
+                    descr[name] = {'_v_pos': pos}
+                descr = descr[name]
+            descr[names[-1]] = _colFromArray(array, pos)
+        return Description(columns)
+
+
+    def _g_copy(self, newParent, newName, recursive, _log=True, **kwargs):
+        # The arrays of the columns are always copied, whatever the
+        # value of `recursive`.
+        title = kwargs.get('title', self._v_title)
+        filters = kwargs.get('filters', None)
+        stats = kwargs.get('stats', None)
+        (start, stop, step) = self._processRange(
+            kwargs.get('start'), kwargs.get('stop'), kwargs.get('step'))
+
+        # Fix arguments with explicit None values for backwards compatibility.
+        if title is None:  title = self._v_title
+        # If no filters have been passed to the call, keep the ones of
+        # every column.
+        colfilters = None
+        if filters is None:
+            filters = getattr(self._v_attrs, 'FILTERS', None)
+            colfilters = dict( (colpathname,
+                                self._g_getColumn(colpathname).filters)
+                               for colpathname in self.colpathnames )
+        if start >= stop:
+            nrows = 0
+        else:
+            nrows = lrange(start, stop, step).length
+
+        # Create a copy of the object.
+        newNode = CTable( newParent, newName, self._v_description, title,
+                          filters, max(nrows, 1), colfilters, new=True,
+                          _log=_log )
+        # Copy the columns a buffer at a time.
+        bufstep = self.nrowsinbuf * step
+        for colpathname in self.colpathnames:
+            array = newNode._g_getColumn(colpathname)
+            for i in xrange(start, stop, bufstep):
+                array.append(self._readColumn(
+                    colpathname, i, min(i + bufstep, stop), step))
+        # Index the same columns in the copy.
+        for colpathname, cindex in self._getColumnIndexes().items():
+            newNode.createIndex(colpathname, filters=cindex.filters)
+
+        # Copy user attributes if needed.
+        if kwargs.get('copyuserattrs', True):
+            self._v_attrs._g_copy(newNode._v_attrs, copyClass=True)
+
+        # Update statistics if needed.
+        if stats is not None:
+            stats['groups'] += 1
+            stats['leaves'] += len(self.colpathnames)
+            stats['bytes'] += nrows * self.dtype.itemsize
+
+        return newNode
+
+
+    def _g_getColumn(self, colpathname):
+        """Get the array (or group) for the `colpathname` column."""
+        return self._v_file.getNode(joinPath(self._v_pathname, colpathname))
+
+
+    def _g_checkColumn(self, colpathname):
+        """Check that `colpathname` is a column (maybe a nested one)."""
+        descr = self._v_description
+        for name in colpathname.split('/'):
+            if ( not isinstance(descr, Description)
+                 or name not in descr._v_names ):
+                raise KeyError( "table ``%s`` does not have a column "
+                                "named ``%s``"
+                                % (self._v_pathname, colpathname) )
+            descr = descr._v_colObjects[name]
+        return descr
+
+
+    def _getFieldsDtype(self, fields):
+        """
+        Get the dtype of the top-level columns containing `fields`.
+
+        `fields` is a sequence of column names, which may be nested
+        ones.  The whole dtype of the table is returned for None.
+        """
+        if fields is None:
+            return self.dtype
+        names = {}
+        for field in fields:
+            self._g_checkColumn(field)
+            names[field.split('/')[0]] = None
+        dtype = self.dtype
+        return numpy.dtype([ (name, dtype[name])
+                             for name in dtype.names if name in names ])
+
+
+    def _read(self, start, stop, step, field=None):
+        """Read a range of rows with no flavor conversion (see `read()`)."""
+        return self.read(start, stop, step, field)
+
+
+    def _readColumn(self, colpathname, start, stop, step):
+        """Read the `colpathname` bottom-level column in a range."""
+        return self._g_getColumn(colpathname).read(start, stop, step)
+
+
+    def _readColumnCoords(self, colpathname, coords):
+        """
+        Read the `colpathname` bottom-level column at `coords`.
+
+        The coordinates are grouped by the chunk of the array they fall
+        in, and the rows of every group are read at once, so that every
+        chunk is read (and decompressed) only once.
+        """
+        array = self._g_getColumn(colpathname)
+        result = numpy.empty(shape=len(coords), dtype=array.atom.dtype)
+        if len(coords) == 0:
+            return result
+        order = numpy.argsort(coords, kind='mergesort')
+        scoords = coords[order]
+        chunks = scoords // array.chunkshape[0]
+        # The positions in `scoords` where a new chunk begins.
+        bounds = (numpy.diff(chunks).nonzero()[0] + 1).tolist()
+        for lo, hi in zip([0] + bounds, bounds + [len(scoords)]):
+            first, last = long(scoords[lo]), long(scoords[hi-1])
+            block = array.read(first, last + 1)
+            result[order[lo:hi]] = block[scoords[lo:hi] - first]
+        return result
+
+
+    def _fillRecords(self, result, readcol, field=None):
+        """
+        Fill the `result` array with the columns returned by `readcol`.
+
+        `readcol` is called with the pathname of every bottom-level
+        column in `result`, which is the `field` column if given.
+        """
+        for colpathname in self.colpathnames:
+            if field is None:
+                names = result.dtype.names
+                if colpathname.split('/')[0] not in names:
+                    continue
+                getNestedField(result, colpathname)[:] = readcol(colpathname)
+            elif colpathname.startswith(field + '/'):
+                relpath = colpathname[len(field)+1:]
+                getNestedField(result, relpath)[:] = readcol(colpathname)
+        return result
+
+
+    def append(self, rows):
+        """
+        Append a sequence of `rows` to the end of the table.
+
+        The `rows` argument may be any object which can be converted to
+        a record array compliant with the table structure (otherwise, a
+        `ValueError` is raised).  This includes NumPy record arrays,
+        lists of tuples or array records, and a string or Python buffer.
+        """
+        self._v_file._checkWritable()
+        try:
+            rows = numpy.rec.array(rows, dtype=self.dtype)
+        except Exception, exc:
+            raise ValueError("rows parameter cannot be converted into a "
+                             "recarray object compliant with table '%s'. "
+                             "The error was: <%s>" % (str(self), exc))
+        rows = rows.reshape((rows.size,))
+        start = self.nrows
+        arrays = [ self._g_getColumn(colpathname)
+                   for colpathname in self.colpathnames ]
+        try:
+            for colpathname, array in zip(self.colpathnames, arrays):
+                array.append(getNestedField(rows, colpathname))
+        except:
+            # Leave all the columns with the same length.
+            for array in arrays:
+                if array.nrows > start:
+                    array.truncate(start)
+            raise
+        # Add the new rows to the indexes of the columns.
+        for colpathname, cindex in self._getColumnIndexes().items():
+            if not cindex.dirty:
+                cindex.append([getNestedField(rows, colpathname)], start)
+
+
+    def flush(self):
+        """Flush the arrays of the columns to disk."""
+        for colpathname in self.colpathnames:
+            self._g_getColumn(colpathname).flush()
+
+
+    def read(self, start=None, stop=None, step=None,
+             field=None, fields=None):
+        """
+        Get data in the table as a (record) array.
+
+        The meaning of the `start`, `stop`, `step`, `field` and `fields`
+        arguments is the same as in `Table.read()`.  Only the arrays of
+        the selected columns are read from disk.
+        """
+        if field and fields is not None:
+            raise ValueError("only one of `field` and `fields` can be used")
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        if start >= stop:
+            nrows = 0
+        else:
+            nrows = lrange(start, stop, step).length
+        def readcol(colpathname):
+            return self._readColumn(colpathname, start, stop, step)
+
+        if field:
+            colobj = self._g_checkColumn(field)
+            if isinstance(colobj, Col):
+                if nrows == 0:
+                    return numpy.empty(shape=(0,)+colobj.shape,
+                                       dtype=colobj.dtype.base)
+                return readcol(field)
+            result = numpy.empty(shape=nrows, dtype=colobj._v_dtype)
+            return self._fillRecords(result, readcol, field)
+        result = numpy.empty(shape=nrows, dtype=self._getFieldsDtype(fields))
+        if nrows == 0:
+            return result
+        return self._fillRecords(result, readcol)
+
+
+    def readCoordinates(self, coords, field=None):
+        """
+        Get a set of rows given their indexes as a (record) array.
+
+        The meaning of the `field` argument is the same as in
+        `CTable.read()`.
+        """
+        coords = numpy.asarray(coords)
+        if coords.dtype.kind == 'b':
+            coords = coords.nonzero()[0]
+        coords = numpy.array(coords, dtype='int64')
+        nrows = self.nrows
+        coords[coords < 0] += nrows
+        if len(coords) and (coords.min() < 0 or coords.max() >= nrows):
+            raise IndexError("coordinates out of range")
+        def readcol(colpathname):
+            return self._readColumnCoords(colpathname, coords)
+
+        if field:
+            colobj = self._g_checkColumn(field)
+            if isinstance(colobj, Col):
+                return readcol(field)
+            result = numpy.empty(shape=len(coords), dtype=colobj._v_dtype)
+            return self._fillRecords(result, readcol, field)
+        result = numpy.empty(shape=len(coords), dtype=self.dtype)
+        return self._fillRecords(result, readcol)
+
+
+    def __getitem__(self, key):
+        """
+        Get a row or a range of rows from the table.
+
+        If `key` is an integer, the corresponding row is returned as a
+        NumPy record.  If `key` is a slice, the range of rows is
+        returned as a record array.  If `key` is a sequence or array of
+        integers or booleans, the rows at these coordinates are returned
+        (see `CTable.readCoordinates()`).
+        """
+        if is_idx(key):
+            # Index out of range protection
+            if key >= self.nrows:
+                raise IndexError("Index out of range")
+            if key < 0:
+                # To support negative values
+                key += self.nrows
+            (start, stop, step) = self._processRange(key, key+1, 1)
+            return self.read(start, stop, step)[0]
+        elif isinstance(key, slice):
+            (start, stop, step) = self._processRange(
+                key.start, key.stop, key.step )
+            return self.read(start, stop, step)
+        elif isinstance(key, str):
+            raise TypeError("use ``cols`` to get the arrays of columns")
+        return self.readCoordinates(key)
+
+
+    def __len__(self):
+        """Get the number of rows in the table."""
+        return int(self.nrows)
+
+
+    def iterrows(self, start=None, stop=None, step=None, fields=None):
+        """
+        Iterate over the table using a `CRow` instance.
+
+        The meaning of the arguments is the same as in `Table.iterrows()`.
+        """
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        return self._iterRows(self._iterSelections(None, None, start,
+                                                   stop, step, fields))
+
+
+    def __iter__(self):
+        """Iterate over all the rows in the table using a `CRow` instance."""
+        return self.iterrows()
+
+
+    def _getColumnIndexes(self):
+        """Get a dictionary mapping indexed columns to their indexes."""
+        if _indexesName not in self:
+            return {}
+        igroup = self._f_getChild(_indexesName)
+        indexes = {}
+        for cindex in igroup._f_iterNodes('CompositeIndex'):
+            indexes[cindex.colpathnames[0]] = cindex
+        return indexes
+
+
+    def createIndex(self, colname, filters=None):
+        """
+        Create an index for the `colname` bottom-level column.
+
+        Queries whose condition compares the column with constants in
+        the same ways supported by `Column.createIndex()` only read the
+        rows at the coordinates yielded by the index.  The values of the
+        column are kept sorted together with their coordinates, and
+        they are read and merged a slice at a time when the index is
+        built, so the column does not need to fit in memory.  Rows added
+        by `CTable.append()` are added to the index incrementally, but
+        modifying the arrays of the columns directly leaves the index
+        out of sync until `CTable.reIndex()` is called.
+
+        `filters` is the `Filters` instance used to compress the index.
+        If ``None``, default index filters will be used.  The number of
+        indexed rows is returned.
+        """
+        self._v_file._checkWritable()
+
+        colobj = self._g_checkColumn(colname)
+        if not isinstance(colobj, Col):
+            raise TypeError("nested columns can not be indexed")
+        dtype = colobj.dtype
+        if dtype.str[1:] == 'u8':
+            raise NotImplementedError(
+                "indexing 64-bit unsigned integer columns "
+                "is not supported yet, sorry" )
+        if dtype.kind == 'c':
+            raise TypeError("complex columns can not be indexed")
+        if dtype.shape != ():
+            raise TypeError("multidimensional columns can not be indexed")
+        if colname in self._getColumnIndexes():
+            raise ValueError( "column ``%s`` of table ``%s`` is already "
+                              "indexed" % (colname, self._v_pathname) )
+
+        if _indexesName in self:
+            igroup = self._f_getChild(_indexesName)
+        else:
+            igroup = CIndexesG(
+                self, _indexesName,
+                "Indexes container for table " + self._v_pathname, new=True )
+        if filters is None:
+            filters = defaultIndexFilters
+        cindex = CompositeIndex(
+            igroup, _indexNameOfColumn(colname), [colname],
+            title="Index for %s column" % colname,
+            filters=filters, new=True )
+        indexedrows = cindex.build()
+        # The set of usable indexes has changed.
+        self._conditionCache.clear()
+        return SizeType(indexedrows)
+
+
+    def removeIndex(self, colname):
+        """
+        Remove the index of the `colname` column.
+
+        A `ValueError` is raised if the column is not indexed.
+        """
+        self._v_file._checkWritable()
+
+        cindex = self._getColumnIndexes().get(colname)
+        if cindex is None:
+            raise ValueError( "column ``%s`` of table ``%s`` is not indexed"
+                              % (colname, self._v_pathname) )
+        # This is needed so as to unnail() the condition cache.
+        cindex.dirty = False
+        cindex._f_remove(recursive=True)
+        self._conditionCache.clear()
+
+
+    def reIndex(self):
+        """
+        Build the indexes of the columns again.
+
+        This is needed after modifying the arrays of indexed columns
+        directly.
+        """
+        self._v_file._checkWritable()
+        for cindex in self._getColumnIndexes().values():
+            cindex.build()
+
+
+    def _requiredExprVars(self, expression, uservars, depth=1):
+        """
+        Get the variables required by the `expression`.
+
+        This works as `Table._requiredExprVars()`, with the arrays of
+        the top-level columns as the default variables.
+        """
+        def getcolumn(var):
+            if var in self.colnames:
+                return self._g_getColumn(var)
+            return None
+        def iscolumn(var, val):
+            if isinstance(val, Leaf):
+                colpathname = val._v_pathname[len(self._v_pathname)+1:]
+                if ( not val._v_pathname.startswith(self._v_pathname + '/')
+                     or colpathname not in self.coldtypes ):
+                    raise ValueError( "variable ``%s`` refers to a column "
+                                      "which is not part of table ``%s``"
+                                      % (var, self._v_pathname) )
+                return True
+            if isinstance(val, Group):
+                raise TypeError( "variable ``%s`` refers to a nested column, "
+                                 "not allowed in conditions" % var )
+            return False
+        # The helper function adds a frame of its own.
+        return required_expr_vars( expression, uservars, getcolumn, iscolumn,
+                                   depth+1, self._exprvarsCache )
+
+
+    def _compileCondition(self, condition, condvars):
+        """
+        Compile the `condition` with the variables in `condvars`.
+
+        The columns with indexes are the indexed ones for
+        ``compile_condition()``.  Compiled conditions are kept in the
+        condition cache of the table.
+        """
+        typemap, colvars = {}, {}
+        for (var, val) in condvars.items():
+            if isinstance(val, Leaf):  # column
+                typemap[var] = _nxTypeFromNPType[val.dtype.type]
+                colvars[var] = val._v_pathname[len(self._v_pathname)+1:]
+            else:  # array
+                try:
+                    typemap[var] = numexpr_getType(val)
+                except ValueError:
+                    # This is more clear than the error given by Numexpr.
+                    raise TypeError( "variable ``%s`` has data type ``%s``, "
+                                     "not allowed in conditions"
+                                     % (var, val.dtype.name) )
+        if not colvars:
+            raise ValueError( "there are no columns taking part "
+                              "in condition ``%s``" % (condition,) )
+
+        condcache = self._conditionCache
+        condkey = ( condition, tuple(sorted(typemap.items())),
+                    tuple(sorted(colvars.items())) )
+        compiled = condcache.get(condkey)
+        if compiled is None:
+            indexes = self._getColumnIndexes()
+            indexedcols = [ var for (var, colpathname) in colvars.items()
+                            if colpathname in indexes
+                            and not indexes[colpathname].dirty ]
+            compiled = compile_condition( condition, typemap,
+                                          frozenset(indexedcols), [] )
+            condcache[condkey] = compiled
+        return compiled.with_replaced_vars(condvars)
+
+
+    def _searchIndexes(self, compiled, condvars, start, stop, step):
+        """
+        Get the coordinates of the candidate rows for `compiled`.
+
+        The index expressions of the condition are searched in the
+        indexes of their columns, and the results are combined as stated
+        by its string expression.  A sorted array with the candidate
+        coordinates in the range given by `start`, `stop` and `step` is
+        returned.
+        """
+        indexes = self._getColumnIndexes()
+        results = {}
+        for i, (var, ops, lims) in enumerate(compiled.index_expressions):
+            colpathname = condvars[var]._v_pathname[len(self._v_pathname)+1:]
+            results["e%d" % i] = indexes[colpathname].search(ops, lims)
+        if len(results) == 1:
+            coords = results.values()[0]
+        else:
+            # Combine the sorted coordinates as sets.
+            coords = combine_index_results(
+                compiled.string_expression, results,
+                and_=numpy.intersect1d, or_=numpy.union1d)
+        if (start, stop, step) != (0, self.nrows, 1):
+            coords = coords[
+                (coords>=start)&(coords<stop)&((coords-start)%step==0) ]
+        return coords
+
+
+    def willQueryUseIndexing(self, condition, condvars=None):
+        """
+        Will a query for the `condition` use indexing?
+
+        The meaning of the `condition` and `condvars` arguments is the
+        same as in the `CTable.where()` method.  A frozenset with the
+        path names of the columns whose indexes are used by the query is
+        returned (it is empty if no index is used).
+        """
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        compiled = self._compileCondition(condition, condvars)
+        return frozenset([ condvars[var]._v_pathname[len(self._v_pathname)+1:]
+                           for var in compiled.index_variables ])
+
+
+    def _where(self, condition, condvars,
+               start=None, stop=None, step=None, fields=None):
+        """
+        Low-level counterpart of `self.where()`.
+
+        An iterator over the `_CSelection` objects of the I/O buffers
+        with selected rows is returned.
+        """
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        condvars = self._requiredExprVars(condition, condvars, depth=3)
+        compiled = self._compileCondition(condition, condvars)
+        args = []
+        for param in compiled.parameters:
+            val = condvars[param]
+            if isinstance(val, Leaf):
+                # Columns are replaced by their pathnames in the table.
+                val = _ColumnName(val._v_pathname[len(self._v_pathname)+1:])
+            args.append(val)
+        coords = None
+        if compiled.index_expressions:
+            coords = self._searchIndexes(compiled, condvars,
+                                         start, stop, step)
+        return self._iterSelections(compiled.function, args,
+                                    start, stop, step, fields, coords)
+
+
+    def _iterSelections(self, func, args, start, stop, step,
+                        fields=None, coords=None):
+        """
+        Iterate over the I/O buffers of the rows in a range.
+
+        Rows are selected with the `func` Numexpr function called with
+        `args`, where the columns are `_ColumnName` instances.  All rows
+        are selected if `func` is None.  If `coords` is given, only the
+        rows at these sorted coordinates are read to call `func`.  Only
+        the buffers with selected rows are yielded, as `_CSelection`
+        objects.
+        """
+        if fields is not None:
+            fields = self._getFieldsDtype(fields).names
+        nrowsinbuf = self._v_nrowsinbuf
+        for bstart in xrange(start, stop, nrowsinbuf * step):
+            bstop = min(bstart + nrowsinbuf * step, stop)
+            selection = _CSelection(self, bstart, bstop, step, fields)
+            if coords is not None:
+                # Only the candidate rows yielded by indexes are read.
+                lo, hi = coords.searchsorted([bstart, bstop])
+                if lo == hi:
+                    continue
+                selection.select((coords[lo:hi] - bstart) // step)
+            if func is not None:
+                fargs = []
+                for arg in args:
+                    if isinstance(arg, _ColumnName):
+                        if coords is None:
+                            arg = selection.readColumn(arg)
+                        else:
+                            arg = selection.getColumn(arg)
+                    fargs.append(arg)
+                positions = func(*fargs).nonzero()[0]
+                if len(positions) == 0:
+                    continue
+                selection.select(positions)
+            yield selection
+
+
+    def _iterRows(self, selections):
+        """Iterate over the rows in `selections` with a `CRow`."""
+        row = CRow(self)
+        for selection in selections:
+            row._selection = selection
+            coords = selection.coords
+            for i in xrange(len(coords)):
+                row._pos = i
+                row.nrow = coords[i]
+                yield row
+
+
+    def where( self, condition, condvars=None,
+               start=None, stop=None, step=None, fields=None ):
+        """
+        Iterate over values fulfilling a `condition`.
+
+        This method returns a `CRow` iterator which only selects rows
+        in the table that satisfy the given `condition`.  The meaning of
+        the arguments is the same as in `Table.where()`, with the arrays
+        of the columns taking the place of `Column` instances.  Only the
+        columns in the `condition` are read to evaluate it (and only at
+        the coordinates yielded by their indexes, if these can be used);
+        the other ones are read as they are accessed in the selected rows.
+        """
+        return self._iterRows(self._where(condition, condvars,
+                                          start, stop, step, fields))
+
+
+    def readWhere( self, condition, condvars=None, field=None,
+                   start=None, stop=None, step=None ):
+        """
+        Read table data fulfilling the given `condition`.
+
+        The meaning of the arguments is the same as in
+        `Table.readWhere()`.  Only the arrays of the selected columns
+        and of the columns in the `condition` are read from disk.
+        """
+        if field:
+            colobj = self._g_checkColumn(field)
+        chunks = []
+        fields = None
+        if field:
+            fields = [field]
+        for selection in self._where(condition, condvars,
+                                     start, stop, step, fields):
+            if field:
+                chunks.append(selection.getField(field))
+            else:
+                chunks.append(selection.getRecords())
+        if chunks:
+            return numpy.concatenate(chunks)
+        if not field:
+            return numpy.empty(shape=0, dtype=self.dtype)
+        elif isinstance(colobj, Col):
+            return numpy.empty(shape=(0,)+colobj.shape,
+                               dtype=colobj.dtype.base)
+        return numpy.empty(shape=0, dtype=colobj._v_dtype)
+
+
+    def getWhereList( self, condition, condvars=None, sort=False,
+                      start=None, stop=None, step=None ):
+        """
+        Get the row coordinates fulfilling the given `condition`.
+
+        The meaning of the arguments is the same as in
+        `Table.getWhereList()`.
+        """
+        chunks = [ selection.coords for selection in
+                   self._where(condition, condvars, start, stop, step, []) ]
+        if not chunks:
+            return numpy.array([], dtype=SizeType)
+        # Coordinates are already sorted.
+        return numpy.concatenate(chunks)
+
+
+
+class _ColumnName(str):
+    """The pathname of a column taking part in a condition."""
+    pass
+
+
+
+class _CSelection(object):
+    """
+    The rows selected in an I/O buffer of a `CTable`.
+
+    The buffer spans rows ``range(start, stop, step)``.  Columns are
+    read from disk as they are requested, and only once per buffer.
+    """
+
+    def __init__(self, ctable, start, stop, step, fields=None):
+        self.ctable = ctable
+        self.start, self.stop, self.step = start, stop, step
+        self.fields = fields
+        """The top-level columns that can be read (all if None)."""
+        self.coords = numpy.arange(start, stop, step, dtype=SizeType)
+        """The coordinates of the selected rows."""
+        self.positions = None
+        """The positions of the selected rows in the buffer (or all)."""
+        self.buffers = {}
+        """The columns read for all the rows in the buffer."""
+        self.columns = {}
+        """The columns (maybe nested) read for the selected rows."""
+        self.records = None
+        """The records of the selected rows."""
+
+
+    def select(self, positions):
+        """Select only the rows at `positions` among the selected ones."""
+        if self.positions is None:
+            self.positions = positions
+        else:
+            self.positions = self.positions[positions]
+        self.coords = self.coords[positions]
+        for colpathname, column in self.columns.items():
+            self.columns[colpathname] = column[positions]
+
+
+    def readColumn(self, colpathname):
+        """Read a bottom-level column for all the rows in the buffer."""
+        buff = self.buffers.get(colpathname)
+        if buff is None:
+            buff = self.ctable._readColumn(colpathname, self.start,
+                                           self.stop, self.step)
+            self.buffers[colpathname] = buff
+        return buff
+
+
+    def getColumn(self, colpathname):
+        """Get a bottom-level column for the selected rows."""
+        column = self.columns.get(colpathname)
+        if column is None:
+            if colpathname in self.buffers or self.positions is None:
+                column = self.readColumn(colpathname)
+                if self.positions is not None:
+                    column = column[self.positions]
+            else:
+                # Only read the selected rows.
+                column = self.ctable._readColumnCoords(colpathname,
+                                                       self.coords)
+            self.columns[colpathname] = column
+        return column
+
+
+    def getField(self, field):
+        """Get a column (maybe a nested one) for the selected rows."""
+        fields = self.fields
+        if fields is not None and field.split('/')[0] not in fields:
+            raise KeyError("no such column: %s" % (field,))
+        column = self.columns.get(field)
+        if column is not None:
+            return column
+        colobj = self.ctable._g_checkColumn(field)
+        if isinstance(colobj, Col):
+            return self.getColumn(field)
+        result = numpy.empty(shape=len(self.coords), dtype=colobj._v_dtype)
+        self.columns[field] = result
+        return self.ctable._fillRecords(result, self.getColumn, field)
+
+
+    def getRecords(self):
+        """Get the records of the selected rows."""
+        if self.records is None:
+            dtype = self.ctable._getFieldsDtype(self.fields)
+            result = numpy.empty(shape=len(self.coords), dtype=dtype)
+            self.records = self.ctable._fillRecords(result, self.getColumn)
+        return self.records
+
+
+
+class CIndexesG(NotLoggedMixin, Group):
+    """The group keeping the indexes of the columns in a `CTable`."""
+
+    _c_classId = 'CTINDEX'
+
+    def _g_checkName(self, name):
+        if name != _indexesName:
+            raise ValueError( "the name of the indexes group must be "
+                              "``%s``: %s" % (_indexesName, name) )
+
+    table = property(
+        lambda self: self._v_parent, None, None,
+        "Accessor for the `CTable` object of this container.")
+
+
+
+class CCols(object):
+    """
+    Container for the arrays of the columns in a `CTable`.
+
+    The array of a column (or the group of a nested column) can be
+    accessed as an attribute of this object, e.g. ``ctable.cols.x``, or
+    by its pathname with the `_f_col()` method.
+    """
+
+    def __init__(self, ctable):
+        self.__dict__['_v_ctable'] = ctable
+
+
+    def _f_col(self, colname):
+        """Get the array or group for the `colname` column."""
+        ctable = self._v_ctable
+        ctable._g_checkColumn(colname)
+        return ctable._g_getColumn(colname)
+
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._f_col(name)
+        except KeyError:
+            raise AttributeError( "``%s`` has no column named ``%s``"
+                                  % (self._v_ctable._v_pathname, name) )
+
+
+    def __len__(self):
+        return len(self._v_ctable)
+
+
+
+class CRow(object):
+    """
+    A row of a `CTable` yielded by its iterators.
+
+    The value of a column in the current row is got with
+    ``row[colname]``, where ``colname`` may be the pathname of a
+    column or the position of a top-level column.  The coordinate of
+    the row in the table is kept in the ``nrow`` attribute.
+    """
+
+    def __init__(self, ctable):
+        self.table = ctable
+        self.nrow = -1
+        self._selection = None
+        self._pos = -1
+
+
+    def __getitem__(self, key):
+        """Get the value of the `key` column in the current row."""
+        if is_idx(key):
+            key = self.table.colnames[key]
+        return self._selection.getField(key)[self._pos]
+
+
+    def fetch_all_fields(self):
+        """Get the current row as a NumPy record."""
+        return self._selection.getRecords()[self._pos]
@@ -165,7 +165,7 @@ cdef extern from "numpy/arrayobject.h":
 # Structs and types from HDF5
 cdef extern from "hdf5.h":
 
-  ctypedef int hid_t  # In H5Ipublic.h
+  ctypedef long long hid_t  # In H5Ipublic.h
   ctypedef int hbool_t
   ctypedef int herr_t
   ctypedef int htri_t
@@ -182,10 +182,11 @@ cdef extern from "hdf5.h":
 
   int H5F_ACC_TRUNC, H5F_ACC_RDONLY, H5F_ACC_RDWR, H5F_ACC_EXCL
   int H5F_ACC_DEBUG, H5F_ACC_CREAT
-  int H5P_DEFAULT, H5P_DATASET_XFER, H5S_ALL
-  int H5P_FILE_CREATE, H5P_FILE_ACCESS
+  hid_t H5P_DEFAULT, H5P_DATASET_XFER, H5S_ALL
+  hid_t H5P_FILE_CREATE, H5P_FILE_ACCESS
   int H5FD_LOG_LOC_WRITE, H5FD_LOG_ALL
   int H5I_INVALID_HID
+  int H5Z_FLAG_REVERSE
 
   # The difference between a single file and a set of mounted files
   cdef enum H5F_scope_t:
@@ -248,61 +249,58 @@ cdef extern from "hdf5.h":
     H5T_NCLASSES                # this must be last
 
   # Native types
-  cdef enum:
-    H5T_C_S1
-    H5T_NATIVE_B8
-    H5T_NATIVE_CHAR
-    H5T_NATIVE_SCHAR
-    H5T_NATIVE_UCHAR
-    H5T_NATIVE_SHORT
-    H5T_NATIVE_USHORT
-    H5T_NATIVE_INT
-    H5T_NATIVE_UINT
-    H5T_NATIVE_LONG
-    H5T_NATIVE_ULONG
-    H5T_NATIVE_LLONG
-    H5T_NATIVE_ULLONG
-    H5T_NATIVE_FLOAT
-    H5T_NATIVE_DOUBLE
-    H5T_NATIVE_LDOUBLE
+  hid_t H5T_C_S1
+  hid_t H5T_NATIVE_B8
+  hid_t H5T_NATIVE_CHAR
+  hid_t H5T_NATIVE_SCHAR
+  hid_t H5T_NATIVE_UCHAR
+  hid_t H5T_NATIVE_SHORT
+  hid_t H5T_NATIVE_USHORT
+  hid_t H5T_NATIVE_INT
+  hid_t H5T_NATIVE_UINT
+  hid_t H5T_NATIVE_LONG
+  hid_t H5T_NATIVE_ULONG
+  hid_t H5T_NATIVE_LLONG
+  hid_t H5T_NATIVE_ULLONG
+  hid_t H5T_NATIVE_FLOAT
+  hid_t H5T_NATIVE_DOUBLE
+  hid_t H5T_NATIVE_LDOUBLE
 
   # "Standard" types
-  cdef enum:
-    H5T_STD_I8LE
-    H5T_STD_I16LE
-    H5T_STD_I32LE
-    H5T_STD_I64LE
-    H5T_STD_U8LE
-    H5T_STD_U16LE
-    H5T_STD_U32LE
-    H5T_STD_U64LE
-    H5T_STD_B8LE
-    H5T_STD_B16LE
-    H5T_STD_B32LE
-    H5T_STD_B64LE
-    H5T_IEEE_F32LE
-    H5T_IEEE_F64LE
-    H5T_STD_I8BE
-    H5T_STD_I16BE
-    H5T_STD_I32BE
-    H5T_STD_I64BE
-    H5T_STD_U8BE
-    H5T_STD_U16BE
-    H5T_STD_U32BE
-    H5T_STD_U64BE
-    H5T_STD_B8BE
-    H5T_STD_B16BE
-    H5T_STD_B32BE
-    H5T_STD_B64BE
-    H5T_IEEE_F32BE
-    H5T_IEEE_F64BE
+  hid_t H5T_STD_I8LE
+  hid_t H5T_STD_I16LE
+  hid_t H5T_STD_I32LE
+  hid_t H5T_STD_I64LE
+  hid_t H5T_STD_U8LE
+  hid_t H5T_STD_U16LE
+  hid_t H5T_STD_U32LE
+  hid_t H5T_STD_U64LE
+  hid_t H5T_STD_B8LE
+  hid_t H5T_STD_B16LE
+  hid_t H5T_STD_B32LE
+  hid_t H5T_STD_B64LE
+  hid_t H5T_IEEE_F32LE
+  hid_t H5T_IEEE_F64LE
+  hid_t H5T_STD_I8BE
+  hid_t H5T_STD_I16BE
+  hid_t H5T_STD_I32BE
+  hid_t H5T_STD_I64BE
+  hid_t H5T_STD_U8BE
+  hid_t H5T_STD_U16BE
+  hid_t H5T_STD_U32BE
+  hid_t H5T_STD_U64BE
+  hid_t H5T_STD_B8BE
+  hid_t H5T_STD_B16BE
+  hid_t H5T_STD_B32BE
+  hid_t H5T_STD_B64BE
+  hid_t H5T_IEEE_F32BE
+  hid_t H5T_IEEE_F64BE
 
   # Types which are particular to UNIX (for Time types)
-  cdef enum:
-    H5T_UNIX_D32LE
-    H5T_UNIX_D64LE
-    H5T_UNIX_D32BE
-    H5T_UNIX_D64BE
+  hid_t H5T_UNIX_D32LE
+  hid_t H5T_UNIX_D64LE
+  hid_t H5T_UNIX_D32BE
+  hid_t H5T_UNIX_D64BE
 
   # The order to retrieve atomic native datatype
   cdef enum H5T_direction_t:
@@ -408,6 +406,7 @@ cdef extern from "hdf5.h":
   herr_t H5Tset_precision(hid_t type_id, size_t prec)
   hid_t  H5Tcreate(H5T_class_t type, size_t size)
   hid_t  H5Tcopy(hid_t type_id)
+  htri_t H5Tequal(hid_t type_id1, hid_t type_id2)
   herr_t H5Tclose(hid_t type_id)
 
   # Operations defined on string data types
@@ -495,6 +494,14 @@ cdef extern from "utils.h":
   herr_t get_order(hid_t type_id, char *byteorder)
   int    is_complex(hid_t type_id)
   herr_t truncate_dset(hid_t dataset_id, int maindim, hsize_t size)
+  object get_filter_pipeline(hid_t dataset_id)
+  int    has_direct_chunk_write()
+  int    has_direct_chunk_read()
+  herr_t write_chunk(hid_t dataset_id, hsize_t *offset,
+                     unsigned int filter_mask, size_t nbytes, void *data)
+  hsize_t get_chunk_size(hid_t dataset_id, hsize_t *offset)
+  herr_t read_chunk(hid_t dataset_id, hsize_t *offset,
+                    unsigned int *filter_mask, void *data)
 
 # Type conversion routines
 cdef extern from "typeconv.h":
@@ -505,6 +512,9 @@ cdef extern from "typeconv.h":
                               unsigned long nelements,
                               int sense)
 
-# Blosc registration
+# Blosc registration and filtering
 cdef extern from "blosc_filter.h":
   int register_blosc(char **version, char **date)
+  size_t blosc_filter(unsigned int flags, size_t cd_nelmts,
+                      unsigned int *cd_values, size_t nbytes,
+                      size_t *buf_size, void **buf) nogil
@@ -63,8 +63,9 @@ from tables.carray import CArray
 from tables.earray import EArray
 from tables.vlarray import VLArray
 from tables.table import Table
+from tables.ctable import CTable
 from tables import linkExtension
-from utils import detectNumberOfCores
+from utils import detectNumberOfCores, WorkerPool
 
 try:
     from tables import lrucacheExtension
@@ -528,6 +529,8 @@ class File(hdf5Extension.File, object):
             params['MAX_THREADS'] = detectNumberOfCores()
 
         self.params = params
+        # The pools of worker threads, by the parameter sizing them.
+        self._workerPools = {}
 
         # Now, it is time to initialize the File extension
         self._g_new(filename, mode, **params)
@@ -770,6 +773,50 @@ class File(hdf5Extension.File, object):
                      chunkshape=chunkshape, byteorder=byteorder)
 
 
+    def createCTable(self, where, name, description, title="",
+                     filters=None, expectedrows=10000, colfilters=None,
+                     createparents=False):
+        """
+        Create a new column-oriented table with the given `name` in `where`.
+
+        `where` is a `Group` instance or a path string for the parent
+        group.  The data of every column is kept in its own array, so
+        that only the columns taking part in a read or query operation
+        are read from disk.
+
+        `description`
+            The structure of the table, given as for `createTable()`
+            (an `IsDescription` subclass, a `Description` instance, a
+            dictionary or a NumPy dtype).
+
+        `title`
+            A description for this node (it sets the ``TITLE`` HDF5
+            attribute on disk).
+
+        `filters`
+            An instance of the `Filters` class with the default filter
+            properties for the columns.
+
+        `expectedrows`
+            A user estimate about the number of rows that will be in the
+            table, used to compute the chunkshape of the columns.
+
+        `colfilters`
+            A dictionary mapping column pathnames to the `Filters`
+            instances to be used for these columns instead of `filters`.
+
+        `createparents`
+            Whether to create the needed groups for the parent path to
+            exist (not done by default).
+        """
+        parentNode = self._getOrCreatePath(where, createparents)
+        _checkfilters(filters)
+        return CTable(parentNode, name,
+                      description=description, title=title,
+                      filters=filters, expectedrows=expectedrows,
+                      colfilters=colfilters, new=True)
+
+
     def createArray(self, where, name, object, title="",
                     byteorder=None, createparents=False):
         """
@@ -1569,6 +1616,23 @@ you may want to use the ``overwrite`` argument""" % dstfilename)
             raise FileModeError("the file is not writable")
 
 
+    def _getWorkerPool(self, param):
+        """
+        Get the pool of worker threads sized by the `param` parameter.
+
+        The same pool is shared by all the nodes in the file, until the
+        value of the parameter changes.  The pools are closed along with
+        the file.
+        """
+        nworkers = self.params[param]
+        pool = self._workerPools.get(param)
+        if pool is None or pool.nworkers != nworkers:
+            if pool is not None:
+                pool.close()
+            pool = self._workerPools[param] = WorkerPool(nworkers)
+        return pool
+
+
     def _checkGroup(self, node):
         # `node` must already be a node.
         if not isinstance(node, Group):
@@ -2150,6 +2214,10 @@ Mark ``%s`` is older than the current mark. Use `redo()` or `goto()` instead."""
                ("alive nodes remain after closing dead nodes: %s"
                 % [path for path in self._aliveNodes])
 
+        # Stop the worker threads
+        for pool in self._workerPools.itervalues():
+            pool.close()
+
         # Close the file
         self._closeFile()
         # After the objects are disconnected, destroy the
@@ -202,6 +202,10 @@ class Group(hdf5Extension.Group, Node):
         '__members__', '_v_children', '_v_groups', '_v_leaves',
         '_v_links', '_v_unknown', '_v_hidden')
 
+    # Whether `_g_copy()` copies the children of the group by itself,
+    # so that recursive copies should not descend into it.
+    _c_copiesChildren = False
+
     # <properties>
 
     # `_v_nchildren` is a direct read-only shorthand
@@ -676,7 +680,8 @@ be ready to see PyTables asking for *lots* of memory and possibly slow I/O."""
             (srcParent, dstParent) = parentStack.pop()
             for srcChild in srcParent._v_children.itervalues():
                 dstChild = srcChild._g_copyAsChild(dstParent, **kwargs)
-                if isinstance(srcChild, Group):
+                if (isinstance(srcChild, Group)
+                    and not srcChild._c_copiesChildren):
                     parentStack.append((srcChild, dstChild))
 
 
@@ -19,6 +19,12 @@ cdef class Array(Leaf):
   cdef int      rank
   cdef hsize_t *maxdims
   cdef hsize_t *dims_chunk
+  cdef _append_pipeline(self, ndarray nparr)
+  cdef _write_pipeline(self, ndarray startl, ndarray stepl, ndarray countl,
+                       ndarray nparr)
+  cdef int _read_direct(self, hsize_t start, hsize_t stop,
+                        ndarray nparr) except -1
+  cdef _read_rows(self, hsize_t start, hsize_t stop, void *rbuf)
 
 
 
@@ -92,7 +92,9 @@ from definitions cimport  \
      H5ARRAYget_ndims, H5ARRAYget_info, \
      set_cache_size, get_objinfo, Giterate, Aiterate, H5UIget_info, \
      get_len_of_range, get_order, set_order, is_complex, \
-     conv_float64_timeval32, truncate_dset
+     conv_float64_timeval32, truncate_dset, H5Tequal, \
+     get_filter_pipeline, has_direct_chunk_write, write_chunk, \
+     has_direct_chunk_read, get_chunk_size, read_chunk
 
 
 # Include conversion tables
@@ -107,7 +109,7 @@ __version__ = "$Revision$"
 # Functions from HDF5 ARRAY (this is not part of HDF5 HL; it's private)
 cdef extern from "H5ARRAY.h":
 
-  herr_t H5ARRAYmake(hid_t loc_id, char *dset_name, char *obversion,
+  hid_t H5ARRAYmake(hid_t loc_id, char *dset_name, char *obversion,
                      int rank, hsize_t *dims, int extdim,
                      hid_t type_id, hsize_t *dims_chunk, void *fill_data,
                      int complevel, char  *complib, int shuffle,
@@ -142,7 +144,7 @@ cdef extern from "H5ARRAY.h":
 # Functions for dealing with VLArray objects
 cdef extern from "H5VLARRAY.h":
 
-  herr_t H5VLARRAYmake( hid_t loc_id, char *dset_name, char *obversion,
+  hid_t H5VLARRAYmake( hid_t loc_id, char *dset_name, char *obversion,
                         int rank, hsize_t *dims, hid_t type_id,
                         hsize_t chunk_size, void *fill_data, int complevel,
                         char *complib, int shuffle, int flecther32,
@@ -788,6 +790,82 @@ cdef class Leaf(Node):
       raise ValueError, "Unexpected classname:", classname
 
 
+  def _g_chunkPipeline(self):
+    """Get the ``(filter_id, cd_values)`` pairs of the filter pipeline.
+
+    None is returned if the chunks of the leaf can not be written
+    bypassing the pipeline, either because HDF5 does not support it or
+    because the type of the data in memory differs from the one on disk.
+    """
+    if not has_direct_chunk_write():
+      return None
+    if H5Tequal(self.disk_type_id, self.type_id) <= 0:
+      return None
+    return get_filter_pipeline(self.dataset_id)
+
+
+  def _g_canReadChunks(self):
+    """Can the chunks of the leaf be read bypassing the pipeline?
+
+    This needs a newer version of HDF5 than writing them.
+    """
+    return bool(has_direct_chunk_read())
+
+
+  def _g_writeChunk(self, object offset, object data,
+                    unsigned int filter_mask=0):
+    """Write the filtered `data` of the chunk at `offset` coordinates.
+
+    `filter_mask` flags the filters skipped when filtering the chunk.
+    """
+    cdef herr_t ret
+    cdef hsize_t *offset_
+    cdef void *buf
+    cdef Py_ssize_t nbytes
+
+    offset_ = malloc_dims(offset)
+    PyObject_AsReadBuffer(data, &buf, &nbytes)
+    Py_BEGIN_ALLOW_THREADS
+    ret = write_chunk(self.dataset_id, offset_, filter_mask,
+                      <size_t>nbytes, buf)
+    Py_END_ALLOW_THREADS
+    free(offset_)
+    if ret < 0:
+      raise HDF5ExtError("Problems writing the chunk at %s of leaf: %s"
+                         % (offset, self))
+
+
+  def _g_readChunk(self, object offset):
+    """Read the filtered data of the chunk at `offset` coordinates.
+
+    A ``(filter_mask, data)`` tuple is returned, where `filter_mask`
+    flags the filters skipped when writing the chunk.  None is returned
+    if the chunk has not been written yet.
+    """
+    cdef herr_t ret
+    cdef hsize_t *offset_
+    cdef hsize_t nbytes
+    cdef unsigned int filter_mask
+    cdef char *buf
+    cdef object data
+
+    offset_ = malloc_dims(offset)
+    nbytes = get_chunk_size(self.dataset_id, offset_)
+    if nbytes == 0:
+      free(offset_)
+      return None
+    data = PyString_FromStringAndSize(NULL, nbytes)
+    buf = PyString_AsString(data)
+    Py_BEGIN_ALLOW_THREADS
+    ret = read_chunk(self.dataset_id, offset_, &filter_mask, buf)
+    Py_END_ALLOW_THREADS
+    free(offset_)
+    if ret < 0:
+      raise HDF5ExtError("Problems reading the chunk at %s of leaf: %s"
+                         % (offset, self))
+    return (filter_mask, data)
+
+
   def _g_flush(self):
     # Flush the dataset (in fact, the entire buffers in file!)
     if self.dataset_id >= 0:
@@ -1004,18 +1082,50 @@ cdef class Array(Leaf):
 
 
   def _append(self, ndarray nparr):
+    cdef long chunkrows, head, ndirect
+    cdef hsize_t nrows
+    cdef object shape
+
+    # Convert some NumPy types to HDF5 before storing.
+    if self.atom.type == 'time64':
+      self._convertTime64(nparr, 0)
+
+    chunkrows = self._directChunkRows()
+    head = ndirect = 0
+    if chunkrows > 0:
+      # The rows filling whole chunks are written directly, and the
+      # ones before and after them, through the filter pipeline.
+      head = (chunkrows - self.dims[0] % chunkrows) % chunkrows
+      ndirect = (nparr.shape[0] - head) // chunkrows * chunkrows
+    if ndirect > 0:
+      self._append_pipeline(nparr[:head])
+      nrows = self.dims[0]
+      if truncate_dset(self.dataset_id, 0, nrows + ndirect) < 0:
+        raise HDF5ExtError("Problems appending the elements")
+      self.dims[0] = nrows + ndirect
+      self._writeDirectChunks(nrows, nparr[head:head+ndirect])
+      self._append_pipeline(nparr[head+ndirect:])
+    else:
+      self._append_pipeline(nparr)
+
+    # Update the new dimensionality
+    shape = list(self.shape)
+    shape[self.extdim] = SizeType(self.dims[self.extdim])
+    self.shape = tuple(shape)
+
+
+  cdef _append_pipeline(self, ndarray nparr):
+    """Append the already converted `nparr` through the filter pipeline."""
     cdef int ret, extdim
     cdef hsize_t *dims_arr
     cdef void *rbuf
-    cdef object shape
 
+    if nparr.size == 0:
+      return
     # Allocate space for the dimension axis info
     dims_arr = npy_malloc_dims(self.rank, nparr.dimensions)
     # Get the pointer to the buffer data area
     rbuf = nparr.data
-    # Convert some NumPy types to HDF5 before storing.
-    if self.atom.type == 'time64':
-      self._convertTime64(nparr, 0)
 
     # Append the records
     extdim = self.extdim
@@ -1023,15 +1133,10 @@ cdef class Array(Leaf):
     ret = H5ARRAYappend_records(self.dataset_id, self.type_id, self.rank,
                                 self.dims, dims_arr, extdim, rbuf)
     Py_END_ALLOW_THREADS
+    free(dims_arr)
     if ret < 0:
       raise HDF5ExtError("Problems appending the elements")
 
-    free(dims_arr)
-    # Update the new dimensionality
-    shape = list(self.shape)
-    shape[self.extdim] = SizeType(self.dims[self.extdim])
-    self.shape = tuple(shape)
-
 
   def _readArray(self, hsize_t start, hsize_t stop, hsize_t step,
                  ndarray nparr):
@@ -1051,12 +1156,13 @@ cdef class Array(Leaf):
       exdim = -1
 
     # Do the physical read
-    Py_BEGIN_ALLOW_THREADS
-    ret = H5ARRAYread(self.dataset_id, self.type_id, start, nrows, step,
-                      extdim, rbuf)
-    Py_END_ALLOW_THREADS
-    if ret < 0:
-      raise HDF5ExtError("Problems reading the array data.")
+    if step != 1 or not self._read_direct(start, start + nrows, nparr):
+      Py_BEGIN_ALLOW_THREADS
+      ret = H5ARRAYread(self.dataset_id, self.type_id, start, nrows, step,
+                        extdim, rbuf)
+      Py_END_ALLOW_THREADS
+      if ret < 0:
+        raise HDF5ExtError("Problems reading the array data.")
 
     if self.atom.kind == 'time':
       # Swap the byteorder by hand (this is not currently supported by HDF5)
@@ -1084,12 +1190,16 @@ cdef class Array(Leaf):
     rbuf = nparr.data
 
     # Do the physical read
-    Py_BEGIN_ALLOW_THREADS
-    ret = H5ARRAYreadSlice(self.dataset_id, self.type_id,
-                           start, stop, step, rbuf)
-    Py_END_ALLOW_THREADS
-    if ret < 0:
-      raise HDF5ExtError("Problems reading the array data.")
+    if not (nparr.ndim == self.rank and (stepl == 1).all() and
+            (startl[1:] == 0).all() and
+            tuple(stopl[1:]) == tuple(self.shape[1:]) and
+            self._read_direct(start[0], stop[0], nparr)):
+      Py_BEGIN_ALLOW_THREADS
+      ret = H5ARRAYreadSlice(self.dataset_id, self.type_id,
+                             start, stop, step, rbuf)
+      Py_END_ALLOW_THREADS
+      if ret < 0:
+        raise HDF5ExtError("Problems reading the array data.")
 
     if self.atom.kind == 'time':
       # Swap the byteorder by hand (this is not currently supported by HDF5)
@@ -1103,6 +1213,62 @@ cdef class Array(Leaf):
     return
 
 
+  cdef int _read_direct(self, hsize_t start, hsize_t stop,
+                        ndarray nparr) except -1:
+    """Read whole rows unfiltering whole chunks in parallel threads.
+
+    The rows before and after the chunks fully covered by the read (and
+    those in chunks not written yet) are read through the filter
+    pipeline.  0 is returned without reading anything when there are
+    not at least two whole chunks to be read directly.
+    """
+    cdef hsize_t chunkrows, head, ndirect, i
+    cdef long rowsize
+    cdef char *rbuf
+
+    chunkrows = self._directChunkRows(read=True)
+    if (chunkrows == 0 or nparr.ndim != self.rank or
+        not (<object>nparr).flags.c_contiguous):
+      return 0
+    head = (chunkrows - start % chunkrows) % chunkrows
+    if start + head > stop:
+      return 0
+    ndirect = (stop - start - head) // chunkrows * chunkrows
+    if ndirect < 2 * chunkrows:
+      return 0
+
+    rbuf = nparr.data
+    rowsize = nparr.strides[0]
+    missing = self._readDirectChunks(start + head, nparr[head:head+ndirect])
+    self._read_rows(start, start + head, rbuf)
+    for i in missing:
+      i = head + i * chunkrows
+      self._read_rows(start + i, start + i + chunkrows, rbuf + i * rowsize)
+    i = head + ndirect
+    self._read_rows(start + i, stop, rbuf + i * rowsize)
+    return 1
+
+
+  cdef _read_rows(self, hsize_t start, hsize_t stop, void *rbuf):
+    """Read the whole rows in ``[start, stop)`` through the pipeline."""
+    cdef herr_t ret
+    cdef ndarray startl, stopl, stepl
+
+    if start == stop:
+      return
+    startl = numpy.zeros(self.rank, dtype=numpy.uint64)
+    stopl = numpy.array(self.shape, dtype=numpy.uint64)
+    stepl = numpy.ones(self.rank, dtype=numpy.uint64)
+    startl[0], stopl[0] = start, stop
+    Py_BEGIN_ALLOW_THREADS
+    ret = H5ARRAYreadSlice(self.dataset_id, self.type_id,
+                           <hsize_t *>startl.data, <hsize_t *>stopl.data,
+                           <hsize_t *>stepl.data, rbuf)
+    Py_END_ALLOW_THREADS
+    if ret < 0:
+      raise HDF5ExtError("Problems reading the array data.")
+
+
   def _g_readCoords(self, ndarray coords, ndarray nparr):
     """Read coordinates in an already created NumPy array."""
     cdef herr_t ret
@@ -1243,8 +1409,43 @@ cdef class Array(Leaf):
   def _g_writeSlice(self, ndarray startl, ndarray stepl, ndarray countl,
                     ndarray nparr):
     """Write a slice in an already created NumPy array."""
+    cdef hsize_t chunkrows, start, count, head, ndirect, tail
+    cdef object startl2, countl2
+
+    # Convert some NumPy types to HDF5 before storing.
+    if self.atom.type == 'time64':
+      self._convertTime64(nparr, 0)
+
+    chunkrows = self._directChunkRows()
+    ndirect = 0
+    if (chunkrows > 0 and nparr.ndim == self.rank and
+        (stepl == 1).all() and (startl[1:] == 0).all() and
+        tuple(countl[1:]) == tuple(self.shape[1:])):
+      # The rows filling whole chunks are written directly, and the
+      # ones before and after them, through the filter pipeline.
+      start, count = startl[0], countl[0]
+      head = min((chunkrows - start % chunkrows) % chunkrows, count)
+      ndirect = (count - head) // chunkrows * chunkrows
+      tail = count - head - ndirect
+    if ndirect == 0:
+      self._write_pipeline(startl, stepl, countl, nparr)
+      return
+
+    startl2, countl2 = startl.copy(), countl.copy()
+    if head > 0:
+      countl2[0] = head
+      self._write_pipeline(startl2, stepl, countl2, nparr[:head])
+    self._writeDirectChunks(start + head, nparr[head:head+ndirect])
+    if tail > 0:
+      startl2[0], countl2[0] = start + head + ndirect, tail
+      self._write_pipeline(startl2, stepl, countl2, nparr[head+ndirect:])
+
+
+  cdef _write_pipeline(self, ndarray startl, ndarray stepl, ndarray countl,
+                       ndarray nparr):
+    """Write the already converted `nparr` through the filter pipeline."""
     cdef int ret
-    cdef void *rbuf, *temp
+    cdef void *rbuf
     cdef hsize_t *start, *step, *count
 
     # Get the pointer to the buffer data area
@@ -1254,10 +1455,6 @@ cdef class Array(Leaf):
     step = <hsize_t *>stepl.data
     count = <hsize_t *>countl.data
 
-    # Convert some NumPy types to HDF5 before storing.
-    if self.atom.type == 'time64':
-      self._convertTime64(nparr, 0)
-
     # Modify the elements:
     Py_BEGIN_ALLOW_THREADS
     ret = H5ARRAYwrite_records(self.dataset_id, self.type_id, self.rank,
@@ -15,9 +15,16 @@ See Index class docstring for more info.
 Classes:
 
     Index
+    CompositeIndex
+    BitmapIndex
+    ChunkSummary
+    ZoneMap
+    BloomFilter
+    Tombstones
 
 Functions:
 
+    bitsetToCoords
 
 Misc variables:
 
@@ -46,7 +53,7 @@ from tables import indexesExtension
 from tables import utilsExtension
 from tables.attributeset import AttributeSet
 from tables.node import NotLoggedMixin
-from tables.atom import IntAtom, UIntAtom, Atom
+from tables.atom import IntAtom, UIntAtom, UInt8Atom, Int64Atom, Atom
 from tables.earray import EArray
 from tables.carray import CArray
 from tables.leaf import Filters
@@ -112,6 +119,19 @@ def _tableColumnPathnameOfIndex(indexpathname):
     return (tablepathname, colpathname)
 
 
+def _startKeysort(pool, ssorted, sindices):
+    """
+    Start sorting `ssorted` and `sindices` with `keysort()` in `pool`.
+
+    The returned job must be waited for before using the arrays again.
+    If `pool` is None, they are sorted right away and None is returned.
+    """
+    if pool is None:
+        indexesExtension.keysort(ssorted, sindices)
+        return None
+    return pool.submit(indexesExtension.keysort, ssorted, sindices)
+
+
 class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
     """
@@ -278,6 +298,39 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         _is_CSI,  None, None,
         "Whether the index is completely sorted or not.")
 
+    has_coords = property(
+        lambda self: (self.indsize == 8 and self.reduction == 1),
+        None, None,
+        """
+        Whether the index keeps the exact coordinates of every row.
+
+        This is true for 'full' indexes, whose search results can be
+        turned into row coordinates by `Index.get_coords()`.
+        """)
+
+    def _getruns(self):
+        attrs = self._v_attrs
+        if 'runs' in attrs:
+            return [int(nslices) for nslices in attrs.runs]
+        # The slices of indexes coming from previous versions are
+        # considered as a single run.
+        if self.nslices > 0:
+            return [self.nslices]
+        return []
+
+    def _setruns(self, runs):
+        self._v_attrs.runs = numpy.array(runs, dtype=numpy.int64)
+
+    runs = property(
+        _getruns, _setruns, None,
+        """
+        The number of slices in every run of sorted slices.
+
+        The slices optimized together when the index is created form
+        its first run, and every slice appended afterwards is a new run
+        of its own, until it is merged by `Index.compact()`.
+        """)
+
     @lazyattr
     def nrowsinchunk(self):
         """The number of rows that fits in a *table* chunk."""
@@ -408,6 +461,9 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         sorted index. -1 means that this number is not computed yet."""
         self.tprof = 0
         """Time counter for benchmarking purposes."""
+        self._v_compaction = None
+        """The runs of slices being merged in the background, if any
+        (see `_startCompact()`)."""
 
         from tables.file import openFile
         self._openFile = openFile
@@ -634,10 +690,6 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             if profile: show_stats("After reduction", tref)
             arr = reduc
             if profile: show_stats("After arr <-- reduc", tref)
-        # A completely sorted index is not longer possible after an
-        # append of an index with already one slice.
-        if nrow > 0:
-            self._v_attrs.is_CSI = False
         if profile: show_stats("Exiting initial_append", tref)
         return larr, arr, idx
 
@@ -659,25 +711,36 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         return idx
 
 
-    def append(self, xarr, update=False):
-        """Append the array to the index objects"""
-
-        if profile: tref = time()
-        if profile: show_stats("Entering append", tref)
+    def _appendTarget(self, update):
+        """Return the objects to append to and the reduction to apply."""
         if not update and self.temp_required:
-            where = self.tmp
             # The reduction will take place *after* the optimization process
-            reduction = 1
-        else:
-            where = self
-            reduction = self.reduction
+            return self.tmp, 1
+        return self, self.reduction
+
+
+    def _saveSlice(self, where, nrows, reduction, sslice):
+        """Save a slice sorted by `initial_append()` as the row `nrows`.
+
+        `sslice` is the ``[larr, arr, idx]`` list returned by
+        `initial_append()`, and it is emptied here so that memory can be
+        released as soon as possible.
+        """
+        if profile: tref = time()
+        if profile: show_stats("Entering _saveSlice", tref)
+        larr, arr, idx = sslice
+        del sslice[:]
+        if where is self:
+            runs = self.runs
         sorted = where.sorted; indices = where.indices
         ranges = where.ranges; mranges = where.mranges
         bounds = where.bounds; mbounds = where.mbounds
         abounds = where.abounds; zbounds = where.zbounds
         sortedLR = where.sortedLR; indicesLR = where.indicesLR
-        nrows = sorted.nrows  # before sorted.append()
-        larr, arr, idx = self.initial_append(xarr, nrows, reduction)
+        # A completely sorted index is not longer possible after an
+        # append of an index with already one slice.
+        if nrows > 0:
+            self._v_attrs.is_CSI = False
         # Save the sorted array
         sorted.append(arr.reshape(1, arr.size))
         cs = self.chunksize/reduction;  ncs = self.nchunkslice
@@ -710,9 +773,82 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         sortedLR.attrs.nelements = self.nelementsSLR
         indicesLR.attrs.nelements = self.nelementsILR
         self.dirtycache = True   # the cache is dirty now
+        if where is self:
+            # The new slice is a run of its own (see `Index.compact()`)
+            self.runs = runs + [1]
+            self._autoCompact()
+        if profile: show_stats("Exiting _saveSlice", tref)
+
+
+    def append(self, xarr, update=False):
+        """Append the array to the index objects"""
+
+        if profile: tref = time()
+        if profile: show_stats("Entering append", tref)
+        where, reduction = self._appendTarget(update)
+        nrows = where.sorted.nrows  # before sorted.append()
+        sslice = list(self.initial_append(xarr, nrows, reduction))
+        self._saveSlice(where, nrows, reduction, sslice)
         if profile: show_stats("Exiting append", tref)
 
 
+    def _getSortPool(self):
+        """Get the pool of threads sorting slices for this index.
+
+        This is the pool of ``INDEX_BUILD_WORKERS`` threads of the file,
+        or None if the slices are to be sorted serially.  As HDF5 is not
+        thread-safe, the threads only sort: the slices are read and
+        written by the thread using the index.
+        """
+        file_ = self._v_file
+        if file_.params['INDEX_BUILD_WORKERS'] < 1:
+            return None
+        return file_._getWorkerPool('INDEX_BUILD_WORKERS')
+
+
+    def _sortSlice(self, xarr, nrows, reduction):
+        """Sort a slice for `_saveSlice()` (run by the sorting threads)."""
+        return list(self.initial_append(xarr, nrows, reduction))
+
+
+    def appendSlices(self, xarrs, update=False):
+        """Append several complete slices to the index objects.
+
+        `xarrs` is a list with the arrays of values for every slice, and
+        it is emptied in the process.  The slices are sorted in parallel
+        by the threads of `_getSortPool()` (or serially if there are
+        none) and saved in order as they get sorted, so the result is
+        the same as appending them one by one with `append()`.
+        """
+
+        pool = self._getSortPool()
+        if pool is None or len(xarrs) < 2 or self.nelementsILR > 0:
+            # Sorting the first slice may require reading the last row
+            # (see `initial_append()`), so let `append()` deal with it.
+            xarrs.reverse()
+            while xarrs:
+                self.append([xarrs.pop()], update=update)
+            return
+
+        where, reduction = self._appendTarget(update)
+        nrows = where.sorted.nrows  # before sorted.append()
+        self.lbucket  # compute this lazy attribute in this thread
+        jobs = []
+        for i in xrange(len(xarrs)):
+            jobs.append(pool.submit(
+                self._sortSlice, [xarrs[i]], nrows+i, reduction))
+            xarrs[i] = None
+        del xarrs[:]
+        try:
+            for i in xrange(len(jobs)):
+                sslice = jobs[i].wait()
+                jobs[i] = None
+                self._saveSlice(where, nrows+i, reduction, sslice)
+        except:
+            pool.cancel([job for job in jobs if job is not None])
+            raise
+
+
     def appendLastRow(self, xarr, update=False):
         """Append the array to the last row index objects"""
 
@@ -730,6 +866,10 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         indicesLR = where.indicesLR
         sortedLR = where.sortedLR
         larr, arr, idx = self.initial_append(xarr, nrows, reduction)
+        # A completely sorted index is not longer possible after an
+        # append of an index with already one slice.
+        if nrows > 0:
+            self._v_attrs.is_CSI = False
         nelementsSLR = len(arr)
         nelementsILR = len(idx)
         # Build the cache of bounds
@@ -767,6 +907,8 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
         """
 
+        # Do not let a merge overwrite the reordered slices
+        self._waitCompact()
         if not self.temp_required:
             return
 
@@ -823,9 +965,143 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
 
         # Close and delete the temporal optimization index file
         self.cleanup_temp()
+        # All the slices are a single run now
+        self.runs = [self.nslices]
         return
 
 
+    def compact(self, nruns=None):
+        """Merge the most recent runs of sorted slices in this index.
+
+        Every slice appended to an index after its creation is sorted
+        on its own, so its range of values overlaps with the ones of
+        previous slices and searches get slower as appends go by.  This
+        merges the last `nruns` runs of slices (see `Index.runs`) into a
+        single sorted run, so that they do not overlap anymore.  If
+        `nruns` is None, all the most recent runs that fit in the
+        ``INDEX_COMPACT_MEMORY`` parameter are merged.
+
+        Only indexes keeping the position of every indexed value (i.e.
+        medium and full ones with no reduction) can be compacted.  The
+        number of slices in the merged run is returned, or 0 if nothing
+        has been merged.
+        """
+
+        self._waitCompact()
+        if self.indsize < 4 or self.reduction > 1:
+            return 0
+        runs = self.runs
+        maxslices = self._v_file.params['INDEX_COMPACT_MEMORY'] // (
+            self.slicesize * (self.dtype.itemsize + self.indsize) )
+        if nruns is None:
+            nruns = 0
+            nslices = 0
+            for run in runs[::-1]:
+                if nslices + run > maxslices:
+                    break
+                nruns += 1
+                nslices += run
+        nruns = min(nruns, len(runs))
+        if nruns < 2:
+            return 0
+        self._startCompact(len(runs) - nruns, nruns, None)
+        return self._waitCompact()
+
+
+    def _startCompact(self, firstrun, nruns, pool):
+        """Start merging `nruns` runs of slices from the run `firstrun`.
+
+        The values of the slices are read here and sorted by the
+        threads in `pool` (or right away if it is None), so that the
+        caller can go on meanwhile.  The sorted slices are saved by
+        `_waitCompact()`.  Until then, the slices in the runs are left
+        untouched, so the index can still be searched and appended to.
+        """
+        runs = self.runs
+        start = sum(runs[:firstrun])
+        nslices = sum(runs[firstrun:firstrun+nruns])
+        if debug:
+            print "compacting slices %d to %d" % (start, start+nslices)
+
+        # Sort the values of all the slices at once
+        ssorted = self.sorted[start:start+nslices].ravel()
+        sindices = self.indices[start:start+nslices].ravel()
+        job = _startKeysort(pool, ssorted, sindices)
+        self._v_compaction = (firstrun, nruns, start, nslices,
+                              ssorted, sindices, job)
+
+
+    def _waitCompact(self):
+        """Save the runs of slices merged by `_startCompact()`, if any.
+
+        The number of slices in the merged run is returned, or 0 if no
+        runs were being merged.
+        """
+        compaction = self._v_compaction
+        if compaction is None:
+            return 0
+        self._v_compaction = None
+        (firstrun, nruns, start, nslices, ssorted, sindices, job) = compaction
+        del compaction
+        if job is not None:
+            job.wait()
+        ss = self.slicesize
+        sorted = self.sorted;  indices = self.indices
+        for i in xrange(nslices):
+            nslice = start + i
+            sorted[nslice] = ssorted[i*ss:(i+1)*ss]
+            indices[nslice] = sindices[i*ss:(i+1)*ss]
+            self.update_caches(nslice, ssorted[i*ss:(i+1)*ss], self)
+        del ssorted, sindices
+        runs = self.runs
+        self.runs = runs[:firstrun] + [nslices] + runs[firstrun+nruns:]
+        if self.indsize == 8 and nruns == len(runs):
+            # The index may be completely sorted now
+            self.compute_overlaps(self, "compact()", debug)
+        self.dirtycache = True   # the cache is dirty now
+        return nslices
+
+
+    def _autoCompact(self):
+        """Compact the index after an append if parameters ask so.
+
+        Every time the last ``INDEX_COMPACT_FACTOR`` runs of the index
+        have the same number of slices, they are merged into a single
+        run, so the number of runs (and overlaps) grows logarithmically
+        with the number of appended slices.
+
+        If there are threads for sorting slices (see `_getSortPool()`),
+        the runs are merged by them while the caller goes on, and the
+        merged slices are saved at the next append (when the merge of
+        the next runs may start) or by `Table.flushRowsToIndex()`.
+        Otherwise, the merges are done right away.
+        """
+        self._waitCompact()
+        params = self._v_file.params
+        factor = params['INDEX_COMPACT_FACTOR']
+        if factor < 2 or self.indsize < 4 or self.reduction > 1:
+            return
+        maxslices = params['INDEX_COMPACT_MEMORY'] // (
+            self.slicesize * (self.dtype.itemsize + self.indsize) )
+        pool = self._getSortPool()
+        while True:
+            # The runs to merge may be followed by a run appended while
+            # the previous ones were being merged.
+            runs = self.runs
+            for stop in (len(runs), len(runs) - 1):
+                firstrun = stop - factor
+                if (firstrun >= 0 and
+                    runs[firstrun:stop] == [runs[stop-1]] * factor and
+                    runs[stop-1] * factor <= maxslices):
+                    break
+            else:
+                return
+            self._startCompact(firstrun, factor, pool)
+            if pool is not None:
+                return
+            self._waitCompact()
+
+
     def do_complete_sort(self):
         """Bring an already optimized index into a complete sorted state."""
 
@@ -848,6 +1124,10 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         sremain = numpy.array([], dtype=self.dtype)
         iremain = numpy.array([], dtype='u%d'%self.indsize)
         starts = numpy.zeros(shape=nslices, dtype=numpy.int_)
+        # Every extended slice is sorted by the sorting threads while
+        # the values for the next one are read by this one.
+        pool = self._getSortPool()
+        job = None
         for i in xrange(nslices):
             # Find the overlapping elements for slice i
             sover = numpy.array([], dtype=self.dtype)
@@ -888,39 +1168,34 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
                         sover = numpy.concatenate((sover, sortedLR[stj:idx]))
                         iover = numpy.concatenate((iover, indicesLR[stj:idx]))
                     starts[j] = idx
-            # Build the extended slices to sort out
+            # Read the values left in the slice i
             if i < self.nslices:
-                ssorted = numpy.concatenate(
-                    (sremain, sorted[i, starts[i]:], sover))
-                sindices = numpy.concatenate(
-                    (iremain, indices[i, starts[i]:], iover))
+                sslice = sorted[i, starts[i]:]
+                islice = indices[i, starts[i]:]
             else:
-                ssorted = numpy.concatenate(
-                    (sremain, sortedLR[starts[i]:nelementsLR], sover))
-                sindices = numpy.concatenate(
-                    (iremain, indicesLR[starts[i]:nelementsLR], iover))
-            # Sort the extended slices
-            indexesExtension.keysort(ssorted, sindices)
-            # Save the first elements of extended slices in the slice i
+                sslice = sortedLR[starts[i]:nelementsLR]
+                islice = indicesLR[starts[i]:nelementsLR]
+            if i > 0:
+                # Save the extended slice i-1, sorted meanwhile
+                if job is not None:
+                    job.wait()
+                sremain, iremain = self._saveExtendedSlice(
+                    i-1, ssorted, sindices)
+            # Build the extended slices to sort out
+            ssorted = numpy.concatenate((sremain, sslice, sover))
+            sindices = numpy.concatenate((iremain, islice, iover))
             if i < self.nslices:
-                sorted[i] = ssorted[:ss];  indices[i] = sindices[:ss]
-                # Update caches for this slice
-                self.update_caches(i, ssorted[:ss])
-                # Save the remaining values in a separate array
                 send = len(sover)+len(sremain)
-                sremain = ssorted[ss:ss+send];  iremain = sindices[ss:ss+send]
             else:
                 # Still some elements remain for the last row
-                n = len(ssorted)
-                assert n == nelementsLR
+                assert len(ssorted) == nelementsLR
                 send = 0
-                sortedLR[:n] = ssorted;  indicesLR[:n] = sindices
-                # Update the caches for last row
-                sortedlr = sortedLR[:nelementsLR]
-                bebounds = numpy.concatenate(
-                    (sortedlr[::self.chunksize], [sortedlr[-1]]))
-                sortedLR[nelementsLR:nelementsLR+len(bebounds)] = bebounds
-                self.bebounds = bebounds
+            # Sort the extended slices
+            job = _startKeysort(pool, ssorted, sindices)
+        if nslices > 0:
+            if job is not None:
+                job.wait()
+            self._saveExtendedSlice(nslices-1, ssorted, sindices)
 
         # Verify that we have dealt with all the remaining values
         assert send == 0
@@ -934,6 +1209,36 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             print "time: %s. clock: %s" % (t, c)
 
 
+    def _saveExtendedSlice(self, nslice, ssorted, sindices):
+        """Save an extended slice sorted by `do_complete_sort()`.
+
+        The first values of `ssorted` and `sindices` go to the slice
+        `nslice` of the temporary index (or to its last row, with all
+        of them) and the remaining ones are returned in a ``(sremain,
+        iremain)`` tuple.
+        """
+        ss = self.slicesize
+        tmp = self.tmp
+        if nslice < self.nslices:
+            # Save the first elements of extended slices in the slice
+            tmp.sorted[nslice] = ssorted[:ss]
+            tmp.indices[nslice] = sindices[:ss]
+            # Update caches for this slice
+            self.update_caches(nslice, ssorted[:ss])
+            # The remaining values go to the next extended slice
+            return (ssorted[ss:], sindices[ss:])
+        n = len(ssorted)
+        sortedLR = tmp.sortedLR;  indicesLR = tmp.indicesLR
+        sortedLR[:n] = ssorted;  indicesLR[:n] = sindices
+        # Update the caches for last row
+        sortedlr = sortedLR[:n]
+        bebounds = numpy.concatenate(
+            (sortedlr[::self.chunksize], [sortedlr[-1]]))
+        sortedLR[n:n+len(bebounds)] = bebounds
+        self.bebounds = bebounds
+        return (ssorted[:0], sindices[:0])
+
+
     def swap(self, what, mode=None):
         "Swap chunks or slices using a certain bounds reference."
 
@@ -1245,38 +1550,74 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         where._g_writeSlice(startl, stepl, countl, buffer)
 
 
-    def reorder_slice(self, nslice, sorted, indices, ssorted, sindices,
-                      tmp_sorted, tmp_indices):
-        """Copy & reorder the slice in source to final destination."""
+    def reorder_run(self, first, last, sorted, indices, ssorted, sindices,
+                    tmp_sorted, tmp_indices):
+        """Copy & reorder the slices from `first` to `last` (included).
+
+        Every slice is sorted together with the previous one and the
+        first half of the sorted buffers is written to its final
+        destination, except for the `last` slice, whose values are left
+        in the first half of the buffers.  The sorts are done by the
+        threads of `_getSortPool()`, so that the next slice is read and
+        the previous one written by this thread meanwhile.
+        """
         ss = self.slicesize
-        # Load the second part in buffers
-        self.read_slice(tmp_sorted, nslice, ssorted[ss:])
-        self.read_slice(tmp_indices, nslice, sindices[ss:])
-        indexesExtension.keysort(ssorted, sindices)
-        # Write the first part of the buffers to the regular leaves
-        self.write_slice(sorted, nslice-1, ssorted[:ss])
-        self.write_slice(indices, nslice-1, sindices[:ss])
-        # Update caches
-        self.update_caches(nslice-1, ssorted[:ss])
+        # Bootstrap the process for reordering
+        # Read the first slice in buffers
+        self.read_slice(tmp_sorted, first, ssorted[:ss])
+        self.read_slice(tmp_indices, first, sindices[:ss])
+        if last == first:
+            return
+        pool = self._getSortPool()
+        # Buffers for the next slice and the one being written
+        nsorted = numpy.empty_like(ssorted[:ss])
+        nindices = numpy.empty_like(sindices[:ss])
+        wsorted = numpy.empty_like(ssorted[:ss])
+        windices = numpy.empty_like(sindices[:ss])
+        self.read_slice(tmp_sorted, first+1, ssorted[ss:])
+        self.read_slice(tmp_indices, first+1, sindices[ss:])
+        job = _startKeysort(pool, ssorted, sindices)
+        for nslice in xrange(first+2, last+1):
+            # Load the next slice while the buffers are sorted
+            self.read_slice(tmp_sorted, nslice, nsorted)
+            self.read_slice(tmp_indices, nslice, nindices)
+            if job is not None:
+                job.wait()
+            wsorted[:] = ssorted[:ss]; windices[:] = sindices[:ss]
+            # Shift the slice in the end to the beginning
+            ssorted[:ss] = ssorted[ss:]; sindices[:ss] = sindices[ss:]
+            ssorted[ss:] = nsorted; sindices[ss:] = nindices
+            job = _startKeysort(pool, ssorted, sindices)
+            # Write the first part of the buffers to the regular leaves
+            self.write_slice(sorted, nslice-2, wsorted)
+            self.write_slice(indices, nslice-2, windices)
+            # Update caches
+            self.update_caches(nslice-2, wsorted)
+        if job is not None:
+            job.wait()
+        self.write_slice(sorted, last-1, ssorted[:ss])
+        self.write_slice(indices, last-1, sindices[:ss])
+        self.update_caches(last-1, ssorted[:ss])
         # Shift the slice in the end to the beginning
         ssorted[:ss] = ssorted[ss:]; sindices[:ss] = sindices[ss:]
 
 
-    def update_caches(self, nslice, ssorted):
+    def update_caches(self, nslice, ssorted, where=None):
         """Update the caches for faster lookups."""
         cs = self.chunksize
         ncs = self.nchunkslice
-        tmp = self.tmp
+        if where is None:
+            where = self.tmp
         # update first & second cache bounds (ranges & bounds)
-        tmp.ranges[nslice] = ssorted[[0,-1]]
-        tmp.bounds[nslice] = ssorted[cs::cs]
+        where.ranges[nslice] = ssorted[[0,-1]]
+        where.bounds[nslice] = ssorted[cs::cs]
         # update start & stop bounds
-        tmp.abounds[nslice*ncs:(nslice+1)*ncs] = ssorted[0::cs]
-        tmp.zbounds[nslice*ncs:(nslice+1)*ncs] = ssorted[cs-1::cs]
+        where.abounds[nslice*ncs:(nslice+1)*ncs] = ssorted[0::cs]
+        where.zbounds[nslice*ncs:(nslice+1)*ncs] = ssorted[cs-1::cs]
         # update median bounds
         smedian = ssorted[cs/2::cs]
-        tmp.mbounds[nslice*ncs:(nslice+1)*ncs] = smedian
-        tmp.mranges[nslice] = smedian[ncs/2]
+        where.mbounds[nslice*ncs:(nslice+1)*ncs] = smedian
+        where.mranges[nslice] = smedian[ncs/2]
 
 
     def reorder_slices(self, tmp):
@@ -1300,6 +1641,9 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         reorders on a slice-by-slice basis.  However, as this is more
         efficient than the old version, one can configure the slicesize
         to be smaller, so the memory consumption is barely similar.
+        Two more slices are kept in memory so that the next slice can
+        be read and the previous one written while sorting (see
+        `reorder_run()`).
         """
 
         tmp = self.tmp
@@ -1320,17 +1664,10 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
                                dtype=numpy.dtype('u%d' % self.indsize))
 
         if self.indsize == 8:
-            # Bootstrap the process for reordering
-            # Read the first slice in buffers
-            self.read_slice(tmp_sorted, 0, ssorted[:ss])
-            self.read_slice(tmp_indices, 0, sindices[:ss])
-
-            nslice = 0   # Just in case the loop behind executes nothing
-            # Loop over the remainding slices in block
-            for nslice in xrange(1, sorted.nrows):
-                self.reorder_slice(nslice, sorted, indices,
-                                   ssorted, sindices,
-                                   tmp_sorted, tmp_indices)
+            # Reorder all the slices at once
+            nslice = max(sorted.nrows - 1, 0)
+            self.reorder_run(0, nslice, sorted, indices,
+                             ssorted, sindices, tmp_sorted, tmp_indices)
 
             # End the process (enrolling the lastrow if necessary)
             if nelementsLR > 0:
@@ -1360,21 +1697,14 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
             # Iterate over each block.  No data should cross block
             # boundaries to avoid adressing problems with short indices.
             for nb in xrange(nblocks):
-                # Bootstrap the process for reordering
-                # Read the first slice in buffers
+                # Reorder the slices in block
                 nrow = nb * nsb
-                self.read_slice(tmp_sorted, nrow, ssorted[:ss])
-                self.read_slice(tmp_indices, nrow, sindices[:ss])
-
-                # Loop over the remainding slices in block
                 lrb = nrow + nsb
                 if lrb > nslices:
                     lrb = nslices
-                nslice = nrow   # Just in case the loop behind executes nothing
-                for nslice in xrange(nrow+1, lrb):
-                    self.reorder_slice(nslice, sorted, indices,
-                                       ssorted, sindices,
-                                       tmp_sorted, tmp_indices)
+                nslice = max(lrb - 1, nrow)
+                self.reorder_run(nrow, nslice, sorted, indices,
+                                 ssorted, sindices, tmp_sorted, tmp_indices)
 
                 # Write the first part of the buffers to the regular leaves
                 self.write_slice(sorted, nslice, ssorted[:ss])
@@ -1998,6 +2328,36 @@ class Index(NotLoggedMixin, indexesExtension.Index, Group):
         return chunkmap
 
 
+    def get_coords(self):
+        """Get the coordinates of the rows found in the last search.
+
+        This is only supported by indexes keeping the exact coordinates
+        of rows (see `Index.has_coords`).  The coordinates are returned
+        sorted, as an array of ``int64`` values.
+        """
+
+        assert self.has_coords, "the index does not keep row coordinates"
+        if profile: tref = time()
+        if profile: show_stats("Entering get_coords", tref)
+        nslices = self.nslices
+        starts, lengths = self.starts, self.lengths
+        coords = numpy.empty(shape=lengths.sum(), dtype='u8')
+        ncoords = 0
+        for nslice in xrange(self.nrows):
+            start = starts[nslice];  stop = start + lengths[nslice]
+            if stop > start:
+                idx = coords[ncoords:ncoords+stop-start]
+                if nslice < nslices:
+                    self.indices._readIndexSlice(nslice, start, stop, idx)
+                else:
+                    self.indicesLR._readIndexSlice(start, stop, idx)
+                ncoords += stop - start
+        coords = coords.view('i8')
+        coords.sort()
+        if profile: show_stats("Exiting get_coords", tref)
+        return coords
+
+
     def getLookupRange(self, ops, limits):
         assert len(ops) in [1, 2]
         assert len(limits) in [1, 2]
@@ -2154,6 +2514,1394 @@ class IndexesTableG(NotLoggedMixin, Group):
 
 
 
+class CompositeIndex(NotLoggedMixin, Group):
+
+    """
+    Represents an index over an ordered tuple of columns in a table.
+
+    The values of the indexed columns are kept in lexicographical order
+    in a table (``sorted``), together with the coordinates of the rows
+    they come from.  Conditions made of equality comparisons on a
+    leading subset of the columns, optionally followed by a range on
+    the next column, are solved with a binary search on that table.
+
+    Rows appended to the table are sorted and added as a new run at the
+    end of ``sorted``, and the last runs are merged while they have
+    similar sizes, so that there are only a few runs (which are
+    searched separately) and every row is sorted a logarithmic number
+    of times.  Any other change to the table makes the index dirty
+    until it is built again.
+
+    Public instance variables
+    -------------------------
+
+    colpathnames
+        The path names of the indexed columns, in index order.
+    dirty
+        Whether the index is dirty or not.
+    filters
+        Filter properties for this index --see `Filters`.
+    nelements
+        The number of currently indexed rows.
+    runs
+        The first rows of the sorted runs in ``sorted``.
+    table
+        The `Table` (or `CTable`) instance this index belongs to.
+
+    Public methods
+    --------------
+
+    append(keys, start)
+    build()
+    search(ops, limits)
+    """
+
+    _c_classId = 'CMPINDEX'
+
+
+    # <properties>
+
+    colpathnames = property(
+        lambda self: list(self._v_attrs.COLUMNS), None, None,
+        "The path names of the indexed columns, in index order.")
+
+    filters = property(
+        lambda self: self._v_filters, None, None,
+        "The filters for this index.")
+
+    def _getdirty(self):
+        if 'DIRTY' not in self._v_attrs:
+            return False
+        return self._v_attrs.DIRTY
+
+    def _setdirty(self, dirty):
+        wasdirty, isdirty = self.dirty, bool(dirty)
+        self._v_attrs.DIRTY = isdirty
+        # If an *actual* change in dirtiness happens,
+        # notify the condition cache by setting or removing a nail.
+        conditionCache = self.table._conditionCache
+        if not wasdirty and isdirty:
+            conditionCache.nail()
+        if wasdirty and not isdirty:
+            conditionCache.unnail()
+
+    dirty = property(
+        _getdirty, _setdirty, None,
+        """
+        Whether the index is dirty or not.
+
+        Dirty indexes are out of sync with table data, so they exist
+        but they are not usable.
+        """ )
+
+    nelements = property(
+        lambda self: self.sorted.nrows, None, None,
+        "The number of currently indexed rows.")
+
+    def _getruns(self):
+        if 'RUNS' not in self._v_attrs:
+            return [0]  # built before runs were introduced
+        return list(self._v_attrs.RUNS)
+
+    def _setruns(self, runs):
+        self._v_attrs.RUNS = list(runs)
+        # Forget the bounds of runs which do not exist anymore.
+        stops = list(runs[1:]) + [self.sorted.nrows]
+        ranges = zip(runs, stops)
+        for range_ in self._v_bounds.keys():
+            if range_ not in ranges:
+                del self._v_bounds[range_]
+
+    runs = property(
+        _getruns, _setruns, None,
+        "The first rows of the sorted runs in ``sorted``.")
+
+    table = property(
+        lambda self: self._v_parent.table, None, None,
+        "Accessor for the `Table` object of this index.")
+
+    # </properties>
+
+
+    def __init__(self, parentNode, name, colpathnames=None,
+                 title="", filters=None, new=False):
+        self._v_new_colpathnames = colpathnames
+        self._v_bounds = {}
+        """The first keys of the blocks of every run (see `_getBounds()`)."""
+        super(CompositeIndex, self).__init__(
+            parentNode, name, title, new, filters)
+
+
+    def _g_postInitHook(self):
+        super(CompositeIndex, self)._g_postInitHook()
+        if self._v_new:
+            self._v_attrs.COLUMNS = list(self._v_new_colpathnames)
+            self._v_attrs.DIRTY = False
+
+
+    def build(self):
+        """
+        Build the index from the current contents of the table.
+
+        The table is read a slice of rows at a time, and every slice is
+        added to the index as a new run (see `append()`), so that the
+        indexed columns do not need to fit in memory.  The number of
+        indexed rows is returned.
+        """
+        from tables.table import Table  # avoid a circular import
+        from tables.description import Col, Int64Col
+
+        table = self.table
+        colpathnames = self.colpathnames
+        nrows = table.nrows
+        descr = {}
+        for i, colpathname in enumerate(colpathnames):
+            descr['c%d' % i] = Col.from_dtype(table.coldtypes[colpathname],
+                                              pos=i)
+        descr['coord'] = Int64Col(pos=len(colpathnames))
+        if 'sorted' in self:
+            self.sorted._g_remove(False, False)
+        sorted = Table(self, 'sorted', descr,
+                       "Sorted values and coordinates", self.filters,
+                       expectedrows=max(nrows, 1), _log=False)
+        self._v_bounds.clear()
+        self.runs = [0]
+        # Read many rows at a time to keep the number of merges low.
+        # Rows deleted lazily are read too, so that coordinates match.
+        nrowsinslice = sorted.nrowsinbuf * 64
+        for start in xrange(0, nrows, nrowsinslice):
+            stop = min(start + nrowsinslice, nrows)
+            self.append([table._read(start, stop, 1, colpathname)
+                         for colpathname in colpathnames], start)
+        self.dirty = False
+        return nrows
+
+
+    def _sortKeys(self, keys, coords):
+        """Get the `keys` and `coords` of some rows sorted by keys."""
+        records = numpy.empty(len(coords), dtype=self.sorted._v_dtype)
+        for i, key in enumerate(keys):
+            records['c%d' % i] = key
+        records['coord'] = coords
+        return self._sortRecords(records)
+
+
+    def _sortRecords(self, records):
+        """Get the rows of ``sorted`` in `records` sorted by keys."""
+        nkeys = len(self.colpathnames)
+        # ``lexsort()`` uses the last key as the primary one.
+        rkeys = [records['c%d' % i] for i in xrange(nkeys-1, -1, -1)]
+        return records[numpy.lexsort(rkeys)]
+
+
+    def _mergeRuns(self, lo, mid):
+        """
+        Merge the runs starting at rows `lo` and `mid` of ``sorted``.
+
+        The second run must be the last one.  The runs are read a
+        buffer of rows at a time, and the merged rows are written to a
+        temporary table and then copied back, so that only a few
+        buffers are kept in memory.
+        """
+        from tables.table import Table  # avoid a circular import
+
+        sorted = self.sorted
+        hi = sorted.nrows
+        nrowsinbuf = sorted.nrowsinbuf
+        if hi - lo <= nrowsinbuf:
+            sorted.modifyRows(lo, hi, 1,
+                              self._sortRecords(sorted.read(lo, hi)))
+            return
+        names = ['c%d' % i for i in xrange(len(self.colpathnames))]
+        if 'merged' in self:
+            # Left by a merge which did not finish.
+            self.merged._g_remove(False, False)
+        merged = Table(self, 'merged', sorted.coldescrs,
+                       "Merged runs of sorted values and coordinates",
+                       self.filters, expectedrows=hi - lo, _log=False)
+        try:
+            nextrows = [lo, mid]  # the next rows to be read from every run
+            stops = [mid, hi]
+            blocks = [None, None]  # the rows read and not merged yet
+            while True:
+                for i in (0, 1):
+                    if blocks[i] is None and nextrows[i] < stops[i]:
+                        stop = min(nextrows[i] + nrowsinbuf, stops[i])
+                        blocks[i] = sorted.read(nextrows[i], stop)
+                        nextrows[i] = stop
+                if blocks[0] is None or blocks[1] is None:
+                    break
+                # All the rows of the block ending with the lowest key
+                # go before the rows left in both runs.
+                i = 0
+                if not _lexLessEqual(blocks[0][-1:], names, blocks[1][-1])[0]:
+                    i = 1
+                other = blocks[1-i]
+                nother = _lexLessEqual(other, names, blocks[i][-1]).sum()
+                merged.append(self._sortRecords(
+                    numpy.concatenate([blocks[i], other[:nother]])))
+                blocks[i] = None
+                blocks[1-i] = other[nother:]
+                if nother == len(other):
+                    blocks[1-i] = None
+            # Only one of the runs has rows left.
+            for i in (0, 1):
+                while blocks[i] is not None:
+                    merged.append(blocks[i])
+                    blocks[i] = None
+                    if nextrows[i] < stops[i]:
+                        stop = min(nextrows[i] + nrowsinbuf, stops[i])
+                        blocks[i] = sorted.read(nextrows[i], stop)
+                        nextrows[i] = stop
+            merged.flush()
+            for start in xrange(0, hi - lo, nrowsinbuf):
+                stop = min(start + nrowsinbuf, hi - lo)
+                sorted.modifyRows(lo + start, lo + stop, 1,
+                                  merged.read(start, stop))
+        finally:
+            merged._g_remove(False, False)
+
+
+    def append(self, keys, start):
+        """
+        Add rows appended to the table from row `start` to the index.
+
+        `keys` is a list with the values of the indexed columns in the
+        new rows, in index order.  The rows are sorted as a new run,
+        and the last run is merged with the previous one while the
+        latter is not more than twice as long.
+        """
+        nrows = len(keys[0])
+        if nrows == 0:
+            return
+        sorted = self.sorted
+        coords = numpy.arange(start, start + nrows, dtype='int64')
+        runs = self.runs
+        runs.append(sorted.nrows)
+        sorted.append(self._sortKeys(keys, coords))
+        while len(runs) > 1:
+            lastsize = sorted.nrows - runs[-1]
+            if runs[-1] - runs[-2] > 2 * lastsize:
+                break
+            mid = runs.pop()
+            self._mergeRuns(runs[-1], mid)
+        sorted.flush()
+        self.runs = runs
+
+
+    def _getBounds(self, lo, hi):
+        """
+        Get the first keys of the blocks of sorted rows between `lo`
+        and `hi`.
+
+        Blocks have as many rows as a chunk of ``sorted``, and their
+        keys are kept in memory, so that searching a run only needs to
+        read the block where the searched keys are (see `_bisect()`).
+        """
+        bounds = self._v_bounds.get((lo, hi))
+        if bounds is None:
+            blocksize = self.sorted.chunkshape[0]
+            bounds = self.sorted.read(lo, hi, blocksize).tolist()
+            self._v_bounds[(lo, hi)] = bounds
+        return bounds
+
+
+    def _bisect(self, target, right, lo, hi):
+        """
+        Find the insertion point of `target` in the sorted values of
+        the run between rows `lo` and `hi`.
+
+        The block of rows where `target` is inserted is found in the
+        bounds of the run (see `_getBounds()`), and it is read at once
+        and searched in memory.
+        """
+        if lo >= hi:
+            return lo
+        nkeys = len(target)
+        if right:
+            bisect = bisect_right
+        else:
+            bisect = bisect_left
+        bounds = [key[:nkeys] for key in self._getBounds(lo, hi)]
+        nblock = bisect(bounds, target)
+        if nblock == 0:
+            return lo
+        blocksize = self.sorted.chunkshape[0]
+        bstart = lo + (nblock - 1) * blocksize
+        bstop = min(bstart + blocksize, hi)
+        block = self.sorted.read(bstart, bstop).tolist()
+        return bstart + bisect([key[:nkeys] for key in block], target)
+
+
+    def search(self, ops, limits):
+        """
+        Get the coordinates of the rows satisfying `ops` on `limits`.
+
+        The first ``'eq'`` operations refer to the leading columns of
+        the index, in order.  The rest of operations (at most two, with
+        the lower bound first) delimit a range for the next column.  A
+        sorted array with the coordinates of the matching rows is
+        returned.
+        """
+        neq = list(ops).count('eq')
+        eqvalues = tuple(limits[:neq])
+        lower = upper = None
+        for op, limit in zip(ops[neq:], limits[neq:]):
+            if op in ('gt', 'ge'):
+                lower = (op, limit)
+            else:
+                upper = (op, limit)
+        runs = self.runs
+        stops = runs[1:] + [self.sorted.nrows]
+        coords = []
+        for lo, hi in zip(runs, stops):
+            if lower is not None:
+                op, limit = lower
+                start = self._bisect(eqvalues + (limit,), op == 'gt', lo, hi)
+            else:
+                start = self._bisect(eqvalues, False, lo, hi)
+            if upper is not None:
+                op, limit = upper
+                stop = self._bisect(eqvalues + (limit,), op == 'le', lo, hi)
+            else:
+                stop = self._bisect(eqvalues, True, lo, hi)
+            if start < stop:
+                coords.append(self.sorted.read(start, stop, field='coord'))
+        if not coords:
+            return numpy.empty(0, dtype='int64')
+        coords = numpy.concatenate(coords)
+        coords.sort()
+        return coords
+
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+        return "%s (%s) dirty=%s, columns=%s" % (
+            self._v_pathname, self.__class__.__name__, self.dirty,
+            self.colpathnames)
+
+
+
+def _lexLessEqual(records, names, key):
+    """
+    Get a mask of the `records` not greater than the `key` record.
+
+    Records are compared in the lexicographical order of their `names`
+    fields, where NaN values are greater than any other one (as in
+    ``numpy.lexsort()``).
+    """
+    result = numpy.ones(len(records), dtype=numpy.bool_)
+    for name in names[::-1]:
+        column, value = records[name], key[name]
+        less = column < value
+        equal = column == value
+        if column.dtype.kind == 'f':
+            isnan = numpy.isnan(column)
+            if numpy.isnan(value):
+                less |= ~isnan
+                equal |= isnan
+        result = less | (equal & result)
+    return result
+
+
+def bitsetToCoords(bitset, start, stop, step=1):
+    """
+    Get the coordinates of the set bits in a `bitset`.
+
+    `bitset` is an array of bytes with a bit per row, as returned by
+    ``numpy.packbits()``.  Only the rows in the ``[start:stop:step]``
+    range are considered.  The bitset is unpacked in blocks, so that
+    memory consumption is kept low.
+    """
+    blocksize = 2**20  # bytes unpacked at a time
+    coords = []
+    bstart = start // 8
+    bstop = (stop + 7) // 8
+    while bstart < bstop:
+        bnext = min(bstart + blocksize, bstop)
+        bits = numpy.unpackbits(bitset[bstart:bnext])
+        coords.append(bits.nonzero()[0] + bstart * 8)
+        bstart = bnext
+    if not coords:
+        return numpy.empty(0, dtype='int64')
+    coords = numpy.concatenate(coords).astype('int64')
+    keep = (coords >= start) & (coords < stop)
+    if step > 1:
+        keep &= ((coords - start) % step == 0)
+    return coords[keep]
+
+
+
+class BitmapIndex(NotLoggedMixin, Group):
+
+    """
+    Represents a bitmap index over a column with few distinct values.
+
+    The distinct values of the column are kept in an array
+    (``values``).  For every one of them, a bitset with a bit per row
+    (``bitmap0``, ``bitmap1``...) tells which rows have that value.
+    Bitsets are packed in bytes and compressed with the filters of the
+    index, so that the long runs of equal bits in them take very little
+    space.
+
+    Conditions are solved by combining the bitsets of the values which
+    satisfy them, so the exact coordinates of the rows are always
+    known.  Rows appended to the table are added incrementally to the
+    index; any other change makes it dirty until it is rebuilt.  The
+    index can not have more distinct values than the
+    ``BITMAP_MAX_VALUES`` parameter: rows bringing more of them make
+    it dirty too, and rebuilding it creates a normal index instead (see
+    `Column.createIndex()`).
+
+    Public instance variables
+    -------------------------
+
+    column
+        The `Column` instance for the indexed column.
+    dirty
+        Whether the index is dirty or not.
+    filters
+        Filter properties for this index --see `Filters`.
+    kind
+        The kind of the index (always ``'bitmap'``).
+    nelements
+        The number of currently indexed rows for this column.
+    nvalues
+        The number of distinct values in the column.
+
+    Public methods
+    --------------
+
+    append(values)
+    build()
+    get_bitset(ops, limits)
+    search(ops, limits)
+    update(stop)
+    """
+
+    _c_classId = 'BITMAPINDEX'
+
+
+    # <properties>
+
+    kind = property(
+        lambda self: 'bitmap', None, None,
+        "The kind of this index.")
+
+    optlevel = property(
+        lambda self: 0, None, None,
+        "The optimization level of this index (bitmaps are not optimized).")
+
+    filters = property(
+        lambda self: self._v_filters, None, None,
+        "The filters for this index.")
+
+    is_CSI = property(
+        lambda self: False, None, None,
+        "Whether the index is completely sorted or not.")
+
+    has_coords = property(
+        lambda self: True, None, None,
+        "Whether the index keeps the exact coordinates of every row.")
+
+    reduction = property(
+        lambda self: 1, None, None,
+        "The reduction level of this index (bitmaps are exact).")
+
+    def _getdirty(self):
+        if 'DIRTY' not in self._v_attrs:
+            return False
+        return self._v_attrs.DIRTY
+
+    def _setdirty(self, dirty):
+        wasdirty, isdirty = self.dirty, bool(dirty)
+        self._v_attrs.DIRTY = isdirty
+        # If an *actual* change in dirtiness happens,
+        # notify the condition cache by setting or removing a nail.
+        conditionCache = self.table._conditionCache
+        if not wasdirty and isdirty:
+            conditionCache.nail()
+        if wasdirty and not isdirty:
+            conditionCache.unnail()
+
+    dirty = property(
+        _getdirty, _setdirty, None,
+        """
+        Whether the index is dirty or not.
+
+        Dirty indexes are out of sync with column data, so they exist
+        but they are not usable.
+        """ )
+
+    def _getnelements(self):
+        return long(self._v_attrs.NELEMENTS)
+
+    def _setnelements(self, nelements):
+        self._v_attrs.NELEMENTS = numpy.int64(nelements)
+
+    nelements = property(
+        _getnelements, _setnelements, None,
+        "The number of currently indexed rows for this column.")
+
+    nvalues = property(
+        lambda self: self.values.nrows, None, None,
+        "The number of distinct values in the column.")
+
+    def _getcolumn(self):
+        tablepath, columnpath = _tableColumnPathnameOfIndex(self._v_pathname)
+        table = self._v_file._getNode(tablepath)
+        return table.cols._g_col(columnpath)
+
+    column = property(
+        _getcolumn, None, None,
+        "Accessor for the `Column` object of this index.")
+
+    def _gettable(self):
+        tablepath, columnpath = _tableColumnPathnameOfIndex(self._v_pathname)
+        return self._v_file._getNode(tablepath)
+
+    table = property(
+        _gettable, None, None,
+        "Accessor for the `Table` object of this index.")
+
+    # </properties>
+
+
+    def __init__(self, parentNode, name, atom=None, title="",
+                 filters=None, expectedrows=0, new=False):
+        self._v_new_atom = atom
+        self._v_expectedrows = expectedrows
+        super(BitmapIndex, self).__init__(
+            parentNode, name, title, new, filters)
+
+
+    def _g_postInitHook(self):
+        super(BitmapIndex, self)._g_postInitHook()
+        if self._v_new:
+            EArray(self, 'values', self._v_new_atom, (0,),
+                   "Distinct values of the column", _log=False)
+            self._v_attrs.DIRTY = False
+            self.nelements = 0
+
+
+    def _getBitmap(self, valueid):
+        """Get the bitset of rows with the value number `valueid`."""
+        return self._f_getChild('bitmap%d' % valueid)
+
+
+    def _addValue(self, value):
+        """Add a new distinct `value` and return its number."""
+        valueid = self.values.nrows
+        self.values.append(numpy.array([value], dtype=self.values.dtype))
+        bitmap = EArray(self, 'bitmap%d' % valueid, UInt8Atom(), (0,),
+                        "Rows with value number %d" % valueid,
+                        filters=self.filters,
+                        expectedrows=self._v_expectedrows // 8 + 1,
+                        _log=False)
+        # The rows already indexed do not have the new value.
+        nbytes = (self.nelements + 7) // 8
+        if nbytes > 0:
+            bitmap.truncate(nbytes)
+        return valueid
+
+
+    def append(self, values):
+        """
+        Add the `values` of the next rows of the column to the index.
+
+        The bits of every distinct value are appended to its bitset,
+        and new distinct values get a new bitset.  If the index would
+        have more distinct values than the ``BITMAP_MAX_VALUES``
+        parameter, nothing is added, the index is marked as dirty and
+        false is returned (true otherwise).
+        """
+        nvalues = len(values)
+        if nvalues == 0:
+            return True
+        nelements = self.nelements
+        distinct = self.values.read()
+        uvalues, inverse = numpy.unique(values, return_inverse=True)
+        # NaN values are never added to the distinct ones.
+        newvalues = uvalues[uvalues == uvalues]
+        newvalues = newvalues[~numpy.in1d(newvalues, distinct)]
+        maxvalues = self._v_file.params['BITMAP_MAX_VALUES']
+        if len(distinct) + len(newvalues) > maxvalues:
+            self.dirty = True
+            return False
+        # The bits of the new rows follow the last (partial) byte.
+        offset = nelements % 8
+        nbytes = (offset + nvalues + 7) // 8
+        valueids = []
+        for i, value in enumerate(uvalues):
+            if value != value:
+                continue  # NaN values never satisfy a condition
+            found = (distinct == value).nonzero()[0]
+            if len(found) > 0:
+                valueid = found[0]
+            else:
+                valueid = self._addValue(value)
+            valueids.append(valueid)
+            bits = numpy.zeros(nbytes * 8, dtype='bool')
+            bits[offset:offset+nvalues] = (inverse == i)
+            self._appendBits(valueid, numpy.packbits(bits), offset)
+        # Distinct values missing in the new rows get unset bits.
+        zeros = numpy.zeros(nbytes, dtype='uint8')
+        for valueid in xrange(len(distinct)):
+            if valueid not in valueids:
+                self._appendBits(valueid, zeros, offset)
+        self.nelements = nelements + nvalues
+        return True
+
+
+    def _appendBits(self, valueid, packed, offset):
+        """Append `packed` bits to a bitset with `offset` bits in use."""
+        bitmap = self._getBitmap(valueid)
+        if offset > 0:
+            # Merge the last byte, which had some bits already.
+            last = bitmap.nrows - 1
+            packed[0] |= bitmap[last]
+            bitmap[last] = packed[0]
+            packed = packed[1:]
+        if len(packed) > 0:
+            bitmap.append(packed)
+
+
+    def update(self, stop):
+        """
+        Add the rows of the column up to `stop` to the index.
+
+        False is returned if there were too many distinct values (see
+        `append()`), true otherwise.
+        """
+        table = self.table
+        colpathname = _tableColumnPathnameOfIndex(self._v_pathname)[1]
+        # Read many rows at a time to keep the number of appends low.
+        nrowsinbuf = table.nrowsinbuf * 64
+        start = self.nelements
+        while start < stop:
+            bstop = min(start + nrowsinbuf, stop)
+            if not self.append(table._read(start, bstop, 1, colpathname)):
+                return False
+            start = bstop
+        return True
+
+
+    def build(self):
+        """
+        Build the index from the current contents of the column.
+
+        The number of indexed rows is returned.  If the column has too
+        many distinct values (see `append()`), the index is left dirty.
+        """
+        if self.update(self.table.nrows):
+            self.dirty = False
+        return self.nelements
+
+
+    def get_bitset(self, ops, limits):
+        """
+        Get the bitset of the rows whose values satisfy `ops` on `limits`.
+
+        The operations are the ones in the index expressions of a
+        compiled condition (all of them must be satisfied).  The bitsets
+        of the distinct values satisfying them are OR'ed together, one
+        chunk at a time.
+        """
+        distinct = self.values.read()
+        matches = numpy.ones(len(distinct), dtype='bool')
+        for op, limit in zip(ops, limits):
+            if op == 'lt':
+                matches &= distinct < limit
+            elif op == 'le':
+                matches &= distinct <= limit
+            elif op == 'gt':
+                matches &= distinct > limit
+            elif op == 'ge':
+                matches &= distinct >= limit
+            elif op == 'eq':
+                matches &= distinct == limit
+        nbytes = (self.nelements + 7) // 8
+        bitset = numpy.zeros(nbytes, dtype='uint8')
+        for valueid in matches.nonzero()[0]:
+            bitmap = self._getBitmap(valueid)
+            chunksize = bitmap.chunkshape[0]
+            for start in xrange(0, nbytes, chunksize):
+                stop = min(start + chunksize, nbytes)
+                bitset[start:stop] |= bitmap.read(start, stop)
+        return bitset
+
+
+    def search(self, ops, limits):
+        """
+        Get the coordinates of the rows satisfying `ops` on `limits`.
+
+        A sorted array with the coordinates of the rows is returned.
+        """
+        return bitsetToCoords(
+            self.get_bitset(ops, limits), 0, self.nelements)
+
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+        return "%s (%s) dirty=%s, nelements=%s, nvalues=%s" % (
+            self._v_pathname, self.__class__.__name__, self.dirty,
+            self.nelements, self.nvalues)
+
+
+    def _f_remove(self, recursive=False):
+        """Remove this index."""
+        # Index removal is always recursive,
+        # no matter what `recursive` says.
+        super(BitmapIndex, self)._f_remove(True)
+
+
+
+def _chunkBounds(values, offsets):
+    """
+    Get the minimum and maximum of `values` between `offsets`.
+
+    An array with a ``(minimum, maximum)`` row for every slice of
+    `values` starting at the positions in `offsets` is returned.  NaN
+    values are ignored unless a slice has nothing else.
+    """
+    bounds = numpy.empty((len(offsets), 2), dtype=values.dtype)
+    kind = values.dtype.kind
+    if kind == 'S':
+        # Strings can not be reduced by ufuncs.
+        limits = list(offsets) + [len(values)]
+        for i in xrange(len(offsets)):
+            svalues = numpy.sort(values[limits[i]:limits[i+1]])
+            bounds[i, 0], bounds[i, 1] = svalues[0], svalues[-1]
+    elif kind == 'f':
+        bounds[:, 0] = numpy.fmin.reduceat(values, offsets)
+        bounds[:, 1] = numpy.fmax.reduceat(values, offsets)
+    else:
+        bounds[:, 0] = numpy.minimum.reduceat(values, offsets)
+        bounds[:, 1] = numpy.maximum.reduceat(values, offsets)
+    return bounds
+
+
+
+class ChunkSummary(NotLoggedMixin, Group):
+
+    """
+    Base class for the summaries of a column in every table chunk.
+
+    The summaries are kept in an extendable array with a row per chunk
+    of the table, and they are used for skipping the chunks which can
+    not have rows satisfying a query condition.  Summaries are never
+    dirty: they are updated incrementally when rows are appended, and
+    the summaries of the chunks with modified rows are recomputed.
+
+    Subclasses must provide the `_g_createSummaries()`, `_summarize()`,
+    `_merge()` and `get_chunkmap()` methods, and the name of the array
+    in the `_c_summariesName` class attribute.
+
+    Public instance variables
+    -------------------------
+
+    colpathname
+        The path name of the column.
+    nchunks
+        The number of chunks with summaries.
+    nrowsinchunk
+        The number of rows in a chunk of the table.
+    table
+        The `Table` instance this summary belongs to.
+
+    Public methods
+    --------------
+
+    append(values, start)
+    get_chunkmap(ops, limits[, start][, stop])
+    update([start][, stop][, coords])
+    """
+
+    _c_summariesName = None
+
+
+    # <properties>
+
+    colpathname = property(
+        lambda self: self._v_attrs.COLUMN, None, None,
+        "The path name of the column.")
+
+    nchunks = property(
+        lambda self: self._f_getChild(self._c_summariesName).nrows,
+        None, None,
+        "The number of chunks with summaries.")
+
+    nrowsinchunk = property(
+        lambda self: self.table.chunkshape[0], None, None,
+        "The number of rows in a chunk of the table.")
+
+    table = property(
+        lambda self: self._v_parent.table, None, None,
+        "Accessor for the `Table` object of this summary.")
+
+    # </properties>
+
+
+    def __init__(self, parentNode, name, colpathname=None,
+                 title="", new=False):
+        self._v_new_colpathname = colpathname
+        super(ChunkSummary, self).__init__(parentNode, name, title, new)
+
+
+    def _g_postInitHook(self):
+        super(ChunkSummary, self)._g_postInitHook()
+        if self._v_new:
+            self._v_attrs.COLUMN = self._v_new_colpathname
+            self._g_createSummaries()
+            self.update()
+
+
+    def _iterSummaryBlocks(self, start, stop):
+        """
+        Iterate over the chunks with rows in the ``[start:stop]`` range.
+
+        The chunks are yielded in ``(bstart, bstop)`` blocks of about an
+        I/O buffer of summaries, so that they can be read a block at a
+        time.  `stop` is the end of the table if it is ``None``.
+        """
+        cs = self.nrowsinchunk
+        if stop is None:
+            stop = self.table.nrows
+        array = self._f_getChild(self._c_summariesName)
+        cstart = start // cs
+        cstop = min((stop + cs - 1) // cs, array.nrows)
+        for bstart in xrange(cstart, cstop, array.nrowsinbuf):
+            yield (bstart, min(bstart + array.nrowsinbuf, cstop))
+
+
+    def _setSummaries(self, nchunk, summaries):
+        """Set the `summaries` of the chunks starting at `nchunk`."""
+        array = self._f_getChild(self._c_summariesName)
+        nset = max(min(len(summaries), array.nrows - nchunk), 0)
+        if nset > 0:
+            array[nchunk:nchunk+nset] = summaries[:nset]
+        if nset < len(summaries):
+            array.append(summaries[nset:])
+
+
+    def append(self, values, start):
+        """
+        Update the summaries with `values` appended at row `start`.
+
+        The summary of the last chunk is merged with the one of
+        `values` going into it, so that there is no need to read it.
+        """
+        cs = self.nrowsinchunk
+        nchunk = start // cs
+        offsets = numpy.arange(nchunk*cs, start+len(values), cs) - start
+        offsets[0] = 0
+        summaries = self._summarize(values, offsets)
+        if nchunk < self.nchunks:
+            # The first chunk already had some rows.
+            array = self._f_getChild(self._c_summariesName)
+            summaries[0] = self._merge(array[nchunk], summaries[0])
+        self._setSummaries(nchunk, summaries)
+
+
+    def update(self, start=0, stop=None, coords=None):
+        """
+        Recompute the summaries of the chunks with modified rows.
+
+        The modified rows are the ones at `coords` or, if it is
+        ``None``, the ones in the ``[start:stop]`` range (till the end
+        of the table if `stop` is ``None``).  Summaries for chunks past
+        the end of the table are removed.
+        """
+        table = self.table
+        cs = self.nrowsinchunk
+        nrows = table.nrows
+        nchunks = (nrows + cs - 1) // cs
+        if self.nchunks > nchunks:
+            self._f_getChild(self._c_summariesName).truncate(nchunks)
+        if coords is not None:
+            # Recompute every run of consecutive chunks at once.
+            chunks = numpy.unique(numpy.asarray(coords, dtype='int64') // cs)
+            if len(chunks) == 0:
+                return
+            breaks = numpy.nonzero(numpy.diff(chunks) > 1)[0] + 1
+            for run in numpy.split(chunks, breaks):
+                self.update(run[0]*cs, (run[-1]+1)*cs)
+            return
+        if stop is None or stop > nrows:
+            stop = nrows
+        # Read whole chunks, about an I/O buffer at a time.
+        nrowsinbuf = max(table.nrowsinbuf // cs, 1) * cs
+        start = (start // cs) * cs
+        stop = min(((stop + cs - 1) // cs) * cs, nrows)
+        while start < stop:
+            bstop = min(start + nrowsinbuf, stop)
+            values = table._read(start, bstop, 1, self.colpathname)
+            self._setSummaries(start // cs, self._summarize(
+                values, numpy.arange(0, len(values), cs)))
+            start = bstop
+
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+        return "%s (%s) column=%s, nchunks=%s" % (
+            self._v_pathname, self.__class__.__name__, self.colpathname,
+            self.nchunks)
+
+
+
+class ZoneMap(ChunkSummary):
+
+    """
+    Keeps the minimum and maximum values of a column in every chunk.
+
+    The bounds of the values in every chunk of the table are kept in
+    an extendable array (``bounds``) with a ``(minimum, maximum)`` row
+    per chunk.  Queries on unindexed columns with a zone map only read
+    the chunks whose bounds may satisfy the condition.
+
+    Contrarily to indexes, zone maps are never dirty: they are updated
+    incrementally when rows are appended and the bounds of the chunks
+    with modified rows are recomputed.
+
+    Public instance variables
+    -------------------------
+
+    colpathname
+        The path name of the column.
+    nchunks
+        The number of chunks with bounds.
+    nrowsinchunk
+        The number of rows in a chunk of the table.
+    table
+        The `Table` instance this zone map belongs to.
+
+    Public methods
+    --------------
+
+    append(values, start)
+    get_chunkmap(ops, limits[, start][, stop])
+    update([start][, stop][, coords])
+    """
+
+    _c_classId = 'ZONEMAP'
+    _c_summariesName = 'bounds'
+
+
+    def _g_createSummaries(self):
+        table = self.table
+        atom = Atom.from_dtype(table.coldtypes[self.colpathname])
+        expectedrows = table.nrows // self.nrowsinchunk + 1
+        EArray(self, 'bounds', atom, (0, 2),
+               "Minimum and maximum values of every chunk",
+               expectedrows=expectedrows, _log=False)
+
+
+    def _summarize(self, values, offsets):
+        return _chunkBounds(values, offsets)
+
+
+    def _merge(self, bounds1, bounds2):
+        return _chunkBounds(numpy.concatenate((bounds1, bounds2)), [0])[0]
+
+
+    def get_chunkmap(self, ops, limits, start=0, stop=None):
+        """
+        Get the chunks with values that may satisfy `ops` on `limits`.
+
+        The operations are the ones in the index expressions of a
+        compiled condition (all of them must be satisfied).  A boolean
+        array with an element for every chunk is returned, where only
+        the chunks with rows in the ``[start:stop]`` range may be set.
+        The bounds of those chunks are read a block at a time.
+        """
+        chunkmap = numpy.zeros(self.nchunks, dtype='bool')
+        for bstart, bstop in self._iterSummaryBlocks(start, stop):
+            bounds = self.bounds[bstart:bstop]
+            mins, maxs = bounds[:, 0], bounds[:, 1]
+            bchunkmap = chunkmap[bstart:bstop]
+            bchunkmap[:] = True
+            for op, limit in zip(ops, limits):
+                if op == 'lt':
+                    bchunkmap &= mins < limit
+                elif op == 'le':
+                    bchunkmap &= mins <= limit
+                elif op == 'gt':
+                    bchunkmap &= maxs > limit
+                elif op == 'ge':
+                    bchunkmap &= maxs >= limit
+                elif op == 'eq':
+                    bchunkmap &= (mins <= limit) & (maxs >= limit)
+        return chunkmap
+
+
+
+# Constants for hashing values with the 64-bit FNV-1a function.
+_fnvOffset = numpy.uint64(14695981039346656037L)
+_fnvPrime = numpy.uint64(1099511628211L)
+
+def _hashValues(values):
+    """
+    Get two 64-bit hashes for every element in `values`.
+
+    The hashes are computed from the bytes of the values in native
+    byte order, so that equal values always get equal hashes.  A
+    ``(hash1, hash2)`` tuple of ``uint64`` arrays is returned, where
+    ``hash2`` is always odd.
+    """
+    values = numpy.ascontiguousarray(
+        values, dtype=values.dtype.newbyteorder('='))
+    if values.dtype.kind == 'f':
+        values = values + 0  # -0.0 and 0.0 are equal values
+    nvalues, itemsize = len(values), values.dtype.itemsize
+    data = values.view('uint8').reshape((nvalues, itemsize))
+    hash1 = numpy.empty(nvalues, dtype='uint64')
+    hash1[:] = _fnvOffset
+    for i in xrange(itemsize):
+        hash1 ^= data[:, i]
+        hash1 *= _fnvPrime
+    # The second hash is a mix of the bits in the first one.
+    hash2 = hash1 ^ (hash1 >> numpy.uint64(29))
+    hash2 *= numpy.uint64(0xbf58476d1ce4e5b9L)
+    hash2 ^= hash2 >> numpy.uint64(32)
+    hash2 |= numpy.uint64(1)
+    return hash1, hash2
+
+
+
+class BloomFilter(ChunkSummary):
+
+    """
+    Keeps a Bloom filter of the values of a column in every chunk.
+
+    The filter of every chunk of the table is a bitset (a row of the
+    ``bits`` extendable array) where every value in the chunk sets a
+    few bits chosen by hashing it.  Queries with equality conditions on
+    a column with Bloom filters only read the chunks whose filters have
+    all the bits of the wanted value set.  Chunks not having the value
+    may still be read, with a probability given by the false positive
+    rate of the filters.
+
+    Bloom filters are never dirty: they are updated incrementally when
+    rows are appended and the filters of the chunks with modified rows
+    are recomputed.
+
+    Public instance variables
+    -------------------------
+
+    colpathname
+        The path name of the column.
+    fprate
+        The false positive rate for full chunks of distinct values.
+    nbits
+        The number of bits in the filter of every chunk.
+    nchunks
+        The number of chunks with filters.
+    nhashes
+        The number of bits set by every value.
+    nrowsinchunk
+        The number of rows in a chunk of the table.
+    table
+        The `Table` instance this Bloom filter belongs to.
+
+    Public methods
+    --------------
+
+    append(values, start)
+    get_chunkmap(ops, limits[, start][, stop])
+    update([start][, stop][, coords])
+    """
+
+    _c_classId = 'BLOOMFILTER'
+    _c_summariesName = 'bits'
+
+
+    # <properties>
+
+    fprate = property(
+        lambda self: float(self._v_attrs.FPRATE), None, None,
+        "The false positive rate for full chunks of distinct values.")
+
+    nbits = property(
+        lambda self: int(self._v_attrs.NBITS), None, None,
+        "The number of bits in the filter of every chunk.")
+
+    nhashes = property(
+        lambda self: int(self._v_attrs.NHASHES), None, None,
+        "The number of bits set by every value.")
+
+    # </properties>
+
+
+    def __init__(self, parentNode, name, colpathname=None,
+                 title="", fprate=0.01, new=False):
+        self._v_new_fprate = fprate
+        super(BloomFilter, self).__init__(
+            parentNode, name, colpathname, title, new)
+
+
+    def _g_createSummaries(self):
+        # Size the filters for chunks with all their values distinct.
+        nvalues = self.nrowsinchunk
+        fprate = self._v_new_fprate
+        nbits = -nvalues * math.log(fprate) / math.log(2)**2
+        nbytes = max(int(math.ceil(nbits / 8)), 1)
+        nhashes = max(int(round(nbytes * 8. / nvalues * math.log(2))), 1)
+        self._v_attrs.FPRATE = fprate
+        self._v_attrs.NBITS = nbytes * 8
+        self._v_attrs.NHASHES = nhashes
+        expectedrows = self.table.nrows // self.nrowsinchunk + 1
+        EArray(self, 'bits', UInt8Atom(), (0, nbytes),
+               "Bloom filter of every chunk",
+               expectedrows=expectedrows, _log=False)
+
+
+    def _getPositions(self, values):
+        """Get the positions of the bits set by every value."""
+        hash1, hash2 = _hashValues(values)
+        nbits = numpy.uint64(self.nbits)
+        positions = numpy.empty((len(values), self.nhashes), dtype='int64')
+        for i in xrange(self.nhashes):
+            positions[:, i] = hash1 % nbits
+            hash1 += hash2
+        return positions
+
+
+    def _summarize(self, values, offsets):
+        nchunks, nbits = len(offsets), self.nbits
+        nchunk = numpy.repeat(
+            numpy.arange(nchunks), numpy.diff(numpy.append(offsets,
+                                                           len(values))))
+        if values.dtype.kind == 'f':
+            # NaN values never satisfy a condition.
+            notnan = values == values
+            values, nchunk = values[notnan], nchunk[notnan]
+        bits = numpy.zeros((nchunks, nbits), dtype='bool')
+        bits[nchunk[:, numpy.newaxis], self._getPositions(values)] = True
+        return numpy.packbits(bits, axis=1)
+
+
+    def _merge(self, bits1, bits2):
+        return bits1 | bits2
+
+
+    def get_chunkmap(self, ops, limits, start=0, stop=None):
+        """
+        Get the chunks with values that may satisfy `ops` on `limits`.
+
+        The operations are the ones in the index expressions of a
+        compiled condition (all of them must be satisfied).  Only
+        equality operations can be checked with Bloom filters, so all
+        chunks may satisfy the other ones.  A boolean array with an
+        element for every chunk is returned, where only the chunks with
+        rows in the ``[start:stop]`` range may be set.  Just the bytes
+        of their filters with the bits of the wanted values are read, a
+        block of chunks at a time.
+        """
+        dtype = self.table.coldtypes[self.colpathname]
+        positions = []
+        for op, limit in zip(ops, limits):
+            if op != 'eq':
+                continue
+            value = numpy.array([limit], dtype=dtype)
+            if value[0] != limit or (dtype.kind in 'iub' and
+                                     not isinstance(limit, (int, long))):
+                # The value can not be hashed like the column ones.
+                continue
+            positions.extend(self._getPositions(value)[0])
+        # The mask of the wanted bits in every byte to be read.
+        masks = {}
+        for position in positions:
+            masks[position // 8] = (masks.get(position // 8, 0) |
+                                    0x80 >> (position % 8))
+        chunkmap = numpy.zeros(self.nchunks, dtype='bool')
+        for bstart, bstop in self._iterSummaryBlocks(start, stop):
+            bchunkmap = chunkmap[bstart:bstop]
+            bchunkmap[:] = True
+            for nbyte, mask in masks.iteritems():
+                bchunkmap &= (self.bits[bstart:bstop, nbyte] & mask) == mask
+        return chunkmap
+
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+        return "%s (%s) column=%s, nchunks=%s, fprate=%s" % (
+            self._v_pathname, self.__class__.__name__, self.colpathname,
+            self.nchunks, self.fprate)
+
+
+
+def _mergeRanges(starts, stops):
+    """
+    Sort and merge the ``[start, stop)`` ranges in `starts` and `stops`.
+
+    A ``(starts, stops)`` tuple with the sorted, disjoint and not
+    adjacent ranges covering the same rows is returned.
+    """
+    order = starts.argsort(kind='mergesort')
+    starts, stops = starts[order], stops[order]
+    if len(starts) > 1:
+        maxstops = numpy.maximum.accumulate(stops)
+        # The ranges not overlapping nor touching the previous ones.
+        first = numpy.ones(len(starts), dtype=numpy.bool_)
+        first[1:] = starts[1:] > maxstops[:-1]
+        first = first.nonzero()[0]
+        last = numpy.append(first[1:], len(starts)) - 1
+        starts, stops = starts[first], maxstops[last]
+    return (starts, stops)
+
+
+def _inRanges(ranges, coords):
+    """
+    Get a mask of the `coords` which fall in some of the `ranges`.
+
+    `ranges` is a ``(starts, stops)`` tuple as returned by
+    `Tombstones.read()`, and `coords` an ``int64`` array.
+    """
+    (starts, stops) = ranges
+    pos = starts.searchsorted(coords, side='right') - 1
+    return (pos >= 0) & (coords < stops[numpy.maximum(pos, 0)])
+
+
+class Tombstones(NotLoggedMixin, Group):
+
+    """
+    Keeps the ranges of rows deleted lazily from a table.
+
+    The ``[start, stop)`` ranges of deleted rows are kept in an
+    extendable array of pairs (``ranges``).  Every deletion only
+    appends the parts of its range which were not deleted yet, so the
+    ranges already saved are never rewritten and the coordinates of
+    the deleted rows are never materialized.  Deleted rows keep their
+    data and coordinates until the table is compacted, so that indexes
+    and the other auxiliary structures of the table remain valid, and
+    they are skipped when reading the table.
+
+    Public instance variables
+    -------------------------
+
+    ndeleted
+        The number of deleted rows.
+    table
+        The `Table` instance these tombstones belong to.
+
+    Public methods
+    --------------
+
+    add(start, stop)
+    read()
+    shift(start, stop)
+    """
+
+    _c_classId = 'TOMBSTONES'
+
+
+    # <properties>
+
+    def _g_getndeleted(self):
+        (starts, stops) = self.read()
+        return long((stops - starts).sum())
+
+    ndeleted = property(
+        _g_getndeleted, None, None, "The number of deleted rows.")
+
+    table = property(
+        lambda self: self._v_parent.table, None, None,
+        "Accessor for the `Table` object of these tombstones.")
+
+    # </properties>
+
+
+    def __init__(self, parentNode, name, title="", new=False):
+        self._v_ranges = None
+        """The merged ranges of the deleted rows, read on demand."""
+        super(Tombstones, self).__init__(parentNode, name, title, new)
+
+
+    def _g_postInitHook(self):
+        super(Tombstones, self)._g_postInitHook()
+        if self._v_new:
+            EArray(self, 'ranges', Int64Atom(), (0, 2),
+                   "Ranges of the deleted rows", _log=False)
+
+
+    def read(self):
+        """
+        Get the ranges of the deleted rows (cached).
+
+        A ``(starts, stops)`` tuple of ``int64`` arrays is returned,
+        with the sorted and disjoint ``[start, stop)`` ranges.
+        """
+        if self._v_ranges is None:
+            ranges = self._f_getChild('ranges').read()
+            self._v_ranges = _mergeRanges(ranges[:,0], ranges[:,1])
+        return self._v_ranges
+
+
+    def add(self, start, stop):
+        """
+        Mark the rows in ``[start, stop)`` as deleted.
+
+        Only the parts of the range which were not deleted yet are
+        appended to the saved ranges.  Their number of rows is returned.
+        """
+        (starts, stops) = self.read()
+        # The deleted ranges overlapping or touching the new one.
+        lo = stops.searchsorted(start, side='left')
+        hi = starts.searchsorted(stop, side='right')
+        # The gaps between them are the rows not deleted yet.
+        gapstarts = numpy.concatenate(
+            ([start], numpy.minimum(stops[lo:hi], stop))).astype('int64')
+        gapstops = numpy.concatenate(
+            (numpy.maximum(starts[lo:hi], start), [stop])).astype('int64')
+        gaps = gapstarts < gapstops
+        gapstarts, gapstops = gapstarts[gaps], gapstops[gaps]
+        nrows = long((gapstops - gapstarts).sum())
+        if nrows == 0:
+            return nrows
+        self._f_getChild('ranges').append(
+            numpy.column_stack((gapstarts, gapstops)))
+        # Replace the ranges merged with the new one in the cache.
+        if hi > lo:
+            start, stop = min(start, starts[lo]), max(stop, stops[hi-1])
+        self._v_ranges = (
+            numpy.concatenate((starts[:lo], [start], starts[hi:])
+                              ).astype('int64'),
+            numpy.concatenate((stops[:lo], [stop], stops[hi:])
+                              ).astype('int64') )
+        return nrows
+
+
+    def shift(self, start, stop):
+        """
+        Update the ranges after removing the rows in ``[start:stop]``.
+
+        Deleted rows in the range are forgotten, and the ones after it
+        are moved back.
+        """
+        (starts, stops) = self.read()
+        if len(stops) == 0 or stops[-1] <= start:
+            return
+        nrows = stop - start
+        starts = numpy.where(starts < start, starts,
+                             numpy.maximum(starts, stop) - nrows)
+        stops = numpy.where(stops <= start, stops,
+                            numpy.maximum(stops, stop) - nrows)
+        keep = starts < stops
+        (starts, stops) = _mergeRanges(starts[keep], stops[keep])
+        array = self._f_getChild('ranges')
+        array.truncate(0)
+        if len(starts) > 0:
+            array.append(numpy.column_stack((starts, stops)))
+        self._v_ranges = (starts, stops)
+
+
+    def __repr__(self):
+        """This provides more metainfo than standard __repr__"""
+        return "%s (%s) ndeleted=%s" % (
+            self._v_pathname, self.__class__.__name__, self.ndeleted)
+
+
+
 class OldIndex(NotLoggedMixin, Group):
     """This is meant to hide indexes of PyTables 1.x files."""
     _c_classId = 'CINDEX'
@@ -134,37 +134,45 @@ def keysort(ndarray array1, ndarray array2):
   array1 can be of any type, except complex or string.  array2 may be made of
   elements on any size.
 
+  The GIL is released during the sort, so that several arrays can be sorted
+  in parallel by different threads.
+
   """
   cdef npy_intp size
-  cdef int elsize1, elsize2
+  cdef int elsize1, elsize2, ret
+  cdef char *data1, *data2
+  cdef char kind
 
   size = array1.size
   elsize1 = array1.itemsize
   elsize2 = array2.itemsize
+  data1 = array1.data
+  data2 = array2.data
+  # Choose the sorting function here, as the GIL is needed for this
   if array1.dtype == "float64":
-    return keysort_f64(<npy_float64 *>array1.data, array2.data, size, elsize2)
+    kind = c'd'
   elif array1.dtype == "float32":
-    return keysort_f32(<npy_float32 *>array1.data, array2.data, size, elsize2)
+    kind = c'f'
   elif array1.dtype == "int64":
-    return keysort_i64(<npy_int64 *>array1.data, array2.data, size, elsize2)
+    kind = c'q'
   elif array1.dtype == "uint64":
-    return keysort_u64(<npy_uint64 *>array1.data, array2.data, size, elsize2)
+    kind = c'Q'
   elif array1.dtype == "int32":
-    return keysort_i32(<npy_int32 *>array1.data, array2.data, size, elsize2)
+    kind = c'i'
   elif array1.dtype == "uint32":
-    return keysort_u32(<npy_uint32 *>array1.data, array2.data, size, elsize2)
+    kind = c'I'
   elif array1.dtype == "int16":
-    return keysort_i16(<npy_int16 *>array1.data, array2.data, size, elsize2)
+    kind = c'h'
   elif array1.dtype == "uint16":
-    return keysort_u16(<npy_uint16 *>array1.data, array2.data, size, elsize2)
+    kind = c'H'
   elif array1.dtype == "int8":
-    return keysort_i8(<npy_int8 *>array1.data, array2.data, size, elsize2)
+    kind = c'b'
   elif array1.dtype == "uint8":
-    return keysort_u8(<npy_uint8 *>array1.data, array2.data, size, elsize2)
+    kind = c'B'
   elif array1.dtype == "bool":
-    return keysort_u8(<npy_uint8 *>array1.data, array2.data, size, elsize2)
+    kind = c'B'
   elif array1.dtype.char == "S":
-    return keysort_S(array1.data, elsize1, array2.data, size, elsize2)
+    kind = c'S'
     # As it turns out, an indirect sort is always faster, and much faster on
     # new processors.  See
     # http://www.mail-archive.com/numpy-discussion@scipy.org/msg06639.html
@@ -179,6 +187,32 @@ def keysort(ndarray array1, ndarray array2):
   else:
     raise ValueError, "This shouldn't happen!"
 
+  Py_BEGIN_ALLOW_THREADS
+  if kind == c'd':
+    ret = keysort_f64(<npy_float64 *>data1, data2, size, elsize2)
+  elif kind == c'f':
+    ret = keysort_f32(<npy_float32 *>data1, data2, size, elsize2)
+  elif kind == c'q':
+    ret = keysort_i64(<npy_int64 *>data1, data2, size, elsize2)
+  elif kind == c'Q':
+    ret = keysort_u64(<npy_uint64 *>data1, data2, size, elsize2)
+  elif kind == c'i':
+    ret = keysort_i32(<npy_int32 *>data1, data2, size, elsize2)
+  elif kind == c'I':
+    ret = keysort_u32(<npy_uint32 *>data1, data2, size, elsize2)
+  elif kind == c'h':
+    ret = keysort_i16(<npy_int16 *>data1, data2, size, elsize2)
+  elif kind == c'H':
+    ret = keysort_u16(<npy_uint16 *>data1, data2, size, elsize2)
+  elif kind == c'b':
+    ret = keysort_i8(<npy_int8 *>data1, data2, size, elsize2)
+  elif kind == c'B':
+    ret = keysort_u8(<npy_uint8 *>data1, data2, size, elsize2)
+  else:
+    ret = keysort_S(data1, elsize1, data2, size, elsize2)
+  Py_END_ALLOW_THREADS
+  return ret
+
 
 # Classes
 
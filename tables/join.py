@@ -0,0 +1,410 @@
+########################################################################
+#
+#       License: BSD
+#       Created: October 18, 2026
+#
+#       $Id$
+#
+########################################################################
+
+"""Here is defined the join() function.
+
+See join() function docstring for more info.
+
+Classes:
+
+
+Functions:
+
+    join
+
+Misc variables:
+
+    __version__
+
+
+"""
+
+import os
+import tempfile
+
+import numpy
+
+from tables.atom import Atom
+from tables.flavor import internal_to_flavor
+from tables.index import _inRanges
+
+__version__ = "$Revision$"
+
+
+_joinKinds = ['inner', 'left', 'right', 'outer']
+"""The kinds of joins supported by `join()`."""
+
+
+
+class _SortedKeys(object):
+    """
+    Read the keys of a table column in sorted order.
+
+    Batches of ``(keys, coords)`` arrays with the sorted keys of the
+    `colpathname` column of `table` and the coordinates of their rows
+    are returned by `next()`, and None when there are no more keys.
+    Keys in a batch are never smaller than the ones in the previous
+    batch.  Batches have about `batchsize` keys.
+
+    If the column has a completely sorted index, it is read in order.
+    Otherwise, the column is sorted in runs of `maxrows` rows.  When
+    there is more than one run, they are kept in a temporary file in
+    `tmp_dir` (which is removed by `close()`) and merged.  Rows deleted
+    lazily from `table` are skipped.
+    """
+
+    def __init__(self, table, colpathname, batchsize, maxrows, tmp_dir):
+        self.batchsize = batchsize
+        self.deleted = table._getDeletedRanges()
+        self.index = table._getSortedIndex(colpathname)
+        self.tmpfile = None
+        self.runs = []
+        if self.index is not None:
+            self.nrowsread = 0
+            return
+
+        nrows = table.nrows
+        for start in xrange(0, nrows, maxrows):
+            stop = min(start + maxrows, nrows)
+            keys = table._read(start, stop, 1, colpathname)
+            coords = numpy.arange(start, stop, dtype=numpy.int64)
+            keys, coords = self._skipDeleted(keys, coords)
+            if len(keys) == 0:
+                continue
+            order = numpy.argsort(keys, kind='mergesort')
+            keys = keys[order]
+            coords = coords[order]
+            if nrows > maxrows:
+                keys, coords = self._saveRun(keys, coords, tmp_dir)
+            # Items of ``[keys, coords, nrowsread, bufkeys, bufcoords]``.
+            self.runs.append([keys, coords, 0, keys[:0], coords[:0]])
+
+
+    def _skipDeleted(self, keys, coords):
+        """Remove the `keys` and `coords` of the rows deleted lazily."""
+        deleted = self.deleted
+        if deleted is None:
+            return (keys, coords)
+        keep = ~_inRanges(deleted, coords.astype('int64'))
+        return (keys[keep], coords[keep])
+
+
+    def _saveRun(self, keys, coords, tmp_dir):
+        """Save a run of sorted `keys` and `coords` to the temporary file."""
+        if self.tmpfile is None:
+            from tables.file import openFile  # avoid a circular import
+            fd, self.tmpfilename = tempfile.mkstemp(
+                ".tmp", "pytables-", tmp_dir)
+            # Close the file descriptor so as to avoid leaks
+            os.close(fd)
+            self.tmpfile = openFile(self.tmpfilename, "w")
+        nrun = len(self.runs)
+        root = self.tmpfile.root
+        keysarr = self.tmpfile.createEArray(
+            root, 'keys%d' % nrun, Atom.from_dtype(keys.dtype), (0,),
+            expectedrows=len(keys))
+        keysarr.append(keys)
+        coordsarr = self.tmpfile.createEArray(
+            root, 'coords%d' % nrun, Atom.from_dtype(coords.dtype), (0,),
+            expectedrows=len(coords))
+        coordsarr.append(coords)
+        return (keysarr, coordsarr)
+
+
+    def next(self):
+        """Get the next batch of sorted keys (or None)."""
+        index = self.index
+        while index is not None:
+            start = self.nrowsread
+            if start >= index.nelements:
+                return None
+            stop = min(start + self.batchsize, index.nelements)
+            self.nrowsread = stop
+            coords = index.readIndices(start, stop).astype(numpy.int64)
+            keys, coords = self._skipDeleted(
+                index.readSorted(start, stop), coords)
+            if len(keys) > 0:
+                return (keys, coords)
+
+        while True:
+            # Every run must have keys in its buffer, unless exhausted.
+            active = []
+            for run in self.runs:
+                keys, coords, nrowsread, bufkeys, bufcoords = run
+                if len(bufkeys) == 0 and nrowsread < len(keys):
+                    stop = nrowsread + self.batchsize
+                    run[2:] = [stop, keys[nrowsread:stop],
+                               coords[nrowsread:stop]]
+                if len(run[3]) > 0:
+                    active.append(run)
+            if not active:
+                return None
+            # The keys up to the smallest last key in the buffers can
+            # be returned, as the following ones are not smaller.
+            lastkeys = numpy.concatenate([run[3][-1:] for run in active])
+            bound = numpy.sort(lastkeys)[0]
+            keys, coords = [], []
+            for run in active:
+                bufkeys, bufcoords = run[3:]
+                n = bufkeys.searchsorted(bound, 'right')
+                keys.append(bufkeys[:n])
+                coords.append(bufcoords[:n])
+                run[3:] = [bufkeys[n:], bufcoords[n:]]
+            keys = numpy.concatenate(keys)
+            coords = numpy.concatenate(coords)
+            order = numpy.argsort(keys, kind='mergesort')
+            return (keys[order], coords[order])
+
+
+    def close(self):
+        """Remove the temporary file (if any)."""
+        self.runs = []
+        if self.tmpfile is not None:
+            self.tmpfile.close()
+            os.remove(self.tmpfilename)
+            self.tmpfile = None
+
+
+
+def _matchKeys(lkeys, lcoords, rkeys, rcoords, how):
+    """
+    Match the rows with equal values in the sorted `lkeys` and `rkeys`.
+
+    A ``(lcoords, rcoords)`` tuple with the coordinates of the matching
+    rows in both sides is returned, sorted by their keys.  Rows in the
+    left side (for ``'left'`` and ``'outer'`` joins) or in the right
+    side (for ``'right'`` and ``'outer'`` joins) with no matches get a
+    -1 coordinate in the other side.
+    """
+    lo = rkeys.searchsorted(lkeys, 'left')
+    counts = rkeys.searchsorted(lkeys, 'right') - lo
+    if lkeys.dtype.kind in 'fc':
+        # NaN values are not equal to anything.
+        counts[numpy.isnan(lkeys)] = 0
+    total = counts.sum()
+    lidx = numpy.repeat(numpy.arange(len(lkeys)), counts)
+    starts = numpy.cumsum(counts) - counts
+    ridx = ( numpy.arange(total) - numpy.repeat(starts, counts)
+             + numpy.repeat(lo, counts) )
+    lresult, rresult, keys = [lcoords[lidx]], [rcoords[ridx]], [lkeys[lidx]]
+
+    if how in ['left', 'outer']:
+        unmatched = (counts == 0)
+        lresult.append(lcoords[unmatched])
+        rresult.append(-numpy.ones(unmatched.sum(), dtype=numpy.int64))
+        keys.append(lkeys[unmatched])
+    if how in ['right', 'outer']:
+        unmatched = ( lkeys.searchsorted(rkeys, 'right')
+                      == lkeys.searchsorted(rkeys, 'left') )
+        if rkeys.dtype.kind in 'fc':
+            unmatched |= numpy.isnan(rkeys)
+        lresult.append(-numpy.ones(unmatched.sum(), dtype=numpy.int64))
+        rresult.append(rcoords[unmatched])
+        keys.append(rkeys[unmatched])
+
+    if len(lresult) == 1:
+        return (lresult[0], rresult[0])
+    order = numpy.argsort(numpy.concatenate(keys), kind='mergesort')
+    return (numpy.concatenate(lresult)[order],
+            numpy.concatenate(rresult)[order])
+
+
+
+def _readSide(table, coords, dtype):
+    """
+    Read the rows of `table` at `coords` into a record array of `dtype`.
+
+    The rows with a -1 coordinate get the default values of the table.
+    """
+    wdflts = table._v_wdflts
+    if wdflts is None:
+        rows = numpy.zeros(len(coords), dtype=dtype)
+    else:
+        rows = wdflts.repeat(len(coords))
+    valid = (coords >= 0)
+    if valid.all():
+        return table._readCoordinates(coords)
+    if valid.any():
+        rows[valid] = table._readCoordinates(coords[valid])
+    return rows
+
+
+
+def join(left, right, on, how='inner', out=None, tmp_dir=None):
+    """
+    Join the rows of the `left` and `right` tables with equal keys.
+
+    `on` is the path name of the key column in both tables, or a
+    ``(leftkey, rightkey)`` pair with the path names of the key columns
+    in every table.  `how` is the kind of join: ``'inner'`` (only
+    matching rows are joined), ``'left'`` (rows in `left` with no
+    matches are joined with the default values of `right`),
+    ``'right'`` (the opposite) or ``'outer'`` (both).
+
+    Every joined row has the top-level columns of `left` followed by
+    those of `right`, except its key column when it has the same name
+    in both tables (it is taken from `right` when `left` has no row).
+    Columns in `right` with the same name as one in `left` get a
+    ``_right`` suffix.  Joined rows are sorted by their keys.
+
+    If `out` is a table, the joined rows are appended to it in
+    buffered batches, and their number is returned.  It must have the
+    columns of the joined rows, although it may have others, which get
+    their default values.  Otherwise, a record array with the joined
+    rows is returned.
+
+    Keys are read in sorted order from the completely sorted index of
+    the key column of every table (see `Column.createCSIndex()`) and
+    merged, so the number of keys read at a time is bounded.  If a key
+    column has no such index, its keys are sorted in memory, or in
+    runs of ``JOIN_SORT_ROWS`` keys in a temporary file in `tmp_dir`
+    (the directory of the file of `left` by default) which are merged.
+    """
+    if how not in _joinKinds:
+        raise ValueError( "unknown kind of join: %r; it must be one of %s"
+                          % (how, _joinKinds) )
+    if isinstance(on, basestring):
+        lkey = rkey = on
+    else:
+        lkey, rkey = on
+    for table, key in [(left, lkey), (right, rkey)]:
+        table._checkNonNestedColumn(key)
+        if table.coldtypes[key].shape != ():
+            raise TypeError( "key column ``%s`` is multidimensional, "
+                             "which is not supported" % key )
+    lkind = left.coldtypes[lkey].kind
+    rkind = right.coldtypes[rkey].kind
+    if (lkind == 'S') != (rkind == 'S'):
+        raise TypeError( "key columns ``%s`` and ``%s`` can not be compared"
+                         % (lkey, rkey) )
+
+    # The description of the joined rows.
+    ldtype, rdtype = left._v_dtype, right._v_dtype
+    descr, rnames = [], []
+    for name in ldtype.names:
+        descr.append((name, ldtype.fields[name][0]))
+    dropkey = (lkey == rkey and '/' not in rkey)
+    for name in rdtype.names:
+        if dropkey and name == rkey:
+            continue
+        newname = name
+        if name in ldtype.names:
+            newname = name + '_right'
+        descr.append((newname, rdtype.fields[name][0]))
+        rnames.append((name, newname))
+    dtype = numpy.dtype(descr)
+    if out is not None:
+        out._v_file._checkWritable()
+        for name in dtype.names:
+            out._checkColumn(name)
+        samedtype = (out._v_dtype == dtype)
+        out.flush()
+
+    params = left._v_file.params
+    maxrows = params['JOIN_SORT_ROWS']
+    if tmp_dir is None:
+        tmp_dir = os.path.dirname(left._v_file.filename)
+    lkeys = _SortedKeys(left, lkey, left.nrowsinbuf, maxrows, tmp_dir)
+    try:
+        rkeys = _SortedKeys(right, rkey, right.nrowsinbuf, maxrows, tmp_dir)
+        try:
+            sides = [ [lkeys, False, lkeys.next()],
+                      [rkeys, False, rkeys.next()] ]
+            for side in sides:
+                if side[2] is None:
+                    side[1:] = [True, (numpy.empty(0, left.coldtypes[lkey]),
+                                       numpy.empty(0, numpy.int64))]
+            nrows, chunks = 0, []
+            while True:
+                # The keys smaller than the last key in the buffers of
+                # both sides are complete, and they can be joined.
+                lastkeys = [ side[2][0][-1:] for side in sides
+                             if not side[1] ]
+                bound = None
+                if lastkeys:
+                    bound = numpy.sort(numpy.concatenate(lastkeys))[0]
+                pairs, ntaken = [], 0
+                for side in sides:
+                    bufkeys, bufcoords = side[2]
+                    n = len(bufkeys)
+                    if bound is not None:
+                        n = bufkeys.searchsorted(bound, 'left')
+                    pairs.append((bufkeys[:n], bufcoords[:n]))
+                    side[2] = (bufkeys[n:], bufcoords[n:])
+                    ntaken += n
+                if ntaken == 0 and bound is not None:
+                    # Read more keys from the sides limited by the bound.
+                    for side in sides:
+                        sorted_, done, (bufkeys, bufcoords) = side
+                        if done or bufkeys[-1] > bound:
+                            continue
+                        batch = sorted_.next()
+                        if batch is None:
+                            side[1] = True
+                        else:
+                            side[2] = (numpy.concatenate([bufkeys, batch[0]]),
+                                       numpy.concatenate([bufcoords,
+                                                          batch[1]]))
+                    continue
+
+                lcoords, rcoords = _matchKeys(
+                    pairs[0][0], pairs[0][1], pairs[1][0], pairs[1][1], how)
+                if len(lcoords) > 0:
+                    result = numpy.empty(len(lcoords), dtype=dtype)
+                    lrows = _readSide(left, lcoords, ldtype)
+                    for name in ldtype.names:
+                        result[name] = lrows[name]
+                    rrows = _readSide(right, rcoords, rdtype)
+                    for name, newname in rnames:
+                        result[newname] = rrows[name]
+                    if dropkey and how in ['right', 'outer']:
+                        noleft = (lcoords < 0)
+                        result[lkey][noleft] = rrows[rkey][noleft]
+                    if out is None:
+                        chunks.append(result)
+                    elif samedtype:
+                        out._saveBufferedRows(result, len(result))
+                    else:
+                        # Start from the defaults in destination, as it
+                        # can have more columns than the joined rows.
+                        wdflts = out._v_wdflts
+                        if wdflts is None:
+                            dstbuf = numpy.zeros(len(result),
+                                                 dtype=out._v_dtype)
+                        else:
+                            dstbuf = wdflts.repeat(len(result))
+                        for name in dtype.names:
+                            dstbuf[name] = result[name]
+                        out._saveBufferedRows(dstbuf, len(dstbuf))
+                    nrows += len(result)
+
+                # Refill the buffers that have been emptied.
+                for side in sides:
+                    sorted_, done, (bufkeys, bufcoords) = side
+                    if not done and len(bufkeys) == 0:
+                        batch = sorted_.next()
+                        if batch is None:
+                            side[1] = True
+                        else:
+                            side[2] = batch
+                if bound is None:
+                    break
+        finally:
+            rkeys.close()
+    finally:
+        lkeys.close()
+
+    if out is not None:
+        out.flush()
+        return nrows
+    if not chunks:
+        return internal_to_flavor(numpy.empty(0, dtype=dtype), left.flavor)
+    if len(chunks) == 1:
+        return internal_to_flavor(chunks[0], left.flavor)
+    return internal_to_flavor(numpy.concatenate(chunks), left.flavor)
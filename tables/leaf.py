@@ -30,6 +30,12 @@ Misc variables:
 import sys
 import warnings
 import math
+import zlib
+
+try:
+    import bz2
+except ImportError:
+    bz2 = None
 
 import numpy
 
@@ -41,7 +47,7 @@ from tables.node import Node
 from tables.filters import Filters
 from tables.utils import byteorders, idx2long, lazyattr, SizeType
 from tables.utilsExtension import whichLibVersion
-from tables.exceptions import PerformanceWarning
+from tables.exceptions import HDF5ExtError, PerformanceWarning
 from tables import utilsExtension
 
 
@@ -90,6 +96,72 @@ def calc_chunksize(expectedsizeinMB):
                            # sequential access
 
 
+def _shuffleChunk(data, cd_values):
+    """Shuffle the bytes of `data` as the HDF5 shuffle filter does."""
+    typesize = cd_values[0]
+    nelements = len(data) // typesize
+    if typesize <= 1 or nelements <= 1:
+        return data
+    nbytes = nelements * typesize
+    buf = numpy.frombuffer(data, dtype=numpy.uint8, count=nbytes)
+    shuffled = buf.reshape((nelements, typesize)).transpose().tostring()
+    return shuffled + data[nbytes:]
+
+def _unshuffleChunk(data, cd_values):
+    """Unshuffle the bytes of `data` as the HDF5 shuffle filter does."""
+    typesize = cd_values[0]
+    nelements = len(data) // typesize
+    if typesize <= 1 or nelements <= 1:
+        return data
+    nbytes = nelements * typesize
+    buf = numpy.frombuffer(data, dtype=numpy.uint8, count=nbytes)
+    # Scattering the bytes is much faster than gathering them.
+    unshuffled = numpy.empty((nelements, typesize), dtype=numpy.uint8)
+    unshuffled.transpose()[...] = buf.reshape((typesize, nelements))
+    return unshuffled.tostring() + data[nbytes:]
+
+def _deflateChunk(data, cd_values):
+    """Compress `data` as the HDF5 deflate filter does."""
+    return zlib.compress(data, cd_values[0])
+
+def _inflateChunk(data, cd_values):
+    """Decompress `data` as the HDF5 deflate filter does."""
+    return zlib.decompress(data)
+
+def _bzip2Chunk(data, cd_values):
+    """Compress `data` as the PyTables bzip2 filter does."""
+    return bz2.compress(data, cd_values[0])
+
+def _bunzip2Chunk(data, cd_values):
+    """Decompress `data` as the PyTables bzip2 filter does."""
+    return bz2.decompress(data)
+
+def _codecFilters(filterChunk):
+    """Get the ``(filter, unfilter)`` pair for a bundled C codec."""
+    return ( lambda data, cd_values: filterChunk(data, cd_values, False),
+             lambda data, cd_values: filterChunk(data, cd_values, True) )
+
+_chunkFilters = {
+    1: (_deflateChunk, _inflateChunk),
+    2: (_shuffleChunk, _unshuffleChunk),
+    32001: _codecFilters(utilsExtension.bloscFilterChunk), }
+"""
+The filters that can be applied to chunks outside of HDF5, by id.
+
+Values are ``(filter, unfilter)`` pairs of functions.  The filter
+functions of optional HDF5 filters may return None instead of the
+filtered data, so that the chunk is left unfiltered by them.
+"""
+if whichLibVersion("lzo") is not None:
+    from tables import _comp_lzo
+    _chunkFilters[305] = _codecFilters(_comp_lzo.filterChunk)
+if whichLibVersion("bzip2") is not None:
+    from tables import _comp_bzip2
+    _chunkFilters[307] = _codecFilters(_comp_bzip2.filterChunk)
+elif bz2 is not None:
+    _chunkFilters[307] = (_bzip2Chunk, _bunzip2Chunk)
+
+
 
 class Leaf(Node):
     """
@@ -214,6 +286,26 @@ class Leaf(Node):
         """Filter properties for this leaf."""
         return Filters._from_leaf(self)
 
+    @lazyattr
+    def _v_chunkpipeline(self):
+        """
+        The filters of the chunks of this leaf, in the order they apply.
+
+        This is a list of ``((filter, unfilter), cd_values)`` pairs for
+        filtering and unfiltering chunks outside of HDF5.  It is None if
+        the leaf has no filters or some of them can not be applied this
+        way.
+        """
+        pipeline = self._g_chunkPipeline()
+        if not pipeline:
+            return None
+        filters = []
+        for (filter_id, cd_values) in pipeline:
+            if filter_id not in _chunkFilters:
+                return None
+            filters.append((_chunkFilters[filter_id], cd_values))
+        return filters
+
     # Other properties
     # ````````````````
     def _getmaindim(self):
@@ -417,6 +509,205 @@ very small/large chunksize, you may want to increase/decrease it."""
         return nrowsinbuf
 
 
+    def _directChunkRows(self, read=False):
+        """
+        Get the number of rows in the chunks to be read or written directly.
+
+        When the ``DIRECT_CHUNK_WORKERS`` parameter is not 0, chunks of
+        whole rows are (un)filtered in parallel threads and read (if
+        `read` is true) or written bypassing the HDF5 filter pipeline
+        (see `_readDirectChunks()` and `_writeDirectChunks()`).  0 is
+        returned if this is not possible for this leaf.
+        """
+        if self._v_file.params['DIRECT_CHUNK_WORKERS'] < 1:
+            return 0
+        return self._wholeChunkRows(read)
+
+
+    def _wholeChunkRows(self, read=False):
+        """
+        Get the number of rows in the chunks to be (un)filtered by us.
+
+        The chunks must span whole rows and their filters must be in
+        `_v_chunkpipeline`.  If `read` is true, they must also be
+        readable bypassing the HDF5 filter pipeline.  0 is returned if
+        this is not possible for this leaf.
+        """
+        if read and not self._g_canReadChunks():
+            return 0
+        chunkshape = self.chunkshape
+        if (chunkshape is None or self.maindim != 0 or
+            tuple(chunkshape[1:]) != tuple(self.shape[1:])):
+            return 0
+        if not self._v_chunkpipeline:
+            return 0
+        return chunkshape[0]
+
+
+    def _writeDirectChunks(self, start, nparr):
+        """
+        Write the rows in `nparr` as whole chunks starting at `start`.
+
+        The rows must be in HDF5 format already and fit in the leaf,
+        and `start` must be the first row of a chunk.  The chunks are
+        filtered by the ``DIRECT_CHUNK_WORKERS`` threads of the file
+        while the already filtered ones are written by this one.
+        """
+        chunkrows = self.chunkshape[0]
+        pool = self._v_file._getWorkerPool('DIRECT_CHUNK_WORKERS')
+        jobs = [ pool.submit(self._filterChunk,
+                             nparr[i*chunkrows:(i+1)*chunkrows])
+                 for i in xrange(len(nparr) // chunkrows) ]
+        try:
+            offset = [0] * len(self.shape)
+            for i in xrange(len(jobs)):
+                (filter_mask, data) = jobs[i].wait()
+                offset[0] = start + i*chunkrows
+                self._g_writeChunk(offset, data, filter_mask)
+        except:
+            pool.cancel(jobs)
+            raise
+
+
+    def _filterChunk(self, rows):
+        """
+        Filter the `rows` of a whole chunk as the HDF5 pipeline does.
+
+        The rows must be in HDF5 format already.  A ``(filter_mask,
+        data)`` tuple is returned, where `filter_mask` flags the optional
+        filters which left the data unfiltered.  HDF5 is not used here,
+        so this can be called from any thread.
+        """
+        data = rows.tostring()
+        filter_mask = 0
+        pipeline = self._v_chunkpipeline
+        for j in xrange(len(pipeline)):
+            ((filter_, unfilter), cd_values) = pipeline[j]
+            filtered = filter_(data, cd_values)
+            if filtered is None:
+                filter_mask |= 1 << j
+            else:
+                data = filtered
+        return (filter_mask, data)
+
+
+    def _filterChunks(self, nparr):
+        """
+        Filter the rows in `nparr` as whole chunks.
+
+        The rows must be in HDF5 format already.  A list with the
+        ``(filter_mask, data)`` tuples of the chunks (see
+        `_filterChunk()`) is returned, to be written with
+        `_writeFilteredChunks()`.  HDF5 is not used here, so this can be
+        called from any thread.
+        """
+        chunkrows = self.chunkshape[0]
+        return [ self._filterChunk(nparr[i*chunkrows:(i+1)*chunkrows])
+                 for i in xrange(len(nparr) // chunkrows) ]
+
+
+    def _writeFilteredChunks(self, start, chunks):
+        """
+        Write the filtered data of whole `chunks` starting at `start`.
+
+        `chunks` has the ``(filter_mask, data)`` tuples returned by
+        `_filterChunks()`.  The chunks must fit in the leaf, and `start`
+        must be the first row of a chunk.
+        """
+        chunkrows = self.chunkshape[0]
+        offset = [0] * len(self.shape)
+        for i in xrange(len(chunks)):
+            (filter_mask, data) = chunks[i]
+            offset[0] = start + i*chunkrows
+            self._g_writeChunk(offset, data, filter_mask)
+
+
+    def _unfilterChunk(self, nchunk, filter_mask, data, chunksize):
+        """
+        Unfilter the `data` read from the chunk number `nchunk`.
+
+        `filter_mask` flags the filters skipped when writing the chunk,
+        and the unfiltered data must be `chunksize` bytes long.  HDF5 is
+        not used here, so this can be called from any thread.
+        """
+        pipeline = self._v_chunkpipeline
+        for j in xrange(len(pipeline)-1, -1, -1):
+            if not filter_mask & (1 << j):
+                ((filter_, unfilter), cd_values) = pipeline[j]
+                data = unfilter(data, cd_values)
+                if data is None:
+                    raise HDF5ExtError(
+                        "chunk %d of leaf ``%s`` can not be unfiltered"
+                        % (nchunk, self._v_pathname))
+        if len(data) != chunksize:
+            raise HDF5ExtError(
+                "chunk %d of leaf ``%s`` has %d bytes instead of %d"
+                % (nchunk, self._v_pathname, len(data), chunksize))
+        return data
+
+
+    def _unfilterChunks(self, start, chunks, nparr):
+        """
+        Unfilter whole `chunks` into the rows of `nparr`.
+
+        `chunks` has the ``(filter_mask, data)`` tuples returned by
+        `_g_readChunk()` for the chunks from the one at row `start`.
+        The rows of the chunks that are None (not written yet) are left
+        untouched.  `nparr` must be contiguous and span the chunks.
+        HDF5 is not used here, so this can be called from any thread.
+        """
+        chunkrows = self.chunkshape[0]
+        rawbuf = nparr.reshape(-1).view(numpy.uint8)
+        chunksize = len(rawbuf) // len(chunks)
+        for i in xrange(len(chunks)):
+            if chunks[i] is not None:
+                (filter_mask, data) = chunks[i]
+                data = self._unfilterChunk(start // chunkrows + i,
+                                           filter_mask, data, chunksize)
+                rawbuf[i*chunksize:(i+1)*chunksize] = numpy.frombuffer(
+                    data, dtype=numpy.uint8)
+
+
+    def _readDirectChunks(self, start, nparr):
+        """
+        Read the rows in `nparr` from whole chunks starting at `start`.
+
+        `nparr` must be contiguous and span whole chunks, and `start`
+        must be the first row of a chunk.  The chunks are read by this
+        thread while the already read ones are unfiltered by the
+        ``DIRECT_CHUNK_WORKERS`` threads of the file.  The rows are left
+        in HDF5 format.  A list with the numbers of the chunks which
+        have not been written yet (and so are not read) is returned.
+        """
+        chunkrows = self.chunkshape[0]
+        nchunks = len(nparr) // chunkrows
+        rawbuf = nparr.reshape(-1).view(numpy.uint8)
+        chunksize = len(rawbuf) // nchunks
+        def unfilter(i, filter_mask, data):
+            data = self._unfilterChunk(start // chunkrows + i,
+                                       filter_mask, data, chunksize)
+            rawbuf[i*chunksize:(i+1)*chunksize] = numpy.frombuffer(
+                data, dtype=numpy.uint8)
+        pool = self._v_file._getWorkerPool('DIRECT_CHUNK_WORKERS')
+        jobs, missing = [], []
+        try:
+            offset = [0] * len(self.shape)
+            for i in xrange(nchunks):
+                offset[0] = start + i*chunkrows
+                chunk = self._g_readChunk(offset)
+                if chunk is None:
+                    missing.append(i)
+                else:
+                    jobs.append(pool.submit(unfilter, i, *chunk))
+            for job in jobs:
+                job.wait()
+        except:
+            # Do not let the workers write into `nparr` anymore.
+            pool.cancel(jobs)
+            raise
+        return missing
+
+
     # This method is appropriate for calls to __getitem__ methods
     def _processRange(self, start, stop, step, dim=None, warn_negstep=True):
         if dim is None:
@@ -700,7 +991,7 @@ very small/large chunksize, you may want to increase/decrease it."""
         if self.extdim < 0:
             raise TypeError("non-enlargeable datasets cannot be truncated")
         if (size > 0 or
-            (size == 0 and whichLibVersion("hdf5")[1] >= "1.8.0")):
+            (size == 0 and whichLibVersion("hdf5")[0] >= 0x10800)):
                 self._g_truncate(size)
         else:
             raise ValueError("""
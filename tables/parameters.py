@@ -98,6 +98,13 @@ LOWEST_HIT_RATIO = 0.6
 """The minimum acceptable hit ratio for a cache to avoid disabling (and
 freeing) it."""
 
+SHARED_COND_CACHE_SLOTS = 512
+"""Maximum number of compiled conditions to be kept in the cache shared
+by all the tables in the process.  Unlike the cache sized by
+``COND_CACHE_SLOTS``, this one survives the closing of files, and it is
+shared by tables with columns of the same types.  The least recently
+used conditions are discarded first."""
+
 
 # Tunable parameters
 # ==================
@@ -201,6 +208,157 @@ BUFFER_TIMES = 100
 ``PerformanceWarning``."""
 
 
+# Parameters for threaded queries
+# -------------------------------
+
+QUERY_PIPELINE_DEPTH = 0
+"""The maximum number of table buffers that are read ahead of the one
+being evaluated during in-kernel queries done by ``Table.readWhere()``
+and ``Table.getWhereList()``, and during ``Table.aggregate()``, so that
+decompression overlaps with the evaluation of the condition.  As HDF5
+is not thread-safe, the compressed chunks of the buffers are read by
+the querying thread, and the ``QUERY_PIPELINE_WORKERS`` threads only
+decompress them and convert their rows.  This is only done for tables
+compressed with the shuffle, zlib, bzip2, lzo and blosc filters (it
+requires HDF5 1.10.2 or higher).  Each buffer takes ``IO_BUFFER_SIZE``
+bytes of memory, approximately.  Set this to 0 to disable the
+pipeline."""
+
+QUERY_PIPELINE_WORKERS = 2
+"""The number of threads that decompress the buffers read ahead by the
+query pipeline (see ``QUERY_PIPELINE_DEPTH``), each one working on a
+different buffer.  The threads are shared by all the tables in a file.
+More threads than ``QUERY_PIPELINE_DEPTH`` are never busy at the same
+time.  Set this to 0 to disable the pipeline."""
+
+
+# Parameters for the query planner
+# --------------------------------
+
+QUERY_CHUNKMAP_COST = 1.2
+"""The cost of reading a table chunk with candidate rows given by
+indexes, relative to the cost of reading it during a sequential scan of
+the table.  Indexes are not used when a sequential scan is estimated to
+be cheaper.  Set this to 0 for always using indexes when possible."""
+
+QUERY_COORDS_COST = 4.0
+"""The cost of fetching a single row at a coordinate given by an index
+(in addition to reading its chunk), in units of rows read during a
+sequential scan of the table.  Only indexes keeping the exact
+coordinates of rows (like 'full' ones) can be used this way."""
+
+QUERY_INDEX_SLICE_COST = 0.0
+"""The cost of searching a slice of an index, in units of rows read
+during a sequential scan of the table.  Zone maps and Bloom filters are
+used instead of indexes when reading the table chunks they select is
+estimated to be cheaper than just searching the indexes.  The default
+of 0 means that usable indexes are always searched (unless zone maps
+or Bloom filters rule out every chunk), so indexed columns keep using
+their indexes when they also have zone maps or Bloom filters."""
+
+
+# Parameters for group-by queries
+# -------------------------------
+
+GROUPBY_MAX_GROUPS = 1000000
+"""The maximum number of groups whose partial results are kept in
+memory by ``Table.groupby()`` before spilling them to disk."""
+
+GROUPBY_PARTITIONS = 16
+"""The number of partitions in which ``Table.groupby()`` spills partial
+results to disk.  Every partition is reduced in memory at the end, so
+more partitions mean less memory for queries with many groups."""
+
+
+# Parameters for joins
+# --------------------
+
+JOIN_SORT_ROWS = 1000000
+"""The maximum number of keys sorted in memory by ``join()`` for a key
+column with no completely sorted index.  Larger tables are sorted in
+runs of this size which are kept in a temporary file and merged."""
+
+
+# Parameters for building indexes
+# -------------------------------
+
+INDEX_BUILD_WORKERS = 0
+"""The number of threads that sort the slices of an index in parallel
+while it is being built.  They also sort the slices while they are
+being reordered by the optimization and complete sort passes, so that
+the next slices are read and the previous ones written meanwhile.  As
+HDF5 is not thread-safe, all the reads and writes are done by the
+thread building the index.  The threads are shared by all the indexes
+in a file.  Set this to 0 to sort the slices serially."""
+
+INDEX_BUILD_MEMORY = 256*_MB
+"""The maximum amount of memory (in bytes, approximately) used for the
+values and indices of the slices being sorted at the same time when
+``INDEX_BUILD_WORKERS`` is not 0."""
+
+INDEX_COMPACT_FACTOR = 0
+"""The number of runs of sorted slices with the same size that are
+merged into a single run when new slices are appended to an index (see
+``Index.compact()``).  This keeps the overlaps among the slices of
+indexes of tables that grow by appends bounded.  If
+``INDEX_BUILD_WORKERS`` is not 0, the runs are merged by those threads
+while rows go on being appended, and the merged slices are written with
+the next slices or when the table is flushed.  Set this to 0 to disable
+the automatic compaction of indexes."""
+
+INDEX_COMPACT_MEMORY = 256*_MB
+"""The maximum amount of memory (in bytes, approximately) used for
+merging runs of sorted slices of an index.  Larger runs are not
+merged."""
+
+BITMAP_MAX_VALUES = 256
+"""The maximum number of distinct values in a column with a 'bitmap'
+index, which keeps a bitset per distinct value.  A 'full' index is
+created instead for columns with more values, and bitmap indexes
+become dirty when appended rows bring more values, so that they are
+replaced by a 'full' index when they are rebuilt."""
+
+
+# Parameters for writing chunks
+# -----------------------------
+
+DIRECT_CHUNK_WORKERS = 0
+"""The number of threads that compress the chunks of data written to
+tables and arrays, which are then written bypassing the HDF5 filter
+pipeline with the same result.  The threads are shared by all the
+nodes in a file.  This is only done for chunks spanning
+whole rows which are entirely written at once (like those filled by
+appends), and for the shuffle, zlib, bzip2, lzo and blosc filters
+(Blosc compresses one chunk at a time, using its own threads).  It
+requires HDF5 1.8.11 or higher with its high-level library, or HDF5
+1.10.3 or higher.  Sequential reads spanning several whole chunks of
+such datasets are also done this way with HDF5 1.10.2 or higher (the
+high-level library is needed before 1.10.3), with the threads
+decompressing the chunks read.  Set this to 0 to always use the filter
+pipeline."""
+
+
+# Parameters for asynchronous appends
+# -----------------------------------
+
+ASYNC_APPEND_DEPTH = 0
+"""The maximum number of I/O buffers filled by ``Row.append()`` that can
+be pending to be saved, so that appending rows does not stall while a
+background thread converts the previous ones to HDF5 format and
+compresses the whole chunks they fill.  As HDF5 is not thread-safe, the
+buffers are written (and indexed) by the thread calling ``Row.append()``
+as the next ones fill up, and the rows in chunks only partly filled by a
+buffer are compressed by HDF5 when written.  If the filters of a table
+can not be applied outside of HDF5 (see ``DIRECT_CHUNK_WORKERS`` for the
+ones supported, or if HDF5 can not write chunks directly), all its
+chunks are compressed this way and a ``PerformanceWarning`` is issued.
+When the limit is reached, ``Row.append()`` waits for the thread to
+catch up.  ``Table.flush()`` writes all the pending buffers, and no
+other operation should be done on the file until then.  Each buffer
+takes ``IO_BUFFER_SIZE`` bytes of memory, approximately.  Set this to 0
+to save the buffers synchronously."""
+
+
 # Miscellaneous
 # -------------
 
@@ -32,7 +32,12 @@ import sys
 import math
 import warnings
 import os.path
+import tempfile
+import threading
+import subprocess
+import cPickle
 from time import time
+from collections import deque
 
 import numpy
 import numexpr
@@ -41,10 +46,10 @@ from tables import tableExtension
 from tables.utilsExtension import lrange
 from tables.lrucacheExtension import ObjectCache, NumCache
 from tables.atom import Atom
-from tables.conditions import compile_condition
+from tables.conditions import compile_condition, combine_index_results, \
+     required_expr_vars
 from numexpr.necompiler import (
     getType as numexpr_getType, double, is_cpu_amd_intel)
-from numexpr.expressions import functions as numexpr_functions
 from tables.flavor import flavor_of, array_as_internal, internal_to_flavor, \
         _numeric_deprecation, _numarray_deprecation
 from tables.utils import is_idx, lazyattr, SizeType, NailedDict as CacheDict
@@ -58,7 +63,8 @@ from tables.utilsExtension import getNestedField
 from tables.path import joinPath, splitPath
 from tables.index import (
     OldIndex, defaultIndexFilters, defaultAutoIndex, Index, IndexesDescG,
-    IndexesTableG)
+    IndexesTableG, CompositeIndex, BitmapIndex, ChunkSummary, ZoneMap,
+    BloomFilter, Tombstones, bitsetToCoords, _hashValues, _inRanges)
 
 profile = False
 #profile = True  # Uncomment for profiling
@@ -121,6 +127,12 @@ def _indexPathnameOf_(nodePath):
 def _indexPathnameOfColumn_(tablePath, colpathname):
     return joinPath(_indexPathnameOf_(tablePath), colpathname)
 
+def _zoneMapNameOf(colpathname):
+    return '_zmap_%s' % colpathname.replace('/', '.')
+
+def _bloomFilterNameOf(colpathname):
+    return '_bloom_%s' % colpathname.replace('/', '.')
+
 
 def _table__setautoIndex(self, auto):
     auto = bool(auto)
@@ -190,6 +202,293 @@ def restorecache(self):
     self._dirtycache = False
 
 
+def _table__getIndexFor(self, var, condvars):
+    """Get the index to be used for the `var` index expression variable."""
+    if type(var) is tuple:
+        colpathnames = [condvars[v].pathname for v in var]
+        for cindex in self._getCompositeIndexes():
+            if ( not cindex.dirty and
+                 cindex.colpathnames[:len(var)] == colpathnames ):
+                return cindex
+        assert False, "the chosen columns have no composite index"
+    index = condvars[var].index
+    assert index is not None, "the chosen column is not indexed"
+    assert not index.dirty, "the chosen column has a dirty index"
+    return index
+
+
+def _table__indexPlan(self, compiled, condvars):
+    """
+    Choose how the indexes in the `compiled` condition are used.
+
+    ``'coords'`` is returned when all the indexes keep the exact
+    coordinates of the rows, so that only the candidate rows need to
+    be read from the table.  Otherwise, ``'chunkmap'`` is returned and
+    the whole chunks containing candidate rows are read.
+    """
+    for var, ops, lims in compiled.index_expressions:
+        index = _table__getIndexFor(self, var, condvars)
+        if isinstance(index, CompositeIndex):
+            continue
+        if not index.has_coords or index.nelements != self.nrows:
+            return 'chunkmap'
+    return 'coords'
+
+
+def _table__searchIndexes(self, compiled, condvars, start, stop, step):
+    """
+    Search the indexes in the `compiled` condition.
+
+    A ``(mode, candidates, ncandidates)`` tuple is returned, where
+    ``mode`` is the value of `_table__indexPlan()`.  For the
+    ``'coords'`` mode, ``candidates`` is an array with the sorted
+    coordinates of the candidate rows in the range given by `start`,
+    `stop` and `step`, otherwise it is the chunkmap of the chunks with
+    candidate rows.  ``candidates`` is None if no candidate rows have
+    been found.  ``ncandidates`` is the number of rows yielded by all
+    the index searches.
+    """
+    idxexprs = compiled.index_expressions
+    strexpr = compiled.string_expression
+    mode = _table__indexPlan(self, compiled, condvars)
+    if mode == 'coords':
+        indexes = [ _table__getIndexFor(self, var, condvars)
+                    for var, ops, lims in idxexprs ]
+        for index in indexes:
+            if not isinstance(index, BitmapIndex):
+                break
+        else:
+            return _table__searchBitmaps(
+                self, compiled, indexes, start, stop, step)
+    cmvars = {}
+    tcoords = 0
+    for i, idxexpr in enumerate(idxexprs):
+        var, ops, lims = idxexpr
+        index = _table__getIndexFor(self, var, condvars)
+
+        # Get the number of rows that the indexed condition yields.
+        if isinstance(index, (CompositeIndex, BitmapIndex)):
+            # These indexes directly yield the selected coordinates.
+            coords = index.search(ops, lims)
+            ncoords = len(coords)
+            reduction = 1
+        else:
+            range_ = index.getLookupRange(ops, lims)
+            ncoords = index.search(range_)
+            reduction = index.reduction
+            if mode == 'coords':
+                coords = index.get_coords()
+        tcoords += ncoords
+        if mode == 'coords':
+            cmvars["e%d"%i] = coords
+            continue
+        if reduction == 1 and ncoords == 0:
+            # No values from index condition, thus the chunkmap should be empty
+            nrowsinchunk = self.chunkshape[0]
+            nchunks = long(math.ceil(float(self.nrows)/nrowsinchunk))
+            chunkmap = numpy.zeros(shape=nchunks, dtype="bool")
+        elif isinstance(index, (CompositeIndex, BitmapIndex)):
+            nrowsinchunk = self.chunkshape[0]
+            nchunks = long(math.ceil(float(self.nrows)/nrowsinchunk))
+            chunkmap = numpy.zeros(shape=nchunks, dtype="bool")
+            chunkmap[coords // nrowsinchunk] = True
+        else:
+            # Get the chunkmap from the index
+            chunkmap = index.get_chunkmap()
+        # Assign the chunkmap to the cmvars dictionary
+        cmvars["e%d"%i] = chunkmap
+
+    if reduction == 1 and tcoords == 0:
+        # No candidates found in any indexed expression component
+        return (mode, None, tcoords)
+
+    if mode == 'coords':
+        if len(cmvars) == 1:
+            coords = cmvars.values()[0]
+        else:
+            # Evaluate the index expression on the union of coordinates
+            allcoords = numpy.unique(numpy.concatenate(cmvars.values()))
+            masks = {}
+            for name, coords in cmvars.iteritems():
+                masks[name] = numpy.in1d(allcoords, coords,
+                                         assume_unique=True)
+            coords = allcoords[numexpr.evaluate(strexpr, masks)]
+        if (start, stop, step) != (0, self.nrows, 1):
+            coords = coords[
+                (coords>=start)&(coords<stop)&((coords-start)%step==0) ]
+        if len(coords) == 0:
+            return (mode, None, tcoords)
+        return (mode, coords, tcoords)
+
+    # Compute the final chunkmap
+    chunkmap = numexpr.evaluate(strexpr, cmvars)
+    # Method .any() is twice as faster than method .sum()
+    if not chunkmap.any():
+        # The chunkmap is empty
+        return (mode, None, tcoords)
+    return (mode, chunkmap, tcoords)
+
+
+# The number of set bits in every possible byte.
+_bitcounts = numpy.unpackbits(
+    numpy.arange(256, dtype='uint8')[:,numpy.newaxis], axis=1).sum(axis=1)
+
+def _table__searchBitmaps(self, compiled, indexes, start, stop, step):
+    """
+    Search the bitmap `indexes` of the `compiled` condition.
+
+    The bitsets yielded by every index expression are combined with
+    bitwise operations, so that only the coordinates of the final
+    result need to be computed.  The returned value is the same as for
+    `_table__searchIndexes()` with a ``'coords'`` mode.
+    """
+    bitsets = {}
+    tcoords = 0
+    for i, idxexpr in enumerate(compiled.index_expressions):
+        var, ops, lims = idxexpr
+        bitset = indexes[i].get_bitset(ops, lims)
+        tcoords += long(_bitcounts[bitset].sum())
+        bitsets["e%d"%i] = bitset
+    if tcoords == 0:
+        return ('coords', None, tcoords)
+    bitset = combine_index_results(compiled.string_expression, bitsets)
+    coords = bitsetToCoords(bitset, start, stop, step)
+    if len(coords) == 0:
+        return ('coords', None, tcoords)
+    return ('coords', coords, tcoords)
+
+
+def _table__estimateQuery(self, mode, candidates, start, stop):
+    """
+    Estimate the cost of the possible plans for a query.
+
+    `mode` and `candidates` are the values returned by
+    `_table__searchIndexes()` for the range of rows between `start`
+    and `stop`.  Costs are expressed in rows read by a sequential scan
+    of the table, and they are weighted by the ``QUERY_CHUNKMAP_COST``
+    and ``QUERY_COORDS_COST`` parameters.  A ``(plan, costs, nchunks)``
+    tuple is returned, where ``plan`` is the cheapest of ``'scan'``,
+    ``'chunkmap'`` and ``'coords'``, ``costs`` is a dictionary with the
+    cost of every possible plan and ``nchunks`` is the number of table
+    chunks with candidate rows.
+    """
+    params = self._v_file.params
+    nrowsinchunk = self.chunkshape[0]
+    costs = {'scan': float(stop - start)}
+    if candidates is None:
+        # Indexes already know that the result is empty.
+        costs['chunkmap'] = 0.
+        if mode == 'coords':
+            costs['coords'] = 0.
+        return (mode, costs, 0)
+
+    if mode == 'coords':
+        nchunks = len(numpy.unique(candidates // nrowsinchunk))
+    else:
+        # Only the chunks in the range of the query are read.
+        chunkmap = candidates[start//nrowsinchunk:(stop-1)//nrowsinchunk+1]
+        nchunks = int(chunkmap.sum())
+    # The rows in the chunks with candidate rows.
+    chunkrows = float(min(nchunks * nrowsinchunk, stop - start))
+    costs['chunkmap'] = chunkrows * params['QUERY_CHUNKMAP_COST']
+    if mode == 'coords':
+        costs['coords'] = ( chunkrows
+                            + len(candidates) * params['QUERY_COORDS_COST'] )
+    # Indexes are preferred in case of a tie.
+    plan = 'scan'
+    for plan_ in ['chunkmap', 'coords']:
+        if plan_ in costs and costs[plan_] <= costs[plan]:
+            plan = plan_
+    return (plan, costs, nchunks)
+
+
+def _table__indexSearchCost(self, compiled, condvars):
+    """
+    Estimate the cost of searching the indexes in the `compiled` condition.
+
+    Searching an index needs a binary search in every one of its
+    slices, and every search is weighted by the
+    ``QUERY_INDEX_SLICE_COST`` parameter.  Composite and bitmap indexes
+    are cheap to search, so they are not taken into account.
+    """
+    slicecost = self._v_file.params['QUERY_INDEX_SLICE_COST']
+    cost = 0.
+    for var, ops, lims in compiled.index_expressions:
+        index = _table__getIndexFor(self, var, condvars)
+        if isinstance(index, Index):
+            # The last row of the index is searched too.
+            cost += (index.nslices + 1) * slicecost
+    return cost
+
+
+def _table__searchZoneMaps(self, condition, condvars, start, stop):
+    """
+    Search the zone maps and Bloom filters of the columns in the
+    `condition`.
+
+    A ``(colpathnames, chunkmap)`` tuple is returned, where
+    ``colpathnames`` is a frozenset with the path names of the columns
+    whose zone maps or Bloom filters are used and ``chunkmap`` tells
+    which chunks of the table may have rows satisfying the `condition`
+    in the ``[start:stop]`` range.  None is returned if no zone map or
+    Bloom filter is usable.
+    """
+    zonemaps = self._getZoneMaps()
+    bloomfilters = self._getBloomFilters()
+    if ( not (zonemaps or bloomfilters)
+         or not self._enabledIndexingInQueries ):
+        return None
+    # Compile the condition with the columns having zone maps or Bloom
+    # filters as the indexed ones, so as to get their range expressions.
+    condkey = self._getConditionKey(condition, condvars)
+    (condition, colnames, varnames, colpaths, vartypes) = condkey
+    typemap = dict(zip(varnames, vartypes))
+    zmcols = []
+    for colname in colnames:
+        col = condvars[colname]
+        typemap[colname] = _nxTypeFromNPType[col.dtype.type]
+        if col.pathname in zonemaps or col.pathname in bloomfilters:
+            zmcols.append(colname)
+    if not zmcols:
+        return None
+    compiled = compile_condition(condition, typemap, frozenset(zmcols), [])
+    if not compiled.index_expressions:
+        return None
+    compiled = compiled.with_replaced_vars(condvars)
+    cmvars = {}
+    for i, (var, ops, lims) in enumerate(compiled.index_expressions):
+        colpathname = condvars[var].pathname
+        chunkmap = None
+        if colpathname in zonemaps:
+            chunkmap = zonemaps[colpathname].get_chunkmap(
+                ops, lims, start, stop)
+        if colpathname in bloomfilters:
+            bfchunkmap = bloomfilters[colpathname].get_chunkmap(
+                ops, lims, start, stop)
+            if chunkmap is None:
+                chunkmap = bfchunkmap
+            else:
+                chunkmap &= bfchunkmap
+        cmvars["e%d"%i] = chunkmap
+    chunkmap = numexpr.evaluate(compiled.string_expression, cmvars)
+    colpathnames = frozenset(
+        [condvars[var].pathname for var in compiled.index_variables])
+    return (colpathnames, chunkmap)
+
+
+def _table__whereCoords(self, compiled, condvars, coords):
+    """
+    Iterate over the rows at the `coords` coordinates yielded by indexes.
+
+    The condition in `compiled` is still evaluated on the rows read.
+    """
+    args = [condvars[param] for param in compiled.parameters]
+    self._whereCondition = (compiled.function, args)
+    self._useIndex = False
+    row = tableExtension.Row(self)
+    return row._iter(0, len(coords), 1, coords=coords)
+
+
 def _table__whereIndexed(self, compiled, condition, condvars,
                          start, stop, step):
     if profile: tref = time()
@@ -217,53 +516,986 @@ def _table__whereIndexed(self, compiled, condition, condvars,
         # Correct the ranges in cached sequence
         if (start, stop, step) != (0, self.nrows, 1):
             seq = seq[(seq>=start)&(seq<stop)&((seq-start)%step==0)]
-        return self.itersequence(seq)
+        return self.itersequence(seq, skipdeleted=True)
+
+    # Look for the candidate rows in indexes and choose the cheapest
+    # way to read them.
+    mode, candidates, ncandidates = _table__searchIndexes(
+        self, compiled, condvars, start, stop, step)
+    plan, costs, nchunks = _table__estimateQuery(
+        self, mode, candidates, start, stop)
+    if plan == 'scan':
+        # A sequential scan of the table is cheaper.
+        self._useIndex = False
+        return None
+
+    # Set row sequence to empty.  It will be populated in the
+    # iterator. If not possible, the slot entry will be removed there.
+    self._nslotseq = self._seqcache.setitem(seqkey, [], 1)
+    if candidates is None:
+        return iter([])
+    if plan == 'coords':
+        return _table__whereCoords(self, compiled, condvars, candidates)
+    if mode == 'coords':
+        # Read the whole chunks containing the candidate rows.
+        nrowsinchunk = self.chunkshape[0]
+        nchunks = long(math.ceil(float(self.nrows)/nrowsinchunk))
+        chunkmap = numpy.zeros(shape=nchunks, dtype="bool")
+        chunkmap[candidates // nrowsinchunk] = True
+        candidates = chunkmap
+
+    if profile: show_stats("Exiting table_whereIndexed", tref)
+    return candidates
+
+
+def _table__deletedOffsets(self, start, stop, step):
+    """
+    Get the offsets in ``[start:stop:step]`` of the rows deleted lazily.
+
+    None is returned if no row has been deleted lazily.
+    """
+    ranges = self._getDeletedRanges()
+    if ranges is None:
+        return None
+    (starts, stops) = ranges
+    lo = stops.searchsorted(start, side='right')
+    hi = starts.searchsorted(stop, side='left')
+    offsets = [numpy.empty(shape=0, dtype='int64')]
+    for i in xrange(lo, hi):
+        first = max(long(starts[i]), start)
+        # The first row in the range selected by `step`.
+        first += -(first - start) % step
+        last = min(long(stops[i]), stop)
+        if first < last:
+            offsets.append(
+                numpy.arange(first - start, last - start, step,
+                             dtype='int64') // step)
+    return numpy.concatenate(offsets)
+
+
+def _table__maskDeleted(self, start, stop, step):
+    """
+    Get a mask of the rows in ``[start:stop:step]`` which are not deleted.
+
+    None is returned if no row in the range has been deleted lazily.
+    """
+    offsets = _table__deletedOffsets(self, start, stop, step)
+    if offsets is None or len(offsets) == 0:
+        return None
+    mask = numpy.ones(lrange(start, stop, step).length, dtype=numpy.bool_)
+    mask[offsets] = False
+    return mask
+
+
+def _table__skipDeleted(self, coords):
+    """
+    Get the row coordinates in `coords` which are not deleted.
+
+    `coords` is returned as is if no row has been deleted lazily.
+    """
+    ranges = self._getDeletedRanges()
+    if ranges is None or len(coords) == 0:
+        return coords
+    coords = numpy.asarray(coords)
+    return coords[~_inRanges(ranges, coords.astype('int64'))]
+
+
+def _table__checkDeleted(self, coords):
+    """
+    Check that no row in `coords` has been deleted lazily.
+
+    An `IndexError` is raised for the first deleted row otherwise.
+    """
+    ranges = self._getDeletedRanges()
+    if ranges is None or len(coords) == 0:
+        return
+    coords = numpy.asarray(coords)
+    deleted = _inRanges(ranges, coords.astype('int64'))
+    if deleted.any():
+        raise IndexError("row %d has been deleted" % coords[deleted][0])
+
+
+def _table__iterBuffers(rows, getrecords=True):
+    """
+    Iterate over the I/O buffers of a `rows` iterator.
+
+    `rows` is an iterator as returned by `Table._where()` and friends.
+    For every I/O buffer with selected rows, a ``(coords, records)``
+    tuple is yielded (see `Row._fetch_buffer()`).  This avoids the
+    creation of a Python object per selected row.  If `getrecords` is
+    false, only the coordinates are collected and `records` is None.
+    """
+    if not isinstance(rows, tableExtension.Row):
+        # This can only be an empty iterator
+        return
+    while True:
+        buffer_ = rows._fetch_buffer(getrecords)
+        if buffer_ is None:
+            break
+        yield buffer_
+
+
+def _table__startPrefetch(rows):
+    """
+    Start reading the I/O buffers of a `rows` iterator in advance.
+
+    If the ``QUERY_PIPELINE_DEPTH`` and ``QUERY_PIPELINE_WORKERS``
+    parameters are not 0 and the chunks of the table can be read
+    directly, the buffers of sequential iterators are prepared by
+    worker threads while the previous ones are being processed (see
+    `_BufferPrefetcher`).  ``rows._stop_prefetch()`` must be called
+    when done with `rows`.
+    """
+    table = rows.table
+    params = table._v_file.params
+    depth = params['QUERY_PIPELINE_DEPTH']
+    if (depth > 0 and params['QUERY_PIPELINE_WORKERS'] > 0 and
+        table._wholeChunkRows(read=True)):
+        def factory(table, start, stop, fields):
+            return _BufferPrefetcher(table, start, stop, depth, fields)
+        rows._start_prefetch(factory)
+
+
+def _table__readBuffers(rows, getrecords=True, field=None):
+    """
+    Read all the I/O buffers of a `rows` iterator.
+
+    A list with the ``(coords, records)`` tuples yielded by
+    `_table__iterBuffers()` is returned.  If `field` is given, only
+    that field is kept in `records`.
+
+    The buffers may be read in a background thread (see
+    `_table__startPrefetch()`).
+    """
+    if not isinstance(rows, tableExtension.Row):
+        # This can only be an empty iterator
+        return []
+    _table__startPrefetch(rows)
+    buffers = []
+    try:
+        for coords, records in _table__iterBuffers(rows, getrecords):
+            if field and records is not None:
+                # Do not keep the unwanted fields alive.
+                records = getNestedField(records, field).copy()
+            buffers.append((coords, records))
+    finally:
+        rows._stop_prefetch()
+    return buffers
+
+
+def _table__mergeBuffers(self, rows, field=None, coordsonly=False):
+    """
+    Read the selected rows in the `rows` iterator into a single array.
+
+    The records (or only `field` in them) are returned in internal
+    format.  If `coordsonly` is true, the row coordinates are returned
+    instead.  The conditions in `self` are reset.
+    """
+    buffers = _table__readBuffers(rows, not coordsonly, field)
+    self._whereCondition = None  # reset the conditions
+    if coordsonly:
+        chunks = [ coords for coords, records in buffers ]
+        if not chunks:
+            return numpy.array([], dtype=SizeType)
     else:
-        # No luck.  Set row sequence to empty.  It will be populated
-        # in the iterator. If not possible, the slot entry will be
-        # removed there.
-        self._nslotseq = self._seqcache.setitem(seqkey, [], 1)
+        chunks = [ records for coords, records in buffers ]
+        if not chunks:
+            result = self._get_container(0)
+            if field:
+                result = getNestedField(result, field)
+            return result
+    if len(chunks) == 1:
+        return chunks[0]
+    return numpy.concatenate(chunks)
+
+
+_aggregateFuncs = ['count', 'sum', 'min', 'max', 'mean']
+"""The aggregate functions supported by `Table.aggregate()`."""
+
+def _checkAggregate(func, dtype):
+    """Check that the `func` aggregate works on values of `dtype`."""
+    if func not in _aggregateFuncs:
+        raise ValueError( "unknown aggregate function: %r; "
+                          "it must be one of %s" % (func, _aggregateFuncs) )
+    if func in ['sum', 'mean'] and dtype.base.kind == 'S':
+        raise TypeError( "aggregate function ``%s`` does not "
+                         "work on string columns" % func )
+
+def _sumDtype(dtype):
+    """Get the type of the sum of values of `dtype` (without shape)."""
+    return numpy.empty(0, dtype.base).sum().dtype
+
+def _meanDtype(dtype):
+    """Get the type of the mean of values of `dtype` (without shape)."""
+    if dtype.base.kind == 'c':
+        return numpy.dtype('complex128')
+    return numpy.dtype('float64')
+
+def _minmax(values):
+    """Get the minimum and maximum of `values` along its first axis."""
+    if values.dtype.kind == 'S':
+        # Strings can not be reduced, but they can be sorted.
+        values = numpy.sort(values, axis=0)
+        return (values[0], values[-1])
+    return (values.min(axis=0), values.max(axis=0))
+
+
+class _ColumnReducer(object):
+    """
+    Compute the aggregate functions of a column an I/O buffer at a time.
+
+    The `funcs` aggregate functions (see `Table.aggregate()`) are
+    computed over the values of a column with the given `dtype`.  Only
+    the partial results of the values passed to `update()` are kept.
+    """
+
+    def __init__(self, funcs, dtype):
+        for func in funcs:
+            _checkAggregate(func, dtype)
+        self.funcs = funcs
+        self.count = 0
+        self.sum = None
+        if 'sum' in funcs:
+            # The sum of no values has the type and shape of the others.
+            self.sum = numpy.empty((0,)+dtype.shape, dtype.base).sum(axis=0)
+        self.meandtype = _meanDtype(dtype)
+        self.meansum = 0
+        self.min = self.max = None
+
+    def _getneedvalues(self):
+        for func in self.funcs:
+            if func != 'count':
+                return True
+        return False
+
+    needvalues = property(
+        _getneedvalues, None, None,
+        "Whether the values are needed to compute the functions.")
+
+    def update(self, values):
+        """Add the `values` of a buffer to the partial results."""
+        funcs = self.funcs
+        self.count += len(values)
+        if 'sum' in funcs:
+            self.sum = self.sum + values.sum(axis=0)
+        if 'mean' in funcs:
+            self.meansum = (self.meansum
+                            + values.sum(axis=0, dtype=self.meandtype))
+        if 'min' in funcs or 'max' in funcs:
+            vmin, vmax = _minmax(values)
+            if self.min is not None:
+                vmin = _minmax(numpy.array([self.min, vmin]))[0]
+                vmax = _minmax(numpy.array([self.max, vmax]))[1]
+            self.min, self.max = vmin, vmax
+
+    def getresults(self):
+        """Get the list of results of the aggregate functions."""
+        results = []
+        for func in self.funcs:
+            if func == 'count':
+                result = self.count
+            elif func == 'sum':
+                result = self.sum
+            elif self.count == 0:
+                result = None
+            elif func == 'mean':
+                result = self.meansum / self.count
+            elif func == 'min':
+                result = self.min
+            else:
+                result = self.max
+            results.append(result)
+        return results
+
+
+def _table__countIndexed(self, condition, condvars, start, stop, step):
+    """
+    Count the rows fulfilling the `condition` using only indexes.
+
+    This is only possible when the indexes cover the whole condition,
+    they are exact and the limits in the condition have the type of
+    their columns.  Otherwise, None is returned.
+    """
+    compiled = self._compileCondition(condition, condvars)
+    if not compiled.index_covered:
+        return None
+    for var, ops, lims in compiled.index_expressions:
+        dtype = condvars[var].dtype
+        for lim in lims:
+            value = numpy.array([lim], dtype=dtype)
+            if value[0] != lim or (dtype.kind in 'iub' and
+                                   not isinstance(lim, (int, long))):
+                # The index may not select the same rows as the condition.
+                return None
 
-    # Compute the chunkmap for every index in indexed expression
     idxexprs = compiled.index_expressions
-    strexpr = compiled.string_expression
-    cmvars = {}
-    tcoords = 0
-    for i, idxexpr in enumerate(idxexprs):
-        var, ops, lims = idxexpr
-        col = condvars[var]
-        index = col.index
-        assert index is not None, "the chosen column is not indexed"
-        assert not index.dirty, "the chosen column has a dirty index"
+    if ( len(idxexprs) == 1 and (start, stop, step) == (0, self.nrows, 1)
+         and not self._hasTombstones ):
+        # The number of values in the index range is enough.
+        var, ops, lims = idxexprs[0]
+        index = _table__getIndexFor(self, var, condvars)
+        if ( isinstance(index, Index) and index.reduction == 1
+             and index.nelements == self.nrows ):
+            range_ = index.getLookupRange(ops, lims)
+            return int(index.search(range_))
+    if _table__indexPlan(self, compiled, condvars) != 'coords':
+        return None
+    mode, coords, ncoords = _table__searchIndexes(
+        self, compiled, condvars, start, stop, step)
+    if coords is None:
+        return 0
+    return len(_table__skipDeleted(self, coords))
+
+
+def _table__reduceBuffers(rows, reducers):
+    """
+    Reduce the I/O buffers of a `rows` iterator with `reducers`.
 
-        # Get the number of rows that the indexed condition yields.
-        range_ = index.getLookupRange(ops, lims)
-        ncoords = index.search(range_)
-        tcoords += ncoords
-        if index.reduction == 1 and ncoords == 0:
-            # No values from index condition, thus the chunkmap should be empty
-            nrowsinchunk = self.chunkshape[0]
-            nchunks = long(math.ceil(float(self.nrows)/nrowsinchunk))
-            chunkmap = numpy.zeros(shape=nchunks, dtype="bool")
-        else:
-            # Get the chunkmap from the index
-            chunkmap = index.get_chunkmap()
-        # Assign the chunkmap to the cmvars dictionary
-        cmvars["e%d"%i] = chunkmap
+    `reducers` maps column path names to `_ColumnReducer` instances,
+    which are fed with the values of their columns in every buffer.
+    The buffers may be read in a background thread (see
+    `_table__startPrefetch()`).
+    """
+    if not isinstance(rows, tableExtension.Row):
+        # This can only be an empty iterator
+        return
+    getrecords = False
+    for reducer in reducers.itervalues():
+        if reducer.needvalues:
+            getrecords = True
+    _table__startPrefetch(rows)
+    try:
+        for coords, records in _table__iterBuffers(rows, getrecords):
+            for colpathname, reducer in reducers.iteritems():
+                if reducer.needvalues:
+                    reducer.update(getNestedField(records, colpathname))
+                else:
+                    reducer.count += len(coords)
+    finally:
+        rows._stop_prefetch()
 
-    if index.reduction == 1 and tcoords == 0:
-        # No candidates found in any indexed expression component, so leave now
-        return iter([])
 
-    # Compute the final chunkmap
-    chunkmap = numexpr.evaluate(strexpr, cmvars)
-    # Method .any() is twice as faster than method .sum()
-    if not chunkmap.any():
-        # The chunkmap is empty
-        return iter([])
+def _groupRows(keys):
+    """
+    Sort rows by the values in the `keys` arrays and find their groups.
 
-    if profile: show_stats("Exiting table_whereIndexed", tref)
-    return chunkmap
+    The first array in `keys` is the primary sort key.  An ``(order,
+    starts)`` tuple is returned, where ``order`` sorts the rows and
+    ``starts`` has the positions in the sorted rows where every group
+    of rows with equal keys starts.
+    """
+    order = numpy.lexsort(keys[::-1])
+    isstart = numpy.zeros(len(order), dtype='bool')
+    isstart[:1] = True
+    for key in keys:
+        key = key[order]
+        isstart[1:] |= (key[1:] != key[:-1])
+    return (order, isstart.nonzero()[0])
+
+
+class _GroupAggregator(object):
+    """
+    Compute aggregate functions over groups of the rows in a table.
+
+    The rows of `table` are grouped by the values in their `keys`
+    columns, and the `aggregates` mapping has the same meaning as in
+    `Table.aggregate()`.  Partial results are kept in record arrays
+    (of ``pdtype``) with a row per group, which are obtained from table
+    rows with `getPartials()`, combined with `reduce()` and turned into
+    the final results (of ``rdtype``) with `getResults()`.
+    """
+
+    def __init__(self, table, keys, aggregates):
+        coldtypes = table.coldtypes
+        self.keys = keys
+        # The descriptions of partial and final results.
+        pdescr, rdescr = [], []
+        for i, key in enumerate(keys):
+            pdescr.append(('k%d' % i, coldtypes[key]))
+            rdescr.append((key.replace('/', '_'), coldtypes[key]))
+        pdescr.append(('count', 'int64'))
+        # Items of ``(colpathname, func, pfield, rfield)`` form.
+        self.aggregates = aggs = []
+        for colpathname in table.colpathnames:
+            if colpathname not in aggregates:
+                continue
+            funcs = aggregates[colpathname]
+            if isinstance(funcs, basestring):
+                funcs = [funcs]
+            dtype = coldtypes[colpathname]
+            for func in funcs:
+                _checkAggregate(func, dtype)
+                rfield = '%s_%s' % (colpathname.replace('/', '_'), func)
+                if func == 'count':
+                    aggs.append((colpathname, func, 'count', rfield))
+                    rdescr.append((rfield, 'int64'))
+                    continue
+                if func == 'sum':
+                    pdtype = numpy.dtype((_sumDtype(dtype), dtype.shape))
+                elif func == 'mean':
+                    pdtype = numpy.dtype((_meanDtype(dtype), dtype.shape))
+                elif dtype.base.kind == 'S' and dtype.shape != ():
+                    raise TypeError( "aggregate function ``%s`` does not "
+                                     "work on multidimensional string "
+                                     "columns" % func )
+                else:
+                    pdtype = dtype
+                pfield = 'a%d' % len(pdescr)
+                aggs.append((colpathname, func, pfield, rfield))
+                pdescr.append((pfield, pdtype))
+                rdescr.append((rfield, pdtype))
+        self.pdtype = numpy.dtype(pdescr)
+        self.rdtype = numpy.dtype(rdescr)
+
+    def _getKeys(self, partials):
+        return [ partials['k%d' % i] for i in xrange(len(self.keys)) ]
+
+    def getPartials(self, records):
+        """Get the partial results of a group per row in `records`."""
+        partials = numpy.empty(len(records), dtype=self.pdtype)
+        for i, key in enumerate(self.keys):
+            partials['k%d' % i] = getNestedField(records, key)
+        partials['count'] = 1
+        for colpathname, func, pfield, rfield in self.aggregates:
+            if func != 'count':
+                partials[pfield] = getNestedField(records, colpathname)
+        return partials
+
+    def reduce(self, partials):
+        """
+        Combine the `partials` of equal groups.
+
+        The partial results are returned with a row per group, sorted
+        by their keys.
+        """
+        if len(partials) == 0:
+            return partials
+        order, starts = _groupRows(self._getKeys(partials))
+        partials = partials[order]
+        result = partials[starts]
+        result['count'] = numpy.add.reduceat(partials['count'], starts)
+        for colpathname, func, pfield, rfield in self.aggregates:
+            values = partials[pfield]
+            if func in ['sum', 'mean']:
+                result[pfield] = numpy.add.reduceat(values, starts, axis=0)
+            elif func == 'count':
+                continue
+            elif values.dtype.kind == 'S':
+                # Strings can not be reduced, but they can be sorted
+                # within every group.
+                sizes = numpy.diff(numpy.append(starts, len(partials)))
+                groups = numpy.repeat(numpy.arange(len(starts)), sizes)
+                values = values[numpy.lexsort((values, groups))]
+                if func == 'min':
+                    result[pfield] = values[starts]
+                else:
+                    result[pfield] = values[starts + sizes - 1]
+            elif func == 'min':
+                result[pfield] = numpy.minimum.reduceat(values, starts, axis=0)
+            else:
+                result[pfield] = numpy.maximum.reduceat(values, starts, axis=0)
+        return result
+
+    def getPartitions(self, partials, npartitions):
+        """
+        Get the partition for every row in `partials`.
+
+        The partitions are chosen by hashing the keys, so equal groups
+        always fall in the same partition.
+        """
+        hashes = numpy.zeros(len(partials), dtype='uint64')
+        for key in self._getKeys(partials):
+            hashes *= numpy.uint64(1099511628211L)
+            hashes ^= _hashValues(key)[0]
+        return hashes % numpy.uint64(npartitions)
+
+    def getResults(self, partials):
+        """Get the final results out of the reduced `partials`."""
+        results = numpy.empty(len(partials), dtype=self.rdtype)
+        for i, key in enumerate(self.keys):
+            results[key.replace('/', '_')] = partials['k%d' % i]
+        for colpathname, func, pfield, rfield in self.aggregates:
+            values = partials[pfield]
+            if func == 'mean':
+                counts = partials['count']
+                values = values / counts.reshape(
+                    counts.shape + (1,) * (len(values.shape) - 1))
+            results[rfield] = values
+        return results
+
+
+class _GroupSpill(object):
+    """
+    Keep the partial results of a group-by query in a temporary file.
+
+    The partial results of `aggregator` are split in `npartitions`
+    tables by hashing their keys, so that every group falls in a single
+    partition and they can be reduced one at a time.  The file is
+    created in the `tmp_dir` directory and removed by `close()`.
+    """
+
+    def __init__(self, aggregator, npartitions, tmp_dir):
+        from tables.file import openFile  # avoid a circular import
+        self.aggregator = aggregator
+        self.npartitions = npartitions
+        fd, self.filename = tempfile.mkstemp(".tmp", "pytables-", tmp_dir)
+        # Close the file descriptor so as to avoid leaks
+        os.close(fd)
+        self.file = openFile(self.filename, "w")
+        self.partitions = [
+            self.file.createTable('/', 'p%d' % i, aggregator.pdtype)
+            for i in xrange(npartitions) ]
+
+    def append(self, partials):
+        """Append the `partials` to their partitions."""
+        if len(partials) == 0:
+            return
+        partitions = self.aggregator.getPartitions(
+            partials, self.npartitions)
+        for i, partition in enumerate(self.partitions):
+            selected = partials[partitions == i]
+            if len(selected) > 0:
+                partition.append(selected)
+
+    def read(self, npartition):
+        """Read the partial results in the `npartition` partition."""
+        return self.partitions[npartition].read()
+
+    def close(self):
+        """Close and remove the temporary file."""
+        self.file.close()
+        os.remove(self.filename)
+
+
+def _table__groupbySorted(self, aggregator, index, condition, condvars,
+                          start, stop, step, fields, output):
+    """
+    Compute the groups of `aggregator` reading rows in `index` order.
+
+    `index` is a completely sorted index of the first key column, so
+    the groups with a key smaller than the last one read are complete
+    and they can be passed to the `output` callable as soon as every
+    buffer is reduced.  The rows in the range between `start` and
+    `stop` fulfilling the `condition` (if any) are used.
+    """
+    row = tableExtension.Row(self)
+    if condition is not None:
+        compiled = self._compileCondition(condition, condvars)
+        fields = self._getProjectedFields(fields, condvars, compiled)
+        args = [condvars[param] for param in compiled.parameters]
+        self._whereCondition = (compiled.function, args)
+        self._nslotseq = -1  # do not feed the sequence cache
+        if self._dirtycache:
+            restorecache(self)
+    else:
+        fields = self._getProjectedFields(fields)
+    if fields is not None:
+        row._set_fields(fields)
+    rows = row._iter(0, index.nelements, 1, coords=index)
+    inrange = (start, stop, step) != (0, self.nrows, 1)
+    pending = aggregator.reduce(numpy.empty(0, dtype=aggregator.pdtype))
+    for coords, records in _table__iterBuffers(rows):
+        if inrange:
+            keep = (coords >= start) & (coords < stop)
+            if step > 1:
+                keep &= ((coords - start) % step == 0)
+            records = records[keep]
+        partials = numpy.concatenate(
+            [pending, aggregator.getPartials(records)])
+        partials = aggregator.reduce(partials)
+        if len(partials) == 0:
+            continue
+        firstkeys = partials['k0']
+        ncomplete = firstkeys.searchsorted(firstkeys[-1])
+        output(aggregator.getResults(partials[:ncomplete]))
+        pending = partials[ncomplete:]
+    self._whereCondition = None  # reset the conditions
+    output(aggregator.getResults(pending))
+
+
+def _table__groupbyHash(self, aggregator, condition, condvars,
+                        start, stop, step, fields, tmp_dir, output):
+    """
+    Compute the groups of `aggregator` by hashing their keys.
+
+    The partial results of every buffer of rows are kept in memory
+    until there are more than ``GROUPBY_MAX_GROUPS`` groups.  Then,
+    they are spilled to ``GROUPBY_PARTITIONS`` partitions in a
+    temporary file in `tmp_dir`, which are reduced one at a time at the
+    end.  The results are passed to the `output` callable, sorted by
+    their keys unless partial results have been spilled.  The rows in
+    the range between `start` and `stop` fulfilling the `condition`
+    (if any) are used.
+    """
+    params = self._v_file.params
+    maxgroups = params['GROUPBY_MAX_GROUPS']
+    if condition is None:
+        rows = self.iterrows(start, stop, step, fields)
+    else:
+        rows = self._where(condition, condvars, start, stop, step, fields)
+    partials, npartials = [], 0
+    spill = None
+    try:
+        if isinstance(rows, tableExtension.Row):
+            _table__startPrefetch(rows)
+        try:
+            for coords, records in _table__iterBuffers(rows):
+                partials.append(
+                    aggregator.reduce(aggregator.getPartials(records)))
+                npartials += len(partials[-1])
+                if npartials <= maxgroups:
+                    continue
+                partials = [aggregator.reduce(numpy.concatenate(partials))]
+                npartials = len(partials[0])
+                if npartials > maxgroups // 2:
+                    # Too many groups, make room for new ones.
+                    if spill is None:
+                        spill = _GroupSpill(aggregator,
+                                            params['GROUPBY_PARTITIONS'],
+                                            tmp_dir)
+                    spill.append(partials[0])
+                    partials, npartials = [], 0
+        finally:
+            if isinstance(rows, tableExtension.Row):
+                rows._stop_prefetch()
+        self._whereCondition = None  # reset the conditions
+
+        partials.insert(0, numpy.empty(0, dtype=aggregator.pdtype))
+        partials = aggregator.reduce(numpy.concatenate(partials))
+        if spill is None:
+            output(aggregator.getResults(partials))
+            return
+        spill.append(partials)
+        del partials
+        for npartition in xrange(spill.npartitions):
+            partials = aggregator.reduce(spill.read(npartition))
+            output(aggregator.getResults(partials))
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+class _BufferPrefetcher(object):
+    """
+    Prepare the I/O buffers of a range of table rows in worker threads.
+
+    The buffers in ``[start, stop)`` are returned in row order by
+    `next()`.  Except at the ends of the range, they begin and end at
+    chunk boundaries (see `Leaf._wholeChunkRows()`).  As HDF5 is not
+    thread-safe, the filtered chunks of the buffers are read by the
+    thread calling `next()`, which keeps at most `depth` of them read
+    ahead.  The ``QUERY_PIPELINE_WORKERS`` threads of the file only do
+    the CPU work of reading them, several buffers at a time:
+    unfiltering the chunks, converting the rows to NumPy format and
+    keeping the top-level `fields` (all of them if None, see
+    `Table._prepareReadRows()`).  What overlaps is this work with the
+    reading of the next chunks and with the work done by the caller on
+    previous buffers.
+    """
+
+    def __init__(self, table, start, stop, depth, fields=None):
+        self.table = table
+        self.fields = fields
+        self.nextrow = start    # the row where the next buffer begins
+        self.stop = stop
+        self.depth = depth
+        self.chunkrows = chunkrows = table._wholeChunkRows(read=True)
+        self.bufrows = max(table.nrowsinbuf // chunkrows, 1) * chunkrows
+        self.pool = table._v_file._getWorkerPool('QUERY_PIPELINE_WORKERS')
+        # The ``(start, nrows, chunkstart, chunks, job)`` buffers read
+        # and not returned yet.
+        self.pending = deque()
+        self.closed = False
+
+    def _readNext(self):
+        """Read the filtered chunks of the next buffer and queue it."""
+        start = self.nextrow
+        chunkrows = self.chunkrows
+        chunkstart = start - start % chunkrows
+        nrows = min(chunkstart + self.bufrows, self.stop) - start
+        self.nextrow += nrows
+        table = self.table
+        offset = [0] * len(table.shape)
+        chunks = []
+        for i in xrange(chunkstart, start + nrows, chunkrows):
+            offset[0] = i
+            chunks.append(table._g_readChunk(offset))
+        job = self.pool.submit(table._prepareReadRows, chunkstart, chunks,
+                               start, nrows, self.fields)
+        self.pending.append((start, nrows, chunkstart, chunks, job))
+
+    def next(self):
+        """Return the next ``(start, records)`` buffer or None if done."""
+        pending = self.pending
+        try:
+            while (not self.closed and self.nextrow < self.stop and
+                   len(pending) < self.depth):
+                self._readNext()
+            if not pending:
+                return None
+            (start, nrows, chunkstart, chunks, job) = pending.popleft()
+            records = job.wait()
+            # The rows in chunks not written yet go through the pipeline.
+            chunkrows = self.chunkrows
+            for i in xrange(len(chunks)):
+                if chunks[i] is None:
+                    rstart = max(chunkstart + i*chunkrows, start)
+                    rstop = min(chunkstart + (i+1)*chunkrows, start + nrows)
+                    self.table._read_records(
+                        rstart, rstop - rstart,
+                        records[rstart-start:rstop-start])
+        except:
+            self.close()
+            raise
+        return (start, records)
+
+    def close(self):
+        """Discard the pending buffers."""
+        if self.closed:
+            return
+        self.closed = True
+        self.pool.cancel([buffer_[4] for buffer_ in self.pending])
+        self.pending.clear()
+
+
+class _BufferWriter(object):
+    """
+    Save the I/O buffers filled by `Row.append()` with a background thread.
+
+    Full buffers are handed to `put()`, which returns an empty one to
+    go on with.  As HDF5 is not thread-safe, the thread only does the
+    CPU work of saving them: converting the rows to HDF5 format and
+    filtering the whole chunks they fill (see
+    `Table._prepareBufferedRows()`).  The prepared buffers are written
+    in order by the thread calling `put()` (as the next buffers fill
+    up) or `close()`.  At most `depth` buffers can be pending: when the
+    limit is reached, `put()` waits for the oldest one to be prepared
+    and writes it.  If preparing or writing a buffer fails, the ones
+    after it are discarded, the thread stops and the error is raised by
+    `put()` or `close()`.
+
+    The chunks are filtered by the thread whenever their filters can be
+    applied outside of HDF5 (see `Leaf._wholeChunkRows()`).  Otherwise
+    a `PerformanceWarning` is issued and they are compressed by HDF5
+    when written.  The rows in chunks only partly filled by a buffer
+    always go through the HDF5 filter pipeline.
+    """
+
+    def __init__(self, table, depth):
+        self.table = table
+        self.depth = depth
+        self.nextrow = table._v_nrows  # the row where the next buffer goes
+        self.chunkrows = table._wholeChunkRows()
+        filters = table.filters
+        if not self.chunkrows and (filters.complevel or filters.fletcher32):
+            warnings.warn(
+                "the chunks of table ``%s`` can not be filtered outside "
+                "of HDF5, so they will be compressed by the thread "
+                "appending the rows instead of in the background"
+                % table._v_pathname, PerformanceWarning )
+        # The ``[records, nrows, start, chunkrows, prepared]`` buffers
+        # not written yet, and the ones of them not prepared yet.
+        self.pending = deque()
+        self.unprepared = deque()
+        self.free = []          # the buffers already written
+        self.writing = False    # is a buffer being written?
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._work)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def _work(self):
+        """Prepare the pending buffers until we are closed."""
+        cond = self.cond
+        while True:
+            cond.acquire()
+            try:
+                while not self.closed and not self.unprepared:
+                    cond.wait()
+                if self.closed:
+                    return
+                job = self.unprepared.popleft()
+            finally:
+                cond.release()
+
+            (records, nrows, start, chunkrows) = job[:4]
+            try:
+                prepared = self.table._prepareBufferedRows(
+                    records, nrows, start, chunkrows)
+            except Exception, exc:
+                prepared = exc
+
+            cond.acquire()
+            try:
+                job[4] = prepared
+                cond.notifyAll()
+            finally:
+                cond.release()
+
+    def _isPrepared(self, job):
+        cond = self.cond
+        cond.acquire()
+        try:
+            return job[4] is not None
+        finally:
+            cond.release()
+
+    def _writeNext(self):
+        """Write the oldest pending buffer, waiting for it if needed."""
+        cond = self.cond
+        job = self.pending[0]
+        cond.acquire()
+        try:
+            while job[4] is None:
+                cond.wait()
+        finally:
+            cond.release()
+
+        (records, nrows, start, chunkrows, prepared) = job
+        table = self.table
+        self.writing = True
+        try:
+            try:
+                if isinstance(prepared, Exception):
+                    raise prepared
+                if start != table._v_nrows:
+                    # The chunks filtered do not fit the table anymore.
+                    prepared = None
+                table._saveBufferedRows(records, nrows, prepared)
+            except:
+                # Rows can not be saved out of order.
+                self._stop()
+                raise
+        finally:
+            self.writing = False
+        self.pending.popleft()
+        self.free.append(records)
+
+    def _stop(self):
+        """Discard the pending buffers and stop the thread."""
+        cond = self.cond
+        cond.acquire()
+        try:
+            self.closed = True
+            self.pending.clear()
+            self.unprepared.clear()
+            cond.notifyAll()
+        finally:
+            cond.release()
+        self.thread.join()
+
+    def put(self, records, nrows):
+        """Queue the first `nrows` of `records` and return a new buffer."""
+        pending = self.pending
+        while pending and (len(pending) >= self.depth or
+                           self._isPrepared(pending[0])):
+            self._writeNext()
+        table = self.table
+        job = [records, nrows, self.nextrow, self.chunkrows, None]
+        self.nextrow += nrows
+        pending.append(job)
+        cond = self.cond
+        cond.acquire()
+        try:
+            self.unprepared.append(job)
+            cond.notifyAll()
+        finally:
+            cond.release()
+        if self.free:
+            return self.free.pop()
+        return table._get_container(len(records))
+
+    def close(self):
+        """Write the pending buffers and stop the thread."""
+        try:
+            while self.pending:
+                self._writeNext()
+        finally:
+            self._stop()
+
+
+_table__workerCode = """\
+import sys, cPickle
+if sys.platform == 'win32':
+    import os, msvcrt
+    msvcrt.setmode(sys.stdin.fileno(), os.O_BINARY)
+    msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
+sys.path[:0] = cPickle.load(sys.stdin)
+from tables.table import _table__whereWorker
+_table__whereWorker(sys.stdin, sys.stdout)
+"""
+"""The code run by the worker processes of `Table.parallelWhere()`."""
+
+def _table__whereWorker(infile, outfile):
+    """
+    Query a partition of a table on behalf of `Table.parallelWhere()`.
+
+    The pickled query is read from `infile`, and a pickled ``(error,
+    result)`` tuple is written to `outfile`, where `error` is the
+    exception raised by the query (if any).
+    """
+    from tables.file import openFile
+
+    error, result = None, None
+    try:
+        (filename, tablepath, condition, colvars, condvars,
+         start, stop, step, field, coordsonly) = cPickle.load(infile)
+        h5file = openFile(filename, 'r')
+        try:
+            table = h5file.getNode(tablepath)
+            for var, colpath in colvars.iteritems():
+                condvars[var] = table.cols._f_col(colpath)
+            rows = table._where(condition, condvars, start, stop, step)
+            result = _table__mergeBuffers(table, rows, field, coordsonly)
+        finally:
+            h5file.close()
+    except Exception, exc:
+        error = exc
+    cPickle.dump((error, result), outfile, cPickle.HIGHEST_PROTOCOL)
+    outfile.flush()
+
+
+def _table__runWorkers(queries):
+    """
+    Run every query in `queries` with `_table__whereWorker()`.
+
+    Each query is run in a new Python interpreter, so that no HDF5
+    state is shared with the current process.  The results are
+    returned in the same order than `queries`.
+    """
+    # HDF5 1.10 and later refuse to open a file which is locked
+    # because it is being written by another process (i.e. this one).
+    env = os.environ.copy()
+    env['HDF5_USE_FILE_LOCKING'] = 'FALSE'
+    procs = []
+    try:
+        for query in queries:
+            proc = subprocess.Popen(
+                [sys.executable, '-c', _table__workerCode],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env )
+            procs.append(proc)
+            cPickle.dump(sys.path, proc.stdin, cPickle.HIGHEST_PROTOCOL)
+            cPickle.dump(query, proc.stdin, cPickle.HIGHEST_PROTOCOL)
+            proc.stdin.close()
+        results = []
+        for proc in procs:
+            output = proc.stdout.read()
+            if proc.wait() != 0 or not output:
+                raise RuntimeError(
+                    "a worker process failed with exit status %d"
+                    % proc.returncode )
+            error, result = cPickle.loads(output)
+            if error is not None:
+                raise error
+            results.append(result)
+    finally:
+        # Do not leave any worker behind in case of errors.
+        for proc in procs:
+            if proc.poll() is None:
+                proc.stdout.close()
+                proc.wait()
+    return results
 
 
 def createIndexesTable(table):
@@ -328,16 +1560,38 @@ def _column__createIndex(self, optlevel, kind, filters, tmp_dir,
             except NoSuchNodeError:
                 idgroup = createIndexesDescr(idgroup, dname, iname, filters)
 
-    # Create the atom
-    assert dtype.shape == ()
-    atom = Atom.from_dtype(numpy.dtype((dtype, (0,))))
-
     # Protection on tables larger than the expected rows (perhaps the
     # user forgot to pass this parameter to the Table constructor?)
     expectedrows = table._v_expectedrows
     if table.nrows > expectedrows:
         expectedrows = table.nrows
 
+    if kind == 'bitmap':
+        # Bitmap indexes are built in a single pass over the column.
+        index = BitmapIndex(
+            idgroup, name, atom=Atom.from_dtype(dtype),
+            title="Bitmap index for %s column" % name,
+            filters=filters, expectedrows=expectedrows, new=True)
+        table._setColumnIndexing(self.pathname, True)
+        indexedrows = index.build()
+        if not index.dirty:
+            table._indexedrows = indexedrows
+            table._unsaved_indexedrows = table.nrows - indexedrows
+            return indexedrows
+        # The column has too many distinct values for a bitmap index.
+        warnings.warn( "column ``%s`` has more than %d distinct values; "
+                       "creating a 'full' index instead of a 'bitmap' one"
+                       % (self.pathname,
+                          table._v_file.params['BITMAP_MAX_VALUES']),
+                       PerformanceWarning )
+        index.dirty = False  # unnail the condition cache
+        index._f_remove()
+        kind = 'full'
+
+    # Create the atom
+    assert dtype.shape == ()
+    atom = Atom.from_dtype(numpy.dtype((dtype, (0,))))
+
     # Create the index itself
     index = Index(
         idgroup, name, atom=atom,
@@ -357,7 +1611,8 @@ def _column__createIndex(self, optlevel, kind, filters, tmp_dir,
     # Add rows to the index if necessary
     if table.nrows > 0:
         indexedrows = table._addRowsToIndex(
-            self.pathname, 0, table.nrows, lastrow=True, update=False )
+            self.pathname, 0, table.nrows, lastrow=True, update=False,
+            verbose=verbose )
     else:
         indexedrows = 0
     index.dirty = False
@@ -487,8 +1742,15 @@ class Table(tableExtension.Table, Leaf):
         Does this table have any indexed columns?
     indexedcolpathnames
         List of the pathnames of indexed columns in the table.
+    ndeleted
+        The number of rows deleted lazily (see `Table.removeRows()`)
+        which have not been compacted yet.  They are still counted in
+        `nrows`.
     nrows
-        Current number of rows in the table.
+        Current number of rows in the table, including the ones deleted
+        lazily which have not been compacted yet.  ``len(table)`` gives
+        the number of rows which are not deleted, i.e. the ones returned
+        by `Table.read()`.
     row
         The associated `Row` instance.
     rowsize
@@ -499,13 +1761,14 @@ class Table(tableExtension.Table, Leaf):
 
     * col(name)
     * iterrows([start][, stop][, step])
-    * itersequence(sequence)
+    * itersequence(sequence[, skipdeleted])
     * itersorted(sortby[, checkCSI][, start][, stop][, step])
     * read([start][, stop][, step][, field][, coords])
-    * readCoordinates(coords[, field])
+    * readCoordinates(coords[, field][, skipdeleted])
     * readSorted(sortby[, checkCSI][, field,][, start][, stop][, step])
     * __getitem__(key)
     * __iter__()
+    * __len__()
 
     Public methods -- writing
     -------------------------
@@ -514,25 +1777,32 @@ class Table(tableExtension.Table, Leaf):
     * modifyColumn([start][, stop][, step][, column][, colname])
     * modifyColumns([start][, stop][, step][, columns][, names])
     * modifyRows([start][, stop][, step][, rows])
-    * removeRows(start[, stop])
+    * compact()
+    * removeRows(start[, stop][, lazy])
     * __setitem__(key, value)
 
     Public methods -- querying
     --------------------------
 
+    * aggregate(aggregates[, condition][, condvars][, start][, stop][, step])
+    * explain(condition[, condvars][, start][, stop][, step])
     * getWhereList(condition[, condvars][, sort][, start][, stop][, step])
+    * groupby(keys, aggregates[, condition][, condvars][, start][, stop]
+      [, step][, newparent][, newname][, tmp_dir])
     * readWhere(condition[, condvars][, field][, start][, stop][, step])
     * where(condition[, condvars][, start][, stop][, step])
     * whereAppend(dstTable, condition[, condvars][, start][, stop][, step])
-    * willQueryUseIndexing(condition[, condvars])
+    * willQueryUseIndexing(condition[, condvars][, plan])
 
     Public methods -- other
     -----------------------
 
+    * createCompositeIndex(colnames[, filters])
     * flushRowsToIndex()
     * getEnum(colname)
     * reIndex()
     * reIndexDirty()
+    * removeCompositeIndex(colnames)
     """
 
     # Class identifier.
@@ -623,6 +1893,35 @@ class Table(tableExtension.Table, Leaf):
         None, None,
         """Whether some index in table is dirty.""")
 
+    def _g_getndeleted(self):
+        if not self._hasTombstones:
+            return SizeType(0)
+        return SizeType(self._getTombstones().ndeleted)
+
+    ndeleted = property(
+        _g_getndeleted, None, None,
+        """
+        The number of rows deleted lazily which have not been compacted.
+        """ )
+
+    def _g_getnrows(self):
+        if self._v_writer is not None:
+            self._waitBufferedRows()
+        return self._v_nrows
+
+    def _g_setnrows(self, nrows):
+        self._v_nrows = nrows
+
+    nrows = property(
+        _g_getnrows, _g_setnrows, None,
+        """
+        The current number of rows in the table.
+
+        Rows deleted lazily are counted until the table is compacted
+        (see `Table.ndeleted`).  The rows pending to be saved by
+        `Row.append()` are written first (see ``ASYNC_APPEND_DEPTH``).
+        """ )
+
 
     # Other methods
     # ~~~~~~~~~~~~~
@@ -685,6 +1984,8 @@ class Table(tableExtension.Table, Leaf):
             expectedrows = parentNode._v_file.params['EXPECTED_ROWS_TABLE']
         self._v_expectedrows = expectedrows
         """The expected number of rows to be stored in the table."""
+        self._v_writer = None
+        """The `_BufferWriter` saving rows in the background (if any)."""
         self.nrows = SizeType(0)
         """The current number of rows in the table."""
         self.description = None
@@ -749,8 +2050,16 @@ class Table(tableExtension.Table, Leaf):
         """Cache of variables participating in numexpr expressions."""
         self._enabledIndexingInQueries = True
         """Is indexing enabled in queries?  *Use only for testing.*"""
+        self._compositeIndexNames = []
+        """The names of the composite indexes in the indexes group."""
+        self._zoneMapNames = []
+        """The names of the zone maps and Bloom filters in the indexes group."""
+        self._hasTombstones = False
+        """Have rows been deleted lazily (see `removeRows()`)?"""
         self._emptyArrayCache = {}
         """Cache of empty arrays."""
+        self._v_projections = {}
+        """The dtypes and HDF5 types for reading only some fields."""
 
         self._v_dtype = None
         """The NumPy datatype fopr this table."""
@@ -886,6 +2195,27 @@ class Table(tableExtension.Table, Leaf):
             if indexed:
                 self.indexed = True
 
+        # Look for composite indexes, zone maps and Bloom filters.
+        if igroup:
+            indexgroup = self._v_file._getNode(indexesGroupPath)
+            for name in indexgroup._v_groups.keys():
+                if name == '_tombstones':
+                    if isinstance(indexgroup._f_getChild(name), Tombstones):
+                        self._hasTombstones = True
+                    continue
+                if name.startswith('_zmap_') or name.startswith('_bloom_'):
+                    if isinstance(indexgroup._f_getChild(name), ChunkSummary):
+                        self._zoneMapNames.append(name)
+                    continue
+                if not name.startswith('_cidx_'):
+                    continue
+                cindex = indexgroup._f_getChild(name)
+                if isinstance(cindex, CompositeIndex):
+                    self._compositeIndexNames.append(name)
+                    # Tell the condition cache about dirty indexes.
+                    if cindex.dirty:
+                        self._conditionCache.nail()
+
         if oldindexes:  # this should only appear under 2.x Pro
             warnings.warn(
                 "table ``%s`` has column indexes with PyTables 1.x format. "
@@ -916,11 +2246,45 @@ class Table(tableExtension.Table, Leaf):
             return arr
 
 
-    def _get_container(self, shape):
-        "Get the appropriate buffer for data depending on table nestedness."
+    def _get_container(self, shape, fields=None):
+        """
+        Get the appropriate buffer for data depending on table nestedness.
+
+        If `fields` is given, the buffer only has these top-level fields
+        (see `_get_projection()`).
+        """
 
+        if fields is None:
+            dtype = self._v_dtype
+        else:
+            dtype = self._get_projection(tuple(fields))[0]
         # This is *much* faster than the numpy.rec.array counterpart
-        return numpy.empty(shape=shape, dtype=self._v_dtype)
+        return numpy.empty(shape=shape, dtype=dtype)
+
+
+    def _getProjectedFields(self, fields, condvars=None, compiled=None):
+        """
+        Get the top-level fields to read for `fields` and a condition.
+
+        `fields` is a sequence of column names (possibly nested ones).
+        The top-level columns in the `compiled` condition are also
+        added.  A tuple with the names in table order is returned, or
+        None if all the fields in the table are needed.
+        """
+        names = {}
+        for field in fields:
+            self._checkColumn(field)
+            names[field.split('/')[0]] = None
+        if compiled is not None:
+            for param in compiled.parameters:
+                var = condvars[param]
+                if hasattr(var, 'pathname'):
+                    names[var.pathname.split('/')[0]] = None
+        fields = tuple([ name for name in self._v_dtype.names
+                         if name in names ])
+        if not fields or fields == self._v_dtype.names:
+            return None
+        return fields
 
 
     def _getTypeColNames(self, type_):
@@ -1118,6 +2482,72 @@ class Table(tableExtension.Table, Leaf):
     _checkColumn = _getColumnInstance
 
 
+    def _checkNonNestedColumn(self, colpathname):
+        """
+        Check that the `colpathname` column exists and it is not nested.
+
+        A `KeyError` or a `TypeError` is raised otherwise, respectively.
+        """
+        self._checkColumn(colpathname)
+        if colpathname not in self.colpathnames:
+            raise TypeError( "column ``%s`` is nested, "
+                             "which is not supported here" % colpathname )
+
+
+    def _getSortedIndex(self, colpathname):
+        """
+        Get the completely sorted index of the `colpathname` column.
+
+        None is returned if the column has no such index, or if it is
+        dirty or it does not cover all the rows in the table.
+        """
+        if not self.colindexed[colpathname]:
+            return None
+        index = self.colindexes[colpathname]
+        if ( not getattr(index, 'is_CSI', False) or index.dirty
+             or index.nelements != self.nrows ):
+            return None
+        return index
+
+
+    def _getTombstones(self, create=False):
+        """
+        Get the `Tombstones` with the rows deleted lazily.
+
+        None is returned if no rows have been deleted lazily, unless
+        `create` is true, in which case new tombstones are created.
+        """
+        itgpathname = _indexPathnameOf(self)
+        if self._hasTombstones:
+            return self._v_file._getNode(joinPath(itgpathname, '_tombstones'))
+        if not create:
+            return None
+        try:
+            itgroup = self._v_file._getNode(itgpathname)
+        except NoSuchNodeError:
+            itgroup = createIndexesTable(self)
+        tombstones = Tombstones(
+            itgroup, '_tombstones',
+            title="Rows deleted from table %s" % self._v_pathname, new=True)
+        self._hasTombstones = True
+        return tombstones
+
+
+    def _getDeletedRanges(self):
+        """
+        Get the ranges of the rows deleted lazily.
+
+        A ``(starts, stops)`` tuple is returned as in `Tombstones.read()`,
+        or None if there are no such rows.
+        """
+        if not self._hasTombstones:
+            return None
+        ranges = self._getTombstones().read()
+        if len(ranges[0]) == 0:
+            return None
+        return ranges
+
+
     def _disableIndexingInQueries(self):
         """Force queries not to use indexing.  *Use only for testing.*"""
         if not self._enabledIndexingInQueries:
@@ -1158,81 +2588,30 @@ class Table(tableExtension.Table, Leaf):
         `depth` specifies the depth of the frame in order to reach local
         or global variables.
         """
-        # Get the names of variables used in the expression.
-        exprvarsCache = self._exprvarsCache
-        if not expression in exprvarsCache:
-            # Protection against growing the cache too much
-            if len(exprvarsCache) > 256:
-                # Remove 10 (arbitrary) elements from the cache
-                for k in exprvarsCache.keys()[:10]:
-                    del exprvarsCache[k]
-            cexpr = compile(expression, '<string>', 'eval')
-            exprvars = [ var for var in cexpr.co_names
-                         if var not in ['None', 'False', 'True']
-                         and var not in numexpr_functions ]
-            exprvarsCache[expression] = exprvars
-        else:
-            exprvars = exprvarsCache[expression]
-
-        # Get the local and global variable mappings of the user frame
-        # if no mapping has been explicitly given for user variables.
-        user_locals, user_globals = {}, {}
-        if uservars is None:
-            # We use specified depth to get the frame where the API
-            # callable using this method is called.  For instance:
-            #
-            # * ``table._requiredExprVars()`` (depth 0) is called by
-            # * ``table._where()`` (depth 1) is called by
-            # * ``table.where()`` (depth 2) is called by
-            # * user-space functions (depth 3)
-            user_frame = sys._getframe(depth)
-            user_locals = user_frame.f_locals
-            user_globals = user_frame.f_globals
-
-        colinstances = self.colinstances
+        # We use specified depth to get the frame where the API
+        # callable using this method is called.  For instance:
+        #
+        # * ``table._requiredExprVars()`` (depth 0) is called by
+        # * ``table._where()`` (depth 1) is called by
+        # * ``table.where()`` (depth 2) is called by
+        # * user-space functions (depth 3)
         tblfile, tblpath = self._v_file, self._v_pathname
-        # Look for the required variables first among the ones
-        # explicitly provided by the user, then among implicit columns,
-        # then among external variables (only if no explicit variables).
-        reqvars = {}
-        for var in exprvars:
-            # Get the value.
-            if uservars is not None and var in uservars:
-                val = uservars[var]
-            elif var in colinstances:
-                val = colinstances[var]
-            elif uservars is None and var in user_locals:
-                val = user_locals[var]
-            elif uservars is None and var in user_globals:
-                val = user_globals[var]
-            else:
-                raise NameError("name ``%s`` is not defined" % var)
-
-            # Check the value.
+        def iscolumn(var, val):
             if hasattr(val, 'pathname'):  # non-nested column
-                if val.shape[1:] != ():
-                    raise NotImplementedError(
-                        "variable ``%s`` refers to "
-                        "a multidimensional column, "
-                        "not yet supported in conditions, sorry" % var )
                 if val._tableFile is not tblfile or val._tablePath != tblpath:
                     raise ValueError( "variable ``%s`` refers to a column "
                                       "which is not part of table ``%s``"
                                       % (var, tblpath) )
-                if val.dtype.str[1:] == 'u8':
-                    raise NotImplementedError(
-                        "variable ``%s`` refers to "
-                        "a 64-bit unsigned integer column, "
-                        "not yet supported in conditions, sorry; "
-                        "please use regular Python selections" % var )
-            elif hasattr(val, '_v_colpathnames'):  # nested column
+                return True
+            if hasattr(val, '_v_colpathnames'):  # nested column
                 raise TypeError(
                     "variable ``%s`` refers to a nested column, "
                     "not allowed in conditions" % var )
-            else:  # only non-column values are converted to arrays
-                val = numpy.asarray(val)
-            reqvars[var] = val
-        return reqvars
+            return False
+        # The helper function adds a frame of its own.
+        return required_expr_vars( expression, uservars,
+                                   self.colinstances.get, iscolumn,
+                                   depth+1, self._exprvarsCache )
 
 
     def _getConditionKey(self, condition, condvars):
@@ -1312,8 +2691,26 @@ class Table(tableExtension.Table, Leaf):
             if not is_cpu_amd_intel and col.pathname in self._colunaligned:
                 copycols.append(colname)
         indexedcols = frozenset(indexedcols)
+
+        # Get the leading columns of usable composite indexes.
+        compositecols = []
+        if self._enabledIndexingInQueries:
+            colvars = dict( (condvars[colname].pathname, colname)
+                            for colname in colnames )
+            for cindex in self._getCompositeIndexes():
+                if cindex.dirty:
+                    continue
+                cvars = []
+                for colpathname in cindex.colpathnames:
+                    if colpathname not in colvars:
+                        break
+                    cvars.append(colvars[colpathname])
+                if cvars and tuple(cvars) not in compositecols:
+                    compositecols.append(tuple(cvars))
+
         # Now let ``compile_condition()`` do the Numexpr-related job.
-        compiled = compile_condition(condition, typemap, indexedcols, copycols)
+        compiled = compile_condition( condition, typemap, indexedcols,
+                                      copycols, compositecols )
 
         # Check that there actually are columns in the condition.
         if not set(compiled.parameters).intersection(set(colnames)):
@@ -1325,7 +2722,7 @@ class Table(tableExtension.Table, Leaf):
         return compiled.with_replaced_vars(condvars)
 
 
-    def willQueryUseIndexing(self, condition, condvars=None):
+    def willQueryUseIndexing(self, condition, condvars=None, plan=False):
         """
         Will a query for the `condition` use indexing?
 
@@ -1333,7 +2730,20 @@ class Table(tableExtension.Table, Leaf):
         same as in the `Table.where()` method.  If `condition` can use
         indexing, this method returns a frozenset with the path names of
         the columns whose index is usable.  Otherwise, it returns an
-        empty list.
+        empty list.  Usable indexes are not used if the query planner
+        estimates that a sequential scan of the table is cheaper (see
+        `Table.explain()`).
+
+        If `plan` is true, the query planner is asked how a query over
+        the whole table would be run, and a ``(columns, plan)`` tuple
+        is returned instead, where ``columns`` is a frozenset with the
+        path names of the columns whose indexes are actually used and
+        ``plan`` states how: ``'coords'`` if only the rows at the
+        coordinates yielded by indexes are read (all of them keep exact
+        row coordinates, like 'full' indexes), ``'chunkmap'`` if the
+        whole chunks with candidate rows are read, or None if no index
+        is used.  These are the ``indexes`` and ``plan`` entries
+        returned by `Table.explain()`.
 
         This method is mainly intended for testing.  Keep in mind that
         changing the set of indexed columns or their dirtyness may make
@@ -1341,16 +2751,114 @@ class Table(tableExtension.Table, Leaf):
         different times.
 
         """
+        self._waitBufferedRows()
         # Compile the condition and extract usable index conditions.
         condvars = self._requiredExprVars(condition, condvars, depth=2)
         compiled = self._compileCondition(condition, condvars)
         # Return the columns in indexed expressions
         idxcols = [condvars[var].pathname for var in compiled.index_variables]
-        return frozenset(idxcols)
+        if not plan:
+            return frozenset(idxcols)
+        explanation = self.explain(condition, condvars)
+        if explanation['indexes']:
+            return (explanation['indexes'], explanation['plan'])
+        return (frozenset(), None)
+
+
+    def explain( self, condition, condvars=None,
+                 start=None, stop=None, step=None ):
+        """
+        Explain how a query for the `condition` would be run.
+
+        The meaning of the arguments is the same as in the
+        `Table.where()` method.  The usable indexes are searched (but
+        the table is not read) and the cheapest way to run the query
+        is chosen.  A dictionary with the following keys is returned:
+
+        ``plan``
+            The way the query is run: ``'scan'`` (a sequential
+            in-kernel scan of the table), ``'chunkmap'`` (only the table
+            chunks with candidate rows from indexes or zone maps are
+            read) or ``'coords'`` (only the candidate rows are read).
+        ``indexes``
+            A frozenset with the path names of the columns whose
+            indexes are used.
+        ``zonemaps``
+            A frozenset with the path names of the columns whose zone
+            maps or Bloom filters are used.  They are only used when
+            indexes are not, or when reading the chunks they select is
+            cheaper than just searching the indexes.
+        ``rows``
+            The number of rows in the range of the query.
+        ``candidates``
+            The number of candidate rows from indexes, or None if no
+            index is usable.  This is an upper bound for indexes not
+            keeping the exact coordinates of rows.
+        ``chunks``
+            The number of table chunks with candidate rows, or None if
+            no index is usable.
+        ``costs``
+            A dictionary with the estimated cost of every possible
+            plan, in units of rows read by a sequential scan.
+
+        The ``QUERY_CHUNKMAP_COST``, ``QUERY_COORDS_COST`` and
+        ``QUERY_INDEX_SLICE_COST`` parameters can be used to tune the
+        choice of the plan.
+        """
+        self._waitBufferedRows()
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        compiled = self._compileCondition(condition, condvars)
+        nrows = max(stop - start, 0)
+        explanation = { 'plan': 'scan', 'indexes': frozenset(),
+                        'zonemaps': frozenset(), 'rows': nrows,
+                        'candidates': None, 'chunks': None,
+                        'costs': {'scan': float(nrows)} }
+        if start >= stop:
+            return explanation
+
+        zmsearch = _table__searchZoneMaps(
+            self, condition, condvars, start, stop)
+        if zmsearch is not None:
+            zmplan, zmcosts, zmnchunks = _table__estimateQuery(
+                self, 'chunkmap', zmsearch[1], start, stop)
+            if ( zmplan == 'chunkmap' and compiled.index_expressions and
+                 zmcosts['chunkmap'] <=
+                 _table__indexSearchCost(self, compiled, condvars) ):
+                # Do not even search the indexes.
+                explanation['costs'].update(zmcosts)
+                explanation.update( plan=zmplan, zonemaps=zmsearch[0],
+                                    chunks=zmnchunks )
+                return explanation
+
+        if compiled.index_expressions:
+            mode, candidates, ncandidates = _table__searchIndexes(
+                self, compiled, condvars, start, stop, step)
+            plan, costs, nchunks = _table__estimateQuery(
+                self, mode, candidates, start, stop)
+            if mode == 'coords':
+                if candidates is None:
+                    ncandidates = 0
+                else:
+                    ncandidates = len(candidates)
+            explanation.update( plan=plan, candidates=ncandidates,
+                                chunks=nchunks, costs=costs )
+            if plan != 'scan':
+                explanation['indexes'] = frozenset(
+                    [ condvars[var].pathname
+                      for var in compiled.index_variables ])
+                return explanation
+
+        if zmsearch is not None:
+            explanation['costs'].update(zmcosts)
+            if zmplan != 'scan':
+                explanation.update( plan=zmplan, zonemaps=zmsearch[0],
+                                    chunks=zmnchunks )
+        return explanation
 
 
     def where( self, condition, condvars=None,
-               start=None, stop=None, step=None ):
+               start=None, stop=None, step=None, fields=None ):
         """
         Iterate over values fulfilling a `condition`.
 
@@ -1380,6 +2888,12 @@ class Table(tableExtension.Table, Leaf):
         `step` are *not* allowed.  Moreover, if only `start` is
         specified, then `stop` will be set to ``start+1``.
 
+        If a sequence of column names is given in `fields`, only the
+        top-level columns containing them (and the ones appearing in
+        the `condition`) are read from disk, so that reading wide
+        tables is faster.  The other columns are not available in the
+        yielded rows, and these can not be updated.
+
         When possible, indexed columns participating in the condition
         will be used to speed up the search.  It is recommended that you
         place the indexed columns as left and out in the condition as
@@ -1417,12 +2931,13 @@ class Table(tableExtension.Table, Leaf):
            the table (like ``Table.append()`` or ``Table.removeRows()``)
            or unexpected errors will happen.
         """
-        return self._where(condition, condvars, start, stop, step)
+        return self._where(condition, condvars, start, stop, step, fields)
 
 
     def _where( self, condition, condvars,
-                start=None, stop=None, step=None ):
+                start=None, stop=None, step=None, fields=None ):
         """Low-level counterpart of `self.where()`."""
+        self._waitBufferedRows()
         if profile: tref = time()
         if profile: show_stats("Entering table._where", tref)
         # Adjust the slice to be used.
@@ -1435,24 +2950,57 @@ class Table(tableExtension.Table, Leaf):
         # Compile the condition and extract usable index conditions.
         condvars = self._requiredExprVars(condition, condvars, depth=3)
         compiled = self._compileCondition(condition, condvars)
+        if fields is not None:
+            # Only the wanted and the condition columns are read.
+            fields = self._getProjectedFields(fields, condvars, compiled)
+
+        # Can we skip chunks with zone maps or Bloom filters?
+        zmchunkmap = None
+        if self._zoneMapNames:
+            zmsearch = _table__searchZoneMaps(
+                self, condition, condvars, start, stop)
+            if zmsearch is not None:
+                plan, costs, nchunks = _table__estimateQuery(
+                    self, 'chunkmap', zmsearch[1], start, stop)
+                if nchunks == 0:
+                    self._whereCondition = None
+                    return iter([])
+                if plan == 'chunkmap':
+                    zmchunkmap = zmsearch[1]
+                    zmcost = costs['chunkmap']
 
         # Can we use indexes?
-        if compiled.index_expressions:
+        chunkmap = None  # default to an in-kernel query
+        if compiled.index_expressions and (
+            zmchunkmap is None or
+            zmcost > _table__indexSearchCost(self, compiled, condvars) ):
             chunkmap = _table__whereIndexed(
                 self, compiled, condition, condvars, start, stop, step)
-            if type(chunkmap) != numpy.ndarray:
+            if chunkmap is None:
+                pass  # the query planner chose an in-kernel query
+            elif type(chunkmap) != numpy.ndarray:
                 # If it is not a NumPy array it should be an iterator
                 # Reset conditions
                 self._useIndex = False
                 self._whereCondition = None
+                if fields is not None and isinstance(chunkmap,
+                                                     tableExtension.Row):
+                    chunkmap._set_fields(fields)
                 # ...and return the iterator
                 return chunkmap
-        else:
-            chunkmap = None  # default to an in-kernel query
+
+        if chunkmap is None and zmchunkmap is not None:
+            chunkmap = zmchunkmap
+            self._useIndex = True
+            self._nslotseq = -1  # do not feed the sequence cache
+            if self._dirtycache:
+                restorecache(self)
 
         args = [condvars[param] for param in compiled.parameters]
         self._whereCondition = (compiled.function, args)
         row = tableExtension.Row(self)
+        if fields is not None:
+            row._set_fields(fields)
         if profile: show_stats("Exiting table._where", tref)
         return row._iter(start, stop, step, chunkmap=chunkmap)
 
@@ -1479,19 +3027,18 @@ class Table(tableExtension.Table, Leaf):
         `Table.where()` method.
         """
         self._checkFieldIfNumeric(field)
+        if field:
+            self._checkColumn(field)
 
-        coords = [ p.nrow for p in
-                   self._where(condition, condvars, start, stop, step) ]
-        self._whereCondition = None  # reset the conditions
-        if len(coords) > 1:
-            cstart, cstop = coords[0], coords[-1]+1
-            if cstop - cstart == len(coords):
-                # Chances for monotonically increasing row values. Refine.
-                inc_seq = numpy.alltrue(
-                    numpy.arange(cstart, cstop) == numpy.array(coords))
-                if inc_seq:
-                    return self.read(cstart, cstop, field=field)
-        return self.readCoordinates(coords, field)
+        # The selected rows are gathered a whole I/O buffer at a time,
+        # so they do not need to be read again from disk.  If only a
+        # field is wanted, the other columns are not read at all.
+        fields = None
+        if field:
+            fields = [field]
+        rows = self._where(condition, condvars, start, stop, step, fields)
+        result = _table__mergeBuffers(self, rows, field)
+        return internal_to_flavor(result, self.flavor)
 
 
     def whereAppend( self, dstTable, condition, condvars=None,
@@ -1510,17 +3057,36 @@ class Table(tableExtension.Table, Leaf):
         # Check that the destination file is not in read-only mode.
         dstTable._v_file._checkWritable()
 
-        # Row objects do not support nested columns, so we must iterate
-        # over the flat column paths.  When rows support nesting,
-        # ``self.colnames`` can be directly iterated upon.
-        colNames = [colName for colName in self.colpathnames]
-        dstRow = dstTable.row
+        # We must copy over the flat column paths, as the destination
+        # may have its columns in a different order or with different
+        # (but compatible) types.  Check that all of them exist.
+        colNames = self.colpathnames
+        for colName in colNames:
+            dstTable._checkColumn(colName)
+        samedtype = (dstTable._v_dtype == self._v_dtype)
+
+        # Rows appended through ``dstTable.row`` must go first.
+        dstTable.flush()
         nrows = 0
-        for srcRow in self._where(condition, condvars, start, stop, step):
-            for colName in colNames:
-                dstRow[colName] = srcRow[colName]
-            dstRow.append()
-            nrows += 1
+        rows = self._where(condition, condvars, start, stop, step)
+        for coords, records in _table__iterBuffers(rows):
+            lenrows = len(records)
+            if samedtype:
+                dstbuf = records
+            else:
+                # Start from the defaults in destination, as it can
+                # have more columns than the source.
+                wdflts = dstTable._v_wdflts
+                if wdflts is None:
+                    dstbuf = numpy.zeros(lenrows, dtype=dstTable._v_dtype)
+                else:
+                    dstbuf = wdflts.repeat(lenrows)
+                for colName in colNames:
+                    dstcol = getNestedField(dstbuf, colName)
+                    dstcol[:] = getNestedField(records, colName)
+            dstTable._saveBufferedRows(dstbuf, lenrows)
+            nrows += lenrows
+        self._whereCondition = None  # reset the conditions
         dstTable.flush()
         return nrows
 
@@ -1538,24 +3104,291 @@ class Table(tableExtension.Table, Leaf):
         `Table.where()` method.
         """
 
-        coords = [ p.nrow for p in
-                   self._where(condition, condvars, start, stop, step) ]
-        coords = numpy.array(coords, dtype=SizeType)
-        # Reset the conditions
-        self._whereCondition = None
+        # Only the columns in the condition are read.
+        rows = self._where(condition, condvars, start, stop, step, [])
+        coords = _table__mergeBuffers(self, rows, coordsonly=True)
         if sort:
             coords = numpy.sort(coords)
         return internal_to_flavor(coords, self.flavor)
 
 
-    def itersequence(self, sequence):
+    def aggregate( self, aggregates, condition=None, condvars=None,
+                   start=None, stop=None, step=None ):
+        """
+        Compute aggregate functions over the columns of the table.
+
+        `aggregates` is a mapping from the path names of non-nested
+        columns to the name of an aggregate function, or to a sequence
+        of them.  The supported functions are ``'count'`` (the number
+        of rows), ``'sum'``, ``'min'``, ``'max'`` and ``'mean'``.  For
+        example::
+
+            result = table.aggregate({'x': 'sum', 'y': ('min', 'max')},
+                                     'x > 0')
+
+        A dictionary mapping each column in `aggregates` to its result
+        (or to a tuple with the results of its sequence of functions)
+        is returned.  Multidimensional columns are aggregated
+        elementwise.  If no rows are selected, the count and the sum
+        are zero, and the other functions yield None.
+
+        If `condition` is given, only the rows fulfilling it are
+        aggregated.  The meaning of the other arguments is the same as
+        in the `Table.where()` method.  The values are reduced as every
+        I/O buffer is read, so memory use does not depend on the number
+        of rows, and only the needed columns are read.  If the
+        ``QUERY_PIPELINE_DEPTH`` parameter is not 0, the buffers are
+        prepared by worker threads while the previous ones are being
+        reduced.  When only counts are asked for and the indexes of the
+        columns cover the whole `condition`, the rows are counted in the
+        indexes and the table is not read at all.
+        """
+        if condition is not None:
+            condvars = self._requiredExprVars(condition, condvars, depth=2)
+        return self._aggregate( aggregates, condition, condvars,
+                                start, stop, step )
+
+
+    def _aggregate( self, aggregates, condition, condvars,
+                    start=None, stop=None, step=None ):
+        """Low-level counterpart of `self.aggregate()`."""
+        self._waitBufferedRows()
+        reducers, fields = {}, []
+        for colpathname, funcs in aggregates.iteritems():
+            self._checkNonNestedColumn(colpathname)
+            if isinstance(funcs, basestring):
+                funcs = [funcs]
+            reducer = _ColumnReducer(funcs, self.coldtypes[colpathname])
+            if reducer.needvalues:
+                fields.append(colpathname)
+            reducers[colpathname] = reducer
+
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        count = None
+        if not fields:
+            # Only the number of selected rows is needed.
+            if condition is None:
+                count = lrange(start, stop, step).length
+                offsets = _table__deletedOffsets(self, start, stop, step)
+                if offsets is not None:
+                    count -= len(offsets)
+            elif self._enabledIndexingInQueries and start < stop:
+                count = _table__countIndexed(
+                    self, condition, condvars, start, stop, step)
+        if count is not None:
+            for reducer in reducers.itervalues():
+                reducer.count = count
+        elif condition is None:
+            rows = self.iterrows(start, stop, step, fields)
+            _table__reduceBuffers(rows, reducers)
+        else:
+            rows = self._where(condition, condvars, start, stop, step, fields)
+            _table__reduceBuffers(rows, reducers)
+            self._whereCondition = None  # reset the conditions
+
+        results = {}
+        for colpathname, funcs in aggregates.iteritems():
+            result = reducers[colpathname].getresults()
+            if isinstance(funcs, basestring):
+                result = result[0]
+            else:
+                result = tuple(result)
+            results[colpathname] = result
+        return results
+
+
+    def groupby( self, keys, aggregates, condition=None, condvars=None,
+                 start=None, stop=None, step=None,
+                 newparent=None, newname=None, tmp_dir=None ):
+        """
+        Compute aggregate functions over groups of rows.
+
+        The rows are grouped by the values in the `keys` columns (a
+        column path name or a sequence of them), and the `aggregates`
+        mapping has the same meaning as in `Table.aggregate()`.  For
+        example, this gets the number of rows and the mean price for
+        every symbol and day::
+
+            result = table.groupby(['symbol', 'day'],
+                                   {'price': ('count', 'mean')})
+
+        The result is a record array with a row per group, with the key
+        columns first (named after them) and then a column for every
+        aggregate function (in table order), named
+        ``<column>_<function>`` (slashes in
+        path names are replaced with underscores, as in
+        ``price_mean``).  If `newname` is given, the results are
+        written in a new table with that name in the `newparent` group
+        (the parent of this table by default) and the new table is
+        returned instead.
+
+        If `condition` is given, only the rows fulfilling it are used.
+        The meaning of the other arguments is the same as in the
+        `Table.where()` method.
+
+        If the first key column has a completely sorted index (see
+        `Column.createCSIndex()`), the rows are read in the order of the
+        index and every group is complete as soon as the next key is
+        read.  Otherwise, the groups are looked up by hashing their
+        keys, and if there are more than ``GROUPBY_MAX_GROUPS`` of them,
+        their partial results are spilled to ``GROUPBY_PARTITIONS``
+        partitions in a temporary file in `tmp_dir` (the directory of
+        the file of this table by default), which are reduced one at a
+        time.  Groups are sorted by their keys, except when results
+        are written to a table after spilling them to disk, in which
+        case only the groups in every partition are sorted.
+        """
+        self._waitBufferedRows()
+        if isinstance(keys, basestring):
+            keys = [keys]
+        keys = list(keys)
+        if not keys:
+            raise ValueError("at least one key column is needed")
+        for key in keys:
+            self._checkNonNestedColumn(key)
+            if self.coldtypes[key].shape != ():
+                raise TypeError( "key column ``%s`` is multidimensional, "
+                                 "which is not supported" % key )
+        for colpathname in aggregates:
+            self._checkNonNestedColumn(colpathname)
+        aggregator = _GroupAggregator(self, keys, aggregates)
+        if condition is not None:
+            condvars = self._requiredExprVars(condition, condvars, depth=2)
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+        fields = keys + list(aggregates)
+
+        if newname is None:
+            chunks = []
+            output = chunks.append
+        else:
+            if newparent is None:
+                newparent = self._v_parent
+            dstTable = self._v_file.createTable(
+                newparent, newname, aggregator.rdtype,
+                title="Groups of %s" % self._v_pathname)
+            def output(results):
+                if len(results) > 0:
+                    dstTable.append(results)
+
+        if tmp_dir is None:
+            tmp_dir = os.path.dirname(self._v_file.filename)
+        index = self._getSortedIndex(keys[0])
+        if start >= stop:
+            output(aggregator.getResults(
+                numpy.empty(0, dtype=aggregator.pdtype)))
+        elif index is not None:
+            _table__groupbySorted(self, aggregator, index, condition,
+                                  condvars, start, stop, step, fields, output)
+        else:
+            _table__groupbyHash(self, aggregator, condition, condvars,
+                                start, stop, step, fields, tmp_dir, output)
+
+        if newname is not None:
+            dstTable.flush()
+            return dstTable
+        if len(chunks) == 1:
+            results = chunks[0]
+        else:
+            results = numpy.concatenate(chunks)
+            # Partitions are not sorted with each other.
+            order = numpy.lexsort(
+                [ results[key.replace('/', '_')] for key in keys[::-1] ])
+            results = results[order]
+        return internal_to_flavor(results, self.flavor)
+
+
+    def parallelWhere( self, condition, condvars=None, field=None,
+                       start=None, stop=None, step=None,
+                       nworkers=None, coordsonly=False ):
+        """
+        Read table data fulfilling the `condition` using several processes.
+
+        The range of rows is split into partitions aligned to chunk
+        boundaries, and each partition is queried by a separate worker
+        process with its own read-only handle of the file.  The results
+        are merged in row order, and they are the same that
+        `Table.readWhere()` would return.  If `coordsonly` is true, the
+        coordinates of the selected rows are returned instead, as
+        `Table.getWhereList()` does (`field` is ignored then).
+
+        `nworkers` is the maximum number of worker processes, which
+        defaults to the ``MAX_THREADS`` parameter.  The meaning of the
+        other arguments is the same as in the `Table.where()` method.
+
+        The table is flushed before starting the workers, so that they
+        can see all its rows.  As starting a worker process has a
+        noticeable cost, this is only worth it for large tables.
+        """
+        self._waitBufferedRows()
+        if not coordsonly:
+            self._checkFieldIfNumeric(field)
+            if field:
+                self._checkColumn(field)
+        else:
+            field = None
+        (start, stop, step) = self._processRangeRead(start, stop, step)
+
+        # Compile the condition here so that errors are raised early.
+        condvars = self._requiredExprVars(condition, condvars, depth=2)
+        self._compileCondition(condition, condvars)
+
+        if nworkers is None:
+            nworkers = self._v_file.params['MAX_THREADS']
+        if self._chunked:
+            chunksize = self.chunkshape[0]
+        else:
+            chunksize = self.nrowsinbuf
+        # Split the range in partitions made of whole chunks.
+        partitions = []
+        if start < stop:
+            firstchunk = start // chunksize
+            nchunks = (stop - 1) // chunksize + 1 - firstchunk
+            nparts = max(min(nworkers, nchunks), 1)
+            partchunks = (nchunks - 1) // nparts + 1
+            for npart in xrange(nparts):
+                pstart = (firstchunk + npart * partchunks) * chunksize
+                pstop = min(pstart + partchunks * chunksize, stop)
+                # Start at the first row in the range step.
+                pstart = max(pstart, start)
+                pstart += (step - (pstart - start) % step) % step
+                if pstart < pstop:
+                    partitions.append((pstart, pstop))
+
+        if len(partitions) <= 1 or not sys.executable:
+            # Not worth the effort (or not possible) to use workers.
+            rows = self._where(condition, condvars, start, stop, step)
+            result = _table__mergeBuffers(self, rows, field, coordsonly)
+            return internal_to_flavor(result, self.flavor)
+
+        # Column variables are passed by path to the workers.
+        colvars, othervars = {}, {}
+        for var, val in condvars.iteritems():
+            if hasattr(val, 'pathname'):  # column
+                colvars[var] = val.pathname
+            else:
+                othervars[var] = val
+        self.flush()
+        filename = os.path.abspath(self._v_file.filename)
+        queries = [ (filename, self._v_pathname, condition, colvars,
+                     othervars, pstart, pstop, step, field, coordsonly)
+                    for (pstart, pstop) in partitions ]
+        result = numpy.concatenate(_table__runWorkers(queries))
+        return internal_to_flavor(result, self.flavor)
+
+
+    def itersequence(self, sequence, skipdeleted=False):
         """
         Iterate over a `sequence` of row coordinates.
 
+        If some of the rows have been deleted lazily (see
+        `Table.removeRows()`), an `IndexError` is raised, unless
+        `skipdeleted` is true, in which case they are skipped.
+
         .. Note:: This iterator can be nested (see `Table.where()` for
            an example).
         """
 
+        self._waitBufferedRows()
         if not hasattr(sequence, '__getitem__'):
             raise TypeError("""\
 Wrong 'sequence' parameter type. Only sequences are suported.""")
@@ -1572,6 +3405,8 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         (start, stop, step) = self._processRangeRead(None, None, None)
         if (start > stop) or (len(sequence) == 0):
             return iter([])
+        if not skipdeleted:
+            _table__checkDeleted(self, sequence)
         row = tableExtension.Row(self)
         return row._iter(start, stop, step, coords=sequence)
 
@@ -1615,6 +3450,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         returned in reverse sorted order.
 
         """
+        self._waitBufferedRows()
         index = self._check_sortby_CSI(sortby, checkCSI)
         # Adjust the slice to be used.
         (start, stop, step) = index._processRange(start, stop, step)
@@ -1646,13 +3482,14 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         returned in reverse sorted order.
 
         """
+        self._waitBufferedRows()
         self._checkFieldIfNumeric(field)
         index = self._check_sortby_CSI(sortby, checkCSI)
         coords = index[start:stop:step]
-        return self.readCoordinates(coords, field)
+        return self.readCoordinates(coords, field, skipdeleted=True)
 
 
-    def iterrows(self, start=None, stop=None, step=None):
+    def iterrows(self, start=None, stop=None, step=None, fields=None):
         """
         Iterate over the table using a `Row` instance.
 
@@ -1661,7 +3498,8 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         method for that purpose.  If you only want to iterate over a
         given *range of rows* in the table, you may use the `start`,
         `stop` and `step` parameters, which have the same meaning as in
-        `Table.read()`.
+        `Table.read()`.  The meaning of `fields` is the same as in
+        `Table.where()`.
 
         Example of use::
 
@@ -1676,14 +3514,29 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
            the table (like `Table.append()` or `Table.removeRows()`) or
            unexpected errors will happen.
         """
+        self._waitBufferedRows()
         (start, stop, step) = self._processRangeRead(start, stop, step)
+        if fields is not None:
+            fields = self._getProjectedFields(fields)
         if start < stop:
             row = tableExtension.Row(self)
+            if fields is not None:
+                row._set_fields(fields)
             return row._iter(start, stop, step)
         # Fall-back action is to return an empty iterator
         return iter([])
 
 
+    def __len__(self):
+        """
+        Get the number of rows in the table which are not deleted.
+
+        This is the number of rows returned by `Table.read()`, i.e.
+        `Table.nrows` minus `Table.ndeleted`.
+        """
+        return self.nrows - self.ndeleted
+
+
     def __iter__(self):
         """
         Iterate over the table using a `Row` instance.
@@ -1707,16 +3560,21 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         return self.iterrows()
 
 
-    def _read(self, start, stop, step, field=None):
+    def _read(self, start, stop, step, field=None, fields=None):
         """Read a range of rows and return an in-memory object.
+
+        If `fields` is given, only these top-level fields are read (see
+        `_get_projection()`).
         """
 
+        self._waitBufferedRows()
         select_field = None
         if field:
             if field not in self.coldtypes:
                 if field in self.description._v_names:
                     # Remember to select this field
                     select_field = field
+                    fields = (field,)
                     field = None
                 else:
                     raise KeyError, "Field %s not found in table %s" % \
@@ -1729,7 +3587,9 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         # Return a rank-0 array if start > stop
         if start >= stop:
             if field == None:
-                nra = self._get_container(0)
+                nra = self._get_container(0, fields)
+                if select_field:
+                    return nra[select_field]
                 return nra
             return numpy.empty(shape=0, dtype=dtypeField)
 
@@ -1741,7 +3601,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
             result = numpy.empty(shape=nrows, dtype=dtypeField)
         else:
             # Recarray case
-            result = self._get_container(nrows)
+            result = self._get_container(nrows, fields)
 
         # Call the routine to fill-up the resulting array
         if step == 1 and not field:
@@ -1764,7 +3624,8 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
             return result
 
 
-    def read(self, start=None, stop=None, step=None, field=None):
+    def read(self, start=None, stop=None, step=None, field=None,
+             fields=None):
         """
         Get data in the table as a (record) array.
 
@@ -1774,7 +3635,8 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         negative values of `step` are not allowed yet.  Moreover, if
         only `start` is specified, then `stop` will be set to
         ``start+1``.  If you do not specify neither `start` nor `stop`,
-        then *all the rows* in the table are selected.
+        then *all the rows* in the table are selected.  Rows deleted
+        lazily (see `Table.removeRows()`) are skipped.
 
         If `field` is supplied only the named column will be selected.
         If the column is not nested, an *array* of the current flavor
@@ -1785,22 +3647,35 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         Columns under a nested column can be specified in the `field`
         parameter by using a slash character (``/``) as a separator
         (e.g. ``'position/x'``).
+
+        If a sequence of column names is given in `fields` instead, a
+        record array with only the top-level columns containing them is
+        returned.  The other columns are not read from disk at all.
         """
 
+        if field and fields is not None:
+            raise ValueError("only one of `field` and `fields` can be used")
         if field:
             self._checkColumn(field)
         else:
             self._checkFieldIfNumeric(field)
+        if fields is not None:
+            fields = self._getProjectedFields(fields)
 
         (start, stop, step) = self._processRangeRead(start, stop, step)
 
-        arr = self._read(start, stop, step, field)
+        arr = self._read(start, stop, step, field, fields)
+        # Skip the rows deleted lazily.
+        mask = _table__maskDeleted(self, start, stop, step)
+        if mask is not None:
+            arr = arr[mask]
         return internal_to_flavor(arr, self.flavor)
 
 
     def _readCoordinates(self, coords, field=None):
         """Private part of `readCoordinates()` with no flavor conversion."""
 
+        self._waitBufferedRows()
         ncoords = len(coords)
         # Create a read buffer only if needed
         if field is None or ncoords > 0:
@@ -1831,7 +3706,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         return result
 
 
-    def readCoordinates(self, coords, field=None):
+    def readCoordinates(self, coords, field=None, skipdeleted=False):
         """
         Get a set of rows given their indexes as a (record) array.
 
@@ -1840,9 +3715,16 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         instead of a column range.
 
         The selected rows are returned in an array or record array of
-        the current flavor.
+        the current flavor.  If some of the rows have been deleted
+        lazily (see `Table.removeRows()`), an `IndexError` is raised,
+        unless `skipdeleted` is true, in which case they are left out
+        of the result.
         """
         self._checkFieldIfNumeric(field)
+        if skipdeleted:
+            coords = _table__skipDeleted(self, coords)
+        else:
+            _table__checkDeleted(self, coords)
         result = self._readCoordinates(coords, field)
         return internal_to_flavor(result, self.flavor)
 
@@ -1887,6 +3769,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         Here you can see how this method can be used as a shorthand for
         the `Table.read()` method.
         """
+        self._waitBufferedRows()
         return self.read(field=name)
 
 
@@ -1933,6 +3816,8 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
                 # To support negative values
                 key += self.nrows
             (start, stop, step) = self._processRange(key, key+1, 1)
+            if _table__maskDeleted(self, start, stop, step) is not None:
+                raise IndexError("row %d has been deleted" % key)
             return self.read(start, stop, step)[0]
         elif isinstance(key, slice):
             (start, stop, step) = self._processRange(
@@ -1941,6 +3826,7 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
         # Try with a boolean or point selection
         elif type(key) in (list, tuple) or isinstance(key, numpy.ndarray):
             coords = self._pointSelection(key)
+            _table__checkDeleted(self, coords)
             return self._readCoordinates(coords, None)
         else:
             raise IndexError("Invalid index or slice: %r" % (key,))
@@ -2010,10 +3896,26 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
             raise IndexError("Invalid index or slice: %r" % (key,))
 
 
-    def _saveBufferedRows(self, wbufRA, lenrows):
-        """Update the indexes after a flushing of rows"""
-        self._open_append(wbufRA)
-        self._append_records(lenrows)
+    def _saveBufferedRows(self, wbufRA, lenrows, prepared=None):
+        """
+        Update the indexes after a flushing of rows
+
+        `prepared` may be the result of `self._prepareBufferedRows()`
+        for these rows at the current end of the table.
+        """
+        # Zone maps and composite indexes are updated before the buffer
+        # is converted in place.
+        self._appendToZoneMaps(wbufRA, lenrows)
+        cindexes = []
+        if self.autoIndex:
+            cindexes = self._appendToCompositeIndexes(wbufRA, lenrows)
+        if prepared is None:
+            self._open_append(wbufRA)
+            self._append_records(lenrows)
+        else:
+            (hdf5buf, chunks) = prepared
+            self._open_append(hdf5buf)
+            self._append_records(lenrows, chunks)
         self._close_append()
         if self.indexed:
             self._unsaved_indexedrows += lenrows
@@ -2025,6 +3927,95 @@ Wrong 'sequence' parameter type. Only sequences are suported.""")
             else:
                 # All the columns are dirty now
                 self._markColumnsAsDirty(self.colpathnames)
+        if not self.autoIndex:
+            # Composite indexes are rebuilt by `Table.reIndexDirty()`.
+            cindexes = self._markCompositeIndexesAsDirty(self.colpathnames)
+        if cindexes:
+            self._dirtycache = True
+
+
+    def _prepareBufferedRows(self, wbufRA, lenrows, start, chunkrows):
+        """
+        Do the CPU work of saving `lenrows` rows of `wbufRA` at `start`.
+
+        This is called by the `_BufferWriter` thread, so HDF5 is not
+        used here.  A ``(hdf5buf, chunks)`` tuple is returned, where
+        `hdf5buf` has the rows converted to HDF5 format (in a copy of
+        `wbufRA` if they need some conversion, since the indexes are
+        updated from the original rows) and `chunks` is a list with
+        the filtered data of the whole chunks they fill (an empty one if
+        `chunkrows` is 0, see `Leaf._wholeChunkRows()`).
+        """
+        hdf5buf = wbufRA
+        if self._time64colnames:
+            hdf5buf = wbufRA.copy()
+            self._convert_records(hdf5buf, lenrows)
+        chunks = []
+        if chunkrows > 0:
+            head = (chunkrows - start % chunkrows) % chunkrows
+            ndirect = (lenrows - head) // chunkrows * chunkrows
+            chunks = self._filterChunks(hdf5buf[head:head+ndirect])
+        return (hdf5buf, chunks)
+
+
+    def _prepareReadRows(self, chunkstart, chunks, start, nrows, fields):
+        """
+        Do the CPU work of reading `nrows` rows from `start`.
+
+        This is called by the `_BufferPrefetcher` threads, so HDF5 is not
+        used here.  `chunks` has the filtered chunks holding the rows,
+        from the one at row `chunkstart` (see `Leaf._unfilterChunks()`).
+        A record array with the rows in NumPy format is returned, with
+        only the top-level `fields` (all of them if None).  The rows in
+        the chunks not written yet are left uninitialized.
+        """
+        buf = self._get_container(len(chunks) * self.chunkshape[0])
+        self._unfilterChunks(chunkstart, chunks, buf)
+        records = buf[start-chunkstart:start-chunkstart+nrows]
+        self._convert_records(records, nrows, 1)
+        if fields is not None:
+            projected = self._get_container(nrows, fields)
+            for name in fields:
+                projected[name] = records[name]
+            records = projected
+        return records
+
+
+    def _queueBufferedRows(self, wbufRA, lenrows):
+        """
+        Save the `wbufRA` buffer filled by `Row.append()`.
+
+        If the ``ASYNC_APPEND_DEPTH`` parameter is not 0, the buffer is
+        handed to a background writer and an empty one to go on with
+        is returned.  Otherwise, the rows are saved right away and None
+        is returned.
+        """
+        writer = self._v_writer
+        if writer is None:
+            depth = self._v_file.params['ASYNC_APPEND_DEPTH']
+            if depth <= 0:
+                self._saveBufferedRows(wbufRA, lenrows)
+                return None
+            writer = self._v_writer = _BufferWriter(self, depth)
+        try:
+            return writer.put(wbufRA, lenrows)
+        except Exception:
+            # The writer has stopped after failing to save some rows.
+            self._v_writer = None
+            raise
+
+
+    def _waitBufferedRows(self):
+        """
+        Write the rows pending in the background writer (if any).
+
+        Every operation on the table but `Row.append()` calls this
+        first.  Nothing is done while the writer is saving rows itself.
+        """
+        writer = self._v_writer
+        if writer is not None and not writer.writing:
+            self._v_writer = None
+            writer.close()
 
 
     def append(self, rows):
@@ -2077,10 +4068,110 @@ You cannot append rows to a non-chunked table.""")
         lenrows = wbufRA.shape[0]
         # If the number of rows to append is zero, don't do anything else
         if lenrows > 0:
+            # Rows appended by `Row.append()` go first.
+            self._waitBufferedRows()
             # Save write buffer to disk
             self._saveBufferedRows(wbufRA, lenrows)
 
 
+    def appendColumns(self, columns):
+        """
+        Append rows given as separate sequences of column values.
+
+        The `columns` argument is a dictionary mapping column names
+        (which may be pathnames of nested columns) to sequences with
+        the values of the new rows in that column, all of them with the
+        same length.  The sequences may be of any flavor which can be
+        converted to an array of the column type.  Columns not given
+        are filled with their default values.
+
+        Unlike `Table.append()`, no record array with all the new rows
+        is built: the columns are interleaved into an I/O buffer, which
+        is saved every ``nrowsinbuf`` rows.  Columns which do not have
+        the column type yet are checked to be convertible a buffer at a
+        time before saving the first buffer, so no row is appended if
+        some value cannot be converted (a `ValueError` is raised).
+
+        Example of use::
+
+            table.appendColumns({'lati': numpy.arange(1000),
+                                 'pressure': numpy.ones(1000)})
+        """
+
+        self._v_file._checkWritable()
+
+        if not self._chunked:
+            raise HDF5ExtError("""\
+You cannot append rows to a non-chunked table.""")
+
+        arrays, lenrows = [], None
+        for colname, column in columns.iteritems():
+            self._getColumnInstance(colname)  # the column must exist
+            column = array_as_internal(column, flavor_of(column))
+            if column.ndim == 0:
+                raise ValueError("the values of column ``%s`` are not a "
+                                 "sequence" % colname)
+            if lenrows is None:
+                lenrows = len(column)
+            elif len(column) != lenrows:
+                raise ValueError("all the columns must have the same length")
+            arrays.append((colname, column))
+        if not lenrows:
+            return
+
+        # Check that every column can be converted before saving any
+        # row, so that a value which can not be converted leaves the
+        # table untouched.  Columns which already have the column type
+        # are used as they are, and the other ones are converted a
+        # buffer at a time into a scratch array, so that no copy of the
+        # whole columns is made.
+        nrowsinbuf = self.nrowsinbuf
+        empty = self._get_container(0)
+        for colname, column in arrays:
+            field = getNestedField(empty, colname)
+            if ( column.dtype == field.dtype and
+                 column.shape[1:] == field.shape[1:] ):
+                continue
+            scratch = numpy.empty((min(nrowsinbuf, lenrows),)
+                                  + field.shape[1:], dtype=field.dtype)
+            try:
+                for start in xrange(0, lenrows, nrowsinbuf):
+                    stop = min(start + nrowsinbuf, lenrows)
+                    scratch[:stop-start] = column[start:stop]
+            except ValueError, exc:
+                raise ValueError(
+                    "the values of column ``%s`` cannot be converted "
+                    "into the column type: %s" % (colname, exc))
+
+        # The defaults of the columns not given.
+        wdflts = self._v_wdflts
+        if wdflts is None:
+            wdflts = numpy.zeros(1, dtype=self._v_dtype)
+        dflts = []
+        for colpathname in self.colpathnames:
+            for colname, column in arrays:
+                if (colpathname == colname or
+                    colpathname.startswith(colname + '/')):
+                    break
+            else:
+                dflts.append(
+                    (colpathname, getNestedField(wdflts, colpathname)))
+
+        # Rows appended by `Row.append()` go first.
+        self._waitBufferedRows()
+        iobuf = self._get_container(min(nrowsinbuf, lenrows))
+        for start in xrange(0, lenrows, nrowsinbuf):
+            stop = min(start + nrowsinbuf, lenrows)
+            # The buffer is converted in place when saved, so it must
+            # be completely filled every time.
+            wbufRA = iobuf[:stop-start]
+            for colpathname, dflt in dflts:
+                getNestedField(wbufRA, colpathname)[:] = dflt
+            for colname, column in arrays:
+                getNestedField(wbufRA, colname)[:] = column[start:stop]
+            self._saveBufferedRows(wbufRA, stop - start)
+
+
     def _conv_to_recarr(self, obj):
         """Try to convert the object into a recarray."""
         try:
@@ -2118,6 +4209,7 @@ table format '%s'. The error was: <%s>
         `Table.append()`.
         """
 
+        self._waitBufferedRows()
         if rows is None:      # Nothing to be done
             return SizeType(0)
 
@@ -2135,6 +4227,7 @@ table format '%s'. The error was: <%s>
         if len(coords) > 0:
             # Do the actual update of rows
             self._update_elements(lcoords, coords, recarr)
+            self._updateZoneMaps(self.colpathnames, coords=coords)
 
         # Redo the index if needed
         self._reIndex(self.colpathnames)
@@ -2155,6 +4248,7 @@ table format '%s'. The error was: <%s>
         `Table.append()`.
         """
 
+        self._waitBufferedRows()
         if rows is None:      # Nothing to be done
             return SizeType(0)
         if start is None:
@@ -2188,6 +4282,7 @@ table format '%s'. The error was: <%s>
 
         # Do the actual update
         self._update_records(start, stop, step, recarr)
+        self._updateZoneMaps(self.colpathnames, start, stop)
 
         # Redo the index if needed
         self._reIndex(self.colpathnames)
@@ -2215,6 +4310,7 @@ table format '%s'. The error was: <%s>
         and a string or Python buffer.
         """
 
+        self._waitBufferedRows()
         if not isinstance(colname, str):
             raise TypeError("The 'colname' parameter must be a string.")
         self._v_file._checkWritable()
@@ -2270,6 +4366,7 @@ table format '%s'. The error was: <%s>
         mod_col[:] = column
         # save this modified rows in table
         self._update_records(start, stop, step, mod_recarr)
+        self._updateZoneMaps([colname], start, stop)
         # Redo the index if needed
         self._reIndex([colname])
 
@@ -2295,6 +4392,7 @@ table format '%s'. The error was: <%s>
         records, and a string or Python buffer.
         """
 
+        self._waitBufferedRows()
         if type(names) not in (list, tuple):
             raise TypeError("""\
 The 'names' parameter must be a list of strings.""")
@@ -2346,6 +4444,7 @@ The 'names' parameter must be a list of strings.""")
             mod_col[:] = recarray[name].squeeze()
         # save this modified rows in table
         self._update_records(start, stop, step, mod_recarr)
+        self._updateZoneMaps(names, start, stop)
         # Redo the index if needed
         self._reIndex(names)
 
@@ -2362,30 +4461,60 @@ The 'names' parameter must be a list of strings.""")
 
         """
 
+        self._waitBufferedRows()
         rowsadded = 0
         if self.indexed:
             # Update the number of unsaved indexed rows
             start = self._indexedrows
             nrows = self._unsaved_indexedrows
+            bitmapsonly = True
             for (colname, colindexed) in self.colindexed.iteritems():
                 if colindexed:
                     col = self.cols._g_col(colname)
                     if nrows > 0 and not col.index.dirty:
-                        rowsadded = self._addRowsToIndex(
+                        added = self._addRowsToIndex(
                             colname, start, nrows, _lastrow, update=True )
+                        # Bitmap indexes always take all the rows, so
+                        # other indexes tell which ones are left unsaved.
+                        if not isinstance(col.index, BitmapIndex):
+                            rowsadded, bitmapsonly = added, False
+                        elif bitmapsonly:
+                            rowsadded = added
+                    if _lastrow and not isinstance(col.index, BitmapIndex):
+                        # Save the slices merged in the background
+                        col.index._waitCompact()
             self._unsaved_indexedrows -= rowsadded
             self._indexedrows += rowsadded
         return rowsadded
 
 
-    def _addRowsToIndex(self, colname, start, nrows, lastrow, update):
-        """Add more elements to the existing index """
+    def _addRowsToIndex(self, colname, start, nrows, lastrow, update,
+                        verbose=False):
+        """Add more elements to the existing index
+
+        If the ``INDEX_BUILD_WORKERS`` parameter is not 0, the slices
+        are read in batches that fit in ``INDEX_BUILD_MEMORY`` and
+        sorted in parallel.  If `verbose` is true, the progress is
+        printed out after every batch.
+        """
 
         # This method really belongs to Column, but since it makes extensive
         # use of the table, it gets dangerous when closing the file, since the
         # column may be accessing a table which is being destroyed.
         index = self.cols._g_col(colname).index
+        if isinstance(index, BitmapIndex):
+            # Bitmap indexes keep track of the rows they already have.
+            index.update(start+nrows)
+            return nrows
         slicesize = index.slicesize
+        params = self._v_file.params
+        nworkers = params['INDEX_BUILD_WORKERS']
+        if nworkers > 0:
+            # Values and indices of a slice are kept during the sort
+            slicemem = slicesize * (index.dtype.itemsize + index.indsize)
+            nslicesbatch = max(params['INDEX_BUILD_MEMORY'] // slicemem, 1)
+        else:
+            nslicesbatch = 1
         # The next loop does not rely on xrange so that it can
         # deal with long ints (i.e. more than 32-bit integers)
         # This allows to index columns with more than 2**31 rows
@@ -2394,21 +4523,27 @@ The 'names' parameter must be a list of strings.""")
         indexedrows = startLR - start
         stop = start+nrows-slicesize+1
         while startLR < stop:
-            index.append(
-                [self._read(startLR, startLR+slicesize, 1, colname)],
-                update=update)
-            indexedrows += slicesize
-            startLR += slicesize
+            xarrs = []
+            while startLR < stop and len(xarrs) < nslicesbatch:
+                xarrs.append(self._read(startLR, startLR+slicesize, 1,
+                                        colname))
+                indexedrows += slicesize
+                startLR += slicesize
+            index.appendSlices(xarrs, update=update)
+            if verbose:
+                print "Indexed rows: %d of %d" % (indexedrows, nrows)
         # index the remaining rows in last row
         if lastrow and startLR < self.nrows:
             index.appendLastRow(
                 [self._read(startLR, self.nrows, 1, colname)],
                 update=update)
             indexedrows += self.nrows - startLR
+            if verbose:
+                print "Indexed rows: %d of %d" % (indexedrows, nrows)
         return indexedrows
 
 
-    def removeRows(self, start, stop=None):
+    def removeRows(self, start, stop=None, lazy=False):
         """
         Remove a range of rows in the table.
 
@@ -2418,6 +4553,15 @@ The 'names' parameter must be a list of strings.""")
         parameter is not supported, and it is not foreseen to be
         implemented anytime soon.
 
+        Removing rows moves all the rows after them and invalidates the
+        indexes of the table.  If `lazy` is true, the rows are only
+        marked as deleted instead, which is very fast: only the range is
+        saved, and the rows are skipped when reading or iterating over
+        the table (and by ``len(table)``), but they keep their
+        coordinates (and they are still counted in `Table.nrows`) until
+        `Table.compact()` is called.  Only the rows not already deleted
+        are counted in the returned number of removed rows.
+
         `start`
             Sets the starting row to be removed.  It accepts negative
             values meaning that the count starts from the end.  A value
@@ -2431,18 +4575,76 @@ The 'names' parameter must be a list of strings.""")
             in `start`.
         """
 
+        self._waitBufferedRows()
         (start, stop, step) = self._processRangeRead(start, stop, 1)
         nrows = stop - start
+        if lazy:
+            self._v_file._checkWritable()
+            if nrows <= 0:
+                return SizeType(0)
+            tombstones = self._getTombstones(create=True)
+            nrows = tombstones.add(start, stop)
+            # The chunk cache of queries may hold deleted rows.
+            self._dirtycache = True
+            return SizeType(nrows)
         if nrows >= self.nrows:
             raise NotImplementedError, \
 """You are trying to delete all the rows in table "%s". This is not supported right now due to limitations on the underlying HDF5 library. Sorry!""" % self._v_pathname
         nrows = self._remove_row(start, nrows)
+        if self._hasTombstones:
+            self._getTombstones().shift(start, start + nrows)
+        # Rows after `start` have been shifted.
+        self._updateZoneMaps(self.colpathnames, start)
         # removeRows is a invalidating index operation
         self._reIndex(self.colpathnames)
 
         return SizeType(nrows)
 
 
+    def compact(self):
+        """
+        Remove the rows deleted lazily from the table.
+
+        The rows marked as deleted by ``Table.removeRows(lazy=True)``
+        are physically removed in a single sequential pass over the
+        table, from the first deleted row on: the remaining rows are
+        moved back a whole I/O buffer at a time and the table is
+        truncated.  Rows get their final coordinates and the indexes
+        of the table are invalidated, as in `Table.removeRows()`.
+
+        The number of removed rows is returned.
+        """
+        self._waitBufferedRows()
+        self._v_file._checkWritable()
+        ranges = self._getDeletedRanges()
+        if ranges is None:
+            return SizeType(0)
+        # Rows appended through ``self.row`` must go first.
+        self.flush()
+        first = long(ranges[0][0])
+        nrows = self.nrows
+        nrowsinbuf = self.nrowsinbuf
+        # Rows are never written after the ones already read.
+        dest = first
+        for start in xrange(first, nrows, nrowsinbuf):
+            stop = min(start + nrowsinbuf, nrows)
+            records = self._read(start, stop, 1)
+            mask = _table__maskDeleted(self, start, stop, 1)
+            if mask is not None:
+                records = records[mask]
+            if len(records) > 0 and (mask is not None or dest != start):
+                self._update_records(dest, dest + len(records), 1, records)
+            dest += len(records)
+        self._g_truncate(dest)
+        self._getTombstones()._f_remove(recursive=True)
+        self._hasTombstones = False
+        self._dirtycache = True
+        # Rows after `first` have been shifted.
+        self._updateZoneMaps(self.colpathnames, first)
+        self._reIndex(self.colpathnames)
+        return SizeType(nrows - dest)
+
+
     def _g_updateDependent(self):
         super(Table, self)._g_updateDependent()
 
@@ -2461,6 +4663,7 @@ The 'names' parameter must be a list of strings.""")
         This overloads the Node._g_move() method.
         """
 
+        self._waitBufferedRows()
         itgpathname = _indexPathnameOf(self)
 
         # First, move the table to the new location.
@@ -2479,6 +4682,7 @@ The 'names' parameter must be a list of strings.""")
 
 
     def _g_remove(self, recursive=False, force=False):
+        self._waitBufferedRows()
         # Remove the associated index group (if any).
         itgpathname = _indexPathnameOf(self)
         try:
@@ -2493,6 +4697,210 @@ The 'names' parameter must be a list of strings.""")
         super(Table, self)._g_remove(recursive, force)
 
 
+    def _getCompositeIndexes(self):
+        """Get the list of composite indexes in this table."""
+        if not self._compositeIndexNames:
+            return []
+        itgroup = self._v_file._getNode(_indexPathnameOf(self))
+        return [ itgroup._f_getChild(name)
+                 for name in self._compositeIndexNames ]
+
+
+    def _getCompositeIndex(self, colpathnames):
+        """Get the composite index over `colpathnames`, or None."""
+        for cindex in self._getCompositeIndexes():
+            if cindex.colpathnames == list(colpathnames):
+                return cindex
+        return None
+
+
+    def createCompositeIndex(self, colnames, filters=None):
+        """
+        Create a composite index over the columns in `colnames`.
+
+        `colnames` is a sequence with the path names of two or more
+        columns, in index order.  Queries whose condition is a
+        conjunction including equality comparisons on the leading
+        columns of the index (optionally followed by a range on the
+        next one) will use it, as in::
+
+            table.createCompositeIndex(['symbol', 'day', 'price'])
+            table.where('(symbol == "ABC") & (day == 10) & (price > 3)')
+
+        The index is built by sorting slices of the table and merging
+        them out of core, so the columns do not need to fit in memory.
+        Appended rows are added to the index incrementally
+        if `Table.autoIndex` is true (otherwise they make it dirty).
+        Modifying or removing rows makes it dirty, and it is rebuilt
+        when the table is flushed (if `Table.autoIndex` is true) or by
+        `Table.reIndex()` and `Table.reIndexDirty()`.
+
+        `filters` is the `Filters` instance used to compress the index.
+        If ``None``, default index filters will be used.  The number of
+        indexed rows is returned.
+        """
+        self._waitBufferedRows()
+        self._v_file._checkWritable()
+
+        colnames = list(colnames)
+        if len(colnames) < 2:
+            raise ValueError("composite indexes need at least two columns")
+        for colname in colnames:
+            dtype = self._getColumnInstance(colname).dtype
+            if dtype.kind == 'c':
+                raise TypeError("complex columns can not be indexed")
+            if dtype.shape != ():
+                raise TypeError("multidimensional columns can not be indexed")
+        if self._getCompositeIndex(colnames) is not None:
+            raise ValueError( "a composite index for columns %s "
+                              "already exists" % (colnames,) )
+
+        # Get the indexes group for table, and if not exists, create it
+        try:
+            itgroup = self._v_file._getNode(_indexPathnameOf(self))
+        except NoSuchNodeError:
+            itgroup = createIndexesTable(self)
+
+        if filters is None:
+            filters = defaultIndexFilters
+        name = '_cidx_' + '__'.join([ colname.replace('/', '.')
+                                      for colname in colnames ])
+        cindex = CompositeIndex(
+            itgroup, name, colnames,
+            title="Composite index for %s columns" % ', '.join(colnames),
+            filters=filters, new=True)
+        self._compositeIndexNames.append(name)
+        indexedrows = cindex.build()
+        # The set of usable indexes has changed.
+        self._conditionCache.clear()
+        return SizeType(indexedrows)
+
+
+    def removeCompositeIndex(self, colnames):
+        """
+        Remove the composite index over the columns in `colnames`.
+
+        A `ValueError` is raised if the composite index does not exist.
+        """
+        self._waitBufferedRows()
+        self._v_file._checkWritable()
+
+        cindex = self._getCompositeIndex(colnames)
+        if cindex is None:
+            raise ValueError( "there is no composite index for columns %s"
+                              % (list(colnames),) )
+        # This is needed so as to unnail() the condition cache.
+        cindex.dirty = False
+        self._compositeIndexNames.remove(cindex._v_name)
+        cindex._f_remove(recursive=True)
+        self._conditionCache.clear()
+
+
+    def _getChunkSummaries(self, colnames=None):
+        """
+        Get the zone maps and Bloom filters of the columns in `colnames`.
+
+        `colnames` may also contain the path names of nested columns,
+        and all of them are returned if it is ``None``.  A list of
+        `ChunkSummary` instances is returned.
+        """
+        if not self._zoneMapNames:
+            return []
+        itgroup = self._v_file._getNode(_indexPathnameOf(self))
+        summaries = []
+        for name in self._zoneMapNames:
+            summary = itgroup._f_getChild(name)
+            colpathname = summary.colpathname
+            if colnames is not None:
+                for colname in colnames:
+                    if ( colpathname == colname
+                         or colpathname.startswith(colname + '/') ):
+                        break
+                else:
+                    continue
+            summaries.append(summary)
+        return summaries
+
+
+    def _getZoneMaps(self, colnames=None):
+        """
+        Get the zone maps of the columns in `colnames`.
+
+        A dictionary mapping column path names to `ZoneMap` instances is
+        returned.  See `_getChunkSummaries()` for `colnames`.
+        """
+        zonemaps = {}
+        for summary in self._getChunkSummaries(colnames):
+            if isinstance(summary, ZoneMap):
+                zonemaps[summary.colpathname] = summary
+        return zonemaps
+
+
+    def _getBloomFilters(self, colnames=None):
+        """
+        Get the Bloom filters of the columns in `colnames`.
+
+        A dictionary mapping column path names to `BloomFilter`
+        instances is returned.  See `_getChunkSummaries()` for
+        `colnames`.
+        """
+        bloomfilters = {}
+        for summary in self._getChunkSummaries(colnames):
+            if isinstance(summary, BloomFilter):
+                bloomfilters[summary.colpathname] = summary
+        return bloomfilters
+
+
+    def _appendToZoneMaps(self, wbufRA, lenrows):
+        """
+        Update the zone maps and Bloom filters with `lenrows` rows
+        about to be appended.
+        """
+        summaries = self._getChunkSummaries()
+        if not summaries:
+            return
+        start = self.nrows
+        for summary in summaries:
+            values = getNestedField(wbufRA, summary.colpathname)[:lenrows]
+            summary.append(values, start)
+
+
+    def _appendToCompositeIndexes(self, wbufRA, lenrows):
+        """
+        Add `lenrows` rows about to be appended to the composite
+        indexes which are not dirty.
+
+        The list of updated composite indexes is returned.
+        """
+        cindexes = []
+        start = self.nrows
+        for cindex in self._getCompositeIndexes():
+            if cindex.dirty:
+                continue
+            keys = [ getNestedField(wbufRA, colpathname)[:lenrows]
+                     for colpathname in cindex.colpathnames ]
+            cindex.append(keys, start)
+            cindexes.append(cindex)
+        return cindexes
+
+
+    def _updateZoneMaps(self, colnames, start=0, stop=None, coords=None):
+        """
+        Update the zone maps and Bloom filters of `colnames` after
+        modifying some rows.
+
+        The meaning of `start`, `stop` and `coords` is the same as in
+        `ChunkSummary.update()`.
+        """
+        summaries = self._getChunkSummaries(colnames)
+        if not summaries:
+            return
+        for summary in summaries:
+            summary.update(start, stop, coords)
+        # The chunk cache used by queries on zone maps is stale now.
+        self._dirtycache = True
+
+
     def _setColumnIndexing(self, colpathname, indexed):
         """Mark the referred column as indexed or non-indexed."""
 
@@ -2517,11 +4925,31 @@ The 'names' parameter must be a list of strings.""")
                 if colindexed[colname]:
                     col = cols._g_col(colname)
                     col.index.dirty = True
+        self._markCompositeIndexesAsDirty(colnames)
+
+
+    def _markCompositeIndexesAsDirty(self, colnames):
+        """
+        Mark composite indexes involving `colnames` as dirty.
+
+        The list of composite indexes involving `colnames` is returned.
+        """
+        cindexes = []
+        for cindex in self._getCompositeIndexes():
+            for colname in cindex.colpathnames:
+                if colname in colnames:
+                    if not cindex.dirty:
+                        cindex.dirty = True
+                    cindexes.append(cindex)
+                    break
+        return cindexes
 
 
     def _reIndex(self, colnames):
         """Re-index columns in `colnames` if automatic indexing is true."""
 
+        # Composite indexes can not be updated, only rebuilt.
+        cindexes = self._markCompositeIndexesAsDirty(colnames)
         if self.indexed:
             colindexed, cols = self.colindexed, self.cols
             colstoindex = []
@@ -2532,10 +4960,14 @@ The 'names' parameter must be a list of strings.""")
                     col.index.dirty = True
                     colstoindex.append(colname)
             # Now, re-index the dirty ones
-            if self.autoIndex and colstoindex:
+            if self.autoIndex and (colstoindex or cindexes):
                 self._doReIndex(dirty=True)
             # The table caches for indexed queries are dirty now
             self._dirtycache = True
+        elif cindexes:
+            if self.autoIndex:
+                self._doReIndex(dirty=True)
+            self._dirtycache = True
 
 
     def _doReIndex(self, dirty):
@@ -2546,6 +4978,9 @@ The 'names' parameter must be a list of strings.""")
             if colindexed:
                 indexcol = self.cols._g_col(colname)
                 indexedrows = indexcol._doReIndex(dirty)
+        for cindex in self._getCompositeIndexes():
+            if not dirty or cindex.dirty:
+                cindex.build()
         # Update counters in case some column has been updated
         if indexedrows > 0:
             self._indexedrows = indexedrows
@@ -2563,6 +4998,7 @@ The 'names' parameter must be a list of strings.""")
         rebuild the indexes on it.
 
         """
+        self._waitBufferedRows()
         self._doReIndex(dirty=False)
 
 
@@ -2576,6 +5012,7 @@ The 'names' parameter must be a list of strings.""")
         example).
 
         """
+        self._waitBufferedRows()
         self._doReIndex(dirty=True)
 
 
@@ -2597,7 +5034,7 @@ The 'names' parameter must be a list of strings.""")
                 rows = self[start2:stop2:step]
             else:
                 coords = index[start2:stop2:step]
-                rows = self.readCoordinates(coords)
+                rows = self.readCoordinates(coords, skipdeleted=True)
             # Save the records on disk
             object.append(rows)
         object.flush()
@@ -2616,6 +5053,15 @@ The 'names' parameter must be a list of strings.""")
             # Optimized version (it saves some conversions)
             nrows = ((stop2 - start2 - 1) // step) + 1
             self.row._fillCol(self._v_iobuf, start2, stop2, step, None)
+            # Do not copy the rows deleted lazily.
+            mask = _table__maskDeleted(self, start2, stop2, step)
+            if mask is not None:
+                iobuf = self._v_iobuf
+                kept = iobuf[:nrows][mask]
+                nrows = len(kept)
+                iobuf[:nrows] = kept
+            if nrows == 0:
+                continue
             # The output buffer is created anew,
             # so the operation is safe to in-place conversion.
             object._append_records(nrows)
@@ -2639,6 +5085,7 @@ The 'names' parameter must be a list of strings.""")
     def _g_copyWithStats(self, group, name, start, stop, step,
                          title, filters, chunkshape, _log, **kwargs):
         "Private part of Leaf.copy() for each kind of leaf"
+        self._waitBufferedRows()
         # Get the private args for the Table flavor of copy()
         sortby = kwargs.pop('sortby', None)
         propindexes = kwargs.pop('propindexes', False)
@@ -2696,6 +5143,7 @@ The 'names' parameter must be a list of strings.""")
         """Flush the table buffers."""
 
         # Flush rows that remains to be appended
+        self._waitBufferedRows()
         if 'row' in self.__dict__:
             self.row._flushBufferedRows()
         if self.indexed and self.autoIndex:
@@ -2709,6 +5157,10 @@ The 'names' parameter must be a list of strings.""")
             if self._dirtyindexes:
                 # Finally, re-index any dirty column
                 self.reIndexDirty()
+        elif self._compositeIndexNames and self.autoIndex:
+            if self._dirtyindexes:
+                # Re-index any dirty composite index
+                self.reIndexDirty()
 
         super(Table, self).flush()
 
@@ -2734,6 +5186,7 @@ The 'names' parameter must be a list of strings.""")
         # call self.flush() before the table is being preempted.
         # F. Alted 2006-08-03
         if (('row' in self.__dict__ and self.row._getUnsavedNrows() > 0) or
+            self._v_writer is not None or
             (self.indexed and self.autoIndex and
              (self._unsaved_indexedrows > 0 or self._dirtyindexes))):
             warnings.warn("""\
@@ -2762,6 +5215,9 @@ table ``%s`` is being preempted from alive nodes without its buffers being flush
         # Flush right now so the row object does not get in the middle.
         if flush:
             self.flush()
+        else:
+            # The background writer must not outlive the dataset.
+            self._waitBufferedRows()
 
         # Some warnings can be issued after calling `self._g_setLocation()`
         # in `self.__init__()`.  If warnings are turned into exceptions,
@@ -3098,6 +5554,9 @@ class Column(object):
     Public instance variables
     -------------------------
 
+    bloomfilter
+        The `BloomFilter` instance associated with this column
+        (``None`` if the column has no Bloom filter).
     descr
         The `Description` instance of the parent table or nested column.
     dtype
@@ -3116,20 +5575,33 @@ class Column(object):
         The parent `Table` instance.
     type
         The PyTables type of the column (a string).
+    zonemap
+        The `ZoneMap` instance associated with this column (``None``
+        if the column has no zone map).
 
     Public methods
     --------------
 
+    aggregate(func[, condition][, condvars][, start][, stop][, step])
+        Compute an aggregate function over this column.
+    createBloomFilter([fprate])
+        Create a Bloom filter for this column.
     createIndex([optlevel][, kind][, filters][, tmp_dir])
         Create an index for this column.
     createCSIndex([filters][, tmp_dir])
         Create a completely sorted index (CSI) for this column.
+    createZoneMap()
+        Create a zone map for this column.
     reIndex()
         Recompute the index associated with this column.
     reIndexDirty()
         Recompute the associated index only if it is dirty.
+    removeBloomFilter()
+        Remove the Bloom filter associated with this column.
     removeIndex()
         Remove the index associated with this column.
+    removeZoneMap()
+        Remove the zone map associated with this column.
 
     Special methods
     ---------------
@@ -3187,6 +5659,18 @@ class Column(object):
 
     is_indexed = property(_isindexed)
 
+
+    def _getzonemap(self):
+        return self.table._getZoneMaps([self.pathname]).get(self.pathname)
+
+    zonemap = property(_getzonemap)
+
+
+    def _getbloomfilter(self):
+        return self.table._getBloomFilters([self.pathname]).get(self.pathname)
+
+    bloomfilter = property(_getbloomfilter)
+
     maindim = property(
         lambda self: 0, None, None,
         "The main dimension for this column.")
@@ -3341,6 +5825,27 @@ class Column(object):
             raise ValueError, "Non-valid index or slice: %s" % key
 
 
+    def aggregate( self, func, condition=None, condvars=None,
+                   start=None, stop=None, step=None ):
+        """
+        Compute an aggregate function over this column.
+
+        `func` is the name of an aggregate function, or a sequence of
+        them (a tuple of results is returned then).  For example::
+
+            xmin, xmax = table.cols.x.aggregate(('min', 'max'), 'y > 0')
+
+        See `Table.aggregate()` for the supported functions and the
+        meaning of the other arguments.
+        """
+        table = self.table
+        if condition is not None:
+            condvars = table._requiredExprVars(condition, condvars, depth=2)
+        result = table._aggregate( {self.pathname: func}, condition,
+                                   condvars, start, stop, step )
+        return result[self.pathname]
+
+
     def createIndex( self, optlevel=6, kind="medium", filters=None,
                      tmp_dir=None, _blocksizes=None, _testmode=False,
                      _verbose=False ):
@@ -3372,6 +5877,15 @@ class Column(object):
             rows).  See ``Column.createCSIndex()`` method for a more
             direct way to create a CSI index.
 
+            The 'bitmap' kind builds a bitset of rows for every distinct
+            value in the column, and `optlevel` is ignored.  It is meant
+            for columns with few distinct values (like enumerated ones),
+            where it takes little space and lets conditions combining
+            several bitmap-indexed columns be solved with bitwise
+            operations.  Columns with more distinct values than the
+            ``BITMAP_MAX_VALUES`` parameter get a 'full' index instead
+            (and a `PerformanceWarning` is issued).
+
         filters -- Specify the `Filters` instance used to compress the
             index.  If ``None``, default index filters will be used
             (currently, zlib level 1 with shuffling).
@@ -3388,7 +5902,8 @@ class Column(object):
 
         """
 
-        kinds = ['ultralight', 'light', 'medium', 'full']
+        self.table._waitBufferedRows()
+        kinds = ['ultralight', 'light', 'medium', 'full', 'bitmap']
         if kind not in kinds:
             raise ValueError, \
                   "Kind must have any of these values: %s" % kinds
@@ -3472,6 +5987,7 @@ class Column(object):
 
         """
 
+        self.table._waitBufferedRows()
         self._doReIndex(dirty=False)
 
 
@@ -3487,6 +6003,7 @@ class Column(object):
 
         """
 
+        self.table._waitBufferedRows()
         self._doReIndex(dirty=True)
 
 
@@ -3500,6 +6017,7 @@ class Column(object):
 
         """
 
+        self.table._waitBufferedRows()
         self._tableFile._checkWritable()
 
         # Remove the index if existing.
@@ -3509,6 +6027,129 @@ class Column(object):
             self.table._setColumnIndexing(self.pathname, False)
 
 
+    def createZoneMap(self):
+        """
+        Create a zone map for this column.
+
+        A zone map keeps the minimum and maximum values of the column in
+        every chunk of the table.  Queries with conditions on the column
+        which can not use indexes only read the chunks whose values may
+        satisfy the condition.  This pays off when the values in the
+        column are clustered, like in roughly time-ordered tables.
+
+        Zone maps are small and cheap to keep, since they are updated
+        along with the table.  The new `ZoneMap` instance is returned.
+        """
+
+        self.table._waitBufferedRows()
+        self._tableFile._checkWritable()
+
+        if self.dtype.kind == 'c':
+            raise TypeError("complex columns can not have zone maps")
+        if self.descr._v_dtypes[self.name].shape != ():
+            raise TypeError("multidimensional columns can not have zone maps")
+        if self.zonemap is not None:
+            raise ValueError( "column ``%s`` already has a zone map"
+                              % self.pathname )
+
+        # Get the indexes group for table, and if not exists, create it
+        table = self.table
+        try:
+            itgroup = self._tableFile._getNode(_indexPathnameOf(table))
+        except NoSuchNodeError:
+            itgroup = createIndexesTable(table)
+        name = _zoneMapNameOf(self.pathname)
+        zonemap = ZoneMap( itgroup, name, self.pathname,
+                           title="Zone map for column %s" % self.pathname,
+                           new=True )
+        table._zoneMapNames.append(name)
+        # Queries on zone maps use the chunk cache.
+        table._dirtycache = True
+        return zonemap
+
+
+    def removeZoneMap(self):
+        """
+        Remove the zone map associated with this column.
+
+        This method does nothing if the column has no zone map.
+        """
+
+        self.table._waitBufferedRows()
+        self._tableFile._checkWritable()
+
+        zonemap = self.zonemap
+        if zonemap is not None:
+            self.table._zoneMapNames.remove(zonemap._v_name)
+            zonemap._f_remove(recursive=True)
+
+
+    def createBloomFilter(self, fprate=0.01):
+        """
+        Create a Bloom filter for this column.
+
+        A Bloom filter is kept for the values of the column in every
+        chunk of the table.  Queries with equality conditions on the
+        column (like ``col == value``) only read the chunks whose
+        filters may contain the value, which makes point lookups on
+        columns with many distinct values (like identifiers) fast, even
+        if the column is not indexed.
+
+        `fprate` is the probability of reading a chunk not having the
+        wanted value (a false positive), for chunks whose values are
+        all distinct.  Lower rates need more space for the filters.
+
+        Bloom filters are updated along with the table.  The new
+        `BloomFilter` instance is returned.
+        """
+
+        self.table._waitBufferedRows()
+        self._tableFile._checkWritable()
+
+        if self.dtype.kind == 'c':
+            raise TypeError("complex columns can not have Bloom filters")
+        if self.descr._v_dtypes[self.name].shape != ():
+            raise TypeError(
+                "multidimensional columns can not have Bloom filters")
+        if not 0 < fprate < 1:
+            raise ValueError("``fprate`` must be between 0 and 1")
+        if self.bloomfilter is not None:
+            raise ValueError( "column ``%s`` already has a Bloom filter"
+                              % self.pathname )
+
+        # Get the indexes group for table, and if not exists, create it
+        table = self.table
+        try:
+            itgroup = self._tableFile._getNode(_indexPathnameOf(table))
+        except NoSuchNodeError:
+            itgroup = createIndexesTable(table)
+        name = _bloomFilterNameOf(self.pathname)
+        bloomfilter = BloomFilter(
+            itgroup, name, self.pathname,
+            title="Bloom filter for column %s" % self.pathname,
+            fprate=fprate, new=True )
+        table._zoneMapNames.append(name)
+        # Queries on Bloom filters use the chunk cache.
+        table._dirtycache = True
+        return bloomfilter
+
+
+    def removeBloomFilter(self):
+        """
+        Remove the Bloom filter associated with this column.
+
+        This method does nothing if the column has no Bloom filter.
+        """
+
+        self.table._waitBufferedRows()
+        self._tableFile._checkWritable()
+
+        bloomfilter = self.bloomfilter
+        if bloomfilter is not None:
+            self.table._zoneMapNames.remove(bloomfilter._v_name)
+            bloomfilter._f_remove(recursive=True)
+
+
     def close(self):
         """Close this column"""
         self.__dict__.clear()
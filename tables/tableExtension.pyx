@@ -34,6 +34,7 @@ from tables.conditions import call_on_recarr
 from tables.utilsExtension import \
      getNestedField, AtomFromHDF5Type, createNestedType
 from tables.utils import SizeType
+from tables.index import _inRanges
 
 from utilsExtension cimport get_native_type
 
@@ -72,7 +73,7 @@ __version__ = "$Revision$"
 # Optimized HDF5 API for PyTables
 cdef extern from "H5TB-opt.h":
 
-  herr_t H5TBOmake_table( char *table_title, hid_t loc_id, char *dset_name,
+  hid_t H5TBOmake_table( char *table_title, hid_t loc_id, char *dset_name,
                           char *version, char *class_,
                           hid_t mem_type_id, hsize_t nrecords,
                           hsize_t chunk_size, void *fill_data, int compress,
@@ -409,13 +410,20 @@ cdef class Table(Leaf):
 
     NumPy to HDF5 conversion is performed when 'sense' is 0.  Otherwise, HDF5
     to NumPy conversion is performed.  The conversion is done in place,
-    i.e. 'recarr' is modified."""
+    i.e. 'recarr' is modified.  'recarr' may have only some of the top-level
+    fields of the table (see `_get_projection()`)."""
+
+    names = recarr.dtype.names
+    if names == self._v_dtype.names:
+      names = None  # all the fields are there
 
     # For reading, first swap the byteorder by hand
     # (this is not currently supported by HDF5)
     if sense == 1:
       for colpathname in self.colpathnames:
         if self.coltypes[colpathname] in ["time32", "time64"]:
+          if names is not None and colpathname.split('/')[0] not in names:
+            continue
           colobj = self.coldescrs[colpathname]
           if hasattr(colobj, "_byteorder"):
             if colobj._byteorder != platform_byteorder:
@@ -425,29 +433,133 @@ cdef class Table(Leaf):
 
     # This should be generalised to support other type conversions.
     for t64cname in self._time64colnames:
+      if names is not None and t64cname.split('/')[0] not in names:
+        continue
       column = getNestedField(recarr, t64cname)
       self._convertTime64_(column, nrecords, sense)
 
 
+  def _get_projection(self, object fields):
+    """Get the dtype and HDF5 memory type for reading only some fields.
+
+    `fields` is a tuple with names of top-level fields, which must be in
+    the same order than in the table.  The memory type is a compound type
+    with only these members, so that HDF5 neither reads nor converts the
+    other ones.  A ``(dtype, type_id)`` tuple is returned, and it is kept
+    in the table for later use.
+    """
+    cdef hid_t type_id, member_type_id
+    cdef int i, nmembers
+    cdef char *colname
+    cdef object dtype, name
+
+    if fields == self._v_dtype.names:
+      return (self._v_dtype, self.type_id)
+    projections = self._v_projections
+    if fields in projections:
+      return projections[fields]
+
+    dtype = numpy.dtype([(name, self._v_dtype[name]) for name in fields])
+    type_id = H5Tcreate(H5T_COMPOUND, dtype.itemsize)
+    nmembers = H5Tget_nmembers(self.type_id)
+    for i from 0 <= i < nmembers:
+      colname = H5Tget_member_name(self.type_id, i)
+      name = colname
+      free(colname)
+      if name in dtype.fields:
+        member_type_id = H5Tget_member_type(self.type_id, i)
+        H5Tinsert(type_id, name, dtype.fields[name][1], member_type_id)
+        H5Tclose(member_type_id)
+    projections[fields] = (dtype, type_id)
+    return (dtype, type_id)
+
+
+  cdef hid_t _get_type_id(self, ndarray recarr) except -1:
+    """Get the HDF5 memory type for reading into `recarr`."""
+    if recarr.dtype is self._v_dtype:
+      return self.type_id
+    return self._get_projection(recarr.dtype.names)[1]
+
+
+  def _g_close(self):
+    # Release the memory types for reading only some fields
+    for dtype, type_id in self._v_projections.values():
+      H5Tclose(type_id)
+    self._v_projections.clear()
+    super(Table, self)._g_close()
+
+
   def _open_append(self, ndarray recarr):
     self._v_recarray = <object>recarr
     # Get the pointer to the buffer data area
     self.wbuf = recarr.data
 
 
-  def _append_records(self, int nrecords):
-    cdef int ret
+  def _convert_records(self, ndarray recarr, hsize_t nrecords, int sense=0):
+    """Convert the first `nrecords` rows of `recarr` to HDF5 format.
+
+    The conversion is from HDF5 format if `sense` is 1.  It is done in
+    place and without using HDF5."""
+    self._convertTypes(recarr, nrecords, sense)
+
+
+  def _append_records(self, int nrecords, object chunks=None):
+    """Append `nrecords` rows from the buffer set by `_open_append()`.
+
+    If `chunks` is not None, the rows are already converted to HDF5
+    format and `chunks` has the ``(filter_mask, data)`` tuples of the
+    whole chunks they fill (see `Leaf._filterChunks()`)."""
     cdef hsize_t nrows
+    cdef long chunkrows, head, ndirect
 
     # Convert some NumPy types to HDF5 before storing.
-    self._convertTypes(self._v_recarray, nrecords, 0)
+    if chunks is None:
+      self._convertTypes(self._v_recarray, nrecords, 0)
+
+    # Buffers prepared by the `_BufferWriter` thread have their whole
+    # chunks filtered already, whatever ``DIRECT_CHUNK_WORKERS`` is.
+    if chunks is not None:
+      chunkrows = self._wholeChunkRows()
+    else:
+      chunkrows = self._directChunkRows()
+    if chunkrows > 0:
+      # The rows filling whole chunks are written directly, and the
+      # ones before and after them, through the filter pipeline.
+      head = (chunkrows - self.nrows % chunkrows) % chunkrows
+      ndirect = (nrecords - head) // chunkrows * chunkrows
+      if ndirect > 0:
+        self._append_pipeline(0, head)
+        nrows = self.nrows
+        if truncate_dset(self.dataset_id, 0, nrows + ndirect) < 0:
+          raise HDF5ExtError("Problems appending the records.")
+        self.nrows = nrows + ndirect
+        if chunks is not None and len(chunks) * chunkrows == ndirect:
+          self._writeFilteredChunks(nrows, chunks)
+        else:
+          self._writeDirectChunks(
+            nrows, self._v_recarray[head:head+ndirect])
+        self._append_pipeline(head + ndirect, nrecords - head - ndirect)
+        return
+    self._append_pipeline(0, nrecords)
+
 
+  cdef _append_pipeline(self, long start, long nrecords):
+    """Append `nrecords` converted rows from `start` in the buffer."""
+    cdef int ret
+    cdef hsize_t nrows
+    cdef long rowsize
+    cdef char *wbuf
+
+    if nrecords <= 0:
+      return
+    rowsize = self._v_recarray.strides[0]
+    wbuf = <char *>self.wbuf + start * rowsize
     nrows = self.nrows
     # release GIL (allow other threads to use the Python interpreter)
     Py_BEGIN_ALLOW_THREADS
     # Append the records:
     ret = H5TBOappend_records(self.dataset_id, self.type_id,
-                              nrecords, nrows, self.wbuf)
+                              nrecords, nrows, wbuf)
     # acquire GIL (disallow other threads from using the Python interpreter)
     Py_END_ALLOW_THREADS
     if ret < 0:
@@ -504,6 +616,101 @@ cdef class Table(Leaf):
 
   def _update_elements(self, hsize_t nrecords, ndarray coords,
                        ndarray recarr):
+    """Write the first `nrecords` rows in `recarr` at `coords`.
+
+    The rows are sorted by their coordinates and grouped by chunk, so
+    that every chunk is read and written (and so decompressed and
+    compressed) only once.  When a coordinate is repeated, the last row
+    for it is written.
+    """
+    if nrecords > 1 and self._chunked:
+      self._update_grouped(nrecords, coords, recarr)
+    else:
+      self._update_points(nrecords, coords, recarr)
+
+
+  cdef _update_grouped(self, hsize_t nrecords, ndarray coords,
+                       ndarray recarr):
+    """Write rows at `coords` with a read-modify-write per chunk."""
+    cdef herr_t ret
+    cdef long nunique, i, lo, hi
+    cdef hsize_t cs, start, stop, count
+    cdef int compressed
+    cdef ndarray buf, srecs, points
+    cdef void *rbuf, *rcoords
+    cdef object order, scoords, last, nchunks, bounds, starts, stops
+    cdef object sparse
+
+    # Sort the rows by coordinate, keeping the last one of repetitions.
+    coords = coords.ravel()[:nrecords]
+    order = numpy.argsort(coords, kind='mergesort')
+    scoords = coords[order]
+    last = numpy.ones(nrecords, dtype=numpy.bool_)
+    last[:-1] = (scoords[1:] != scoords[:-1])
+    order = order[last]
+    scoords = scoords[last]
+    nunique = len(scoords)
+    # A copy with the rows in HDF5 format.
+    srecs = recarr.ravel()[:nrecords][order]
+    self._convertTypes(srecs, nunique, 0)
+
+    # Look for the runs of coordinates in the same chunk.
+    cs = self.chunkshape[0]
+    nchunks = scoords // cs
+    bounds = numpy.flatnonzero(nchunks[1:] != nchunks[:-1]) + 1
+    starts = numpy.concatenate(([0], bounds))
+    stops = numpy.concatenate((bounds, [nunique]))
+
+    compressed = (self.filters.complevel > 0)
+    sparse = []
+    for i from 0 <= i < len(starts):
+      lo = starts[i];  hi = stops[i]
+      # Chunks with just a few rows are written by points if they do
+      # not need to be decompressed.
+      if not compressed and (hi - lo) * 8 < <long>cs:
+        sparse.append(numpy.arange(lo, hi))
+        continue
+      # Read the rows spanned by the coordinates in this chunk, update
+      # them and write them back.
+      start = scoords[lo];  stop = scoords[hi-1] + 1
+      count = stop - start
+      buf = numpy.empty(count, dtype=self._v_dtype)
+      rbuf = buf.data
+      Py_BEGIN_ALLOW_THREADS
+      ret = H5TBOread_records(self.dataset_id, self.type_id,
+                              start, count, rbuf)
+      Py_END_ALLOW_THREADS
+      if ret < 0:
+        raise HDF5ExtError("Problems reading records.")
+      buf[scoords[lo:hi] - start] = srecs[lo:hi]
+      Py_BEGIN_ALLOW_THREADS
+      ret = H5TBOwrite_records(self.dataset_id, self.type_id,
+                               start, count, 1, rbuf)
+      Py_END_ALLOW_THREADS
+      if ret < 0:
+        raise HDF5ExtError("Problems updating the records.")
+
+    if sparse:
+      sparse = numpy.concatenate(sparse)
+      points = numpy.ascontiguousarray(scoords[sparse], dtype=SizeType)
+      buf = srecs[sparse]
+      count = len(points)
+      rcoords = points.data
+      rbuf = buf.data
+      Py_BEGIN_ALLOW_THREADS
+      ret = H5TBOwrite_elements(self.dataset_id, self.type_id,
+                                count, rcoords, rbuf)
+      Py_END_ALLOW_THREADS
+      if ret < 0:
+        raise HDF5ExtError("Problems updating the records.")
+
+    # Set the caches to dirty
+    self._dirtycache = True
+
+
+  cdef _update_points(self, hsize_t nrecords, ndarray coords,
+                      ndarray recarr):
+    """Write rows at `coords` with a point selection."""
     cdef herr_t ret
     cdef void *rbuf, *rcoords
 
@@ -529,28 +736,77 @@ cdef class Table(Leaf):
 
 
   def _read_records(self, hsize_t start, hsize_t nrecords, ndarray recarr):
-    cdef void *rbuf
-    cdef int ret
+    cdef hid_t type_id
 
     # Correct the number of records to read, if needed
     if (start + nrecords) > self.nrows:
       nrecords = self.nrows - start
 
-    # Get the pointer to the buffer data area
-    rbuf = recarr.data
+    # Only the fields in recarr are read
+    type_id = self._get_type_id(recarr)
 
     # Read the records from disk
+    if type_id != self.type_id or not self._read_direct(start, nrecords,
+                                                         recarr):
+      self._read_pipeline(start, nrecords, type_id, recarr.data)
+
+    # Convert some HDF5 types to NumPy after reading.
+    self._convertTypes(recarr, nrecords, 1)
+
+    return nrecords
+
+
+  cdef _read_pipeline(self, hsize_t start, hsize_t nrecords, hid_t type_id,
+                      void *rbuf):
+    """Read `nrecords` from `start` through the filter pipeline."""
+    cdef int ret
+
+    if nrecords == 0:
+      return
     Py_BEGIN_ALLOW_THREADS
-    ret = H5TBOread_records(self.dataset_id, self.type_id, start,
+    ret = H5TBOread_records(self.dataset_id, type_id, start,
                             nrecords, rbuf)
     Py_END_ALLOW_THREADS
     if ret < 0:
       raise HDF5ExtError("Problems reading records.")
 
-    # Convert some HDF5 types to NumPy after reading.
-    self._convertTypes(recarr, nrecords, 1)
 
-    return nrecords
+  cdef int _read_direct(self, hsize_t start, hsize_t nrecords,
+                        ndarray recarr) except -1:
+    """Read whole rows unfiltering whole chunks in parallel threads.
+
+    The rows before and after the chunks fully covered by the read (and
+    those in chunks not written yet) are read through the filter
+    pipeline.  0 is returned without reading anything when there are
+    not at least two whole chunks to be read directly.
+    """
+    cdef hsize_t chunkrows, head, ndirect, i
+    cdef long rowsize
+    cdef char *rbuf
+
+    chunkrows = self._directChunkRows(read=True)
+    if chunkrows == 0 or not (<object>recarr).flags.c_contiguous:
+      return 0
+    head = (chunkrows - start % chunkrows) % chunkrows
+    if head > nrecords:
+      return 0
+    ndirect = (nrecords - head) // chunkrows * chunkrows
+    if ndirect < 2 * chunkrows:
+      return 0
+
+    rbuf = recarr.data
+    rowsize = recarr.strides[0]
+    missing = self._readDirectChunks(start + head,
+                                     recarr[head:head+ndirect])
+    self._read_pipeline(start, head, self.type_id, rbuf)
+    for i in missing:
+      i = head + i * chunkrows
+      self._read_pipeline(start + i, chunkrows, self.type_id,
+                          rbuf + i * rowsize)
+    i = head + ndirect
+    self._read_pipeline(start + i, nrecords - i, self.type_id,
+                        rbuf + i * rowsize)
+    return 1
 
 
   cdef hsize_t _read_chunk(self, hsize_t nchunk, ndarray IObuf, long cstart):
@@ -567,6 +823,10 @@ cdef class Table(Leaf):
     nrecords = chunkshape
     if (start + nrecords) > self.nrows:
       nrecords = self.nrows - start
+    if IObuf.dtype.names != self._v_dtype.names:
+      # The chunk cache keeps whole rows, so read only some fields of
+      # them directly from disk.
+      return self._read_records(start, nrecords, IObuf[cstart:])
     rbuf = <char *>IObuf.data + cstart * chunkcache.itemsize
     # Try to see if the chunk is in cache
     nslot = chunkcache.getslot_(nchunk)
@@ -581,13 +841,117 @@ cdef class Table(Leaf):
       if ret < 0:
         raise HDF5ExtError("Problems reading chunk records.")
       nslot = chunkcache.setitem_(nchunk, rbuf, 0)
+    # The chunk cache keeps the rows in HDF5 format.
+    if self._time64colnames:
+      self._convertTypes(IObuf[cstart:], nrecords, 1)
     return nrecords
 
 
   def _read_elements(self, ndarray coords, ndarray recarr):
+    """Read the rows at `coords` into `recarr`.
+
+    `coords` must be a contiguous array of ``SizeType`` coordinates in
+    any order.  Coordinates are sorted and deduplicated, and the rows
+    in the same chunk are read together, so that every chunk is read
+    (and decompressed) only once.  The rows are scattered back into
+    `recarr` in the order of `coords`.  The number of rows read is
+    returned.
+    """
+    cdef long nrecords
+
+    nrecords = coords.size
+    if nrecords > 1 and self._chunked:
+      return self._read_grouped(coords, recarr)
+    return self._read_points(coords, recarr)
+
+
+  cdef long _read_grouped(self, ndarray coords, ndarray recarr) except -1:
+    """Read the rows at `coords` into `recarr` a chunk at a time."""
+    cdef long nrecords, nunique, i, lo, hi, nslot
+    cdef hsize_t cs, start, nrows, nchunkrows
+    cdef int ret, usecache, compressed
+    cdef void *rbuf
+    cdef ndarray chunkbuf
+    cdef NumCache chunkcache
+    cdef object ucoords, inverse, ubuf, nchunks, bounds, starts, stops
+    cdef object sparse, points, pointbuf
+
+    nrecords = coords.size
+    ucoords, inverse = numpy.unique(coords, return_inverse=True)
+    nunique = len(ucoords)
+    nrows = self.nrows
+    if ucoords[nunique-1] >= nrows:
+      # Let HDF5 complain about coordinates out of range.
+      return self._read_points(coords, recarr)
+    if nunique == nrecords and (ucoords == coords).all():
+      # Sorted coordinates with no repetitions: no need to scatter them.
+      ubuf = recarr
+    else:
+      ubuf = numpy.empty(nunique, dtype=recarr.dtype)
+
+    # Look for the runs of coordinates in the same chunk.
+    cs = self.chunkshape[0]
+    nchunks = ucoords // cs
+    bounds = numpy.flatnonzero(nchunks[1:] != nchunks[:-1]) + 1
+    starts = numpy.concatenate(([0], bounds))
+    stops = numpy.concatenate((bounds, [nunique]))
+
+    # The chunk cache keeps whole rows in HDF5 format.
+    chunkcache = None
+    usecache = (recarr.dtype == self._v_dtype and not self._dirtycache
+                and getattr(self, '_chunkcache', None) is not None)
+    if usecache:
+      chunkcache = self._chunkcache
+      usecache = (chunkcache.slotsize == cs)
+    compressed = (self.filters.complevel > 0)
+    chunkbuf = numpy.empty(cs, dtype=recarr.dtype)
+    rbuf = chunkbuf.data
+    sparse = []
+    for i from 0 <= i < len(starts):
+      lo = starts[i];  hi = stops[i]
+      # Chunks with just a few rows are read by points if they do not
+      # need to be decompressed.
+      if not compressed and (hi - lo) * 8 < <long>cs:
+        sparse.append(numpy.arange(lo, hi))
+        continue
+      start = nchunks[lo] * cs
+      nchunkrows = cs
+      if start + cs > nrows:
+        nchunkrows = nrows - start
+      if usecache:
+        nslot = chunkcache.getslot_(nchunks[lo])
+        if nslot >= 0:
+          chunkcache.getitem_(nslot, chunkbuf.data, 0)
+        else:
+          Py_BEGIN_ALLOW_THREADS
+          ret = H5TBOread_records(self.dataset_id, self.type_id,
+                                  start, nchunkrows, rbuf)
+          Py_END_ALLOW_THREADS
+          if ret < 0:
+            raise HDF5ExtError("Problems reading chunk records.")
+          chunkcache.setitem_(nchunks[lo], chunkbuf.data, 0)
+        self._convertTypes(chunkbuf, nchunkrows, 1)
+      else:
+        self._read_records(start, nchunkrows, chunkbuf)
+      ubuf[lo:hi] = chunkbuf[ucoords[lo:hi] - start]
+
+    if sparse:
+      sparse = numpy.concatenate(sparse)
+      points = numpy.ascontiguousarray(ucoords[sparse], dtype=SizeType)
+      pointbuf = numpy.empty(len(points), dtype=recarr.dtype)
+      self._read_points(points, pointbuf)
+      ubuf[sparse] = pointbuf
+    if ubuf is not recarr:
+      recarr[:nrecords] = ubuf[inverse]
+    return nrecords
+
+
+  cdef object _read_points(self, ndarray coords, ndarray recarr):
+    """Read the rows at `coords` into `recarr` with a point selection."""
     cdef long nrecords
     cdef void *rbuf, *rbuf2
     cdef int ret
+    cdef hid_t type_id
 
     # Get the chunk of the coords that correspond to a buffer
     nrecords = coords.size
@@ -595,9 +959,11 @@ cdef class Table(Leaf):
     rbuf = recarr.data
     # Get the pointer to the buffer coords area
     rbuf2 = coords.data
+    # Only the fields in recarr are read
+    type_id = self._get_type_id(recarr)
 
     Py_BEGIN_ALLOW_THREADS
-    ret = H5TBOread_elements(self.dataset_id, self.type_id,
+    ret = H5TBOread_elements(self.dataset_id, type_id,
                              nrecords, rbuf2, rbuf)
     Py_END_ALLOW_THREADS
     if ret < 0:
@@ -693,6 +1059,7 @@ cdef class Row:
   cdef int     ro_filemode, chunked
   cdef int     _bufferinfo_done, sss_on
   cdef int     iterseqMaxElements
+  cdef int     projected
   cdef ndarray bufcoords, indexValid, indexValues, chunkmap
   cdef hsize_t *bufcoordsData, *indexValuesData
   cdef char    *chunkmapData, *indexValidData
@@ -707,6 +1074,11 @@ cdef class Row:
   cdef object  _tableFile, _tablePath
   cdef object  modified_fields
   cdef object  seq_available
+  cdef object  prefetcher
+  cdef object  deleted
+  cdef long long *delstartsData
+  cdef long long *delstopsData
+  cdef hsize_t ndelranges
 
   # The nrow() method has been converted into a property, which is handier
   property nrow:
@@ -783,21 +1155,44 @@ cdef class Row:
       self.wfields[name] = self.wrec[name]
 
     # Get the read buffer for this instance (it is private, remember!)
-    buff = self.IObuf = table._get_container(self.nrowsinbuf)
+    self._newReadBuffer(table._get_container(self.nrowsinbuf))
+    # The rowsize
+    self._rowsize = self.dtype.itemsize
+    self.nrows = table.nrows  # This value may change
+
+
+  cdef _newReadBuffer(self, buff):
+    """Use the `buff` recarray as the read buffer"""
+
+    self.IObuf = buff
+    self.IObufcpy = None
+    self.projected = (buff.dtype.names != self.dtype.names)
     # Build the rfields dictionary for faster access to columns
     # This is quite fast, as it only takes around 5 us per column
     # in my laptop (Pentium 4 @ 2 GHz).
     # F. Alted 2006-08-18
     self.rfields = {}
     for i, name in enumerate(self.dtype.names):
-      self.rfields[i] = buff[name]
-      self.rfields[name] = buff[name]
+      if name in buff.dtype.fields:
+        self.rfields[i] = buff[name]
+        self.rfields[name] = buff[name]
+    self.rfieldscache = {}
 
     # Get the stride of these buffers
     self._stride = buff.strides[0]
-    # The rowsize
-    self._rowsize = self.dtype.itemsize
-    self.nrows = table.nrows  # This value may change
+
+
+  def _set_fields(self, fields):
+    """Read only some top-level `fields` of the rows (all if None).
+
+    This must be called before starting the iteration.  Rows read in
+    this way can not be updated.
+    """
+    table = self.table
+    if fields is None:
+      self._newReadBuffer(table._get_container(self.nrowsinbuf))
+    else:
+      self._newReadBuffer(table._get_container(self.nrowsinbuf, fields))
 
 
   cdef _initLoop(self, hsize_t start, hsize_t stop, hsize_t step,
@@ -819,18 +1214,35 @@ cdef class Row:
 
     self.nrows = table.nrows   # Update the row counter
 
+    # The rows deleted lazily are skipped.
+    self.deleted = table._getDeletedRanges()
+    if self.deleted is None:
+      self.ndelranges = 0
+    else:
+      self.deleted = (
+        numpy.ascontiguousarray(self.deleted[0], dtype='int64'),
+        numpy.ascontiguousarray(self.deleted[1], dtype='int64') )
+      self.delstartsData = <long long *>(<ndarray>self.deleted[0]).data
+      self.delstopsData = <long long *>(<ndarray>self.deleted[1]).data
+      self.ndelranges = len(self.deleted[0])
+
+    if table._whereCondition:
+      self.whereCond = 1
+      self.condfunc, self.condargs = table._whereCondition
+      table._whereCondition = None
+
     if coords is not None:
       self.nrowsread = start
       self.nextelement = start
       self.stop = min(stop, len(coords))
       self.absstep = abs(step)
+      if self.whereCond:
+        # The coordinates come from an index: the rows satisfying the
+        # condition are fed into the sequence cache.
+        self.iterseqMaxElements = table._v_file.params['ITERSEQ_MAX_ELEMENTS']
+        self.seq_available = True
       return
 
-    if table._whereCondition:
-      self.whereCond = 1
-      self.condfunc, self.condargs = table._whereCondition
-      table._whereCondition = None
-
     if table._useIndex:
       self.indexed = 1
       # Compute totalchunks here because self.nrows can change during the
@@ -849,6 +1261,36 @@ cdef class Row:
       self.iterseqMaxElements = table._v_file.params['ITERSEQ_MAX_ELEMENTS']
       self.seq_available = True
 
+  cdef int _is_deleted(self, hsize_t nrow):
+    """Has the `nrow` row been deleted lazily?"""
+    cdef hsize_t lo, hi, mid
+
+    # Look for the last range starting at or before `nrow`.
+    lo = 0;  hi = self.ndelranges
+    while lo < hi:
+      mid = (lo + hi) / 2
+      if self.delstartsData[mid] <= <long long>nrow:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo > 0 and <long long>nrow < self.delstopsData[lo-1]
+
+
+  cdef object _skip_deleted(self, object buffer_):
+    """Remove the rows deleted lazily from a `_fetch_buffer()` result."""
+    cdef object coords, records, keep
+
+    coords, records = buffer_
+    if len(coords) == 0:
+      return buffer_
+    keep = ~_inRanges(self.deleted, coords.astype('int64'))
+    if keep.all():
+      return buffer_
+    if records is not None:
+      records = records[keep]
+    return (coords[keep], records)
+
+
   def __next__(self):
     """next() method for __iter__() that is called on each iteration"""
     if not self._riterator:
@@ -872,9 +1314,6 @@ cdef class Row:
     cdef Table table
     cdef ndarray IObuf
     cdef void *IObufData
-    cdef long nslot
-    cdef object seq
-    cdef ObjectCache seqcache
 
     assert self.nrowsinbuf >= self.chunksize
     while self.nextelement < self.stop:
@@ -929,19 +1368,7 @@ cdef class Row:
         self._row = -1
 
         # Feed the indexValues into the seqcache
-        seqcache = table._seqcache
-        nslot = table._nslotseq
-        # See if we have a buffer available to place results
-        if nslot >= 0 and self.seq_available:
-          seq = seqcache.getitem_(nslot)
-          if self.lenbuf + len(seq) < self.iterseqMaxElements:
-            seq.extend(self.indexValues)
-            # Update the size of sequence in cache
-            # Each element in indexValues should take at least 8 bytes
-            seqcache.rsizes[nslot] = len(seq) * 8
-          else:
-            seqcache.removeslot_(nslot)
-            self.seq_available = False
+        self._feed_seqcache(table, self.indexValues)
 
       self._row = self._row + 1
       # Check whether we have read all the rows in buf
@@ -963,12 +1390,52 @@ cdef class Row:
           continue
       # Return this row
       self.nextelement = self._nrow + 1
+      if self.ndelranges and self._is_deleted(self._nrow):
+        continue
       return self
     else:
       # All the elements have been read for this mode
       self._finish_riterator()
 
 
+  cdef long _select_coords(self, long recout):
+    """Keep the rows in the I/O buffer that satisfy the condition.
+
+    The coordinates of the selected rows are kept in `bufcoords` and
+    fed into the sequence cache.  The number of selected rows is
+    returned.
+    """
+    cdef object valid
+
+    valid = call_on_recarr(self.condfunc, self.condargs, self.IObuf[:recout])
+    self.bufcoords = self.bufcoords[valid]
+    recout = self.bufcoords.size
+    self.IObuf[:recout] = self.IObuf[:len(valid)][valid]
+    self._feed_seqcache(self.table, self.bufcoords)
+    return recout
+
+
+  cdef _feed_seqcache(self, Table table, object indexValues):
+    """Add the coordinates in `indexValues` to the sequence cache."""
+    cdef long nslot
+    cdef object seq
+    cdef ObjectCache seqcache
+
+    seqcache = table._seqcache
+    nslot = table._nslotseq
+    # See if we have a buffer available to place results
+    if nslot >= 0 and self.seq_available:
+      seq = seqcache.getitem_(nslot)
+      if len(indexValues) + len(seq) < self.iterseqMaxElements:
+        seq.extend(indexValues)
+        # Update the size of sequence in cache
+        # Each element in indexValues should take at least 8 bytes
+        seqcache.rsizes[nslot] = len(seq) * 8
+      else:
+        seqcache.removeslot_(nslot)
+        self.seq_available = False
+
+
   cdef __next__coords(self):
     """The version of next() for user-required coordinates"""
     cdef int recout
@@ -988,16 +1455,27 @@ cdef class Row:
         self._row = -1
         if self.bufcoords.size > 0:
           recout = self.table._read_elements(self.bufcoords, self.IObuf)
+          if self.whereCond:
+            recout = self._select_coords(recout)
         else:
           recout = 0
         self.bufcoordsData = <hsize_t*>self.bufcoords.data
+        self.lenbuf = recout
         self.nrowsread = self.nrowsread + lenbuf
         if recout == 0:
           # no items were read, skip out
+          self.nextelement = self.nrowsread
           continue
       self._row = self._row + 1
+      if self._row == self.lenbuf:
+        # Some coordinates have been discarded by the condition
+        self.nextelement = self.nrowsread
+        self._row = self._row - 1
+        continue
       self._nrow = self.bufcoordsData[self._row]
       self.nextelement = self.nextelement + self.absstep
+      if self.ndelranges and self._is_deleted(self._nrow):
+        continue
       return self
     else:
       # All the elements have been read for this mode
@@ -1054,6 +1532,8 @@ cdef class Row:
       # Return only if this value is interesting
       self.indexChunk = self.indexChunk + self.step
       if self.indexValidData[self.indexChunk]:
+        if self.ndelranges and self._is_deleted(self._nrow):
+          continue
         return self
     else:
       self._finish_riterator()
@@ -1087,12 +1567,276 @@ cdef class Row:
         self.startb = (self._row + self.step) % self.nrowsinbuf
 
       self.nextelement = self._nrow + self.step
+      if self.ndelranges and self._is_deleted(self._nrow):
+        continue
       # Return this value
       return self
     else:
       self._finish_riterator()
 
 
+  def _fetch_buffer(self, getrecords=True):
+    """Get the rows selected in the next I/O buffer of this iterator.
+
+    This is the buffered counterpart of `__next__()`.  Instead of
+    positioning the row on every selected row, all the selected rows
+    in a whole I/O buffer are returned at once as a ``(coords,
+    records)`` tuple, where `coords` is an array with the row
+    coordinates and `records` is a record array (a copy) with the
+    contents of these rows.  If `getrecords` is false, only the
+    coordinates are collected and `records` is None.  When the
+    iterator is exhausted, None is returned.
+    """
+    cdef object buffer_
+
+    while True:
+      if not self._riterator:
+        return None
+      if self.indexed:
+        buffer_ = self._fetch_buffer_indexed(getrecords)
+      elif self.coords is not None:
+        buffer_ = self._fetch_buffer_coords(getrecords)
+      elif self.prefetcher is not None:
+        buffer_ = self._fetch_buffer_prefetched(getrecords)
+      elif self.whereCond:
+        buffer_ = self._fetch_buffer_inKernel(getrecords)
+      else:
+        buffer_ = self._fetch_buffer_general(getrecords)
+      if buffer_ is None or not self.ndelranges:
+        return buffer_
+      # Skip the rows deleted lazily, and buffers with none left.
+      buffer_ = self._skip_deleted(buffer_)
+      if len(buffer_[0]) > 0:
+        return buffer_
+
+
+  cdef _fetch_buffer_indexed(self, int getrecords):
+    """The version of _fetch_buffer() for indexed columns and a chunkmap."""
+    cdef long recout, nrecords
+    cdef hsize_t nchunk, cs, nrowsinbuf
+    cdef Table table
+    cdef ndarray IObuf
+    cdef object valid, positions, coords, keep
+
+    table = self.table
+    cs = self.chunksize
+    # Every fill takes whole chunks, so the I/O buffer must have room
+    # for at least one of them.
+    nrowsinbuf = self.nrowsinbuf
+    if nrowsinbuf < cs:
+      nrowsinbuf = cs
+    if len(self.IObuf) < nrowsinbuf:
+      self._newReadBuffer(numpy.empty(nrowsinbuf, dtype=self.IObuf.dtype))
+    IObuf = self.IObuf
+    # Start at the chunk where interesting information begins
+    nchunk = self.nrowsread / cs
+    if nchunk < self.start / cs:
+      nchunk = self.start / cs
+    while nchunk < self.totalchunks and nchunk * cs < self.stop:
+      recout = 0
+      self.bufcoords = numpy.empty(nrowsinbuf, dtype=SizeType)
+      # Fetch valid chunks until the I/O buffer is full
+      while (nchunk < self.totalchunks and nchunk * cs < self.stop and
+             recout + cs <= nrowsinbuf):
+        if self.chunkmapData[nchunk]:
+          nrecords = table._read_chunk(nchunk, IObuf, recout)
+          self.bufcoords[recout:recout+nrecords] = numpy.arange(
+            nchunk * cs, nchunk * cs + nrecords, dtype=SizeType)
+          recout = recout + nrecords
+        nchunk = nchunk + 1
+      self.nrowsread = nchunk * cs
+      if recout == 0:
+        continue
+
+      # Evaluate the condition on this table fragment.
+      valid = call_on_recarr(self.condfunc, self.condargs, IObuf[:recout])
+      positions = valid.nonzero()[0]
+      coords = self.bufcoords[positions]
+      # Feed the valid coordinates into the seqcache
+      self._feed_seqcache(table, coords)
+      # Check additional conditions on start, stop, step params
+      if self.sss_on:
+        keep = (coords >= self.start) & (coords < self.stop)
+        if self.step > 1:
+          keep &= ((coords - self.start) % self.step == 0)
+        positions = positions[keep]
+        coords = coords[keep]
+      if len(positions) > 0:
+        if not getrecords:
+          return coords, None
+        return coords, IObuf[positions]
+    self._finish_fetch_buffer()
+
+
+  cdef _fetch_buffer_coords(self, int getrecords):
+    """The version of _fetch_buffer() for user-required coordinates."""
+    cdef long long lenbuf
+    cdef long recout
+    cdef object coords
+
+    while self.nrowsread < self.stop:
+      # Correction for avoiding reading past self.stop
+      if self.nrowsread + self.nrowsinbuf > self.stop:
+        lenbuf = self.stop - self.nrowsread
+      else:
+        lenbuf = self.nrowsinbuf
+      coords = self.coords[self.nrowsread:self.nrowsread+lenbuf:self.step]
+      self.nrowsread = self.nrowsread + lenbuf
+      # We have to get a contiguous buffer, so numpy.array is the way to go
+      self.bufcoords = numpy.array(coords, dtype="uint64")
+      if self.bufcoords.size == 0:
+        continue
+      if not getrecords and not self.whereCond:
+        return self.bufcoords.astype(SizeType), None
+      recout = self.table._read_elements(self.bufcoords, self.IObuf)
+      if self.whereCond:
+        recout = self._select_coords(recout)
+        if recout == 0:
+          continue
+        if not getrecords:
+          return self.bufcoords.astype(SizeType), None
+      return self.bufcoords.astype(SizeType), self.IObuf[:recout].copy()
+    self._finish_fetch_buffer()
+
+
+  cdef _fetch_buffer_inKernel(self, int getrecords):
+    """The version of _fetch_buffer() in case of in-kernel conditions."""
+    cdef hsize_t recout, lenbuf, startb
+    cdef object valid, positions
+
+    self.nextelement = self._nrow + self.step
+    while self.nextelement < self.stop:
+      startb = self.nextelement
+      recout = self.table._read_records(startb, self.nrowsinbuf, self.IObuf)
+      lenbuf = recout
+      if startb + lenbuf > self.stop:
+        lenbuf = self.stop - startb
+      # Remember the last row that has been considered in this buffer
+      self._nrow = startb + ((lenbuf - 1) / self.step) * self.step
+      self.nextelement = self._nrow + self.step
+
+      # Evaluate the condition on this table fragment.
+      valid = call_on_recarr(
+        self.condfunc, self.condargs, self.IObuf[:lenbuf])
+      if self.step > 1:
+        positions = numpy.arange(0, lenbuf, self.step)
+        positions = positions[valid[::self.step]]
+      else:
+        positions = valid.nonzero()[0]
+      if len(positions) > 0:
+        if not getrecords:
+          return positions.astype(SizeType) + startb, None
+        return positions.astype(SizeType) + startb, self.IObuf[positions]
+    self._finish_fetch_buffer()
+
+
+  cdef _fetch_buffer_prefetched(self, int getrecords):
+    """The version of _fetch_buffer() for prefetched buffers.
+
+    The condition, if any, is evaluated on every buffer.
+    """
+    cdef hsize_t lenbuf, startb, offset
+    cdef object buffer_, records, valid, positions
+
+    while True:
+      buffer_ = self.prefetcher.next()
+      if buffer_ is None:
+        break
+      startb, records = buffer_
+      lenbuf = len(records)
+      # Offset of the first row in this buffer that is in the range step
+      offset = (self.step - (startb - self.start) % self.step) % self.step
+      if offset >= lenbuf:
+        continue
+      # Remember the last row that has been considered in this buffer
+      self._nrow = (startb + offset +
+                    ((lenbuf - offset - 1) / self.step) * self.step)
+
+      if not self.whereCond:
+        # All the rows in the range step are selected.
+        positions = numpy.arange(offset, lenbuf, self.step)
+        if not getrecords:
+          return positions.astype(SizeType) + startb, None
+        if self.step == 1:
+          return positions.astype(SizeType) + startb, records
+        return positions.astype(SizeType) + startb, records[positions]
+
+      # Evaluate the condition on this table fragment.
+      valid = call_on_recarr(self.condfunc, self.condargs, records)
+      if self.step > 1:
+        positions = numpy.arange(offset, lenbuf, self.step)
+        positions = positions[valid[offset::self.step]]
+      else:
+        positions = valid.nonzero()[0]
+      if len(positions) > 0:
+        if not getrecords:
+          return positions.astype(SizeType) + startb, None
+        return positions.astype(SizeType) + startb, records[positions]
+    self._finish_fetch_buffer()
+
+
+  def _start_prefetch(self, factory):
+    """Read the I/O buffers of a sequential iterator ahead of time.
+
+    `factory` is called with the table, the range of rows still to be
+    scanned and the fields to read (None for all of them), as
+    ``factory(table, start, stop, fields)``.  It must return an
+    object whose `next()` method returns ``(start, records)`` buffers
+    in row order (or None when exhausted), and whose `close()` method
+    stops the reading.  Only `_fetch_buffer()` uses these buffers.
+
+    Returns true if buffers are going to be prefetched.
+    """
+    if not (self._riterator and not self.indexed and self.coords is None):
+      return False
+    self._stop_prefetch()
+    fields = None
+    if self.projected:
+      fields = self.IObuf.dtype.names
+    self.prefetcher = factory(self.table, self._nrow + self.step, self.stop,
+                              fields)
+    return True
+
+
+  def _stop_prefetch(self):
+    """Stop reading buffers ahead of time (if that was the case)."""
+    if self.prefetcher is not None:
+      self.prefetcher.close()
+      self.prefetcher = None
+
+
+  cdef _fetch_buffer_general(self, int getrecords):
+    """The version of _fetch_buffer() for the general cases."""
+    cdef hsize_t recout, lenbuf, startb
+
+    self.nextelement = self._nrow + self.step
+    if self.nextelement < self.stop:
+      startb = self.nextelement
+      if getrecords:
+        recout = self.table._read_records(startb, self.nrowsinbuf, self.IObuf)
+      else:
+        recout = self.nrowsinbuf  # no need to touch the disk
+      lenbuf = recout
+      if startb + lenbuf > self.stop:
+        lenbuf = self.stop - startb
+      self._nrow = startb + ((lenbuf - 1) / self.step) * self.step
+      self.nextelement = self._nrow + self.step
+      if not getrecords:
+        return (numpy.arange(startb, startb + lenbuf, self.step,
+                             dtype=SizeType), None)
+      return (numpy.arange(startb, startb + lenbuf, self.step, dtype=SizeType),
+              self.IObuf[:lenbuf:self.step].copy())
+    self._finish_fetch_buffer()
+
+
+  cdef _finish_fetch_buffer(self):
+    """Clean-up things after a buffered iteration has been done."""
+
+    self._stop_prefetch()
+    self._riterator = 0        # out of iterator
+    return None
+
+
   cdef _finish_riterator(self):
     """Clean-up things after iterator has been done"""
 
@@ -1101,7 +1845,11 @@ cdef class Row:
     # Make a copy of the last read row in the private record
     # (this is useful for accessing the last row after an iterator loop)
     if self._row >= 0:
-      self.wrec[:] = self.IObuf[self._row]
+      if self.projected:
+        for name in self.IObuf.dtype.names:
+          self.wrec[name] = self.IObuf[name][self._row]
+      else:
+        self.wrec[:] = self.IObuf[self._row]
     self._riterator = 0        # out of iterator
     if self._mod_nrows > 0:    # Check if there is some modified row
       self._flushModRows()     # Flush any possible modified row
@@ -1113,10 +1861,17 @@ cdef class Row:
     """Read a field from a table on disk and put the result in result"""
     cdef hsize_t startr, stopr, i, j, istartb, istopb
     cdef hsize_t istart, istop, istep, inrowsinbuf, inextelement, inrowsread
-    cdef object fields
+    cdef object fields, IObuf
 
     # We can't reuse existing buffers in this context
     self._initLoop(start, stop, step, None, None)
+    # Read only the fields that are needed
+    IObuf = self.IObuf
+    if field:
+      IObuf = self.table._get_container(
+        self.nrowsinbuf, (field.split('/')[0],))
+    elif result.dtype.names != self.dtype.names:
+      IObuf = self.table._get_container(self.nrowsinbuf, result.dtype.names)
     istart, istop, istep = (self.start, self.stop, self.step)
     inrowsinbuf, inextelement, inrowsread = (self.nrowsinbuf, istart, istart)
     istartb, startr = (self.startb, 0)
@@ -1133,9 +1888,9 @@ cdef class Row:
       stopr = startr + ((istopb - istartb - 1) / istep) + 1
       # Read a chunk
       inrowsread = inrowsread + self.table._read_records(i, inrowsinbuf,
-                                                         self.IObuf)
+                                                         IObuf)
       # Assign the correct part to result
-      fields = self.IObuf
+      fields = IObuf
       if field:
         fields = getNestedField(fields, field)
       result[startr:stopr] = fields[istartb:istopb:istep]
@@ -1197,9 +1952,18 @@ cdef class Row:
     wreccpy = <ndarray>self.wreccpy
     memcpy(wrec.data, wreccpy.data, self._rowsize)
     self._unsaved_nrows = self._unsaved_nrows + 1
-    # When the buffer is full, flush it
+    # When the buffer is full, save it (maybe in the background)
     if self._unsaved_nrows == self.nrowsinbuf:
-      self._flushBufferedRows()
+      self._queueBufferedRows()
+
+
+  cdef _queueBufferedRows(self):
+    """Save the full write buffer, or hand it to the background writer."""
+    buff = self.table._queueBufferedRows(self.IObuf, self._unsaved_nrows)
+    if buff is not None:
+      # Go on with an empty buffer while the full one is being saved.
+      self._newReadBuffer(buff)
+    self._unsaved_nrows = 0
 
 
   def _flushBufferedRows(self):
@@ -1258,6 +2022,9 @@ cdef class Row:
     if not self._riterator:
       raise NotImplementedError("You are only allowed to update rows through the Row.update() method if you are in the middle of a table iterator.")
 
+    if self.projected:
+      raise NotImplementedError("You are not allowed to update rows read with a selection of fields.")
+
     if self.mod_elements is None:
       # Initialize an array for keeping the modified elements
       # (just in case Row.update() would be used)
@@ -1286,6 +2053,8 @@ cdef class Row:
     table = self.table
     # Save the records on disk
     table._update_elements(self._mod_nrows, self.mod_elements, self.IObufcpy)
+    table._updateZoneMaps(self.modified_fields,
+                          coords=self.mod_elements[:self._mod_nrows])
     # Reset the counter of modified rows to 0
     self._mod_nrows = 0
     # Mark the modified fields' indexes as dirty.
@@ -34,6 +34,7 @@ def suite():
         'tables.tests.test_lists',
         'tables.tests.test_tables',
         'tables.tests.test_tablesMD',
+        'tables.tests.test_ctable',
         'tables.tests.test_array',
         'tables.tests.test_earray',
         'tables.tests.test_carray',
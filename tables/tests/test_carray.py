@@ -2410,6 +2410,47 @@ class MDLargeAtomReopen(MDLargeAtomTestCase):
 
 
 
+class DirectChunkWriteTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def test00_setitem(self):
+        """Writing whole chunks bypassing the filters."""
+
+        filters = Filters(complevel=1, complib='zlib', shuffle=True)
+        arrays = []
+        for nworkers in [0, 2]:
+            self.h5file.params['DIRECT_CHUNK_WORKERS'] = nworkers
+            carray = self.h5file.createCArray(
+                '/', 'test%d' % nworkers, Int16Atom(), (100, 2),
+                filters=filters, chunkshape=(16, 2))
+            carray[5:90] = numpy.arange(170).reshape(85, 2)
+            carray[32:64] = -numpy.arange(64).reshape(32, 2)
+            carray[70:71, 1:] = [[7]]
+            arrays.append(carray)
+        expected = numpy.zeros((100, 2), dtype='int16')
+        expected[5:90] = numpy.arange(170).reshape(85, 2)
+        expected[32:64] = -numpy.arange(64).reshape(32, 2)
+        expected[70, 1] = 7
+        self.assertTrue(allequal(arrays[0][:], expected))
+        self.assertTrue(allequal(arrays[1][:], expected))
+
+
+    def test01_readSparse(self):
+        """Reading whole chunks, some of them never written."""
+
+        filters = Filters(complevel=1, complib='zlib', shuffle=True)
+        carray = self.h5file.createCArray(
+            '/', 'test', Int16Atom(), (100, 2), filters=filters,
+            chunkshape=(16, 2))
+        carray[:20] = numpy.arange(40).reshape(20, 2)
+        carray[60:70] = -numpy.arange(20).reshape(10, 2)
+        expected = carray[:]
+        self.h5file.params['DIRECT_CHUNK_WORKERS'] = 2
+        self.assertTrue(allequal(carray[:], expected))
+        self.assertTrue(allequal(carray[3:97], expected[3:97]))
+        self.assertTrue(allequal(carray.read(10, 90), expected[10:90]))
+
+
+
 #----------------------------------------------------------------------
 
 
@@ -2486,6 +2527,7 @@ def suite():
         theSuite.addTest(unittest.makeSuite(TruncateTestCase))
         theSuite.addTest(unittest.makeSuite(MDAtomNoReopen))
         theSuite.addTest(unittest.makeSuite(MDAtomReopen))
+        theSuite.addTest(unittest.makeSuite(DirectChunkWriteTestCase))
         theSuite.addTest(unittest.makeSuite(MDLargeAtomNoReopen))
         theSuite.addTest(unittest.makeSuite(MDLargeAtomReopen))
     if common.heavy:
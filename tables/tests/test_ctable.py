@@ -0,0 +1,399 @@
+import unittest
+
+import numpy
+
+from tables import *
+from tables.utils import SizeType
+from tables.tests import common
+from tables.tests.common import allequal
+
+# To delete the internal attributes automagically
+unittest.TestCase.tearDown = common.cleanup
+
+
+class Record(IsDescription):
+    id = IntCol(pos=0)
+    v1 = FloatCol(pos=1)
+    v2 = StringCol(itemsize=8, pos=2)
+    t = Time64Col(pos=3)
+    class nested(IsDescription):
+        _v_pos = 4
+        x = Int16Col()
+        y = Float32Col()
+    md = Int16Col(shape=(2,), pos=5)
+
+
+class BasicTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests for reading and querying `CTable` objects."""
+
+    nrowsinbuf = None
+    reopen = False
+
+
+    def setUp(self):
+        super(BasicTestCase, self).setUp()
+        ctable = self.h5file.createCTable(
+            '/', 'test', Record, title="A column-oriented table",
+            filters=Filters(complevel=1),
+            colfilters={'v2': Filters(complevel=5, shuffle=False)} )
+        self.nrows = nrows = 1000
+        ctable.append([ (i, i*.5, str(i), i+.25, (i%100, i*2), (i, -i))
+                        for i in xrange(nrows) ])
+        if self.reopen:
+            self._reopen()
+            ctable = self.h5file.root.test
+        if self.nrowsinbuf is not None:
+            ctable._v_nrowsinbuf = self.nrowsinbuf
+        self.ctable = ctable
+        self.data = numpy.rec.array(
+            [ (i, i*.5, str(i), i+.25, (i%100, i*2), (i, -i))
+              for i in xrange(nrows) ],
+            dtype=Description(Record().columns)._v_dtype )
+
+
+    def test00_attributes(self):
+        """Checking the attributes of a `CTable`."""
+
+        ctable = self.ctable
+        self.assertTrue(isinstance(ctable, CTable))
+        self.assertEqual(ctable.nrows, self.nrows)
+        self.assertEqual(len(ctable), self.nrows)
+        self.assertEqual(ctable.dtype, self.data.dtype)
+        self.assertEqual(ctable.colnames,
+                         ['id', 'v1', 'v2', 't', 'nested', 'md'])
+        self.assertEqual(ctable.colpathnames,
+                         ['id', 'v1', 'v2', 't', 'nested/x', 'nested/y',
+                          'md'])
+        self.assertEqual(ctable.coltypes['t'], 'time64')
+        self.assertEqual(ctable._v_title, "A column-oriented table")
+        # Every column can have its own filters.
+        self.assertEqual(ctable.cols.v1.filters.complevel, 1)
+        self.assertEqual(ctable.cols.v2.filters.complevel, 5)
+        self.assertEqual(ctable.cols.nested.y.filters.complevel, 1)
+        self.assertTrue(ctable.cols._f_col('nested/x') is
+                        ctable.cols.nested.x)
+        self.assertRaises(AttributeError, getattr, ctable.cols, 'foo')
+
+
+    def test01_read(self):
+        """Reading rows and columns of a `CTable`."""
+
+        ctable, data = self.ctable, self.data
+        self.assertTrue(allequal(ctable.read(), data))
+        self.assertTrue(allequal(ctable.read(3, 900, 7), data[3:900:7]))
+        self.assertTrue(allequal(ctable.read(field='v2'), data['v2']))
+        self.assertTrue(allequal(ctable.read(field='nested'),
+                                 data['nested']))
+        self.assertTrue(allequal(ctable.read(field='nested/y'),
+                                 data['nested']['y']))
+        result = ctable.read(fields=['md', 'nested/x'])
+        self.assertEqual(result.dtype.names, ('nested', 'md'))
+        self.assertTrue(allequal(result['md'], data['md']))
+        self.assertEqual(len(ctable.read(5, 5)), 0)
+        self.assertRaises(KeyError, ctable.read, field='foo')
+        self.assertRaises(ValueError, ctable.read, field='id', fields=['v1'])
+
+
+    def test02_getitem(self):
+        """Getting rows of a `CTable` with ``__getitem__()``."""
+
+        ctable, data = self.ctable, self.data
+        self.assertEqual(ctable[3], data[3])
+        self.assertEqual(ctable[-1], data[-1])
+        self.assertTrue(allequal(ctable[10:20:3], data[10:20:3]))
+        self.assertTrue(allequal(ctable[[5, 1, 7]], data[[5, 1, 7]]))
+        self.assertTrue(allequal(ctable.readCoordinates([5, 1, 7], 'md'),
+                                 data['md'][[5, 1, 7]]))
+        # Coordinates spread over several chunks, in any order.
+        coords = range(0, self.nrows, 37) + range(self.nrows-1, 0, -61)
+        self.assertTrue(allequal(ctable[coords], data[coords]))
+        self.assertRaises(IndexError, ctable.__getitem__, self.nrows)
+
+
+    def test03_iterrows(self):
+        """Iterating over the rows of a `CTable`."""
+
+        ctable, data = self.ctable, self.data
+        result = [ (row.nrow, row['v2'], row['nested/y'])
+                   for row in ctable.iterrows(step=3) ]
+        expected = [ (i, data['v2'][i], data['nested']['y'][i])
+                     for i in xrange(0, self.nrows, 3) ]
+        self.assertEqual(result, expected)
+        self.assertEqual([row[0] for row in ctable], range(self.nrows))
+
+
+    def test04_where(self):
+        """Querying a `CTable` with ``where()``."""
+
+        ctable, data = self.ctable, self.data
+        cond = '((id %% 7) == 0) & (v1 < %d)' % (self.nrows // 3)
+        selected = (data['id'] % 7 == 0) & (data['v1'] < self.nrows // 3)
+        result = [ (row.nrow, row['t'], row['md'].tolist())
+                   for row in ctable.where(cond) ]
+        expected = [ (i, data['t'][i], data['md'][i].tolist())
+                     for i in selected.nonzero()[0] ]
+        self.assertEqual(result, expected)
+        result = [ row.fetch_all_fields() for row in ctable.where(cond) ]
+        self.assertEqual(result, list(data[selected]))
+        # Variables in condition.
+        result = [ row.nrow for row in
+                   ctable.where('x < lim', {'x': ctable.cols.nested.x,
+                                            'lim': 3}, stop=300) ]
+        self.assertEqual(result, [0, 1, 2, 100, 101, 102, 200, 201, 202])
+        self.assertRaises(NameError, ctable.where, 'foo < 3', {})
+        self.assertRaises(TypeError, ctable.where, 'nested < 3')
+
+
+    def test05_readWhere(self):
+        """Reading from a `CTable` with ``readWhere()``."""
+
+        ctable, data = self.ctable, self.data
+        cond = '(v1 > 100) & (id < 500)'
+        selected = (data['v1'] > 100) & (data['id'] < 500)
+        self.assertTrue(allequal(ctable.readWhere(cond), data[selected]))
+        self.assertTrue(allequal(ctable.readWhere(cond, field='nested'),
+                                 data['nested'][selected]))
+        self.assertTrue(allequal(ctable.readWhere(cond, step=3),
+                                 data[::3][selected[::3]]))
+        coords = ctable.getWhereList(cond)
+        self.assertEqual(coords.dtype, SizeType)
+        self.assertEqual(list(coords), list(selected.nonzero()[0]))
+        result = ctable.readWhere('id < 0', field='md')
+        self.assertEqual(result.shape, (0, 2))
+        self.assertEqual(len(ctable.getWhereList('id < 0')), 0)
+
+
+class Basic2TestCase(BasicTestCase):
+    nrowsinbuf = 33
+
+class Basic3TestCase(BasicTestCase):
+    nrowsinbuf = 33
+    reopen = True
+
+
+class IndexTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests for indexing the columns of `CTable` objects."""
+
+    nrowsinbuf = None
+    reopen = False
+
+
+    def setUp(self):
+        super(IndexTestCase, self).setUp()
+        ctable = self.h5file.createCTable(
+            '/', 'test', Record,
+            colfilters={'v2': Filters(complevel=5, shuffle=False)} )
+        self.nrows = nrows = 1000
+        rows = [ (i, i*.5, str(i % 10), i+.25, (i%100, i*2), (i, -i))
+                 for i in xrange(nrows) ]
+        ctable.append(rows[:600])
+        self.assertEqual(ctable.createIndex('id'), 600)
+        ctable.createIndex('v2')
+        ctable.createIndex('nested/x')
+        # These rows are added to the indexes.
+        ctable.append(rows[600:])
+        if self.reopen:
+            self._reopen('a')
+            ctable = self.h5file.root.test
+        if self.nrowsinbuf is not None:
+            ctable._v_nrowsinbuf = self.nrowsinbuf
+        self.ctable = ctable
+        self.data = numpy.rec.array(
+            rows, dtype=Description(Record().columns)._v_dtype )
+
+
+    def test00_indexes(self):
+        """Checking the indexes of a `CTable`."""
+
+        ctable = self.ctable
+        self.assertEqual(ctable.indexedcolpathnames, ['id', 'nested/x', 'v2'])
+        self.assertEqual(ctable.colpathnames,
+                         ['id', 'v1', 'v2', 't', 'nested/x', 'nested/y',
+                          'md'])
+        self.assertEqual(ctable.willQueryUseIndexing('(id > 3) & (v1 < 9)'),
+                         frozenset(['id']))
+        self.assertEqual(ctable.willQueryUseIndexing(
+            '(x == 3) | (v2 == "4")', {'x': ctable.cols.nested.x,
+                                       'v2': ctable.cols.v2}),
+                         frozenset(['nested/x', 'v2']))
+        self.assertEqual(ctable.willQueryUseIndexing('v1 < 9'), frozenset())
+
+
+    def test01_where(self):
+        """Querying a `CTable` using indexes."""
+
+        ctable, data = self.ctable, self.data
+        x = data['nested']['x']
+        for cond, selected in [
+            ('id < 10', data['id'] < 10),
+            ('(id >= 500) & (id < 720) & (v1 > 300)',
+             (data['id'] >= 500) & (data['id'] < 720) & (data['v1'] > 300)),
+            ('(v2 == "3") & (id > 650)',
+             (data['v2'] == '3') & (data['id'] > 650)),
+            ('(x == 42) | (id > 990)', (x == 42) | (data['id'] > 990)),
+            ('id > 2000', data['id'] > 2000) ]:
+            condvars = {'x': ctable.cols.nested.x}
+            self.assertTrue(ctable.willQueryUseIndexing(cond, condvars))
+            self.assertEqual(list(ctable.getWhereList(cond, condvars)),
+                             list(selected.nonzero()[0]))
+            self.assertTrue(allequal(ctable.readWhere(cond, condvars),
+                                     data[selected]))
+            result = [ (row.nrow, row['md'].tolist())
+                       for row in ctable.where(cond, condvars, step=3) ]
+            expected = [ (i, data['md'][i].tolist())
+                         for i in selected.nonzero()[0] if i % 3 == 0 ]
+            self.assertEqual(result, expected)
+
+
+    def test02_candidates(self):
+        """Only the candidate rows are read in indexed queries."""
+
+        ctable, data = self.ctable, self.data
+        def readColumn(colpathname, start, stop, step):
+            self.fail("whole buffers should not be read")
+        ctable._readColumn = readColumn
+        selected = (data['id'] > 100) & (data['id'] <= 110)
+        self.assertTrue(allequal(ctable.readWhere('(id > 100) & (id <= 110)'),
+                                 data[selected]))
+
+
+    def test03_removeIndex(self):
+        """Removing and rebuilding the indexes of a `CTable`."""
+
+        ctable, data = self.ctable, self.data
+        ctable.removeIndex('id')
+        self.assertEqual(ctable.indexedcolpathnames, ['nested/x', 'v2'])
+        self.assertEqual(ctable.willQueryUseIndexing('id < 10'), frozenset())
+        self.assertEqual(list(ctable.getWhereList('id < 10')), range(10))
+        self.assertRaises(ValueError, ctable.removeIndex, 'id')
+        # Modify a column directly and rebuild the indexes.
+        ctable.cols.v2[:10] = 'z'
+        ctable.reIndex()
+        self.assertEqual(list(ctable.getWhereList('v2 == "z"')), range(10))
+
+
+    def test04_errors(self):
+        """Indexing wrong columns of a `CTable`."""
+
+        ctable = self.ctable
+        self.assertRaises(ValueError, ctable.createIndex, 'id')
+        self.assertRaises(KeyError, ctable.createIndex, 'foo')
+        self.assertRaises(TypeError, ctable.createIndex, 'nested')
+        self.assertRaises(TypeError, ctable.createIndex, 'md')
+
+
+    def test05_copy(self):
+        """Copying an indexed `CTable`."""
+
+        ctable, data = self.ctable, self.data
+        ctable.cols.v2[:5] = 'z'
+        data['v2'][:5] = 'z'
+        ctable._v_attrs.foo = 'bar'
+        h5file = self.h5file
+        ctable._f_copy('/', 'copy')
+        h5file.copyNode(ctable, '/group', 'copy', createparents=True)
+        h5file.root.group._f_copy('/', 'group2', recursive=True)
+        ctable._f_copy('/', 'copy3', start=100, stop=900, step=3)
+        if self.reopen:
+            self._reopen()
+            ctable = self.h5file.root.test
+        for pathname, expected in [ ('/copy', data),
+                                    ('/group/copy', data),
+                                    ('/group2/copy', data),
+                                    ('/copy3', data[100:900:3]) ]:
+            copy = self.h5file.getNode(pathname)
+            self.assertTrue(isinstance(copy, CTable))
+            self.assertEqual(list(copy._v_attrs.COLPATHNAMES),
+                             list(ctable._v_attrs.COLPATHNAMES))
+            self.assertEqual(copy._v_attrs.foo, 'bar')
+            self.assertEqual(copy.indexedcolpathnames,
+                             ['id', 'nested/x', 'v2'])
+            self.assertEqual(copy.cols.v2.filters.complevel, 5)
+            self.assertEqual(copy.cols.v1.filters.complevel, 0)
+            self.assertTrue(allequal(copy.read(), expected))
+            self.assertTrue(allequal(copy.readWhere('v2 == "z"'),
+                                     expected[expected['v2'] == 'z']))
+            self.assertTrue(allequal(copy.readWhere('id >= 800'),
+                                     expected[expected['id'] >= 800]))
+
+
+class Index2TestCase(IndexTestCase):
+    nrowsinbuf = 33
+
+class Index3TestCase(IndexTestCase):
+    nrowsinbuf = 33
+    reopen = True
+
+
+class CreateTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests for creating `CTable` objects."""
+
+    def test00_descriptions(self):
+        """Creating a `CTable` from several kinds of descriptions."""
+
+        dtype = numpy.dtype([('a', 'i4'), ('b', [('c', 'f8')])])
+        for descr in [dtype, {'a': IntCol(pos=0),
+                              'b': {'c': FloatCol(), '_v_pos': 1}}]:
+            ctable = self.h5file.createCTable('/', 'test', descr)
+            ctable.append([(1, (2.,))])
+            self.assertEqual(ctable.colpathnames, ['a', 'b/c'])
+            self.assertEqual(ctable.read().tolist(), [(1, (2.,))])
+            ctable._f_remove(recursive=True)
+
+
+    def test01_errors(self):
+        """Creating a `CTable` with wrong arguments."""
+
+        self.assertRaises(TypeError, self.h5file.createCTable,
+                          '/', 'test', 1)
+        self.assertRaises(ValueError, self.h5file.createCTable,
+                          '/', 'test', None)
+        self.assertRaises(KeyError, self.h5file.createCTable,
+                          '/', 'test', Record, colfilters={'foo': Filters()})
+        self.assertRaises(TypeError, self.h5file.createCTable,
+                          '/', 'test', Record, colfilters={'id': 1})
+
+
+    def test02_appendError(self):
+        """Failing to append rows leaves the columns untouched."""
+
+        ctable = self.h5file.createCTable('/', 'test', Record)
+        ctable.append([(1, 2., 'a', 3., (4, 5.), (6, 7))])
+        column = ctable._g_getColumn('nested/y')
+        def append(values):
+            raise HDF5ExtError("can not append")
+        column.append = append
+        self.assertRaises(HDF5ExtError, ctable.append,
+                          [(8, 9., 'b', 10., (11, 12.), (13, 14))] * 3)
+        for colpathname in ctable.colpathnames:
+            self.assertEqual(ctable._g_getColumn(colpathname).nrows, 1)
+        self.assertEqual(ctable.nrows, 1)
+        self.assertEqual(ctable.read()['id'].tolist(), [1])
+
+
+#----------------------------------------------------------------------
+
+def suite():
+    theSuite = unittest.TestSuite()
+    niter = 1
+
+    for n in range(niter):
+        theSuite.addTest(unittest.makeSuite(BasicTestCase))
+        theSuite.addTest(unittest.makeSuite(Basic2TestCase))
+        theSuite.addTest(unittest.makeSuite(Basic3TestCase))
+        theSuite.addTest(unittest.makeSuite(IndexTestCase))
+        theSuite.addTest(unittest.makeSuite(Index2TestCase))
+        theSuite.addTest(unittest.makeSuite(Index3TestCase))
+        theSuite.addTest(unittest.makeSuite(CreateTestCase))
+
+    return theSuite
+
+
+if __name__ == '__main__':
+    unittest.main( defaultTest='suite' )
+
+## Local Variables:
+## mode: python
+## py-indent-offset: 4
+## tab-width: 4
+## End:
@@ -2243,7 +2243,7 @@ class TruncateTestCase(unittest.TestCase):
         """Checking EArray.truncate() method (truncating to 0 rows)"""
 
         # Only run this test for HDF5 >= 1.8.0
-        if whichLibVersion("hdf5")[1] < "1.8.0":
+        if whichLibVersion("hdf5")[0] < 0x10800:
             return
 
         array1 = self.fileh.root.array1
@@ -2586,6 +2586,28 @@ class MDAtomReopen(MDAtomTestCase):
 
 
 
+class DirectChunkWriteTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    def test00_append(self):
+        """Appending whole chunks written bypassing the filters."""
+
+        filters = Filters(complevel=1, complib='zlib', shuffle=True)
+        arrays = []
+        for nworkers in [0, 2]:
+            self.h5file.params['DIRECT_CHUNK_WORKERS'] = nworkers
+            earray = self.h5file.createEArray(
+                '/', 'test%d' % nworkers, Int32Atom(), (0, 3),
+                filters=filters, chunkshape=(16, 3))
+            for start, stop in [(0, 5), (5, 100), (100, 148), (148, 150)]:
+                earray.append(numpy.arange(start*3, stop*3).reshape(-1, 3))
+            arrays.append(earray)
+        self.assertEqual(arrays[1].shape, (150, 3))
+        self.assertTrue(allequal(arrays[1][:], arrays[0][:]))
+        self.assertTrue(allequal(
+            arrays[1][:], numpy.arange(450, dtype='int32').reshape(150, 3)))
+
+
+
 #----------------------------------------------------------------------
 
 def suite():
@@ -2650,6 +2672,7 @@ def suite():
         theSuite.addTest(unittest.makeSuite(ZeroSizedTestCase))
         theSuite.addTest(unittest.makeSuite(MDAtomNoReopen))
         theSuite.addTest(unittest.makeSuite(MDAtomReopen))
+        theSuite.addTest(unittest.makeSuite(DirectChunkWriteTestCase))
     if common.heavy:
         theSuite.addTest(unittest.makeSuite(Slices3EArrayTestCase))
         theSuite.addTest(unittest.makeSuite(Slices4EArrayTestCase))
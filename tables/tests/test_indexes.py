@@ -2,9 +2,11 @@ import unittest
 import os
 import tempfile
 import copy
+import math
 
 from tables import *
-from tables.index import Index, defaultAutoIndex, defaultIndexFilters
+from tables.index import Index, BitmapIndex, defaultAutoIndex, \
+     defaultIndexFilters
 from tables.idxutils import calcChunksize
 from tables.tests.common import verbose, allequal, heavy, cleanup, \
      PyTablesTestCase, TempFileMixin
@@ -2310,6 +2312,1106 @@ class readSortedIndex9(readSortedIndexTestCase):
     optlevel = 9
 
 
+class CompositeIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for composite indexes over several columns."""
+
+    nrows = 500
+
+    class MyDescription(IsDescription):
+        scol = StringCol(itemsize=4, pos=1)
+        icol = IntCol(pos=2)
+        fcol = FloatCol(pos=3)
+
+    def setUp(self):
+        super(CompositeIndexTestCase, self).setUp()
+        table = self.h5file.createTable('/', 'table', self.MyDescription,
+                                        chunkshape=16)
+        row = table.row
+        for i in xrange(self.nrows):
+            row['scol'] = "s%d" % (i % 3)
+            row['icol'] = i % 7
+            row['fcol'] = i % 11
+            row.append()
+        table.flush()
+        self.table = table
+        self.table.createCompositeIndex(['scol', 'icol', 'fcol'])
+
+    def checkQuery(self, condition, usedcols):
+        """Check that `condition` uses `usedcols` and gives right results."""
+        table = self.table
+        self.assertEqual(table.willQueryUseIndexing(condition), usedcols)
+        result = table.getWhereList(condition)
+        table._disableIndexingInQueries()
+        expected = table.getWhereList(condition)
+        table._enableIndexingInQueries()
+        if verbose:
+            print "Selected coordinates:", result
+        self.assertTrue(len(expected) > 0)
+        self.assertTrue(allequal(result, expected))
+
+    def test00_equality(self):
+        """Checking equality conditions on the leading columns."""
+        self.checkQuery('(scol == "s1") & (icol == 3)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(icol == 3) & (fcol == 4) & (scol == "s1")',
+                        frozenset(['scol', 'icol', 'fcol']))
+
+    def test01_range(self):
+        """Checking a range condition after the equality conditions."""
+        self.checkQuery('(scol == "s2") & (icol == 3) & (fcol > 2)',
+                        frozenset(['scol', 'icol', 'fcol']))
+        self.checkQuery('(scol == "s2") & (icol >= 2) & (icol < 5)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(scol == "s0") & (icol == 1) & (fcol != 5)',
+                        frozenset(['scol', 'icol']))
+
+    def test02_notUsable(self):
+        """Checking conditions that can not use the composite index."""
+        table = self.table
+        self.assertEqual(table.willQueryUseIndexing('icol == 3'),
+                         frozenset())
+        self.assertEqual(
+            table.willQueryUseIndexing('(scol == "s1") | (icol == 3)'),
+            frozenset() )
+
+    def test03_dirty(self):
+        """Checking that modifications make the composite index dirty."""
+        table = self.table
+        table.autoIndex = False
+        table.modifyColumn(0, 10, column=[6]*10, colname='icol')
+        condition = '(scol == "s1") & (icol == 6)'
+        self.assertEqual(table.willQueryUseIndexing(condition), frozenset())
+        table.reIndexDirty()
+        self.checkQuery(condition, frozenset(['scol', 'icol']))
+
+    def test04_append(self):
+        """Checking that appended rows are indexed when flushing."""
+        table = self.table
+        table.append([("s9", 3, 1.)] * 3)
+        table.flush()
+        self.checkQuery('(scol == "s9") & (icol == 3)',
+                        frozenset(['scol', 'icol']))
+        self.assertEqual(len(table.getWhereList('scol == "s9"')), 3)
+
+    def test05_reopen(self):
+        """Checking the composite index after re-opening the file."""
+        self._reopen(mode='a')
+        self.table = self.h5file.root.table
+        self.checkQuery('(scol == "s1") & (icol == 3) & (fcol <= 6)',
+                        frozenset(['scol', 'icol', 'fcol']))
+        self.table.removeCompositeIndex(['scol', 'icol', 'fcol'])
+        self.assertEqual(
+            self.table.willQueryUseIndexing('(scol == "s1") & (icol == 3)'),
+            frozenset() )
+
+    def test06_errors(self):
+        """Checking errors when creating composite indexes."""
+        table = self.table
+        self.assertRaises(ValueError, table.createCompositeIndex, ['icol'])
+        self.assertRaises(KeyError, table.createCompositeIndex,
+                          ['icol', 'xcol'])
+        self.assertRaises(ValueError, table.createCompositeIndex,
+                          ['scol', 'icol', 'fcol'])
+        self.assertRaises(ValueError, table.removeCompositeIndex,
+                          ['icol', 'scol'])
+
+    def test07_appendRuns(self):
+        """Checking that appended rows are kept in a few sorted runs."""
+        table = self.table
+        cindex = table._getCompositeIndex(['scol', 'icol', 'fcol'])
+        for i in xrange(40):
+            table.append([("s%d" % (i % 5), i % 7, float(i))] * (i + 1))
+            table.flush()
+            self.assertFalse(cindex.dirty)
+        self.assertEqual(cindex.nelements, table.nrows)
+        runs = cindex.runs
+        if verbose:
+            print "Runs:", runs
+        self.assertEqual(runs[0], 0)
+        self.assertTrue(len(runs) <= math.log(table.nrows, 2) + 1)
+        records = cindex.sorted.read()
+        for lo, hi in zip(runs, runs[1:] + [table.nrows]):
+            keys = [record[:3] for record in records[lo:hi].tolist()]
+            self.assertEqual(keys, sorted(keys))
+        self.assertEqual(sorted(records['coord']), range(table.nrows))
+        self.checkQuery('(scol == "s4") & (icol == 3)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(scol == "s1") & (icol == 6) & (fcol >= 10)',
+                        frozenset(['scol', 'icol', 'fcol']))
+        self._reopen(mode='a')
+        self.table = self.h5file.root.table
+        self.checkQuery('(scol == "s0") & (icol < 3)',
+                        frozenset(['scol', 'icol']))
+
+    def test08_blocks(self):
+        """Checking searches spanning several blocks of sorted rows."""
+        table = self.table
+        nrows = 100000
+        records = numpy.empty(nrows, dtype=table.dtype)
+        records['scol'] = ['s%d' % (i % 3) for i in xrange(nrows)]
+        records['icol'] = numpy.arange(nrows) % 1013
+        records['fcol'] = numpy.arange(nrows) % 17
+        table.append(records)
+        table.flush()
+        cindex = table._getCompositeIndex(['scol', 'icol', 'fcol'])
+        self.assertTrue(cindex.sorted.chunkshape[0] < cindex.nelements // 4)
+        self.checkQuery('(scol == "s2") & (icol == 1000)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(scol == "s1") & (icol >= 3) & (icol < 9)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(scol == "s0") & (icol == 0) & (fcol > 15)',
+                        frozenset(['scol', 'icol', 'fcol']))
+        self.checkQuery('scol == "s1"', frozenset(['scol']))
+
+    def test09_buildSlices(self):
+        """Checking indexes built from several slices of the table."""
+        table = self.table
+        table.append([("s1", 3, numpy.nan)] * 10)
+        table.flush()
+        table.removeCompositeIndex(['scol', 'icol', 'fcol'])
+        # Use small slices and buffers to merge the runs in many steps.
+        self.h5file.params['IO_BUFFER_SIZE'] = 48
+        table.createCompositeIndex(['scol', 'icol', 'fcol'])
+        cindex = table._getCompositeIndex(['scol', 'icol', 'fcol'])
+        self.assertTrue(cindex.sorted.nrowsinbuf < table.nrows // 4)
+        self.assertEqual(cindex.nelements, table.nrows)
+        runs = cindex.runs
+        if verbose:
+            print "Runs:", runs
+        self.assertTrue(1 < len(runs) <= math.log(table.nrows, 2) + 1)
+        self.assertFalse('merged' in cindex)
+        records = cindex.sorted.read()
+        rkeys = [records['c%d' % i] for i in (2, 1, 0)]
+        for lo, hi in zip(runs, runs[1:] + [table.nrows]):
+            order = numpy.lexsort([key[lo:hi] for key in rkeys])
+            self.assertTrue(allequal(order, numpy.arange(hi - lo)))
+        self.assertEqual(sorted(records['coord']), range(table.nrows))
+        self.checkQuery('(scol == "s1") & (icol == 3)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(scol == "s2") & (icol == 5) & (fcol < 7)',
+                        frozenset(['scol', 'icol', 'fcol']))
+        self.assertEqual(len(table.getWhereList(
+            '(scol == "s1") & (icol == 3) & (fcol < 11)')),
+            len([r for r in table if r['scol'] == "s1" and
+                 r['icol'] == 3 and r['fcol'] < 11]))
+
+
+    def test10_lazyRemove(self):
+        """Checking indexes rebuilt after removing rows lazily."""
+        table = self.table
+        table.removeRows(10, 100, lazy=True)
+        table.removeRows(250, lazy=True)
+        table.reIndex()
+        cindex = table._getCompositeIndex(['scol', 'icol', 'fcol'])
+        self.assertEqual(cindex.nelements, table.nrows)
+        self.checkQuery('(scol == "s1") & (icol == 3)',
+                        frozenset(['scol', 'icol']))
+        self.checkQuery('(scol == "s2") & (icol == 5) & (fcol < 7)',
+                        frozenset(['scol', 'icol', 'fcol']))
+        result = table.readWhere('(scol == "s1") & (icol == 3)')
+        expected = [r.nrow for r in table
+                    if r['scol'] == "s1" and r['icol'] == 3]
+        self.assertEqual(len(result), len(expected))
+        self.assertTrue(allequal(
+            table.getWhereList('(scol == "s1") & (icol == 3)'),
+            numpy.array(expected)))
+
+
+class IndexCoordsTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for queries reading rows at coordinates from indexes."""
+
+    nrows = 1000
+
+    class MyDescription(IsDescription):
+        icol = IntCol(pos=1)
+        fcol = FloatCol(pos=2)
+
+    def setUp(self):
+        super(IndexCoordsTestCase, self).setUp()
+        # Make the query planner prefer reading rows by coordinates.
+        self.h5file.params['QUERY_COORDS_COST'] = 0
+        table = self.h5file.createTable('/', 'table', self.MyDescription,
+                                        chunkshape=32)
+        table.append([(i*7 % 101, i % 13) for i in xrange(self.nrows)])
+        table.flush()
+        self.table = table
+
+    def checkQuery(self, condition, plan, **kwargs):
+        """Check that `condition` uses `plan` and gives right results."""
+        table = self.table
+        self.assertEqual(table.willQueryUseIndexing(condition, plan=True)[1],
+                         plan)
+        table._disableIndexingInQueries()
+        expected = table.getWhereList(condition, **kwargs)
+        table._enableIndexingInQueries()
+        # Run the query twice so as to exercise the sequence cache.
+        for i in range(2):
+            result = [row.nrow for row in table.where(condition, **kwargs)]
+            if verbose:
+                print "Selected coordinates:", result
+            self.assertTrue(allequal(numpy.array(result), expected))
+            self.assertTrue(allequal(table.getWhereList(condition, **kwargs),
+                                     expected))
+
+    def test00_full(self):
+        """Checking that full indexes use row coordinates."""
+        self.table.cols.icol.createIndex(kind='full')
+        self.checkQuery('icol == 3', 'coords')
+        self.checkQuery('(icol < 3) | (icol > 97)', 'coords')
+        self.checkQuery('(icol < 20) & (fcol == 4)', 'coords',
+                        start=10, stop=900, step=3)
+
+    def test01_light(self):
+        """Checking that lighter indexes use chunkmaps."""
+        self.table.cols.icol.createIndex(kind='light')
+        self.checkQuery('icol == 3', 'chunkmap')
+        self.table.cols.fcol.createIndex(kind='full')
+        self.checkQuery('(icol == 3) & (fcol < 5)', 'chunkmap')
+        self.assertEqual(
+            self.table.willQueryUseIndexing('fcol < 5', plan=True),
+            (frozenset(['fcol']), 'coords') )
+
+    def test02_notIndexed(self):
+        """Checking the plan of queries not using indexes."""
+        self.assertEqual(
+            self.table.willQueryUseIndexing('icol == 3', plan=True),
+            (frozenset(), None) )
+
+    def test03_modify(self):
+        """Checking row modification in a query using row coordinates."""
+        table = self.table
+        table.cols.icol.createCSIndex()
+        for row in table.where('icol == 3'):
+            row['fcol'] = -1
+            row.update()
+        table.flush()
+        self.assertEqual(len(table.getWhereList('fcol == -1')),
+                         len(table.getWhereList('icol == 3')))
+
+
+class QueryPlannerTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for the choice of plans for indexed queries."""
+
+    nrows = 10000
+
+    class MyDescription(IsDescription):
+        icol = IntCol(pos=1)  # clustered values
+        rcol = IntCol(pos=2)  # scattered values
+        ncol = IntCol(pos=3)  # not indexed
+
+    def setUp(self):
+        super(QueryPlannerTestCase, self).setUp()
+        table = self.h5file.createTable('/', 'table', self.MyDescription,
+                                        chunkshape=100)
+        table.append([(i, i*7919 % self.nrows, i % 10)
+                      for i in xrange(self.nrows)])
+        table.flush()
+        table.cols.icol.createIndex(kind='full')
+        table.cols.rcol.createIndex(kind='full')
+        self.table = table
+
+    def checkPlan(self, condition, plan, **kwargs):
+        """Check that `condition` uses `plan` and gives right results."""
+        table = self.table
+        explanation = table.explain(condition, **kwargs)
+        if verbose:
+            print "Explanation for %r:" % condition, explanation
+        self.assertEqual(explanation['plan'], plan)
+        table._disableIndexingInQueries()
+        expected = table.getWhereList(condition, **kwargs)
+        table._enableIndexingInQueries()
+        result = [row.nrow for row in table.where(condition, **kwargs)]
+        self.assertTrue(allequal(numpy.array(result, dtype='int64'),
+                                 expected))
+        self.assertTrue(allequal(table.getWhereList(condition, **kwargs),
+                                 expected))
+        return explanation
+
+    def test00_notIndexed(self):
+        """Checking the explanation of queries not using indexes."""
+        explanation = self.checkPlan('ncol == 3', 'scan')
+        self.assertEqual(explanation['indexes'], frozenset())
+        self.assertEqual(explanation['rows'], self.nrows)
+        self.assertEqual(explanation['candidates'], None)
+        self.assertEqual(explanation['chunks'], None)
+        self.assertEqual(explanation['costs'], {'scan': self.nrows})
+
+    def test01_scan(self):
+        """Checking that a scan is used for non-selective queries."""
+        explanation = self.checkPlan('rcol < 5000', 'scan')
+        self.assertEqual(explanation['indexes'], frozenset())
+        self.assertEqual(explanation['candidates'], 5000)
+        self.assertEqual(explanation['chunks'], 100)
+        self.checkPlan('(icol < 3000) | (icol > 4000)', 'scan')
+
+    def test02_chunkmap(self):
+        """Checking that chunkmaps are used for clustered candidates."""
+        explanation = self.checkPlan('(icol >= 120) & (icol < 170)',
+                                     'chunkmap')
+        self.assertEqual(explanation['indexes'], frozenset(['icol']))
+        self.assertEqual(explanation['candidates'], 50)
+        self.assertEqual(explanation['chunks'], 1)
+        self.checkPlan('(icol < 150) & (ncol == 3)', 'chunkmap',
+                       start=20, stop=5000, step=3)
+
+    def test03_coords(self):
+        """Checking that row coordinates are used for scattered candidates."""
+        explanation = self.checkPlan('rcol < 5', 'coords')
+        self.assertEqual(explanation['indexes'], frozenset(['rcol']))
+        self.assertEqual(explanation['candidates'], 5)
+        self.assertEqual(explanation['chunks'], 5)
+        costs = explanation['costs']
+        self.assertTrue(costs['coords'] < costs['chunkmap'] < costs['scan'])
+
+    def test04_empty(self):
+        """Checking the explanation of queries with no candidates."""
+        explanation = self.checkPlan('icol < 0', 'coords')
+        self.assertEqual(explanation['candidates'], 0)
+        self.assertEqual(explanation['chunks'], 0)
+        explanation = self.checkPlan('rcol < 5', 'coords', start=9000,
+                                     stop=self.nrows)
+        self.assertEqual(explanation['rows'], 1000)
+
+    def test05_params(self):
+        """Checking the parameters of the query planner."""
+        params = self.h5file.params
+        params['QUERY_CHUNKMAP_COST'] = 0
+        self.checkPlan('rcol < 5000', 'chunkmap')
+        params['QUERY_COORDS_COST'] = 1000
+        self.checkPlan('rcol < 5', 'chunkmap')
+
+    def test06_willQueryUseIndexing(self):
+        """Checking that `willQueryUseIndexing()` follows the planner."""
+        table = self.table
+        # The index is usable, but a scan is cheaper.
+        self.assertEqual(table.willQueryUseIndexing('rcol < 5000'),
+                         frozenset(['rcol']))
+        self.assertEqual(table.willQueryUseIndexing('rcol < 5000', plan=True),
+                         (frozenset(), None))
+        self.assertEqual(table.willQueryUseIndexing('rcol < 5', plan=True),
+                         (frozenset(['rcol']), 'coords'))
+        self.assertEqual(
+            table.willQueryUseIndexing('(icol >= 120) & (icol < 170)',
+                                       plan=True),
+            (frozenset(['icol']), 'chunkmap') )
+
+
+class ParallelBuildTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for building indexes with several threads."""
+
+    nrows = 12345
+
+    class MyDescription(IsDescription):
+        fcol = FloatCol(pos=1)
+        scol = StringCol(itemsize=4, pos=2)
+
+    def setUp(self):
+        super(ParallelBuildTestCase, self).setUp()
+        table = self.h5file.createTable('/', 'table', self.MyDescription)
+        random = numpy.random.RandomState(1)
+        table.append([(random.rand(), str(i % 997))
+                      for i in xrange(self.nrows)])
+        table.flush()
+        self.table = table
+
+    def buildIndexes(self, kind, nworkers, optlevel=0):
+        """Build and return the indexes of the table with `nworkers`."""
+        params = self.h5file.params
+        params['INDEX_BUILD_WORKERS'] = nworkers
+        # Only a few slices are sorted at the same time
+        params['INDEX_BUILD_MEMORY'] = 50000
+        cols = self.table.cols
+        for col in [cols.fcol, cols.scol]:
+            if col.index is not None:
+                col.removeIndex()
+            col.createIndex(kind=kind, optlevel=optlevel,
+                            _blocksizes=(2048, 512, 128, 32))
+        return [ (col.index.sorted[:], col.index.indices[:],
+                  col.index.sortedLR[:], col.index.indicesLR[:])
+                 for col in [cols.fcol, cols.scol] ]
+
+    def checkBuild(self, kind, optlevel=0):
+        """Check that parallel builds give the same indexes."""
+        expected = self.buildIndexes(kind, 0, optlevel)
+        result = self.buildIndexes(kind, 3, optlevel)
+        for colexpected, colresult in zip(expected, result):
+            for arrexpected, arrresult in zip(colexpected, colresult):
+                self.assertTrue(allequal(arrresult, arrexpected))
+        table = self.table
+        for condition in ['(fcol > 0.3) & (fcol < 0.31)', 'scol == "12"']:
+            result = table.getWhereList(condition)
+            table._disableIndexingInQueries()
+            expected = table.getWhereList(condition)
+            table._enableIndexingInQueries()
+            self.assertTrue(allequal(result, expected))
+
+    def test00_ultralight(self):
+        """Building ultralight indexes in parallel."""
+        self.checkBuild('ultralight')
+
+    def test01_light(self):
+        """Building light indexes in parallel."""
+        self.checkBuild('light')
+
+    def test02_medium(self):
+        """Building medium indexes in parallel."""
+        self.checkBuild('medium')
+
+    def test03_full(self):
+        """Building full indexes in parallel."""
+        self.checkBuild('full')
+
+    def test04_reindex(self):
+        """Appending rows to indexes built in parallel."""
+        table = self.table
+        self.buildIndexes('full', 3)
+        table.append([(0.5, "new")] * 5000)
+        table.flush()
+        self.assertEqual(len(table.getWhereList('scol == "new"')), 5000)
+        self.assertEqual(len(table.getWhereList('fcol == 0.5')), 5000)
+
+    def test05_optimized(self):
+        """Optimizing indexes in parallel."""
+        self.checkBuild('light', optlevel=6)
+        self.checkBuild('full', optlevel=6)
+
+    def test06_completeSort(self):
+        """Completely sorting indexes in parallel."""
+        self.checkBuild('full', optlevel=9)
+        self.assertTrue(self.table.cols.fcol.index.is_CSI)
+
+
+class CompactIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for the compaction of indexes of growing tables."""
+
+    class MyDescription(IsDescription):
+        icol = IntCol(pos=1)
+
+    def setUp(self):
+        super(CompactIndexTestCase, self).setUp()
+        self.table = self.h5file.createTable('/', 'table', self.MyDescription)
+        self.random = numpy.random.RandomState(1)
+        self.appendRows(2000)
+
+    def appendRows(self, nrows):
+        """Append `nrows` random rows to the table."""
+        self.table.append([(value,) for value in
+                           self.random.randint(0, 1000, nrows)])
+        self.table.flush()
+
+    def createIndex(self, kind):
+        """Create an index of `kind` and append five slices of rows."""
+        table = self.table
+        table.cols.icol.createIndex(kind=kind,
+                                    _blocksizes=(4096, 2048, 512, 128))
+        for i in range(5):
+            self.appendRows(512)
+        return table.cols.icol.index
+
+    def checkQueries(self):
+        """Check the results of some queries using the index."""
+        table = self.table
+        for condition in ['icol == 3', '(icol > 10) & (icol <= 30)',
+                          'icol >= 990']:
+            result = table.getWhereList(condition)
+            table._disableIndexingInQueries()
+            expected = table.getWhereList(condition)
+            table._enableIndexingInQueries()
+            if verbose:
+                print "Results for %r:" % condition, result
+            self.assertTrue(allequal(numpy.sort(result), expected))
+
+    def test00_full(self):
+        """Compacting full indexes."""
+        index = self.createIndex('full')
+        self.assertEqual(index.runs, [3, 1, 1, 1, 1, 1])
+        noverlaps = index.compute_overlaps(index, None, False)[0]
+        self.checkQueries()
+        self.assertEqual(index.compact(2), 2)
+        self.assertEqual(index.runs, [3, 1, 1, 1, 2])
+        self.checkQueries()
+        self.assertEqual(index.compact(), 8)
+        self.assertEqual(index.runs, [8])
+        self.assertTrue(index.compute_overlaps(index, None, False)[0] <
+                        noverlaps)
+        self.checkQueries()
+        # The merged runs are kept on disk
+        self._reopen('a')
+        self.table = self.h5file.root.table
+        self.assertEqual(self.table.cols.icol.index.runs, [8])
+        self.appendRows(512)
+        self.assertEqual(self.table.cols.icol.index.runs, [8, 1])
+        self.checkQueries()
+
+    def test01_medium(self):
+        """Compacting medium indexes."""
+        index = self.createIndex('medium')
+        self.assertEqual(index.compact(), 8)
+        self.assertEqual(index.runs, [8])
+        self.checkQueries()
+
+    def test02_light(self):
+        """Compacting light indexes (not supported)."""
+        index = self.createIndex('light')
+        self.assertEqual(index.compact(), 0)
+        self.assertEqual(index.runs, [3, 1, 1, 1, 1, 1])
+        self.checkQueries()
+
+    def test03_auto(self):
+        """Compacting indexes automatically during appends."""
+        self.h5file.params['INDEX_COMPACT_FACTOR'] = 2
+        index = self.createIndex('full')
+        self.assertEqual(index.runs, [3, 4, 1])
+        self.checkQueries()
+
+    def test04_memory(self):
+        """Compacting indexes with a limited amount of memory."""
+        params = self.h5file.params
+        # Only three slices of the index can be merged
+        params['INDEX_COMPACT_MEMORY'] = 512 * (4 + 8) * 3
+        index = self.createIndex('full')
+        self.assertEqual(index.compact(), 3)
+        self.assertEqual(index.runs, [3, 1, 1, 3])
+        params['INDEX_COMPACT_FACTOR'] = 2
+        self.appendRows(512 * 2)
+        self.assertEqual(index.runs, [3, 1, 1, 3, 2])
+        self.checkQueries()
+
+    def test05_autoThreads(self):
+        """Compacting indexes automatically with sorting threads."""
+        params = self.h5file.params
+        params['INDEX_COMPACT_FACTOR'] = 2
+        params['INDEX_BUILD_WORKERS'] = 2
+        index = self.createIndex('full')
+        self.assertEqual(index.runs, [3, 4, 1])
+        self.assertTrue(index._v_compaction is None)
+        self.checkQueries()
+        # The runs merged while appending are saved when flushing
+        table = self.table
+        table.append([(value,) for value in
+                      self.random.randint(0, 1000, 512)])
+        self.assertTrue(index._v_compaction is not None)
+        self.assertEqual(index.runs, [3, 4, 1, 1])
+        self.checkQueries()
+        table.flush()
+        self.assertTrue(index._v_compaction is None)
+        self.assertEqual(index.runs, [3, 4, 2])
+        self.checkQueries()
+
+
+class ZoneMapTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for zone maps on unindexed columns."""
+
+    nrows = 10000
+    reopen = False
+
+    class MyDescription(IsDescription):
+        tcol = FloatCol(pos=1)  # roughly ordered values
+        scol = StringCol(itemsize=4, pos=2)
+        class nested(IsDescription):
+            _v_pos = 3
+            icol = IntCol()  # scattered values
+        mcol = IntCol(shape=(2,), pos=4)
+
+    def setUp(self):
+        super(ZoneMapTestCase, self).setUp()
+        table = self.h5file.createTable('/', 'table', self.MyDescription,
+                                        chunkshape=100)
+        self.random = numpy.random.RandomState(1)
+        self.appendRows(table, 0, self.nrows)
+        table.cols.tcol.createZoneMap()
+        table.cols.scol.createZoneMap()
+        table.cols.nested.icol.createZoneMap()
+        self.table = table
+
+    def appendRows(self, table, start, stop):
+        """Append the rows in the ``[start:stop]`` range to `table`."""
+        tvalues = numpy.arange(start, stop) + self.random.rand(stop-start)*5
+        table.append([ (t, 'a%03d' % (i // 100), (i*7919 % self.nrows,),
+                        (i, i))
+                       for i, t in zip(xrange(start, stop), tvalues) ])
+
+    def checkBounds(self):
+        """Check the bounds kept by the zone maps of the table."""
+        table = self.table
+        cs = table.chunkshape[0]
+        for colname in ['tcol', 'scol', 'nested/icol']:
+            zonemap = table.cols._f_col(colname).zonemap
+            values = table.col(colname)
+            nchunks = (len(values) + cs - 1) // cs
+            self.assertEqual(zonemap.nchunks, nchunks)
+            bounds = zonemap.bounds.read()
+            for i in xrange(nchunks):
+                chunk = values[i*cs:(i+1)*cs]
+                self.assertEqual(bounds[i].tolist(),
+                                 [min(chunk), max(chunk)])
+
+    def checkQuery(self, condition, plan, **kwargs):
+        """Check that `condition` uses `plan` and gives right results."""
+        table = self.table
+        explanation = table.explain(condition, **kwargs)
+        if verbose:
+            print "Explanation for %r:" % condition, explanation
+        self.assertEqual(explanation['plan'], plan)
+        table._disableIndexingInQueries()
+        expected = table.getWhereList(condition, **kwargs)
+        table._enableIndexingInQueries()
+        result = [row.nrow for row in table.where(condition, **kwargs)]
+        self.assertTrue(allequal(numpy.array(result, dtype='int64'),
+                                 expected))
+        self.assertTrue(allequal(table.getWhereList(condition, **kwargs),
+                                 expected))
+        self.assertTrue(allequal(table.readWhere(condition, **kwargs),
+                                 table.readCoordinates(expected)))
+        return explanation
+
+    def test00_create(self):
+        """Creating zone maps."""
+        table = self.table
+        self.checkBounds()
+        self.assertTrue(table.cols.mcol.zonemap is None)
+        self.assertRaises(TypeError, table.cols.mcol.createZoneMap)
+        self.assertRaises(ValueError, table.cols.tcol.createZoneMap)
+        self.assertFalse(table.indexed)
+        if self.reopen:
+            self._reopen('a')
+            self.table = table = self.h5file.root.table
+            self.checkBounds()
+        table.cols.tcol.removeZoneMap()
+        self.assertTrue(table.cols.tcol.zonemap is None)
+        self.checkQuery('tcol < 120', 'scan')
+
+    def test01_query(self):
+        """Querying columns with zone maps."""
+        explanation = self.checkQuery('(tcol > 150) & (tcol <= 250)',
+                                      'chunkmap')
+        self.assertEqual(explanation['indexes'], frozenset())
+        self.assertEqual(explanation['zonemaps'], frozenset(['tcol']))
+        self.assertEqual(explanation['chunks'], 2)
+        self.checkQuery('(scol == "a042") | (tcol < 50)', 'chunkmap')
+        self.checkQuery('(tcol < 3000) & (scol >= "a020")', 'chunkmap',
+                        start=33, stop=5000, step=7)
+        explanation = self.checkQuery('tcol < -1', 'chunkmap')
+        self.assertEqual(explanation['chunks'], 0)
+        # Zone maps do not help with scattered values.
+        explanation = self.checkQuery(
+            'icol < 5000', 'scan',
+            condvars={'icol': self.table.cols.nested.icol})
+        self.assertEqual(explanation['zonemaps'], frozenset())
+
+    def test02_append(self):
+        """Appending rows to tables with zone maps."""
+        table = self.table
+        self.appendRows(table, self.nrows, self.nrows + 150)
+        row = table.row
+        for i in xrange(55):
+            row['tcol'] = -i
+            row['scol'] = 'z'
+            row['nested/icol'] = i
+            row.append()
+        table.flush()
+        if self.reopen:
+            self._reopen('a')
+            self.table = table = self.h5file.root.table
+        self.checkBounds()
+        self.checkQuery('tcol < 0', 'chunkmap')
+        self.checkQuery('scol > "y"', 'chunkmap')
+
+    def test03_modify(self):
+        """Modifying rows of tables with zone maps."""
+        table = self.table
+        table.modifyRows(150, 152, rows=[(-1., 'b', (0,), (0, 0))]*2)
+        table.cols.tcol[2000:2300:7] = numpy.arange(43)
+        table.modifyColumns(4000, 4001, columns=[['z']], names=['scol'])
+        table[[7000, 9999]] = [(1e6, 'c', (1,), (1, 1))]*2
+        for row in table.iterrows(5000, 5003):
+            row['nested/icol'] = -row.nrow
+            row.update()
+        table.flush()
+        self.checkBounds()
+        self.checkQuery('tcol < 0', 'chunkmap')
+        self.checkQuery('tcol > 1e5', 'chunkmap')
+        self.checkQuery('scol == "z"', 'chunkmap')
+        table.removeRows(3050, 3170)
+        self.checkBounds()
+        self.checkQuery('(tcol >= 3100) & (tcol < 3300)', 'chunkmap')
+        # Indexes are used when zone maps can not help.
+        table.cols.nested.icol.createIndex(kind='full')
+        explanation = self.checkQuery(
+            'icol < 5', 'coords', condvars={'icol': table.cols.nested.icol})
+        self.assertEqual(explanation['zonemaps'], frozenset())
+
+    def test04_indexes(self):
+        """Indexed columns with zone maps use their indexes."""
+        table = self.table
+        table.cols.tcol.createIndex(kind='full')
+        condition = '(tcol > 150) & (tcol <= 250)'
+        explanation = self.checkQuery(condition, 'chunkmap')
+        self.assertEqual(explanation['indexes'], frozenset(['tcol']))
+        self.assertEqual(explanation['zonemaps'], frozenset())
+        self.assertEqual(table.willQueryUseIndexing(condition, plan=True),
+                         (frozenset(['tcol']), 'chunkmap'))
+        self.checkQuery('tcol < 50', 'chunkmap')
+        # Zone maps are used if searching the index is costly enough.
+        self.h5file.params['QUERY_INDEX_SLICE_COST'] = 500
+        explanation = self.checkQuery(condition, 'chunkmap')
+        self.assertEqual(explanation['indexes'], frozenset())
+        self.assertEqual(explanation['zonemaps'], frozenset(['tcol']))
+
+    def test05_partialUpdate(self):
+        """Updating the zone maps of a range of rows only."""
+        table = self.table
+        zonemap = table.cols.tcol.zonemap
+        bounds = zonemap.bounds
+        expected = bounds.read()
+        bounds[1:4] = [(-1., -1.)] * 3
+        bounds[50] = (-1., -1.)
+        # Whole chunks are summarized, but only the ones in the range.
+        zonemap.update(150, 210)
+        result = bounds.read()
+        self.assertEqual(result[:3].tolist(), expected[:3].tolist())
+        self.assertEqual(result[3].tolist(), [-1., -1.])
+        self.assertEqual(result[50].tolist(), [-1., -1.])
+        zonemap.update(0, table.nrows)
+        self.checkBounds()
+
+
+class ZoneMapReopenTestCase(ZoneMapTestCase):
+    reopen = True
+
+
+class BloomFilterTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for Bloom filters on columns."""
+
+    nrows = 10000
+    reopen = False
+
+    class MyDescription(IsDescription):
+        scol = StringCol(itemsize=12, pos=1)  # scattered identifiers
+        icol = Int32Col(pos=2)
+        fcol = FloatCol(pos=3)
+        mcol = IntCol(shape=(2,), pos=4)
+
+    def setUp(self):
+        super(BloomFilterTestCase, self).setUp()
+        table = self.h5file.createTable('/', 'table', self.MyDescription,
+                                        chunkshape=100)
+        self.appendRows(table, 0, self.nrows)
+        table.cols.scol.createBloomFilter()
+        table.cols.icol.createBloomFilter(fprate=0.05)
+        table.cols.fcol.createBloomFilter()
+        if self.reopen:
+            self._reopen('a')
+            table = self.h5file.root.table
+        self.table = table
+
+    def appendRows(self, table, start, stop):
+        """Append the rows in the ``[start:stop]`` range to `table`."""
+        table.append([ ('id%08d' % (i*7919 % 10000), i*7919 % 10000,
+                        i*.5, (i, i))
+                       for i in xrange(start, stop) ])
+
+    def checkFilters(self):
+        """Check the filters kept for every chunk of the table."""
+        table = self.table
+        cs = table.chunkshape[0]
+        for colname in ['scol', 'icol', 'fcol']:
+            bloomfilter = table.cols._f_col(colname).bloomfilter
+            values = table.col(colname)
+            nchunks = (len(values) + cs - 1) // cs
+            self.assertEqual(bloomfilter.nchunks, nchunks)
+            expected = bloomfilter._summarize(
+                values, numpy.arange(0, len(values), cs))
+            self.assertTrue(allequal(bloomfilter.bits.read(), expected))
+            # There are no false negatives.
+            for nrow in xrange(0, len(values), 97):
+                chunkmap = bloomfilter.get_chunkmap(['eq'], [values[nrow]])
+                self.assertTrue(chunkmap[nrow // cs])
+            # Only the chunks in a range are searched, a block at a time.
+            bloomfilter.bits.nrowsinbuf = 3
+            chunkmap = bloomfilter.get_chunkmap(['eq'], [values[250]])
+            ranged = bloomfilter.get_chunkmap(
+                ['eq'], [values[250]], 150, 460)
+            self.assertEqual(len(ranged), nchunks)
+            self.assertEqual(ranged[1:5].tolist(), chunkmap[1:5].tolist())
+            self.assertFalse(ranged[:1].any() or ranged[5:].any())
+
+    def checkQuery(self, condition, plan, **kwargs):
+        """Check that `condition` uses `plan` and gives right results."""
+        table = self.table
+        explanation = table.explain(condition, **kwargs)
+        if verbose:
+            print "Explanation for %r:" % condition, explanation
+        self.assertEqual(explanation['plan'], plan)
+        table._disableIndexingInQueries()
+        expected = table.getWhereList(condition, **kwargs)
+        table._enableIndexingInQueries()
+        result = [row.nrow for row in table.where(condition, **kwargs)]
+        self.assertTrue(allequal(numpy.array(result, dtype='int64'),
+                                 expected))
+        self.assertTrue(allequal(table.getWhereList(condition, **kwargs),
+                                 expected))
+        return explanation
+
+    def test00_create(self):
+        """Creating Bloom filters."""
+        table = self.table
+        self.checkFilters()
+        bloomfilter = table.cols.icol.bloomfilter
+        self.assertEqual(bloomfilter.fprate, 0.05)
+        self.assertEqual(bloomfilter.nbits % 8, 0)
+        self.assertTrue(bloomfilter.nhashes >= 1)
+        self.assertTrue(table.cols.icol.zonemap is None)
+        self.assertTrue(table.cols.mcol.bloomfilter is None)
+        self.assertRaises(TypeError, table.cols.mcol.createBloomFilter)
+        self.assertRaises(ValueError, table.cols.icol.createBloomFilter)
+        self.assertFalse(table.indexed)
+        table.cols.icol.removeBloomFilter()
+        self.assertTrue(table.cols.icol.bloomfilter is None)
+        self.assertRaises(ValueError, table.cols.icol.createBloomFilter, 0)
+        self.assertRaises(ValueError, table.cols.icol.createBloomFilter, 1.5)
+        self.checkQuery('icol == 3', 'scan')
+
+    def test01_query(self):
+        """Querying columns with Bloom filters."""
+        explanation = self.checkQuery('scol == "id00001234"', 'chunkmap')
+        self.assertEqual(explanation['indexes'], frozenset())
+        self.assertEqual(explanation['zonemaps'], frozenset(['scol']))
+        self.assertTrue(1 <= explanation['chunks'] <= 3)
+        self.checkQuery('icol == 4321', 'chunkmap')
+        self.checkQuery('(icol == 17) | (scol == "id00000042")', 'chunkmap')
+        self.checkQuery('(fcol == 2.5) & (icol > 3)', 'chunkmap')
+        self.checkQuery('scol == "id00000555"', 'chunkmap',
+                        start=33, stop=9000, step=7)
+        # Bloom filters can not help with ranges.
+        explanation = self.checkQuery('icol < 5', 'scan')
+        self.assertEqual(explanation['zonemaps'], frozenset())
+        # Few chunks are read for missing values.
+        bloomfilter = self.table.cols.scol.bloomfilter
+        nchunks = 0
+        for i in xrange(100):
+            chunkmap = bloomfilter.get_chunkmap(['eq'], ['foo%d' % i])
+            nchunks += chunkmap.sum()
+        self.assertTrue(nchunks < 0.05 * 100 * bloomfilter.nchunks)
+
+    def test02_append(self):
+        """Appending rows to tables with Bloom filters."""
+        table = self.table
+        self.appendRows(table, self.nrows, self.nrows + 150)
+        row = table.row
+        for i in xrange(55):
+            row['scol'] = 'new%d' % i
+            row['icol'] = -i
+            row.append()
+        table.flush()
+        if self.reopen:
+            self._reopen('a')
+            self.table = table = self.h5file.root.table
+        self.checkFilters()
+        explanation = self.checkQuery('scol == "new33"', 'chunkmap')
+        self.assertTrue(explanation['chunks'] >= 1)
+        self.checkQuery('icol == -54', 'chunkmap')
+
+    def test03_modify(self):
+        """Modifying rows of tables with Bloom filters."""
+        table = self.table
+        table.modifyRows(150, 152, rows=[('x', -1, -1., (0, 0))]*2)
+        table.cols.icol[2000:2300:7] = numpy.arange(43) + 20000
+        table.modifyColumns(4000, 4001, columns=[['z']], names=['scol'])
+        table[[7000, 9999]] = [('y', -2, 1e6, (1, 1))]*2
+        for row in table.iterrows(5000, 5003):
+            row['icol'] = -row.nrow
+            row.update()
+        table.flush()
+        self.checkFilters()
+        self.checkQuery('scol == "x"', 'chunkmap')
+        self.checkQuery('icol == 20042', 'chunkmap')
+        self.checkQuery('(scol == "z") | (fcol == 1e6)', 'chunkmap')
+        self.checkQuery('icol == -5002', 'chunkmap')
+        table.removeRows(3050, 3170)
+        self.checkFilters()
+        self.checkQuery('scol == "id00000042"', 'chunkmap')
+
+    def test04_indexes(self):
+        """Choosing between Bloom filters and indexes."""
+        table = self.table
+        table.cols.scol.createIndex(kind='full')
+        # Indexes are searched by default.
+        explanation = self.checkQuery('scol == "id00004321"', 'coords')
+        self.assertEqual(explanation['zonemaps'], frozenset())
+        self.assertEqual(explanation['indexes'], frozenset(['scol']))
+        # Reading a few chunks is cheaper than searching a costly index.
+        self.h5file.params['QUERY_INDEX_SLICE_COST'] = 500
+        explanation = self.checkQuery('scol == "id00004321"', 'chunkmap')
+        self.assertEqual(explanation['zonemaps'], frozenset(['scol']))
+        self.assertEqual(explanation['indexes'], frozenset())
+
+
+class BloomFilterReopenTestCase(BloomFilterTestCase):
+    reopen = True
+
+
+class BitmapIndexTestCase(TempFileMixin, PyTablesTestCase):
+    """Test case for bitmap indexes."""
+
+    nrows = 10003
+    reopen = False
+    colors = Enum(['red', 'green', 'blue'])
+
+    class MyDescription(IsDescription):
+        ecol = EnumCol(Enum(['red', 'green', 'blue']), 'red', 'uint8',
+                       pos=1)
+        scol = StringCol(itemsize=4, pos=2)
+        icol = IntCol(pos=3)
+        fcol = FloatCol(pos=4)
+
+    def setUp(self):
+        super(BitmapIndexTestCase, self).setUp()
+        table = self.h5file.createTable('/', 'table', self.MyDescription,
+                                        chunkshape=100)
+        self.appendRows(table, 0, self.nrows)
+        table.cols.ecol.createIndex(kind='bitmap')
+        table.cols.scol.createIndex(kind='bitmap')
+        table.cols.icol.createIndex(kind='bitmap')
+        if self.reopen:
+            self._reopen('a')
+            table = self.h5file.root.table
+        self.table = table
+
+    def appendRows(self, table, start, stop):
+        """Append the rows in the ``[start:stop]`` range to `table`."""
+        # Values come in runs, so that selective queries touch few chunks.
+        table.append([ (min((i % 1000) // 20, 2), 's%d' % (i // 500 % 7),
+                        i // 50 % 100, i)
+                       for i in xrange(start, stop) ])
+
+    def checkQuery(self, condition, plan=None, **kwargs):
+        """Check that `condition` uses `plan` and gives right results.
+
+        If `plan` is None, any plan using the indexes is accepted.
+        """
+        table = self.table
+        condvars = {'red': self.colors['red'], 'blue': self.colors['blue']}
+        explanation = table.explain(condition, condvars, **kwargs)
+        if verbose:
+            print "Explanation for %r:" % condition, explanation
+        if plan is None:
+            self.assertNotEqual(explanation['plan'], 'scan')
+        else:
+            self.assertEqual(explanation['plan'], plan)
+        table._disableIndexingInQueries()
+        expected = table.getWhereList(condition, condvars, **kwargs)
+        table._enableIndexingInQueries()
+        result = [ row.nrow
+                   for row in table.where(condition, condvars, **kwargs) ]
+        self.assertTrue(allequal(numpy.array(result, dtype='int64'),
+                                 expected))
+        self.assertTrue(allequal(
+            table.getWhereList(condition, condvars, **kwargs), expected))
+        return expected
+
+    def test00_create(self):
+        """Creating bitmap indexes."""
+        table = self.table
+        index = table.cols.scol.index
+        self.assertTrue(isinstance(index, BitmapIndex))
+        self.assertEqual(index.kind, 'bitmap')
+        self.assertEqual(index.nelements, self.nrows)
+        self.assertEqual(index.nvalues, 7)
+        self.assertEqual(sorted(index.values.read()),
+                         ['s%d' % i for i in range(7)])
+        self.assertFalse(index.dirty)
+        self.assertTrue(table.colindexed['icol'])
+        coords = numpy.arange(self.nrows)
+        self.assertTrue(allequal(index.search(['eq'], ['s3']),
+                                 coords[coords // 500 % 7 == 3]))
+        self.assertRaises(ValueError, table.cols.icol.createIndex,
+                          kind='bitmap')
+        table.cols.icol.removeIndex()
+        self.assertTrue(table.cols.icol.index is None)
+        self.checkQuery('icol < 3', 'scan')
+
+    def test01_query(self):
+        """Querying columns with bitmap indexes."""
+        coords = self.checkQuery('ecol == red')
+        self.assertEqual(len(coords), 203)
+        self.checkQuery('(ecol == red) & (scol == "s2")')
+        self.checkQuery('(scol == "s0") & ((icol > 3) & (icol <= 5))')
+        self.checkQuery('(ecol == red) | (icol == 4)', start=11, stop=9000,
+                        step=3)
+        self.assertEqual(len(self.checkQuery('icol > 100')), 0)
+        # Unselective conditions are better solved by a table scan.
+        self.checkQuery('ecol == blue', 'scan')
+        # Bitmap indexes can be combined with other kinds.
+        self.table.cols.fcol.createIndex(kind='full')
+        self.checkQuery('(fcol < 700) & (scol == "s1")')
+        self.checkQuery('(fcol < 50) | (icol == 9)')
+
+    def test02_append(self):
+        """Appending rows to tables with bitmap indexes."""
+        table = self.table
+        self.appendRows(table, self.nrows, self.nrows + 150)
+        row = table.row
+        for i in xrange(5):
+            row['scol'] = 'new'
+            row['icol'] = 100
+            row.append()
+        table.flush()
+        if self.reopen:
+            self._reopen('a')
+            self.table = table = self.h5file.root.table
+        nrows = self.nrows + 155
+        self.assertEqual(table.cols.scol.index.nelements, nrows)
+        self.assertEqual(table.cols.scol.index.nvalues, 8)
+        self.assertEqual(list(self.checkQuery('scol == "new"')),
+                         range(nrows - 5, nrows))
+        self.checkQuery('(icol == 100) | (ecol == red)')
+        self.checkQuery('(scol == "s2") & (icol > 95)')
+
+    def test03_modify(self):
+        """Modifying rows of tables with bitmap indexes."""
+        table = self.table
+        table.modifyRows(150, 152, rows=[(0, 'x', 42, 0.)]*2)
+        table.cols.icol[200:300:7] = numpy.arange(15)
+        self.assertFalse(table.cols.icol.index.dirty)
+        self.checkQuery('scol == "x"', 'coords')
+        self.checkQuery('(icol == 42) | (icol == 14)')
+        table.removeRows(500, 600)
+        self.assertEqual(table.cols.icol.index.nelements, self.nrows - 100)
+        self.checkQuery('(ecol == red) | (icol < 2)')
+
+    def test04_maxValues(self):
+        """Limiting the number of distinct values in bitmap indexes."""
+        table = self.table
+        params = self.h5file.params
+        # Columns with too many values get a normal index.
+        params['BITMAP_MAX_VALUES'] = 50
+        table.cols.icol.removeIndex()
+        table.cols.icol.createIndex(kind='bitmap')
+        self.assertEqual(table.cols.icol.index.kind, 'full')
+        self.checkQuery('icol == 42')
+        # Rows bringing too many values replace the bitmap index too.
+        params['BITMAP_MAX_VALUES'] = 8
+        row = table.row
+        for i in xrange(2):
+            row['scol'] = 'new%d' % i
+            row.append()
+        table.flush()
+        index = table.cols.scol.index
+        self.assertEqual(index.kind, 'full')
+        self.assertFalse(index.dirty)
+        self.assertEqual(list(self.checkQuery('scol == "new1"')),
+                         [self.nrows + 1])
+        self.checkQuery('(scol == "s2") & (ecol == red)')
+        # Other bitmap indexes are still usable.
+        self.assertEqual(table.cols.ecol.index.kind, 'bitmap')
+        self.assertEqual(table.cols.ecol.index.nelements, self.nrows + 2)
+
+
+class BitmapIndexReopenTestCase(BitmapIndexTestCase):
+    reopen = True
+
+
 #----------------------------------------------------------------------
 
 def suite():
@@ -2343,6 +3445,17 @@ def suite():
         theSuite.addTest(unittest.makeSuite(readSortedIndex3))
         theSuite.addTest(unittest.makeSuite(readSortedIndex6))
         theSuite.addTest(unittest.makeSuite(readSortedIndex9))
+        theSuite.addTest(unittest.makeSuite(CompositeIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(IndexCoordsTestCase))
+        theSuite.addTest(unittest.makeSuite(QueryPlannerTestCase))
+        theSuite.addTest(unittest.makeSuite(ParallelBuildTestCase))
+        theSuite.addTest(unittest.makeSuite(CompactIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(ZoneMapTestCase))
+        theSuite.addTest(unittest.makeSuite(ZoneMapReopenTestCase))
+        theSuite.addTest(unittest.makeSuite(BloomFilterTestCase))
+        theSuite.addTest(unittest.makeSuite(BloomFilterReopenTestCase))
+        theSuite.addTest(unittest.makeSuite(BitmapIndexTestCase))
+        theSuite.addTest(unittest.makeSuite(BitmapIndexReopenTestCase))
     if heavy:
         # These are too heavy for normal testing
         theSuite.addTest(unittest.makeSuite(AI4bTestCase))
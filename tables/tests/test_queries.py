@@ -16,6 +16,7 @@ import unittest
 import numpy
 
 import tables
+from tables import conditions
 from tables.utils import SizeType
 from tables.tests import common
 from common import verbosePrint as vprint
@@ -224,10 +225,14 @@ class BaseTableQueryTestCase(common.TempFileMixin, common.PyTablesTestCase):
         to index them.
     ``optlevel``
         The level of optimisation of column indexes.  Default is 0.
+    ``chunkmapcost``
+        The value of the ``QUERY_CHUNKMAP_COST`` parameter.  Default
+        is None, which keeps the default value.
     """
 
     indexed = False
     optlevel = 0
+    chunkmapcost = None
 
     colNotIndexable_re = re.compile(r"\bcan not be indexed\b")
     condNotBoolean_re = re.compile(r"\bdoes not have a boolean type\b")
@@ -255,6 +260,8 @@ class BaseTableQueryTestCase(common.TempFileMixin, common.PyTablesTestCase):
 
     def setUp(self):
         super(BaseTableQueryTestCase, self).setUp()
+        if self.chunkmapcost is not None:
+            self.h5file.params['QUERY_CHUNKMAP_COST'] = self.chunkmapcost
         self.table = table = self.h5file.createTable(
             '/', 'test', self.tableDescription, expectedrows=self.nrows )
         fill_table(table, self.shape, self.nrows)
@@ -383,6 +390,11 @@ def create_test_method(type_, op, extracond):
             ptvars['c_idxextra'] = table.colinstances['c_idxextra']
             try:
                 isidxq = table.willQueryUseIndexing(cond, ptvars)
+                if isidxq and self.chunkmapcost == 0:
+                    # Reading chunks costs nothing, so usable indexes
+                    # must always be used.
+                    explanation = table.explain(cond, ptvars, **table_slice)
+                    self.assertNotEqual(explanation['plan'], 'scan')
                 # Query twice to trigger possible query result caching.
                 ptrownos = [ table.getWhereList( cond, condvars, sort=True,
                                                  **table_slice )
@@ -506,6 +518,10 @@ heavy_itable_optvalues = frozenset([0, 1, 7, 9])
 #    Index types are listed in `ckinds`.
 # 3. 0 to 9 is the desired index optimization level.
 #    Optimizations are listed in `itable_optvalues`.
+#
+# Reading chunks is made free, so that indexes are always used when
+# possible, since the query planner would otherwise fall back to
+# sequential scans on these small tables (see `QueryPlanTestCase`).
 def iclassdata():
     for ckind in ckinds:
         for size in itable_sizes:
@@ -518,7 +534,8 @@ def iclassdata():
                                '%sITableMixin' % ckind,
                                'ScalarTableMixin',
                                'TableDataTestCase' )
-                classdict = dict(heavy=heavy, optlevel=optlevel, indexed=True)
+                classdict = dict(heavy=heavy, optlevel=optlevel,
+                                 indexed=True, chunkmapcost=0)
                 yield (classname, cbasenames, classdict)
 
 
@@ -1068,6 +1085,104 @@ class IndexedTableUsage32(IndexedTableUsage):
     str_expr = ''
 
 
+class QueryPlanTestCase(common.TempFileMixin, common.PyTablesTestCase):
+
+    """Test case for indexed queries falling back to sequential scans."""
+
+    nrows = 1000
+
+    def setUp(self):
+        super(QueryPlanTestCase, self).setUp()
+        self.table = table = self.h5file.createTable(
+            '/', 'test', {'c1': tables.Int32Col(), 'c2': tables.FloatCol()})
+        table.append([(i % 10, i*2.) for i in xrange(self.nrows)])
+        table.cols.c1.createIndex(kind='full')
+        self.expected = [i for i in xrange(self.nrows) if i % 10 < 9]
+
+    def test00_scan(self):
+        """Conditions selecting most rows are solved by a scan."""
+        table, condition = self.table, 'c1 < 9'
+        self.assertEqual(table.willQueryUseIndexing(condition),
+                         frozenset(['c1']))
+        self.assertEqual(table.willQueryUseIndexing(condition, plan=True),
+                         (frozenset(), None))
+        self.assertEqual(table.explain(condition)['plan'], 'scan')
+        self.assertEqual(table.getWhereList(condition).tolist(),
+                         self.expected)
+
+    def test01_freeChunks(self):
+        """Indexes are always used when reading chunks costs nothing."""
+        table, condition = self.table, 'c1 < 9'
+        self.h5file.params['QUERY_CHUNKMAP_COST'] = 0
+        self.assertNotEqual(table.explain(condition)['plan'], 'scan')
+        self.assertEqual(table.getWhereList(condition, sort=True).tolist(),
+                         self.expected)
+
+
+class SharedConditionCacheTestCase(common.TempFileMixin,
+                                   common.PyTablesTestCase):
+
+    """Test case for the cache of compiled conditions shared by tables."""
+
+    def setUp(self):
+        super(SharedConditionCacheTestCase, self).setUp()
+        self.cache = conditions.compiled_condition_cache
+        self.tables = []
+        for name in ['test1', 'test2']:
+            table = self.h5file.createTable(
+                '/', name, {'c1': tables.Int32Col(), 'c2': tables.FloatCol()})
+            table.append([(i, i*2.) for i in xrange(20)])
+            self.tables.append(table)
+
+    def test00_shared(self):
+        """Sharing compiled conditions among tables and files."""
+        # Use a condition that can not be cached by other tests.
+        condition = '(c1 > %d) & (c2 < 30.)' % id(self)
+        hits, misses = self.cache.hits, self.cache.misses
+        self.assertEqual(
+            self.tables[0].getWhereList(condition).tolist(), [])
+        self.assertEqual(self.cache.misses, misses+1)
+        # The other table has the same description.
+        self.tables[1].getWhereList(condition)
+        self.assertEqual(self.cache.hits, hits+1)
+        # And the condition survives the closing of the file.
+        self._reopen()
+        self.h5file.root.test1.getWhereList(condition)
+        self.assertEqual(self.cache.hits, hits+2)
+        self.assertEqual(self.cache.misses, misses+1)
+
+    def test01_indexed(self):
+        """Conditions with different usable indexes are not mixed."""
+        condition = 'c1 > 15'
+        self.tables[1].cols.c1.createIndex(_blocksizes=small_blocksizes)
+        self.assertTrue(self.tables[1].willQueryUseIndexing(condition))
+        self.assertFalse(self.tables[0].willQueryUseIndexing(condition))
+        for table in self.tables:
+            self.assertEqual(
+                table.getWhereList(condition).tolist(), [16, 17, 18, 19])
+
+    def test02_lru(self):
+        """Discarding the least recently used conditions."""
+        cache = conditions.CompiledConditionCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache.get('a'), 1)
+        cache['c'] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # Setting a condition again makes it the most recently used.
+        cache['a'] = 4
+        cache['d'] = 5
+        self.assertEqual(sorted(cache._cache.keys()), ['a', 'd'])
+        self.assertEqual(cache.get('a'), 4)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+
 
 # Main part
 # ---------
@@ -1130,6 +1245,8 @@ def suite():
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage30))
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage31))
         testSuite.addTest(unittest.makeSuite(IndexedTableUsage32))
+        testSuite.addTest(unittest.makeSuite(QueryPlanTestCase))
+        testSuite.addTest(unittest.makeSuite(SharedConditionCacheTestCase))
 
     return testSuite
 
@@ -2,6 +2,7 @@ import sys
 import unittest
 import os
 import tempfile
+import threading
 import warnings
 
 from numpy import *
@@ -4940,6 +4941,1618 @@ class WhereAppendTestCase(common.TempFileMixin, common.PyTablesTestCase):
             os.remove(h5fname2)
 
 
+    def _fillBigTable(self, nrows):
+        tbl1 = self.h5file.root.test
+        tbl1.append([(i, i*.5, str(i)) for i in xrange(nrows)])
+        return tbl1
+
+
+    def test06_reordered(self):
+        """Query with reordered storage spanning several buffers."""
+
+        class DstTblDesc(IsDescription):
+            v3 = IntCol(dflt=-1, pos=0)  # extra column with a default
+            v2 = StringCol(itemsize=8, pos=1)
+            v1 = FloatCol(pos=2)
+            id = IntCol(pos=3)
+
+        tbl1 = self._fillBigTable(3*self.h5file.root.test.nrowsinbuf)
+        tbl2 = self.h5file.createTable('/', 'test2', DstTblDesc)
+        nrows = tbl1.whereAppend(tbl2, '(id % 3) == 0', step=2)
+
+        expected = [r.fetch_all_fields()
+                    for r in tbl1.where('(id % 3) == 0', step=2)]
+        self.assertEqual(nrows, len(expected))
+        self.assertEqual(tbl2.nrows, len(expected))
+        for r1, r2 in zip(expected, tbl2.read()):
+            self.assertTrue(r1['id'] == r2['id'] and r1['v1'] == r2['v1']
+                            and r1['v2'] == r2['v2'] and r2['v3'] == -1)
+
+
+    def test07_indexed(self):
+        """Query using an index."""
+
+        tbl1 = self._fillBigTable(2*self.h5file.root.test.nrowsinbuf)
+        tbl1.cols.id.createIndex()
+        tbl2 = self.h5file.createTable('/', 'test2', self.SrcTblDesc)
+        cond = '(id > 10) & (id < 1000)'
+        self.assertTrue(tbl1.willQueryUseIndexing(cond))
+        # Query twice to check the cache of query results too.
+        for i in range(2):
+            tbl1.whereAppend(tbl2, cond)
+        expected = tbl1.readWhere(cond)
+        self.assertTrue(allequal(tbl2.read(),
+                                 concatenate([expected, expected])))
+
+
+    def test08_indexedSmallBuffer(self):
+        """Query using an index with a buffer smaller than a chunk."""
+
+        tbl1 = self.h5file.createTable('/', 'test1', self.SrcTblDesc,
+                                       chunkshape=16)
+        tbl1.append([(i, i*.5, str(i)) for i in xrange(200)])
+        tbl1.cols.id.createIndex(kind='light')
+        tbl1.nrowsinbuf = 15
+        tbl2 = self.h5file.createTable('/', 'test2', self.SrcTblDesc)
+        cond = '(id > 10) & (id < 40)'
+        self.assertEqual(tbl1.explain(cond)['plan'], 'chunkmap')
+        nrows = tbl1.whereAppend(tbl2, cond)
+        self.assertEqual(nrows, 29)
+        self.assertEqual(list(tbl2.cols.id[:]), range(11, 40))
+
+
+
+class ReadWhereTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests `Table.readWhere()` and `Table.getWhereList()` methods."""
+
+    depth = 0
+    workers = 2
+    filters = None
+
+
+    class TblDesc(IsDescription):
+        id = IntCol()
+        v1 = FloatCol()
+        v2 = StringCol(itemsize=8)
+        v3 = Time64Col()
+
+
+    def setUp(self):
+        super(ReadWhereTestCase, self).setUp()
+        self.h5file.params['QUERY_PIPELINE_DEPTH'] = self.depth
+        self.h5file.params['QUERY_PIPELINE_WORKERS'] = self.workers
+
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc,
+                                      filters=self.filters)
+        nrows = 3*tbl.nrowsinbuf + 10
+        tbl.append([(i, i*.5, str(i), i+.25) for i in xrange(nrows)])
+        tbl.flush()
+        self.tbl = tbl
+
+
+    def _checkQuery(self, cond, **kwargs):
+        tbl = self.tbl
+        expected = [r.nrow for r in tbl.where(cond, **kwargs)]
+        coords = tbl.getWhereList(cond, **kwargs)
+        self.assertEqual(list(coords), expected)
+        self.assertTrue(allequal(tbl.readWhere(cond, **kwargs),
+                                 tbl.readCoordinates(expected)))
+        self.assertTrue(allequal(tbl.readWhere(cond, field='v1', **kwargs),
+                                 tbl.readCoordinates(expected, field='v1')))
+
+
+    def test00_inKernel(self):
+        """Querying several I/O buffers in-kernel."""
+
+        self._checkQuery('(id % 7) == 0')
+        self._checkQuery('(id % 7) == 0', start=3, stop=-5, step=3)
+        self._checkQuery('id < 0')
+
+
+    def test01_indexed(self):
+        """Querying several I/O buffers using an index."""
+
+        self.tbl.cols.id.createIndex()
+        cond = '(id > 10) & (id < %d)' % (2*self.tbl.nrowsinbuf)
+        self.assertTrue(self.tbl.willQueryUseIndexing(cond))
+        # Query twice to check the cache of query results too.
+        for i in range(2):
+            self._checkQuery(cond)
+        self._checkQuery(cond, start=3, stop=-5, step=3)
+
+
+    def test02_empty(self):
+        """Querying with no results."""
+
+        coords = self.tbl.getWhereList('id < 0')
+        self.assertEqual(len(coords), 0)
+        self.assertEqual(coords.dtype, SizeType)
+        result = self.tbl.readWhere('id < 0')
+        self.assertEqual(len(result), 0)
+        self.assertEqual(result.dtype, self.tbl.dtype)
+        result = self.tbl.readWhere('id < 0', field='v2')
+        self.assertEqual(len(result), 0)
+        self.assertEqual(result.dtype, self.tbl.coldtypes['v2'])
+
+
+    def test03_prefetchThread(self):
+        """Prefetched buffers are read from HDF5 by the consuming thread."""
+
+        from tables.table import _BufferPrefetcher
+        tbl = self.tbl
+        if not tbl._wholeChunkRows(read=True):
+            raise common.SkipTest("chunks can not be read directly")
+        threads, workers = [], set()
+        readChunk = tbl._g_readChunk
+        def _g_readChunk(offset):
+            threads.append(threading.currentThread())
+            if offset[0] == tbl.chunkshape[0]:
+                return None  # check the rows of chunks not written yet
+            return readChunk(offset)
+        tbl._g_readChunk = _g_readChunk
+        def _prepareReadRows(*args):
+            workers.add(threading.currentThread())
+            return tbl.__class__._prepareReadRows(tbl, *args)
+        tbl._prepareReadRows = _prepareReadRows
+        start = tbl.chunkshape[0] // 2
+        prefetcher = _BufferPrefetcher(tbl, start, tbl.nrows,
+                                       self.depth or 1, ['id', 'v3'])
+        try:
+            nrows = 0
+            buffer_ = prefetcher.next()
+            while buffer_ is not None:
+                bstart, records = buffer_
+                self.assertEqual(bstart, start + nrows)
+                expected = tbl.read(bstart, bstart+len(records))
+                self.assertEqual(records.dtype.names, ('id', 'v3'))
+                self.assertTrue(allequal(records['id'], expected['id']))
+                self.assertTrue(allequal(records['v3'], expected['v3']))
+                nrows += len(records)
+                buffer_ = prefetcher.next()
+            self.assertEqual(nrows, tbl.nrows - start)
+        finally:
+            prefetcher.close()
+            del tbl._g_readChunk
+            del tbl._prepareReadRows
+        prefetcher.close()
+        self.assertTrue(len(threads) > 0)
+        self.assertEqual(threads, [threading.currentThread()] * len(threads))
+        # The buffers are prepared by the pool of the file.
+        self.assertTrue(0 < len(workers) <= self.workers)
+        self.assertTrue(threading.currentThread() not in workers)
+
+
+
+class ParallelWhereTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests `Table.parallelWhere()` method."""
+
+
+    class TblDesc(IsDescription):
+        id = IntCol()
+        v1 = FloatCol()
+        v2 = StringCol(itemsize=8)
+
+
+    def setUp(self):
+        super(ParallelWhereTestCase, self).setUp()
+
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc,
+                                      chunkshape=(100,))
+        nrows = 1000
+        tbl.append([(i, i*.5, str(i)) for i in xrange(nrows)])
+        self.tbl = tbl
+
+
+    def test00_records(self):
+        """Reading records and fields in several partitions."""
+
+        tbl = self.tbl
+        self.assertTrue(allequal(tbl.parallelWhere('(id % 7) == 0',
+                                                   nworkers=3),
+                                 tbl.readWhere('(id % 7) == 0')))
+        bound = 300
+        self.assertTrue(allequal(
+            tbl.parallelWhere('(v1 > bound) | (id < 10)', field='v2',
+                              start=3, stop=-50, step=7, nworkers=4),
+            tbl.readWhere('(v1 > bound) | (id < 10)', field='v2',
+                          start=3, stop=-50, step=7)))
+
+
+    def test01_coords(self):
+        """Getting coordinates in several partitions."""
+
+        tbl = self.tbl
+        self.assertTrue(allequal(
+            tbl.parallelWhere('id > 500', start=250, nworkers=3,
+                              stop=900, coordsonly=True),
+            tbl.getWhereList('id > 500', start=250, stop=900)))
+        coords = tbl.parallelWhere('id < 0', coordsonly=True, nworkers=2)
+        self.assertEqual(len(coords), 0)
+
+
+    def test02_errors(self):
+        """Errors in the condition are raised before starting workers."""
+
+        tbl = self.tbl
+        self.assertRaises(NameError, tbl.parallelWhere, 'id > foo', {})
+        self.assertRaises(KeyError, tbl.parallelWhere, 'id > 0',
+                          field='foo')
+
+
+
+class ReadWherePipeline1TestCase(ReadWhereTestCase):
+    depth = 1
+    workers = 1
+    filters = Filters(complevel=1)
+
+class ReadWherePipeline3TestCase(ReadWhereTestCase):
+    depth = 3
+    workers = 3
+    filters = Filters(complevel=1, shuffle=False)
+
+class ReadWherePipelineBloscTestCase(ReadWhereTestCase):
+    depth = 4
+    workers = 2
+    filters = Filters(complevel=5, complib='blosc')
+
+
+
+class AggregateTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests `Table.aggregate()` and `Column.aggregate()` methods."""
+
+    depth = 0
+    filters = None
+
+
+    class TblDesc(IsDescription):
+        id = IntCol(pos=0)
+        v1 = Float32Col(pos=1)
+        v2 = StringCol(itemsize=8, pos=2)
+        md = Int16Col(shape=(2,), pos=3)
+        class nested(IsDescription):
+            _v_pos = 4
+            x = Int16Col()
+
+
+    def setUp(self):
+        super(AggregateTestCase, self).setUp()
+        self.h5file.params['QUERY_PIPELINE_DEPTH'] = self.depth
+
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc,
+                                      filters=self.filters)
+        nrows = 3*tbl.nrowsinbuf + 10
+        tbl.append([ (i, i*.5, str(i % 113), (i % 7, -i), (i % 3,))
+                     for i in xrange(nrows) ])
+        tbl.flush()
+        self.tbl = tbl
+
+
+    def _checkAggregate(self, colname, cond=None, **kwargs):
+        tbl = self.tbl
+        if cond is None:
+            values = tbl.read(field=colname, **kwargs)
+        else:
+            values = tbl.readWhere(cond, field=colname, **kwargs)
+        funcs = ['count', 'min', 'max']
+        if values.dtype.kind != 'S':
+            funcs.extend(['sum', 'mean'])
+        result = tbl.aggregate({colname: funcs}, cond, **kwargs)
+        self.assertEqual(result.keys(), [colname])
+        count, vmin, vmax = result[colname][:3]
+        self.assertEqual(count, len(values))
+        if len(values) == 0:
+            self.assertEqual(result[colname][1:3], (None, None))
+            if values.dtype.kind != 'S':
+                self.assertTrue(allequal(result[colname][3],
+                                         values.sum(axis=0)))
+                self.assertTrue(result[colname][4] is None)
+            return
+        sortedvalues = sort(values, axis=0)
+        self.assertTrue(allequal(vmin, sortedvalues[0]))
+        self.assertTrue(allequal(vmax, sortedvalues[-1]))
+        if values.dtype.kind != 'S':
+            vsum, vmean = result[colname][3:]
+            self.assertTrue(allclose(vsum, values.sum(axis=0)))
+            self.assertTrue(allclose(vmean, values.mean(axis=0)))
+
+
+    def test00_noCondition(self):
+        """Aggregating all the rows in a range."""
+
+        for colname in ['id', 'v1', 'v2', 'md', 'nested/x']:
+            self._checkAggregate(colname)
+            self._checkAggregate(colname, start=3, stop=-5, step=3)
+            self._checkAggregate(colname, start=5, stop=5)
+        tbl = self.tbl
+        self.assertEqual(tbl.cols.id.aggregate('count'), tbl.nrows)
+        self.assertEqual(tbl.cols.id.aggregate('count', step=10),
+                         len(xrange(0, tbl.nrows, 10)))
+
+
+    def test01_condition(self):
+        """Aggregating the rows fulfilling a condition."""
+
+        for colname in ['id', 'v1', 'v2', 'md']:
+            self._checkAggregate(colname, '(id % 7) == 0')
+            self._checkAggregate(colname, '(id % 7) == 0',
+                                 start=3, stop=-5, step=3)
+            self._checkAggregate(colname, 'id < 0')
+        tbl = self.tbl
+        bound = tbl.nrowsinbuf
+        result = tbl.aggregate({'id': 'count', 'v1': 'sum'},
+                               '(id > bound) & (v2 == "3")')
+        values = tbl.readWhere('(id > bound) & (v2 == "3")', field='v1')
+        self.assertEqual(result, {'id': len(values), 'v1': values.sum()})
+        self.assertEqual(tbl.cols.v1.aggregate('max', 'id < bound'),
+                         (bound-1) * .5)
+
+
+    def test02_indexed(self):
+        """Aggregating the rows fulfilling a condition with indexes."""
+
+        tbl = self.tbl
+        tbl.cols.id.createIndex(kind='full')
+        cond = '(id > 10) & (id < %d)' % (2*tbl.nrowsinbuf)
+        self.assertTrue(tbl.willQueryUseIndexing(cond))
+        for colname in ['id', 'v1', 'md']:
+            self._checkAggregate(colname, cond)
+            self._checkAggregate(colname, cond, start=3, stop=-5, step=3)
+
+
+    def test03_countIndexed(self):
+        """Counting rows using only indexes."""
+
+        tbl = self.tbl
+        tbl.cols.id.createIndex(kind='full')
+        tbl.cols.v2.createIndex(kind='full')
+        nrows = tbl.nrowsinbuf
+        conds = [ 'id < %d' % nrows, '(id > 10) & (id <= %d)' % nrows,
+                  '(id < 10) | (id > %d)' % nrows,
+                  '(id < %d) & (v2 == "3")' % (2*nrows), 'id < 0' ]
+        expected = []
+        for cond in conds:
+            expected.append((len(tbl.getWhereList(cond)),
+                             len(tbl.getWhereList(cond, start=3, step=7,
+                                                  stop=-5))))
+        # The table must not be read for counting.
+        tbl._where = None
+        for cond, (count, count2) in zip(conds, expected):
+            self.assertEqual(tbl.aggregate({'id': 'count'}, cond),
+                             {'id': count})
+            self.assertEqual(tbl.cols.v2.aggregate('count', cond,
+                                                   start=3, stop=-5, step=7),
+                             count2)
+        # These conditions are not fully covered by indexes.
+        del tbl._where
+        for cond in ['(id < 10) & (v1 > 2)', 'id < 10.5', 'v2 == "123456789"']:
+            self.assertEqual(tbl.cols.id.aggregate('count', cond),
+                             len(tbl.getWhereList(cond)))
+
+
+    def test04_errors(self):
+        """Aggregating with wrong arguments."""
+
+        tbl = self.tbl
+        self.assertRaises(ValueError, tbl.aggregate, {'id': 'foo'})
+        self.assertRaises(ValueError, tbl.cols.id.aggregate, ('sum', 'foo'))
+        self.assertRaises(KeyError, tbl.aggregate, {'foo': 'sum'})
+        self.assertRaises(TypeError, tbl.aggregate, {'nested': 'count'})
+        self.assertRaises(TypeError, tbl.aggregate, {'v2': 'sum'})
+        self.assertRaises(TypeError, tbl.cols.v2.aggregate, 'mean')
+        self.assertRaises(NameError, tbl.aggregate, {'id': 'sum'},
+                          'id > foo', {})
+
+
+class AggregatePipelineTestCase(AggregateTestCase):
+    depth = 2
+    filters = Filters(complevel=1)
+
+
+
+class GroupByTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests `Table.groupby()` method."""
+
+
+    class TblDesc(IsDescription):
+        sym = StringCol(itemsize=4, pos=0)
+        day = Int32Col(pos=1)
+        price = Float64Col(pos=2)
+        md = Int16Col(shape=(2,), pos=3)
+
+
+    aggregates = { 'price': ('count', 'sum', 'mean', 'min', 'max'),
+                   'sym': ('min', 'max'), 'md': 'sum' }
+
+
+    def setUp(self):
+        super(GroupByTestCase, self).setUp()
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc)
+        nrows = 3*tbl.nrowsinbuf + 10
+        tbl.append([ ('s%d' % (i % 13), i % 5, i * .5, (i % 3, -i))
+                     for i in xrange(nrows) ])
+        tbl.flush()
+        self.tbl = tbl
+
+
+    def _checkGroups(self, result, cond=None, **kwargs):
+        tbl = self.tbl
+        if cond is None:
+            data = tbl.read(**kwargs)
+        else:
+            data = tbl.readWhere(cond, **kwargs)
+        groups = {}
+        for row in data:
+            groups.setdefault((row['sym'], row['day']), []).append(row)
+        keys = groups.keys()
+        keys.sort()
+        self.assertEqual(result.dtype.names,
+                         ('sym', 'day', 'sym_min', 'sym_max', 'price_count',
+                          'price_sum', 'price_mean', 'price_min', 'price_max',
+                          'md_sum'))
+        self.assertEqual([(row['sym'], row['day']) for row in result], keys)
+        for row in result:
+            rows = array(groups[(row['sym'], row['day'])])
+            self.assertEqual(row['sym_min'], row['sym'])
+            self.assertEqual(row['sym_max'], row['sym'])
+            self.assertEqual(row['price_count'], len(rows))
+            self.assertEqual(row['price_sum'], rows['price'].sum())
+            self.assertTrue(allclose(row['price_mean'], rows['price'].mean()))
+            self.assertEqual(row['price_min'], rows['price'].min())
+            self.assertEqual(row['price_max'], rows['price'].max())
+            self.assertTrue(allequal(row['md_sum'], rows['md'].sum(axis=0)))
+
+
+    def test00_hash(self):
+        """Grouping rows by hashing their keys."""
+
+        tbl = self.tbl
+        self._checkGroups(tbl.groupby(['sym', 'day'], self.aggregates))
+        self._checkGroups(tbl.groupby(('sym', 'day'), self.aggregates,
+                                      start=3, stop=-5, step=3),
+                          start=3, stop=-5, step=3)
+        self._checkGroups(tbl.groupby(['sym', 'day'], self.aggregates,
+                                      'price > 1000'), 'price > 1000')
+        result = tbl.groupby('day', {'sym': 'count'}, 'price < 0')
+        self.assertEqual(len(result), 0)
+        self.assertEqual(result.dtype.names, ('day', 'sym_count'))
+        result = tbl.groupby('day', {'sym': 'count'}, start=5, stop=5)
+        self.assertEqual(len(result), 0)
+
+
+    def test01_spill(self):
+        """Grouping rows with partial results spilled to disk."""
+
+        tbl = self.tbl
+        self.h5file.params['GROUPBY_MAX_GROUPS'] = 10
+        self.h5file.params['GROUPBY_PARTITIONS'] = 3
+        self._checkGroups(tbl.groupby(['sym', 'day'], self.aggregates))
+        bound = 500
+        self._checkGroups(tbl.groupby(['sym', 'day'], self.aggregates,
+                                      'price > bound', step=2),
+                          'price > 500', step=2)
+        # The temporary files are removed.
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            tbl.groupby(['sym', 'day'], self.aggregates, tmp_dir=tmp_dir)
+            self.assertEqual(os.listdir(tmp_dir), [])
+        finally:
+            os.rmdir(tmp_dir)
+
+
+    def test02_sorted(self):
+        """Grouping rows in the order of a completely sorted index."""
+
+        tbl = self.tbl
+        expected = tbl.groupby(['sym', 'day'], self.aggregates)
+        tbl.cols.sym.createCSIndex()
+        # The table must not be scanned.
+        tbl.iterrows = tbl._where = None
+        result = tbl.groupby(['sym', 'day'], self.aggregates)
+        self.assertTrue(allequal(result, expected))
+        result = tbl.groupby(['sym', 'day'], self.aggregates, 'day != 3',
+                             start=3, stop=-5, step=3)
+        del tbl.iterrows, tbl._where
+        self._checkGroups(result, 'day != 3', start=3, stop=-5, step=3)
+
+
+    def test03_newTable(self):
+        """Writing groups to a new table."""
+
+        tbl = self.tbl
+        for maxgroups in [1000, 10]:
+            self.h5file.params['GROUPBY_MAX_GROUPS'] = maxgroups
+            newtbl = tbl.groupby(['sym', 'day'], self.aggregates,
+                                 newname='groups%d' % maxgroups)
+            self.assertTrue(newtbl is self.h5file.root._f_getChild(
+                'groups%d' % maxgroups))
+            result = newtbl.read()
+            result = result[lexsort([result['day'], result['sym']])]
+            self._checkGroups(result)
+        self.h5file.createGroup('/', 'g')
+        newtbl = tbl.groupby('day', {'price': 'max'}, 'day < 2',
+                             newparent='/g', newname='days')
+        self.assertEqual(newtbl._v_pathname, '/g/days')
+        prices = tbl.read(field='price')
+        self.assertEqual(newtbl.read().tolist(),
+                         [(0, prices[0::5].max()), (1, prices[1::5].max())])
+
+
+    def test04_errors(self):
+        """Grouping with wrong arguments."""
+
+        tbl = self.tbl
+        self.assertRaises(KeyError, tbl.groupby, 'foo', {'price': 'sum'})
+        self.assertRaises(KeyError, tbl.groupby, 'sym', {'foo': 'sum'})
+        self.assertRaises(TypeError, tbl.groupby, 'md', {'price': 'sum'})
+        self.assertRaises(TypeError, tbl.groupby, 'day', {'sym': 'mean'})
+        self.assertRaises(ValueError, tbl.groupby, 'day', {'sym': 'foo'})
+        self.assertRaises(ValueError, tbl.groupby, [], {'sym': 'count'})
+        self.assertRaises(NameError, tbl.groupby, 'day', {'sym': 'count'},
+                          'day > foo', {})
+
+
+
+class JoinTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests the `join()` function."""
+
+
+    class LeftDesc(IsDescription):
+        key = Int32Col(pos=0)
+        value = Float64Col(pos=1)
+
+
+    class RightDesc(IsDescription):
+        key = Int32Col(pos=0)
+        value = StringCol(itemsize=4, dflt='none', pos=1)
+        id = Int16Col(pos=2)
+
+
+    def setUp(self):
+        super(JoinTestCase, self).setUp()
+        left = self.h5file.createTable('/', 'left', self.LeftDesc)
+        # Keys are repeated in both tables, and some are not shared.
+        left.append([((i * 7) % 101, i * .5) for i in xrange(310)])
+        right = self.h5file.createTable('/', 'right', self.RightDesc)
+        right.append([((i * 3) % 131, 'v%d' % i, i) for i in xrange(270)])
+        # Use small buffers so that keys are merged in several batches.
+        left.nrowsinbuf = right.nrowsinbuf = 16
+        self.left, self.right = left, right
+
+
+    def _expected(self, how):
+        lrows = self.left.read().tolist()
+        rrows = self.right.read().tolist()
+        result, rmatched = [], {}
+        for lrow in lrows:
+            matched = False
+            for i, rrow in enumerate(rrows):
+                if lrow[0] == rrow[0]:
+                    result.append(lrow + rrow[1:])
+                    matched = rmatched[i] = True
+            if not matched and how in ['left', 'outer']:
+                result.append(lrow + ('none', 0))
+        if how in ['right', 'outer']:
+            for i, rrow in enumerate(rrows):
+                if i not in rmatched:
+                    result.append((rrow[0], 0.) + rrow[1:])
+        result.sort()
+        return result
+
+
+    def _checkJoin(self, result, how):
+        self.assertEqual(result.dtype.names,
+                         ('key', 'value', 'value_right', 'id'))
+        # Only keys must be sorted, so compare after sorting rows.
+        keys = result['key']
+        self.assertTrue((keys[:-1] <= keys[1:]).all())
+        result = result.tolist()
+        result.sort()
+        self.assertEqual(result, self._expected(how))
+
+
+    def test00_sort(self):
+        """Joining tables with no indexes."""
+
+        for how in ['inner', 'left', 'right', 'outer']:
+            self._checkJoin(join(self.left, self.right, 'key', how), how)
+
+
+    def test01_runs(self):
+        """Joining tables sorted in runs in a temporary file."""
+
+        self.h5file.params['JOIN_SORT_ROWS'] = 50
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            for how in ['inner', 'outer']:
+                result = join(self.left, self.right, 'key', how,
+                              tmp_dir=tmp_dir)
+                self._checkJoin(result, how)
+                # The temporary files are removed.
+                self.assertEqual(os.listdir(tmp_dir), [])
+        finally:
+            os.rmdir(tmp_dir)
+
+
+    def test02_indexed(self):
+        """Joining tables in the order of completely sorted indexes."""
+
+        self.left.cols.key.createCSIndex()
+        self._checkJoin(join(self.left, self.right, 'key', 'outer'), 'outer')
+        self.right.cols.key.createCSIndex()
+        hows = ['inner', 'left', 'right', 'outer']
+        # The key columns must not be read.
+        self.left._read = self.right._read = None
+        results = [join(self.left, self.right, 'key', how) for how in hows]
+        del self.left._read, self.right._read
+        for how, result in zip(hows, results):
+            self._checkJoin(result, how)
+
+
+    def test03_out(self):
+        """Joining tables into a destination table."""
+
+        class OutDesc(IsDescription):
+            key = Int64Col(pos=0)
+            value = Float64Col(pos=1)
+            value_right = StringCol(itemsize=4, pos=2)
+            id = Int16Col(pos=3)
+            extra = Int8Col(dflt=-1, pos=4)
+
+        out = self.h5file.createTable('/', 'out', OutDesc)
+        nrows = join(self.left, self.right, 'key', 'left', out=out)
+        self.assertEqual(nrows, out.nrows)
+        self.assertTrue((out.cols.extra[:] == -1).all())
+        result = out.read(field=None)[['key', 'value', 'value_right', 'id']]
+        result = result.tolist()
+        result.sort()
+        self.assertEqual(result, self._expected('left'))
+
+
+    def test04_keys(self):
+        """Joining tables on key columns with different names."""
+
+        result = join(self.left, self.right, ('value', 'id'))
+        self.assertEqual(result.dtype.names,
+                         ('key', 'value', 'key_right', 'value_right', 'id'))
+        values = self.left.cols.value[:]
+        ids = values[values == values.astype('int16')].astype('int16')
+        self.assertEqual(result['id'].tolist(), sorted(ids))
+        self.assertTrue((result['value'] == result['id']).all())
+
+
+    def test05_errors(self):
+        """Joining tables with wrong arguments."""
+
+        left, right = self.left, self.right
+        self.assertRaises(ValueError, join, left, right, 'key', 'cross')
+        self.assertRaises(KeyError, join, left, right, 'foo')
+        self.assertRaises(KeyError, join, left, right, ('key', 'foo'))
+        self.assertRaises(TypeError, join, left, right, ('key', 'value'))
+
+
+
+class LazyRemoveTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests removing rows lazily and compacting tables."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(pos=1)
+
+
+    def setUp(self):
+        super(LazyRemoveTestCase, self).setUp()
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc)
+        # Use small buffers so that reads span several of them.
+        tbl.nrowsinbuf = 16
+        nrows = 100
+        tbl.append([(i, i * 2.) for i in xrange(nrows)])
+        self.assertEqual(tbl.removeRows(10, 20, lazy=True), 10)
+        self.assertEqual(tbl.removeRows(15, 25, lazy=True), 5)
+        self.assertEqual(tbl.removeRows(-1, lazy=True), 1)
+        self.assertEqual(tbl.removeRows(50, 50, lazy=True), 0)
+        self.tbl = tbl
+        self.live = [i for i in xrange(nrows) if not (10 <= i < 25 or i == 99)]
+
+
+    def _checkRows(self, tbl):
+        live = self.live
+        self.assertEqual(tbl.nrows, 100)
+        self.assertEqual(tbl.ndeleted, 16)
+        self.assertEqual(len(tbl), len(live))
+        self.assertEqual(tbl.read(field='var1').tolist(), live)
+        self.assertEqual(tbl[5:40:3]['var1'].tolist(),
+                         [i for i in live if i >= 5 and i < 40 and i % 3 == 2])
+        self.assertEqual(tbl.cols.var2[:].tolist(), [i * 2. for i in live])
+        self.assertEqual([row['var1'] for row in tbl], live)
+        self.assertEqual([row.nrow for row in tbl.iterrows(0, 50, 2)],
+                         [i for i in live if i < 50 and i % 2 == 0])
+        self.assertEqual(tbl[9]['var1'], 9)
+        self.assertRaises(IndexError, tbl.__getitem__, 10)
+        self.assertRaises(IndexError, tbl.__getitem__, -1)
+
+
+    def _checkCoordinates(self, tbl):
+        # Reading deleted rows by their coordinates is an error...
+        self.assertRaises(IndexError, tbl.itersequence, [30, 12])
+        self.assertRaises(IndexError, tbl.readCoordinates, [5, 15, 30])
+        self.assertRaises(IndexError, tbl.readCoordinates, [99], 'var1')
+        self.assertRaises(IndexError, tbl.__getitem__, [5, 15, 30])
+        # ...unless they are skipped explicitly.
+        self.assertEqual([row['var1'] for row in
+                          tbl.itersequence([30, 12], skipdeleted=True)], [30])
+        self.assertEqual(tbl.readCoordinates([5, 15, 30],
+                                             skipdeleted=True)['var1'].tolist(),
+                         [5, 30])
+        self.assertEqual(tbl.readCoordinates([15], 'var1',
+                                             skipdeleted=True).tolist(), [])
+        # Coordinates of rows which are not deleted are read as usual.
+        self.assertEqual([row['var1'] for row in tbl.itersequence([30, 9])],
+                         [30, 9])
+        self.assertEqual(tbl.readCoordinates([30, 5])['var1'].tolist(),
+                         [30, 5])
+        self.assertEqual(tbl[[5, 30]]['var1'].tolist(), [5, 30])
+
+
+    def _checkQueries(self, tbl):
+        live = [i for i in self.live if i < 60]
+        self.assertEqual([row['var1'] for row in tbl.where('var1 < 60')], live)
+        self.assertEqual(tbl.readWhere('var1 < 60')['var1'].tolist(), live)
+        self.assertEqual(tbl.getWhereList('var1 < 60').tolist(), live)
+        self.assertEqual(tbl.aggregate({'var1': 'count'}, 'var1 < 60'),
+                         {'var1': len(live)})
+        result = tbl.groupby('var1', {'var2': 'max'}, 'var1 < 60')
+        self.assertEqual(result['var1'].tolist(), live)
+        self.assertEqual(join(tbl, tbl, 'var1')['var1'].tolist(), self.live)
+
+
+    def test00_read(self):
+        """Reading and iterating over tables with rows deleted lazily."""
+
+        self._checkRows(self.tbl)
+        self._reopen()
+        self._checkRows(self.h5file.root.test)
+
+
+    def test00b_readCoordinates(self):
+        """Reading rows deleted lazily by their coordinates."""
+
+        self._checkCoordinates(self.tbl)
+        self._reopen()
+        self._checkCoordinates(self.h5file.root.test)
+
+
+    def test01_where(self):
+        """Querying tables with rows deleted lazily."""
+
+        tbl = self.tbl
+        self._checkQueries(tbl)
+        tbl.cols.var1.createCSIndex()
+        self._checkQueries(tbl)
+        self.assertEqual(self.tbl.readSorted('var1', field='var1').tolist(),
+                         self.live)
+
+
+    def test02_compact(self):
+        """Compacting tables with rows deleted lazily."""
+
+        tbl = self.tbl
+        tbl.cols.var1.createIndex()
+        self.assertEqual(tbl.compact(), 16)
+        self.assertEqual(tbl.nrows, len(self.live))
+        self.assertEqual(tbl.ndeleted, 0)
+        self.assertEqual(tbl.compact(), 0)
+        self.assertEqual(tbl.read(field='var1').tolist(), self.live)
+        # Indexes are up to date.
+        self.assertEqual(tbl.readWhere('var1 < 60')['var1'].tolist(),
+                         [i for i in self.live if i < 60])
+        self._reopen()
+        tbl = self.h5file.root.test
+        self.assertEqual(tbl.ndeleted, 0)
+        self.assertEqual(tbl.cols.var2[:].tolist(),
+                         [i * 2. for i in self.live])
+
+
+    def test03_removeRows(self):
+        """Removing rows from tables with rows deleted lazily."""
+
+        tbl = self.tbl
+        self.assertEqual(tbl.removeRows(5, 12), 7)
+        self.assertEqual(tbl.nrows, 93)
+        self.assertEqual(tbl.ndeleted, 14)
+        live = [i for i in self.live if not (5 <= i < 12)]
+        self.assertEqual(tbl.read(field='var1').tolist(), live)
+        # Rows can be deleted lazily at once.
+        self.assertEqual(tbl.removeRows(0, tbl.nrows, lazy=True), 79)
+        self.assertEqual(len(tbl.read()), 0)
+        self.assertEqual(tbl.compact(), 93)
+        self.assertEqual(tbl.nrows, 0)
+
+
+    def test04_copy(self):
+        """Copying tables with rows deleted lazily."""
+
+        tbl = self.tbl
+        newtbl = tbl.copy('/', 'test2')
+        self.assertEqual(newtbl.ndeleted, 0)
+        self.assertEqual(newtbl.read(field='var1').tolist(), self.live)
+        newtbl = tbl.copy('/', 'test3', start=5, stop=60, step=2)
+        self.assertEqual(newtbl.read(field='var1').tolist(),
+                         [i for i in self.live if i >= 5 and i < 60
+                          and i % 2 == 1])
+
+
+    def test05_aggregate(self):
+        """Aggregating tables with rows deleted lazily."""
+
+        tbl = self.tbl
+        self.assertEqual(tbl.aggregate({'var1': 'count'}),
+                         {'var1': len(self.live)})
+        self.assertEqual(tbl.aggregate({'var1': 'count'}, start=5, stop=60,
+                                       step=2),
+                         {'var1': len([i for i in self.live
+                                       if i >= 5 and i < 60 and i % 2 == 1])})
+        self.assertEqual(tbl.aggregate({'var1': ('count', 'sum')}),
+                         {'var1': (len(self.live), sum(self.live))})
+
+
+    def test06_ranges(self):
+        """Deleted rows are saved as ranges which are only appended."""
+
+        tbl = self.tbl
+        ranges = tbl._getTombstones()._f_getChild('ranges')
+        self.assertEqual(ranges.read().tolist(), [[10, 20], [20, 25], [99, 100]])
+        # Only the rows not deleted yet are saved.
+        self.assertEqual(tbl.removeRows(5, 30, lazy=True), 10)
+        self.assertEqual(ranges.read().tolist(),
+                         [[10, 20], [20, 25], [99, 100], [5, 10], [25, 30]])
+        for i in xrange(40, 60, 2):
+            self.assertEqual(tbl.removeRows(i, lazy=True), 1)
+        self.assertEqual(tbl.removeRows(40, 60, lazy=True), 10)
+        self.assertEqual(tbl.ndeleted, 46)
+        self.assertEqual(tbl._getDeletedRanges()[0].tolist(), [5, 40, 99])
+        self.assertEqual(tbl._getDeletedRanges()[1].tolist(), [30, 60, 100])
+        live = [i for i in xrange(100)
+                if not (5 <= i < 30 or 40 <= i < 60 or i == 99)]
+        self.assertEqual(tbl.read(field='var1').tolist(), live)
+        self.assertEqual(tbl[::3]['var1'].tolist(),
+                         [i for i in live if i % 3 == 0])
+        self._reopen()
+        tbl = self.h5file.root.test
+        self.assertEqual(tbl.ndeleted, 46)
+        self.assertEqual(len(tbl), len(live))
+        self.assertEqual(tbl.readWhere('var1 > 20')['var1'].tolist(),
+                         [i for i in live if i > 20])
+
+
+
+class ScatteredReadTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests reading rows at unsorted and repeated coordinates."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(pos=1)
+        var3 = Time32Col(pos=2)
+
+
+    def setUp(self):
+        super(ScatteredReadTestCase, self).setUp()
+        self.tables = []
+        for complevel in [0, 1]:
+            tbl = self.h5file.createTable(
+                '/', 'test%d' % complevel, self.TblDesc,
+                filters=Filters(complevel), chunkshape=(32,))
+            tbl.append([(i, i * 2., i) for i in xrange(1000)])
+            self.tables.append(tbl)
+        # Coordinates in dense and sparse chunks, with repetitions.
+        coords = range(990, 90, -7) + range(300, 364) + [5, 999, 5, 300]
+        self.coords = array(coords, dtype='int64')
+
+
+    def _checkRows(self, rows, coords):
+        self.assertEqual(rows['var1'].tolist(), coords.tolist())
+        self.assertEqual(rows['var2'].tolist(), (coords * 2.).tolist())
+        self.assertEqual(rows['var3'].tolist(), coords.tolist())
+
+
+    def test00_readCoordinates(self):
+        """Reading rows at scattered coordinates."""
+
+        coords = self.coords
+        for tbl in self.tables:
+            self._checkRows(tbl.readCoordinates(coords), coords)
+            self._checkRows(tbl[coords], coords)
+            self._checkRows(tbl.readCoordinates(sort(coords)), sort(coords))
+            self.assertEqual(tbl.readCoordinates(coords, 'var2').tolist(),
+                             (coords * 2.).tolist())
+
+
+    def test01_itersequence(self):
+        """Iterating over rows at scattered coordinates."""
+
+        coords = self.coords
+        for tbl in self.tables:
+            self.assertEqual([row['var1'] for row in tbl.itersequence(coords)],
+                             coords.tolist())
+            self.assertEqual([row.nrow for row in tbl.itersequence(coords)],
+                             coords.tolist())
+
+
+    def test02_chunkCache(self):
+        """Reading rows at scattered coordinates through the chunk cache."""
+
+        coords = self.coords
+        for tbl in self.tables:
+            # Queries on zone maps fill the chunk cache.
+            tbl.cols.var1.createZoneMap()
+            self.assertEqual(len(tbl.readWhere('var1 < 100')), 100)
+            self.assertFalse(tbl._dirtycache)
+            self._checkRows(tbl.readCoordinates(coords), coords)
+            self._checkRows(tbl.readCoordinates(coords), coords)
+            # Modified rows are not read from the cache.
+            tbl.cols.var1[300] = -1
+            rows = tbl.readCoordinates(coords)
+            self.assertEqual(rows['var1'][coords == 300].tolist(), [-1, -1])
+
+
+
+class ScatteredWriteTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests writing rows at unsorted and repeated coordinates."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(pos=1)
+        var3 = Time32Col(pos=2)
+
+
+    def setUp(self):
+        super(ScatteredWriteTestCase, self).setUp()
+        self.tables = []
+        for complevel in [0, 1]:
+            tbl = self.h5file.createTable(
+                '/', 'test%d' % complevel, self.TblDesc,
+                filters=Filters(complevel), chunkshape=(32,))
+            tbl.append([(i, i * 2., i) for i in xrange(1000)])
+            self.tables.append(tbl)
+        # Coordinates in dense and sparse chunks, with repetitions.
+        self.coords = range(990, 90, -7) + range(300, 364) + [5, 999, 5, 300]
+
+
+    def _checkUpdates(self, tbl, coords):
+        expected = range(1000)
+        # The last value for a repeated coordinate wins.
+        for i, coord in enumerate(coords):
+            expected[coord] = -i
+        self.assertEqual(tbl.cols.var1[:].tolist(), expected)
+        self.assertEqual(tbl.cols.var2[:].tolist(),
+                         [value * 2. for value in expected])
+        self.assertEqual(tbl.cols.var3[:].tolist(), expected)
+
+
+    def test00_modifyCoordinates(self):
+        """Modifying rows at scattered coordinates."""
+
+        coords = self.coords
+        rows = [(-i, -i * 2., -i) for i in xrange(len(coords))]
+        for tbl in self.tables:
+            self.assertEqual(tbl.modifyCoordinates(coords, rows), len(coords))
+            self._checkUpdates(tbl, coords)
+
+
+    def test01_setitem(self):
+        """Setting rows at scattered coordinates."""
+
+        coords = array(self.coords)
+        rows = [(-i, -i * 2., -i) for i in xrange(len(coords))]
+        for tbl in self.tables:
+            tbl.cols.var1.createIndex()
+            tbl[coords] = rows
+            self._checkUpdates(tbl, coords)
+            # The index is up to date.
+            self.assertEqual(tbl.getWhereList('var1 < 0', sort=True).tolist(),
+                             sorted(set(coords) - set([coords[0]])))
+
+
+    def test02_rowUpdate(self):
+        """Updating rows at scattered coordinates while iterating."""
+
+        coords = self.coords[:-2]
+        for tbl in self.tables:
+            for i, row in enumerate(tbl.itersequence(coords)):
+                row['var1'] = row['var3'] = -i
+                row['var2'] = -i * 2.
+                row.update()
+            self._checkUpdates(tbl, coords)
+
+
+
+class DirectChunkWriteTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests appending rows in chunks written bypassing the filters."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(pos=1)
+        var3 = Time32Col(pos=2)
+
+
+    def _createTables(self, filters, nworkers):
+        self.h5file.params['DIRECT_CHUNK_WORKERS'] = nworkers
+        tbl = self.h5file.createTable(
+            '/', 'test%d' % nworkers, self.TblDesc, filters=filters,
+            chunkshape=(32,))
+        tbl.nrowsinbuf = 50
+        # Count the chunks written directly.
+        self.nchunks = 0
+        def writeChunk(offset, data, filter_mask=0):
+            self.nchunks += 1
+            tbl.__class__._g_writeChunk(tbl, offset, data, filter_mask)
+        tbl._g_writeChunk = writeChunk
+        for start, stop in [(0, 10), (10, 110), (110, 180), (180, 183)]:
+            tbl.append([(i, i * 2., i) for i in xrange(start, stop)])
+        row = tbl.row
+        for i in xrange(183, 400):
+            row['var1'], row['var2'], row['var3'] = i, i * 2., i
+            row.append()
+        tbl.flush()
+        return tbl
+
+
+    def _checkTables(self, filters):
+        reference = self._createTables(filters, 0)
+        self.assertEqual(self.nchunks, 0)
+        tbl = self._createTables(filters, 2)
+        if not tbl._v_chunkpipeline:
+            raise common.SkipTest(
+                "chunks can not be written directly with this HDF5 version")
+        self.assertTrue(self.nchunks > 0)
+        expected = reference.read()
+        self.assertEqual(tbl.read().tolist(), expected.tolist())
+        # Copies append whole chunks too.
+        tbl2 = tbl.copy('/', 'copy', chunkshape=(32,))
+        self.assertEqual(tbl2.read().tolist(), expected.tolist())
+
+
+    def test00_zlib(self):
+        """Appending to a compressed table."""
+
+        self._checkTables(Filters(complevel=1, complib='zlib'))
+
+
+    def test01_shuffle(self):
+        """Appending to a compressed and shuffled table."""
+
+        self._checkTables(Filters(complevel=1, complib='zlib', shuffle=True))
+
+
+    def test02_fletcher32(self):
+        """Appending to a table with filters not applied outside HDF5."""
+
+        filters = Filters(complevel=1, complib='zlib', fletcher32=True)
+        self.h5file.params['DIRECT_CHUNK_WORKERS'] = 2
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc,
+                                      filters=filters)
+        self.assertEqual(tbl._directChunkRows(), 0)
+
+
+    def test03_blosc(self):
+        """Appending to a table compressed with Blosc."""
+
+        self._checkTables(Filters(complevel=5, complib='blosc'))
+
+
+    def test04_lzo(self):
+        """Appending to a table compressed with LZO."""
+
+        if whichLibVersion('lzo') is None:
+            raise common.SkipTest("LZO is not available")
+        self._checkTables(Filters(complevel=1, complib='lzo', shuffle=True))
+
+
+    def test05_bzip2(self):
+        """Appending to a table compressed with bzip2."""
+
+        if whichLibVersion('bzip2') is None:
+            raise common.SkipTest("bzip2 is not available")
+        self._checkTables(Filters(complevel=1, complib='bzip2'))
+
+
+    def test06_incompressible(self):
+        """Chunks which do not get smaller are left uncompressed."""
+
+        filters = Filters(complevel=5, complib='blosc', shuffle=False)
+        self.h5file.params['DIRECT_CHUNK_WORKERS'] = 2
+        tbl = self.h5file.createTable('/', 'test', {'x': Float64Col()},
+                                      filters=filters, chunkshape=(32,))
+        if not tbl._v_chunkpipeline:
+            raise common.SkipTest(
+                "chunks can not be written directly with this HDF5 version")
+        masks = []
+        def writeChunk(offset, data, filter_mask=0):
+            masks.append(filter_mask)
+            tbl.__class__._g_writeChunk(tbl, offset, data, filter_mask)
+        tbl._g_writeChunk = writeChunk
+        values = random.random(320)
+        tbl.append([values])
+        tbl.flush()
+        self.assertEqual(masks, [1] * 10)
+        self.assertEqual(tbl.col('x').tolist(), values.tolist())
+
+
+    def test07_workerPool(self):
+        """The worker threads are shared by the appends to a file."""
+
+        tbl = self._createTables(Filters(complevel=1, complib='zlib'), 2)
+        if not tbl._v_chunkpipeline:
+            raise common.SkipTest(
+                "chunks can not be written directly with this HDF5 version")
+        pool = self.h5file._getWorkerPool('DIRECT_CHUNK_WORKERS')
+        nthreads = threading.activeCount()
+        for start in xrange(400, 1000, 100):
+            tbl.append([(i, i * 2., i) for i in xrange(start, start+100)])
+        self.assertTrue(
+            self.h5file._getWorkerPool('DIRECT_CHUNK_WORKERS') is pool)
+        self.assertEqual(threading.activeCount(), nthreads)
+        self.assertEqual(tbl.col('var1').tolist(), range(1000))
+        # Changing the parameter replaces the pool.
+        self.h5file.params['DIRECT_CHUNK_WORKERS'] = 3
+        tbl.append([(i, i * 2., i) for i in xrange(1000, 1100)])
+        self.assertEqual(
+            self.h5file._getWorkerPool('DIRECT_CHUNK_WORKERS').nworkers, 3)
+        self.assertEqual(tbl.col('var1').tolist(), range(1100))
+
+
+
+class DirectChunkReadTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests reading rows in chunks decompressed outside the filters."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(pos=1)
+
+
+    def setUp(self):
+        super(DirectChunkReadTestCase, self).setUp()
+        filters = Filters(complevel=1, complib='zlib', shuffle=True)
+        self.tbl = tbl = self.h5file.createTable(
+            '/', 'test', self.TblDesc, filters=filters, chunkshape=(32,))
+        tbl.nrowsinbuf = 100
+        tbl.append([(i, i * 2.) for i in xrange(500)])
+        tbl.flush()
+        self.expected = tbl.read()
+        self.h5file.params['DIRECT_CHUNK_WORKERS'] = 2
+        # Count the chunks read directly.
+        self.nchunks = 0
+        def readChunk(offset):
+            self.nchunks += 1
+            return tbl.__class__._g_readChunk(tbl, offset)
+        tbl._g_readChunk = readChunk
+
+
+    def test00_read(self):
+        """Reading ranges spanning several whole chunks."""
+
+        tbl = self.tbl
+        for start, stop in [(0, 500), (5, 300), (64, 128), (10, 40)]:
+            self.assertEqual(tbl.read(start, stop).tolist(),
+                             self.expected[start:stop].tolist())
+        if tbl._v_chunkpipeline:
+            self.assertEqual(self.nchunks, 15 + 8 + 2)
+
+
+    def test01_readWhere(self):
+        """Selecting rows with chunks read directly."""
+
+        result = self.tbl.readWhere('var1 % 7 == 3')
+        self.assertEqual(result.tolist(),
+                         [row for row in self.expected.tolist()
+                          if row[0] % 7 == 3])
+
+
+    def test02_step(self):
+        """Reading with a step."""
+
+        self.assertEqual(self.tbl.read(0, 500, 3).tolist(),
+                         self.expected[::3].tolist())
+        self.assertEqual(self.tbl.read(7, 450, 40).tolist(),
+                         self.expected[7:450:40].tolist())
+
+
+
+class AsyncAppendTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests saving the rows appended with `Row.append()` in a thread."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(pos=1)
+
+
+    def setUp(self):
+        super(AsyncAppendTestCase, self).setUp()
+        self.h5file.params['ASYNC_APPEND_DEPTH'] = 2
+        self.tbl = self.h5file.createTable('/', 'test', self.TblDesc)
+        self.tbl.nrowsinbuf = 10
+
+
+    def _appendRows(self, start, stop):
+        row = self.tbl.row
+        for i in xrange(start, stop):
+            row['var1'], row['var2'] = i, i * 2.
+            row.append()
+
+
+    def _checkRows(self, nrows):
+        self.assertEqual(self.tbl.nrows, nrows)
+        self.assertEqual(self.tbl.read().tolist(),
+                         [(i, i * 2.) for i in xrange(nrows)])
+
+
+    def test00_flush(self):
+        """Flushing waits for the rows being saved."""
+
+        self._appendRows(0, 95)
+        self.assertTrue(self.tbl._v_writer is not None)
+        self.tbl.flush()
+        self.assertTrue(self.tbl._v_writer is None)
+        self._checkRows(95)
+        self._appendRows(95, 150)
+        self.tbl.flush()
+        self._checkRows(150)
+
+
+    def test01_tableAppend(self):
+        """Appending rows directly after the buffered ones."""
+
+        self._appendRows(0, 50)
+        self.tbl.append([(i, i * 2.) for i in xrange(50, 60)])
+        self.tbl.flush()
+        self._checkRows(60)
+
+
+    def test02_indexed(self):
+        """Saving rows of an indexed table in the background."""
+
+        self.tbl.cols.var1.createIndex()
+        self._appendRows(0, 200)
+        self.tbl.flush()
+        self._checkRows(200)
+        result = self.tbl.readWhere('(var1 >= 40) & (var1 < 50)')
+        self.assertEqual(result['var1'].tolist(), range(40, 50))
+
+
+    def test03_close(self):
+        """Closing the file saves the pending rows."""
+
+        self._appendRows(0, 95)
+        self._reopen()
+        self.tbl = self.h5file.root.test
+        self._checkRows(95)
+
+
+    def test04_error(self):
+        """Errors saving rows are raised when appending or flushing."""
+
+        tbl = self.tbl
+        def saveBufferedRows(*args):
+            raise IOError("disk full")
+        tbl._saveBufferedRows = saveBufferedRows
+        def appendRows():
+            self._appendRows(0, 30)
+            tbl.flush()
+        self.assertRaises(IOError, appendRows)
+        self.assertTrue(tbl._v_writer is None)
+        del tbl._saveBufferedRows
+        tbl.flush()
+
+
+    def test05_operations(self):
+        """Other operations wait for the rows being saved."""
+
+        tbl = self.tbl
+        self._appendRows(0, 95)
+        # The rows in the last buffer are not saved until flushing.
+        self.assertEqual(tbl.nrows, 90)
+        self.assertTrue(tbl._v_writer is None)
+        self._appendRows(95, 200)
+        self.assertEqual(len(tbl.read()), 200)
+        self._appendRows(200, 300)
+        self.assertEqual(tbl.readWhere('var1 >= 290')['var1'].tolist(),
+                         range(290, 300))
+        self._appendRows(300, 400)
+        tbl.modifyRows(395, 400, 1, [(-1, -1.)] * 5)
+        self.assertTrue(tbl._v_writer is None)
+        self._appendRows(400, 500)
+        tbl.cols.var1.createIndex()
+        self.assertTrue(tbl._v_writer is None)
+        tbl.flush()
+        self.assertEqual(tbl.nrows, 500)
+        self.assertEqual(tbl.readWhere('var1 < 0')['var2'].tolist(),
+                         [-1.] * 5)
+
+
+    def test06_callerThread(self):
+        """Rows are only written by the thread appending them."""
+
+        tbl = self.tbl
+        threads = []
+        def saveBufferedRows(*args):
+            threads.append(threading.currentThread())
+            return tbl.__class__._saveBufferedRows(tbl, *args)
+        tbl._saveBufferedRows = saveBufferedRows
+        self._appendRows(0, 95)
+        tbl.flush()
+        del tbl._saveBufferedRows
+        self._checkRows(95)
+        self.assertEqual(threads, [threading.currentThread()] * 10)
+
+
+    def test07_filteredChunks(self):
+        """Chunks are filtered in the background and written directly."""
+
+        self.h5file.removeNode('/test')
+        filters = Filters(complevel=1, complib='zlib', shuffle=True)
+        self.tbl = tbl = self.h5file.createTable(
+            '/', 'test', self.TblDesc, filters=filters, chunkshape=(4,))
+        tbl.nrowsinbuf = 10
+        # No direct chunk workers are needed for this.
+        self.assertEqual(self.h5file.params['DIRECT_CHUNK_WORKERS'], 0)
+        if not tbl._v_chunkpipeline:
+            raise common.SkipTest(
+                "chunks can not be written directly with this HDF5 version")
+        offsets, threads = [], []
+        def writeChunk(offset, data, filter_mask=0):
+            offsets.append(offset[0])
+            return tbl.__class__._g_writeChunk(tbl, offset, data, filter_mask)
+        def filterChunks(nparr):
+            threads.append(threading.currentThread())
+            return tbl.__class__._filterChunks(tbl, nparr)
+        tbl._g_writeChunk = writeChunk
+        tbl._filterChunks = filterChunks
+        self._appendRows(0, 95)
+        tbl.flush()
+        self._checkRows(95)
+        # Two whole chunks in each buffer of 10 rows.
+        self.assertEqual(len(offsets), 18)
+        self.assertTrue(4 * 20 in offsets)
+        self.assertTrue(threads)
+        self.assertTrue(threading.currentThread() not in threads)
+
+
+    def test08_time64(self):
+        """Time columns are converted in the background."""
+
+        class TblDesc(IsDescription):
+            var1 = Int32Col(pos=0)
+            var2 = Time64Col(pos=1)
+        self.h5file.removeNode('/test')
+        self.tbl = tbl = self.h5file.createTable('/', 'test', TblDesc)
+        tbl.nrowsinbuf = 10
+        tbl.cols.var2.createIndex()
+        self._appendRows(0, 95)
+        tbl.flush()
+        self._checkRows(95)
+        result = tbl.readWhere('(var2 >= 40) & (var2 < 50)')
+        self.assertEqual(result['var1'].tolist(), range(20, 25))
+
+
+    def test09_unfilteredChunks(self):
+        """Chunks not filtered in the background issue a warning."""
+
+        from tables.table import _BufferWriter
+        self.h5file.removeNode('/test')
+        filters = Filters(complevel=1, complib='zlib', fletcher32=True)
+        self.tbl = tbl = self.h5file.createTable(
+            '/', 'test', self.TblDesc, filters=filters, chunkshape=(4,))
+        tbl.nrowsinbuf = 10
+        self.assertEqual(tbl._wholeChunkRows(), 0)
+        warnings.filterwarnings('error', category=PerformanceWarning)
+        try:
+            self.assertRaises(PerformanceWarning, _BufferWriter, tbl, 2)
+        finally:
+            warnings.filterwarnings('default', category=PerformanceWarning)
+        # The rows are saved anyway.
+        warnings.filterwarnings('ignore', category=PerformanceWarning)
+        try:
+            self._appendRows(0, 95)
+            tbl.flush()
+        finally:
+            warnings.filterwarnings('default', category=PerformanceWarning)
+        self._checkRows(95)
+
+
+
+class AppendColumnsTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests appending rows given as separate column sequences."""
+
+
+    class TblDesc(IsDescription):
+        var1 = Int32Col(pos=0)
+        var2 = Float64Col(dflt=-1., pos=1)
+        var3 = StringCol(itemsize=4, dflt='none', pos=2)
+        class Info(IsDescription):
+            _v_pos = 3
+            x = Int16Col(dflt=7, shape=2)
+            y = BoolCol()
+
+
+    def setUp(self):
+        super(AppendColumnsTestCase, self).setUp()
+        self.tbl = self.h5file.createTable('/', 'test', self.TblDesc)
+        self.tbl.nrowsinbuf = 7
+
+
+    def test00_allColumns(self):
+        """Appending all the columns."""
+
+        tbl = self.tbl
+        var1 = arange(30, dtype='int32')
+        x = arange(60, dtype='int16').reshape(30, 2)
+        tbl.appendColumns({'var1': var1, 'var2': var1 * 2.,
+                           'var3': ['r%d' % i for i in xrange(30)],
+                           'Info/x': x, 'Info/y': var1 % 2 == 0})
+        tbl.appendColumns({'var1': [30], 'var2': [60.], 'var3': ['r30'],
+                           'Info/x': [[60, 61]], 'Info/y': [True]})
+        self.assertEqual(tbl.nrows, 31)
+        result = tbl.read()
+        self.assertEqual(result['var1'].tolist(), range(31))
+        self.assertEqual(result['var2'].tolist(), range(0, 62, 2))
+        self.assertEqual(result['var3'].tolist(),
+                         ['r%d' % i for i in xrange(31)])
+        self.assertEqual(result['Info']['x'].tolist(),
+                         [[2*i, 2*i+1] for i in xrange(31)])
+        self.assertEqual(result['Info']['y'].tolist(),
+                         [i % 2 == 0 for i in xrange(31)])
+
+
+    def test01_defaults(self):
+        """Columns not given are filled with their defaults."""
+
+        tbl = self.tbl
+        tbl.appendColumns({'var2': arange(20.)})
+        info = zeros(2, dtype=tbl.description.Info._v_dtype)
+        info['x'] = [[1, 2], [3, 4]]
+        tbl.appendColumns({'var1': [1, 2], 'Info': info})
+        self.assertEqual(tbl.nrows, 22)
+        result = tbl.read()
+        self.assertEqual(result['var1'].tolist(), [0] * 20 + [1, 2])
+        self.assertEqual(result['var2'].tolist(), range(20) + [-1., -1.])
+        self.assertEqual(result['var3'].tolist(), ['none'] * 22)
+        self.assertEqual(result['Info']['x'].tolist(),
+                         [[7, 7]] * 20 + [[1, 2], [3, 4]])
+        self.assertEqual(result['Info']['y'].tolist(), [False] * 22)
+
+
+    def test02_indexed(self):
+        """Appending columns to an indexed table."""
+
+        tbl = self.tbl
+        tbl.cols.var1.createIndex()
+        tbl.appendColumns({'var1': arange(100)[::-1]})
+        tbl.flush()
+        result = tbl.readWhere('var1 < 5')
+        self.assertEqual(sorted(result['var1'].tolist()), range(5))
+
+
+    def test03_errors(self):
+        """Appending wrong columns."""
+
+        tbl = self.tbl
+        self.assertRaises(KeyError, tbl.appendColumns, {'var4': [1]})
+        self.assertRaises(ValueError, tbl.appendColumns,
+                          {'var1': [1, 2], 'var2': [1.]})
+        self.assertRaises(ValueError, tbl.appendColumns,
+                          {'Info/x': [[1, 2, 3]]})
+        self.assertEqual(tbl.nrows, 0)
+        tbl.appendColumns({})
+        self.assertEqual(tbl.nrows, 0)
+
+
+    def test04_errorInLastBuffer(self):
+        """A wrong value in the last buffer appends no row at all."""
+
+        tbl = self.tbl
+        var2 = [float(i) for i in xrange(30)] + ['wrong']
+        self.assertRaises(ValueError, tbl.appendColumns,
+                          {'var1': arange(31), 'var2': var2})
+        self.assertEqual(tbl.nrows, 0)
+        self.assertEqual(len(tbl.read()), 0)
+
+
+
+class ProjectionTestCase(common.TempFileMixin, common.PyTablesTestCase):
+    """Tests reading only some columns with the `fields` argument."""
+
+
+    class TblDesc(IsDescription):
+        id = IntCol(pos=0)
+        v1 = FloatCol(pos=1)
+        v2 = StringCol(itemsize=8, pos=2)
+        t = Time64Col(pos=3)
+        class nested(IsDescription):
+            _v_pos = 4
+            x = Int16Col()
+            y = Float32Col()
+
+
+    def setUp(self):
+        super(ProjectionTestCase, self).setUp()
+        tbl = self.h5file.createTable('/', 'test', self.TblDesc)
+        nrows = 2*tbl.nrowsinbuf + 10
+        tbl.append([(i, i*.5, str(i), i+.25, (i%100, i*2))
+                    for i in xrange(nrows)])
+        tbl.flush()
+        self.tbl = tbl
+        self.data = tbl.read()
+
+
+    def _checkRecords(self, result, names, data):
+        self.assertEqual(result.dtype.names, names)
+        for name in names:
+            self.assertTrue(allequal(result[name], data[name]))
+
+
+    def test00_read(self):
+        """Reading some columns with `Table.read()`."""
+
+        tbl, data = self.tbl, self.data
+        self._checkRecords(tbl.read(fields=['v1', 'id']),
+                           ('id', 'v1'), data)
+        self._checkRecords(tbl.read(3, 1000, 7, fields=['t', 'nested/x']),
+                           ('t', 'nested'), data[3:1000:7])
+        self._checkRecords(tbl.read(5, 5, fields=['v2']), ('v2',), data[:0])
+        self.assertTrue(allequal(tbl.read(field='nested'), data['nested']))
+        self.assertRaises(ValueError, tbl.read, field='id', fields=['v1'])
+        self.assertRaises(KeyError, tbl.read, fields=['foo'])
+
+
+    def test01_iterrows(self):
+        """Iterating over some columns with `Table.iterrows()`."""
+
+        tbl, data = self.tbl, self.data
+        result = [ (row['id'], row['nested/y'])
+                   for row in tbl.iterrows(step=3, fields=['nested', 'id']) ]
+        expected = [ (row['id'], row['nested']['y']) for row in data[::3] ]
+        self.assertEqual(result, expected)
+        for row in tbl.iterrows(0, 1, fields=['id']):
+            self.assertRaises(KeyError, row.__getitem__, 'v1')
+            self.assertRaises(NotImplementedError, row.update)
+
+
+    def test02_where(self):
+        """Querying some columns with `Table.where()`."""
+
+        tbl, data = self.tbl, self.data
+        cond = '(v1 > 10) & (v1 < %d)' % tbl.nrowsinbuf
+        expected = [ (row['id'], row['v2']) for row in data
+                     if 10 < row['v1'] < tbl.nrowsinbuf ]
+        result = [ (row['id'], row['v2'])
+                   for row in tbl.where(cond, fields=['id', 'v2']) ]
+        self.assertEqual(result, expected)
+        # Columns in the condition are read too.
+        result = [ (row['id'], row['v1'])
+                   for row in tbl.where(cond, fields=['id']) ]
+        self.assertEqual(result, [ (i, i*.5) for i, v2 in expected ])
+
+
+    def test03_whereIndexed(self):
+        """Querying some columns with `Table.where()` using an index."""
+
+        tbl = self.tbl
+        tbl.cols.id.createIndex()
+        cond = '(id > 10) & (id < %d)' % (2*tbl.nrowsinbuf)
+        expected = [ row['t'] for row in tbl.where(cond) ]
+        for coordscost in [0, 100]:
+            self.h5file.params['QUERY_COORDS_COST'] = coordscost
+            # Query twice to check the cache of query results too.
+            for i in range(2):
+                result = [ row['t'] for row in tbl.where(cond, fields=['t']) ]
+                self.assertEqual(result, expected)
+
+
 
 class DerivedTableTestCase(unittest.TestCase):
 
@@ -5086,7 +6699,7 @@ class TruncateTestCase(unittest.TestCase):
         """Checking Table.truncate() method (truncating to 0 rows)"""
 
         # Only run this test for HDF5 >= 1.8.0
-        if whichLibVersion("hdf5")[1] < "1.8.0":
+        if whichLibVersion("hdf5")[0] < 0x10800:
             return
 
         table = self.fileh.root.table
@@ -5533,6 +7146,23 @@ def suite():
         theSuite.addTest(unittest.makeSuite(Length1TestCase))
         theSuite.addTest(unittest.makeSuite(Length2TestCase))
         theSuite.addTest(unittest.makeSuite(WhereAppendTestCase))
+        theSuite.addTest(unittest.makeSuite(ReadWhereTestCase))
+        theSuite.addTest(unittest.makeSuite(ReadWherePipeline1TestCase))
+        theSuite.addTest(unittest.makeSuite(ReadWherePipeline3TestCase))
+        theSuite.addTest(unittest.makeSuite(ReadWherePipelineBloscTestCase))
+        theSuite.addTest(unittest.makeSuite(AggregateTestCase))
+        theSuite.addTest(unittest.makeSuite(AggregatePipelineTestCase))
+        theSuite.addTest(unittest.makeSuite(GroupByTestCase))
+        theSuite.addTest(unittest.makeSuite(JoinTestCase))
+        theSuite.addTest(unittest.makeSuite(LazyRemoveTestCase))
+        theSuite.addTest(unittest.makeSuite(ScatteredReadTestCase))
+        theSuite.addTest(unittest.makeSuite(ScatteredWriteTestCase))
+        theSuite.addTest(unittest.makeSuite(DirectChunkWriteTestCase))
+        theSuite.addTest(unittest.makeSuite(DirectChunkReadTestCase))
+        theSuite.addTest(unittest.makeSuite(AsyncAppendTestCase))
+        theSuite.addTest(unittest.makeSuite(AppendColumnsTestCase))
+        theSuite.addTest(unittest.makeSuite(ProjectionTestCase))
+        theSuite.addTest(unittest.makeSuite(ParallelWhereTestCase))
         theSuite.addTest(unittest.makeSuite(DerivedTableTestCase))
         theSuite.addTest(unittest.makeSuite(ChunkshapeTestCase))
         theSuite.addTest(unittest.makeSuite(ZeroSizedTestCase))
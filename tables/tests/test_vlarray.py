@@ -4135,7 +4135,7 @@ class TruncateTestCase(unittest.TestCase):
         """Checking EArray.truncate() method (truncating to 0 rows)"""
 
         # Only run this test for HDF5 >= 1.8.0
-        if whichLibVersion("hdf5")[1] < "1.8.0":
+        if whichLibVersion("hdf5")[0] < 0x10800:
             return
 
         array1 = self.fileh.root.array1
@@ -14,7 +14,9 @@
 
 import os, os.path, subprocess
 import sys
+import threading
 from time import time, clock
+from collections import deque
 
 import numpy
 
@@ -376,6 +378,116 @@ class NailedDict(object):
         cache[key] = value
 
 
+class WorkerJob(object):
+    """A call to be run by the threads of a `WorkerPool`."""
+
+    def __init__(self, func, args):
+        self._func = func
+        self._args = args
+        self._done = threading.Event()
+        self._result = None
+        self._excinfo = None
+
+    def _run(self):
+        try:
+            self._result = self._func(*self._args)
+        except:
+            self._excinfo = sys.exc_info()
+        # Do not keep the arguments alive.
+        self._func = self._args = None
+        self._done.set()
+
+    def wait(self):
+        """Wait for the job and return its result (or raise its error)."""
+        self._done.wait()
+        if self._excinfo is not None:
+            raise self._excinfo[0], self._excinfo[1], self._excinfo[2]
+        return self._result
+
+
+class WorkerPool(object):
+    """
+    A pool of `nworkers` threads running jobs for other threads.
+
+    Jobs are started in the order they are submitted with `submit()`.
+    As HDF5 is not thread-safe, they must not use it.  The threads are
+    started as jobs are submitted, and they stop after `close()`.
+    """
+
+    def __init__(self, nworkers):
+        self.nworkers = nworkers
+        self._cond = threading.Condition()
+        self._queue = deque()   # the jobs not started yet
+        self._threads = []
+        self._closed = False
+
+    def _work(self):
+        """Run the queued jobs until we are closed."""
+        cond = self._cond
+        while True:
+            cond.acquire()
+            try:
+                while not self._queue and not self._closed:
+                    cond.wait()
+                if not self._queue:
+                    return
+                job = self._queue.popleft()
+            finally:
+                cond.release()
+            job._run()
+
+    def submit(self, func, *args):
+        """Queue a call to ``func(*args)`` and return its `WorkerJob`."""
+        job = WorkerJob(func, args)
+        cond = self._cond
+        cond.acquire()
+        try:
+            if self._closed:
+                raise ValueError("the pool of worker threads is closed")
+            self._queue.append(job)
+            if len(self._threads) < self.nworkers:
+                thread = threading.Thread(target=self._work)
+                thread.setDaemon(True)
+                thread.start()
+                self._threads.append(thread)
+            cond.notify()
+        finally:
+            cond.release()
+        return job
+
+    def cancel(self, jobs):
+        """
+        Cancel the `jobs` not started yet and wait for the others.
+
+        The result of the cancelled jobs is None, and the errors of the
+        other ones are ignored.
+        """
+        cond = self._cond
+        cond.acquire()
+        try:
+            for job in jobs:
+                if job in self._queue:
+                    self._queue.remove(job)
+                    job._func = job._args = None
+                    job._done.set()
+        finally:
+            cond.release()
+        for job in jobs:
+            job._done.wait()
+
+    def close(self):
+        """Stop the threads once the queued jobs are done."""
+        cond = self._cond
+        cond.acquire()
+        try:
+            self._closed = True
+            cond.notifyAll()
+        finally:
+            cond.release()
+        for thread in self._threads:
+            thread.join()
+
+
 def detectNumberOfCores():
     """
     Detects the number of cores on a system. Cribbed from pp.
@@ -31,9 +31,11 @@ from tables.atom import Atom, EnumAtom
 from tables.utils import checkFileAccess
 
 from definitions cimport import_array, ndarray, \
-     malloc, free, strchr, strcpy, strncpy, strcmp, strdup, \
-     PyString_AsString, PyString_FromString, \
+     malloc, free, strchr, strcpy, strncpy, strcmp, strdup, memcpy, \
+     PyString_AsString, PyString_FromString, PyString_FromStringAndSize, \
+     PyObject_AsReadBuffer, \
      H5F_ACC_RDONLY, H5P_DEFAULT, H5D_CHUNKED, H5T_DIR_DEFAULT, \
+     H5Z_FLAG_REVERSE, \
      size_t, hid_t, herr_t, hsize_t, hssize_t, htri_t, \
      H5T_class_t, H5D_layout_t, H5T_sign_t, \
      H5Fopen, H5Fclose, H5Fis_hdf5, H5Gopen, H5Gclose, \
@@ -51,7 +53,7 @@ from definitions cimport import_array, ndarray, \
      get_order, set_order, is_complex, \
      get_len_of_range, NPY_INT64, npy_int64, dtype, \
      PyArray_DescrFromType, PyArray_Scalar, \
-     register_blosc
+     register_blosc, blosc_filter
 
 
 
@@ -127,6 +129,49 @@ def setBloscMaxThreads(nthreads):
   return blosc_set_nthreads(nthreads)
 
 
+def bloscFilterChunk(object data, object cd_values, int reverse):
+  """Compress the `data` of a chunk with Blosc, or decompress it if `reverse`.
+
+  `cd_values` are the parameters of the filter in the pipeline of the
+  chunk.  None is returned if the filter fails, as it does when the
+  data would not get smaller.  The GIL is released while filtering, so
+  this can be called from several threads, although Blosc itself only
+  filters one chunk at a time (using its own threads).
+  """
+  cdef void *inbuf, *buf
+  cdef Py_ssize_t nbytes
+  cdef size_t buf_size, outbytes, cd_nelmts, i
+  cdef unsigned int flags, *cd_values_
+
+  flags = 0
+  if reverse:
+    flags = H5Z_FLAG_REVERSE
+  if PyObject_AsReadBuffer(data, &inbuf, &nbytes) < 0:
+    raise TypeError("the data of the chunk must be a buffer")
+  cd_nelmts = len(cd_values)
+  cd_values_ = <unsigned int *>malloc((cd_nelmts+1) * sizeof(unsigned int))
+  buf = malloc(nbytes+1)
+  if cd_values_ == NULL or buf == NULL:
+    free(cd_values_)
+    free(buf)
+    raise MemoryError("unable to allocate the buffers for the chunk")
+  for i from 0 <= i < cd_nelmts:
+    cd_values_[i] = cd_values[i]
+  # The filter frees the buffer when replacing it with its output.
+  memcpy(buf, inbuf, nbytes)
+  buf_size = nbytes
+  with nogil:
+    outbytes = blosc_filter(flags, cd_nelmts, cd_values_, buf_size,
+                            &buf_size, &buf)
+  free(cd_values_)
+  if outbytes == 0:
+    data = None
+  else:
+    data = PyString_FromStringAndSize(<char *>buf, outbytes)
+  free(buf)
+  return data
+
+
 if sys.platform == "win32":
   # We need a different approach in Windows, because it complains when
   # trying to import the extension that is linked with a dynamic library